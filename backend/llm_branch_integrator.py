@@ -27,8 +27,58 @@ except ImportError as e:
     logging.error(f"Error importando módulos: {e}")
     MODULES_AVAILABLE = False
 
+from modules.utils.keyword_matcher import KeywordMatcher
+
 logger = logging.getLogger(__name__)
 
+# Mapeo de palabras clave a dominios
+DOMAIN_KEYWORDS = {
+    "medicina_y_salud": [
+        "médico",
+        "salud",
+        "enfermedad",
+        "tratamiento",
+        "síntoma",
+        "diagnóstico",
+    ],
+    "computación_y_programación": [
+        "código",
+        "programa",
+        "software",
+        "algoritmo",
+        "python",
+        "javascript",
+    ],
+    "matemáticas": [
+        "matemática",
+        "cálculo",
+        "álgebra",
+        "ecuación",
+        "función",
+        "derivada",
+    ],
+    "física": [
+        "física",
+        "mecánica",
+        "energía",
+        "fuerza",
+        "velocidad",
+        "aceleración",
+    ],
+    "química": [
+        "química",
+        "molécula",
+        "átomo",
+        "reacción",
+        "compuesto",
+        "elemento",
+    ],
+    "biología": ["biología", "célula", "gen", "ADN", "evolución", "ecosistema"],
+}
+
+# Autómata compartido: una pasada por consulta en lugar de un bucle por palabra
+_DOMAIN_MATCHER = KeywordMatcher.from_lexicons(DOMAIN_KEYWORDS, word_boundary=False)
+
 
 class LLMBranchIntegrator:
     """
@@ -182,55 +232,11 @@ class LLMBranchIntegrator:
 
     def _simple_domain_detection(self, query: str) -> tuple:
         """Detección simple de dominio por palabras clave"""
-        query_lower = query.lower()
-
-        # Mapeo de palabras clave a dominios
-        domain_keywords = {
-            "medicina_y_salud": [
-                "médico",
-                "salud",
-                "enfermedad",
-                "tratamiento",
-                "síntoma",
-                "diagnóstico",
-            ],
-            "computación_y_programación": [
-                "código",
-                "programa",
-                "software",
-                "algoritmo",
-                "python",
-                "javascript",
-            ],
-            "matemáticas": [
-                "matemática",
-                "cálculo",
-                "álgebra",
-                "ecuación",
-                "función",
-                "derivada",
-            ],
-            "física": [
-                "física",
-                "mecánica",
-                "energía",
-                "fuerza",
-                "velocidad",
-                "aceleración",
-            ],
-            "química": [
-                "química",
-                "molécula",
-                "átomo",
-                "reacción",
-                "compuesto",
-                "elemento",
-            ],
-            "biología": ["biología", "célula", "gen", "ADN", "evolución", "ecosistema"],
-        }
+        found = _DOMAIN_MATCHER.count_keywords(query)
 
-        for domain, keywords in domain_keywords.items():
-            if any(keyword in query_lower for keyword in keywords):
+        # Respetar el orden de declaración de los dominios
+        for domain in DOMAIN_KEYWORDS:
+            if domain in found:
                 return domain, 0.8
 
         return "general", 0.5
@@ -28,6 +28,7 @@ try:
         EmbeddingInfo,
         SearchResult,
     )
+    from .model_registry import ModelRegistry, get_model_registry
 except ImportError as e:
     print(f"Error importando módulos de datos: {e}")
 
@@ -146,6 +147,16 @@ def process_corpus(corpus_data: dict, save_processed: bool = True) -> tuple:
     return processor.process_corpus(corpus_data, save_processed)
 
 
+def process_corpus_parallel(
+    source, output_dir: str = None, workers: int = None, chunk_size: int = 256
+):
+    """Procesa un corpus en paralelo por fragmentos, reanudable"""
+    processor = get_corpus_processor_instance()
+    return processor.process_corpus_parallel(
+        source, output_dir=output_dir, workers=workers, chunk_size=chunk_size
+    )
+
+
 def clean_text(text: str, language: str = "es") -> str:
     """Limpia un texto"""
     processor = get_corpus_processor_instance()
@@ -352,7 +363,7 @@ def list_available_corpus() -> list:
 def list_available_models() -> list:
     """Lista los modelos de embeddings disponibles"""
     embeddings_manager = get_embeddings_manager_instance()
-    return list(embeddings_manager.models.keys())
+    return embeddings_manager.get_available_models()
 
 
 # Funciones de inicialización y cierre
@@ -420,6 +431,8 @@ __all__ = [
     "CorpusProcessorStats",
     "EmbeddingInfo",
     "SearchResult",
+    "ModelRegistry",
+    "get_model_registry",
     "get_data_manager",
     "get_corpus_processor",
     "get_embeddings_manager",
@@ -431,6 +444,7 @@ __all__ = [
     "get_rag_memory_data",
     "process_document",
     "process_corpus",
+    "process_corpus_parallel",
     "clean_text",
     "tokenize_text",
     "extract_keywords",
@@ -10,12 +10,15 @@ import logging
 import asyncio
 import threading
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Union, Tuple, Set
+from typing import Dict, Any, List, Optional, Union, Tuple, Set, Iterable, Iterator
 from dataclasses import dataclass, asdict
 from datetime import datetime
 import hashlib
+import os
 import unicodedata
 from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
 import nltk
 from nltk.tokenize import word_tokenize, sent_tokenize
 from nltk.corpus import stopwords
@@ -62,6 +65,125 @@ class CorpusStats:
     processing_time: float
 
 
+class CorpusStatsAccumulator:
+    """Acumulador incremental de estadísticas (mezclable entre fragmentos)"""
+
+    def __init__(self):
+        self.total_documents = 0
+        self.total_words = 0
+        self.total_sentences = 0
+        self.vocabulary = Counter()
+        self.language_distribution = Counter()
+        self.category_distribution = Counter()
+
+    def add_document(self, doc: "ProcessedDocument"):
+        """Añade un documento procesado"""
+        self.total_documents += 1
+        self.total_words += doc.word_count
+        self.total_sentences += doc.sentence_count
+        self.vocabulary.update(doc.tokens)
+        self.language_distribution[doc.language] += 1
+        self.category_distribution[doc.category] += 1
+
+    def merge(self, other: "CorpusStatsAccumulator"):
+        """Mezcla las estadísticas de otro fragmento"""
+        self.total_documents += other.total_documents
+        self.total_words += other.total_words
+        self.total_sentences += other.total_sentences
+        self.vocabulary.update(other.vocabulary)
+        self.language_distribution.update(other.language_distribution)
+        self.category_distribution.update(other.category_distribution)
+
+    def to_stats(self, processing_time: float) -> CorpusStats:
+        """Convierte el acumulado en CorpusStats"""
+        unique_words = len(self.vocabulary)
+        return CorpusStats(
+            total_documents=self.total_documents,
+            total_words=self.total_words,
+            total_sentences=self.total_sentences,
+            unique_words=unique_words,
+            vocabulary_size=unique_words,
+            language_distribution=dict(self.language_distribution),
+            category_distribution=dict(self.category_distribution),
+            average_document_length=(
+                self.total_words / self.total_documents
+                if self.total_documents > 0
+                else 0
+            ),
+            average_sentence_length=(
+                self.total_words / self.total_sentences
+                if self.total_sentences > 0
+                else 0
+            ),
+            processing_time=processing_time,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializa el acumulado para los checkpoints"""
+        return {
+            "total_documents": self.total_documents,
+            "total_words": self.total_words,
+            "total_sentences": self.total_sentences,
+            "vocabulary": dict(self.vocabulary),
+            "language_distribution": dict(self.language_distribution),
+            "category_distribution": dict(self.category_distribution),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CorpusStatsAccumulator":
+        """Reconstruye el acumulado desde un checkpoint"""
+        accumulator = cls()
+        accumulator.total_documents = data.get("total_documents", 0)
+        accumulator.total_words = data.get("total_words", 0)
+        accumulator.total_sentences = data.get("total_sentences", 0)
+        accumulator.vocabulary = Counter(data.get("vocabulary", {}))
+        accumulator.language_distribution = Counter(
+            data.get("language_distribution", {})
+        )
+        accumulator.category_distribution = Counter(
+            data.get("category_distribution", {})
+        )
+        return accumulator
+
+
+# Procesador reutilizado por cada proceso trabajador (modelos cargados una vez)
+_worker_processor = None
+
+
+def _init_corpus_worker(data_dir: str):
+    """Inicializa los modelos NLP una sola vez por proceso trabajador"""
+    global _worker_processor
+    inherited = globals().get("corpus_processor")
+    if inherited is not None and str(inherited.data_dir) == str(Path(data_dir)):
+        # Con fork, el trabajador hereda el procesador ya inicializado
+        _worker_processor = inherited
+    else:
+        _worker_processor = CorpusProcessor(data_dir)
+
+
+def _process_corpus_chunk(
+    chunk_index: int, documents: List[Dict[str, Any]]
+) -> Tuple[int, List[Dict[str, Any]], CorpusStatsAccumulator, int]:
+    """Procesa un fragmento de documentos dentro de un trabajador"""
+    processor = _worker_processor
+    accumulator = CorpusStatsAccumulator()
+    processed = []
+    errors = 0
+
+    for document in documents:
+        try:
+            doc = processor.process_document(document)
+        except Exception:
+            errors += 1
+            continue
+        accumulator.add_document(doc)
+        doc_dict = asdict(doc)
+        doc_dict["processed_at"] = doc_dict["processed_at"].isoformat()
+        processed.append(doc_dict)
+
+    return chunk_index, processed, accumulator, errors
+
+
 class CorpusProcessor:
     """Procesador principal de corpus del sistema NeuroFusion"""
 
@@ -418,48 +540,188 @@ class CorpusProcessor:
             logger.error(f"Error procesando corpus: {e}")
             raise
 
+    @staticmethod
+    def iter_documents(
+        source: Union[str, Path, Dict[str, Any], Iterable[Dict[str, Any]]]
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Itera documentos sin cargar el corpus completo cuando es posible
+
+        Acepta un archivo .jsonl (un documento por línea, leído en streaming),
+        un archivo .json con clave "documents", un diccionario de corpus o
+        cualquier iterable de documentos.
+        """
+        if isinstance(source, dict):
+            yield from source.get("documents", [])
+            return
+
+        if isinstance(source, (str, Path)):
+            path = Path(source)
+            if path.suffix == ".jsonl":
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        line = line.strip()
+                        if line:
+                            yield json.loads(line)
+            else:
+                with open(path, "r", encoding="utf-8") as f:
+                    yield from json.load(f).get("documents", [])
+            return
+
+        yield from source
+
+    def process_corpus_parallel(
+        self,
+        source: Union[str, Path, Dict[str, Any], Iterable[Dict[str, Any]]],
+        output_dir: Optional[Union[str, Path]] = None,
+        workers: Optional[int] = None,
+        chunk_size: int = 256,
+        resume: bool = True,
+        checkpoint_every: int = 10,
+    ) -> CorpusStats:
+        """
+        Procesa un corpus en paralelo por fragmentos con checkpoints reanudables
+
+        Los documentos se leen en streaming y se reparten en fragmentos entre
+        un pool de procesos que inicializan los modelos NLP una sola vez. Cada
+        fragmento se escribe como un archivo JSONL propio y las estadísticas
+        se mezclan de forma incremental. Si el proceso se interrumpe, una nueva
+        ejecución con ``resume=True`` salta los fragmentos ya completados.
+
+        Args:
+            source: Ruta .jsonl/.json, diccionario de corpus o iterable de documentos
+            output_dir: Directorio de salida (fragmentos, checkpoint y estadísticas)
+            workers: Número de procesos (por defecto, núcleos disponibles)
+            chunk_size: Documentos por fragmento
+            resume: Reanudar desde el checkpoint existente
+            checkpoint_every: Guardar el checkpoint cada N fragmentos completados
+
+        Returns:
+            Estadísticas del corpus procesado
+        """
+        start_time = datetime.now()
+        output_dir = Path(output_dir or self.data_dir / "corpus" / "processed_chunks")
+        output_dir.mkdir(parents=True, exist_ok=True)
+        checkpoint_path = output_dir / "checkpoint.json"
+        workers = workers or os.cpu_count() or 1
+
+        # Cargar checkpoint previo
+        completed_chunks: Set[int] = set()
+        accumulator = CorpusStatsAccumulator()
+        errors = 0
+        elapsed_before = 0.0
+        if resume and checkpoint_path.exists():
+            with open(checkpoint_path, "r", encoding="utf-8") as f:
+                checkpoint = json.load(f)
+            if checkpoint.get("chunk_size") == chunk_size:
+                completed_chunks = set(checkpoint.get("completed_chunks", []))
+                accumulator = CorpusStatsAccumulator.from_dict(
+                    checkpoint.get("stats", {})
+                )
+                errors = checkpoint.get("errors", 0)
+                elapsed_before = checkpoint.get("processing_time", 0.0)
+                logger.info(
+                    f"Reanudando corpus: {len(completed_chunks)} fragmentos completados"
+                )
+            else:
+                logger.warning("Checkpoint con otro tamaño de fragmento, se ignora")
+
+        def save_checkpoint():
+            elapsed = elapsed_before + (datetime.now() - start_time).total_seconds()
+            tmp_path = checkpoint_path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "chunk_size": chunk_size,
+                        "completed_chunks": sorted(completed_chunks),
+                        "errors": errors,
+                        "processing_time": elapsed,
+                        "stats": accumulator.to_dict(),
+                        "updated_at": datetime.now().isoformat(),
+                    },
+                    f,
+                    ensure_ascii=False,
+                )
+            os.replace(tmp_path, checkpoint_path)
+
+        def chunks() -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+            iterator = self.iter_documents(source)
+            chunk_index = 0
+            while True:
+                chunk = list(islice(iterator, chunk_size))
+                if not chunk:
+                    return
+                if chunk_index not in completed_chunks:
+                    yield chunk_index, chunk
+                chunk_index += 1
+
+        def handle_result(result):
+            nonlocal errors
+            chunk_index, processed, chunk_stats, chunk_errors = result
+            chunk_path = output_dir / f"chunk_{chunk_index:06d}.jsonl"
+            with open(chunk_path, "w", encoding="utf-8") as f:
+                for doc_dict in processed:
+                    f.write(json.dumps(doc_dict, ensure_ascii=False) + "\n")
+
+            accumulator.merge(chunk_stats)
+            errors += chunk_errors
+            completed_chunks.add(chunk_index)
+            if len(completed_chunks) % checkpoint_every == 0:
+                save_checkpoint()
+            logger.info(
+                f"Fragmento {chunk_index} procesado "
+                f"({accumulator.total_documents} documentos en total)"
+            )
+
+        # Limitar fragmentos en vuelo para mantener la memoria acotada
+        max_in_flight = workers * 2
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_corpus_worker,
+            initargs=(str(self.data_dir),),
+        ) as executor:
+            pending = set()
+            for chunk_index, chunk in chunks():
+                pending.add(executor.submit(_process_corpus_chunk, chunk_index, chunk))
+                if len(pending) >= max_in_flight:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        handle_result(future.result())
+
+            for future in pending:
+                handle_result(future.result())
+
+        save_checkpoint()
+        processing_time = elapsed_before + (datetime.now() - start_time).total_seconds()
+        stats = accumulator.to_stats(processing_time)
+
+        with open(output_dir / "stats.json", "w", encoding="utf-8") as f:
+            json.dump(
+                {"stats": asdict(stats), "errors": errors},
+                f,
+                indent=2,
+                ensure_ascii=False,
+            )
+
+        logger.info(
+            f"Corpus procesado en paralelo: {stats.total_documents} documentos, "
+            f"{errors} errores"
+        )
+        return stats
+
     def _calculate_corpus_stats(
         self, processed_docs: List[ProcessedDocument], start_time: datetime
     ) -> CorpusStats:
         """Calcula estadísticas del corpus procesado"""
         try:
-            total_documents = len(processed_docs)
-            total_words = sum(doc.word_count for doc in processed_docs)
-            total_sentences = sum(doc.sentence_count for doc in processed_docs)
-
-            # Vocabulario único
-            all_tokens = []
+            accumulator = CorpusStatsAccumulator()
             for doc in processed_docs:
-                all_tokens.extend(doc.tokens)
-            unique_words = len(set(all_tokens))
-
-            # Distribución de idiomas
-            language_dist = Counter(doc.language for doc in processed_docs)
-
-            # Distribución de categorías
-            category_dist = Counter(doc.category for doc in processed_docs)
-
-            # Promedios
-            avg_doc_length = total_words / total_documents if total_documents > 0 else 0
-            avg_sentence_length = (
-                total_words / total_sentences if total_sentences > 0 else 0
-            )
+                accumulator.add_document(doc)
 
             # Tiempo de procesamiento
             processing_time = (datetime.now() - start_time).total_seconds()
 
-            return CorpusStats(
-                total_documents=total_documents,
-                total_words=total_words,
-                total_sentences=total_sentences,
-                unique_words=unique_words,
-                vocabulary_size=unique_words,
-                language_distribution=dict(language_dist),
-                category_distribution=dict(category_dist),
-                average_document_length=avg_doc_length,
-                average_sentence_length=avg_sentence_length,
-                processing_time=processing_time,
-            )
+            return accumulator.to_stats(processing_time)
 
         except Exception as e:
             logger.error(f"Error calculando estadísticas: {e}")
@@ -17,10 +17,13 @@ import faiss
 import numpy as np
 from datetime import datetime, timedelta
 import hashlib
-import pickle
-import gzip
 import shutil
 
+try:
+    from .tiered_cache import TieredCache
+except ImportError:
+    from tiered_cache import TieredCache
+
 # Configuración de logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -59,10 +62,12 @@ class DataManager:
         self.data_dir = Path(data_dir)
         self.connections = {}
         self.locks = {}
-        self.cache = {}
         self._initialize_directories()
         self._initialize_connections()
 
+        # Caché general: LRU en memoria + almacén SQLite único
+        self.cache = TieredCache(self.data_dir / "cache" / "data_cache.db")
+
     def _initialize_directories(self):
         """Inicializa los directorios necesarios"""
         directories = [
@@ -390,59 +395,20 @@ class DataManager:
 
     def get_cache_data(self, cache_key: str) -> Optional[Any]:
         """Obtiene datos del caché"""
-        cache_path = self.data_dir / "cache" / f"{cache_key}.pkl.gz"
-
-        if not cache_path.exists():
-            return None
-
-        try:
-            with gzip.open(cache_path, "rb") as f:
-                data = pickle.load(f)
-
-            # Verificar expiración
-            if "expires_at" in data:
-                if datetime.now() > datetime.fromisoformat(data["expires_at"]):
-                    cache_path.unlink()
-                    return None
-
-            return data.get("value")
-
-        except Exception as e:
-            logger.error(f"Error cargando caché {cache_key}: {e}")
-            return None
+        return self.cache.get(cache_key)
 
     def set_cache_data(self, cache_key: str, value: Any, ttl_hours: int = 24) -> bool:
         """Establece datos en el caché"""
-        cache_path = self.data_dir / "cache" / f"{cache_key}.pkl.gz"
-
-        try:
-            data = {
-                "value": value,
-                "created_at": datetime.now().isoformat(),
-                "expires_at": (datetime.now() + timedelta(hours=ttl_hours)).isoformat(),
-            }
-
-            with gzip.open(cache_path, "wb") as f:
-                pickle.dump(data, f)
-
+        if self.cache.set(cache_key, value, ttl_seconds=ttl_hours * 3600):
             logger.debug(f"Datos guardados en caché: {cache_key}")
             return True
-
-        except Exception as e:
-            logger.error(f"Error guardando caché {cache_key}: {e}")
-            return False
+        return False
 
     def clear_cache(self, pattern: str = "*") -> int:
         """Limpia el caché según un patrón"""
-        cache_dir = self.data_dir / "cache"
-        cleared_count = 0
-
         try:
-            for cache_file in cache_dir.glob(f"{pattern}.pkl.gz"):
-                cache_file.unlink()
-                cleared_count += 1
-
-            logger.info(f"Caché limpiado: {cleared_count} archivos eliminados")
+            cleared_count = self.cache.clear(pattern)
+            logger.info(f"Caché limpiado: {cleared_count} entradas eliminadas")
             return cleared_count
 
         except Exception as e:
@@ -592,12 +558,10 @@ class DataManager:
         cleaned_count = 0
 
         try:
-            # Limpiar caché expirado
-            cache_dir = self.data_dir / "cache"
-            for cache_file in cache_dir.glob("*.pkl.gz"):
-                if cache_file.stat().st_mtime < cutoff_date.timestamp():
-                    cache_file.unlink()
-                    cleaned_count += 1
+            # Limpiar caché expirado o antiguo
+            cleaned_count += self.cache.purge_expired(
+                older_than=cutoff_date.timestamp()
+            )
 
             # Limpiar backups antiguos
             backup_dir = self.data_dir / "backups"
@@ -627,6 +591,7 @@ class DataManager:
 
         self.connections.clear()
         self.locks.clear()
+        self.cache.close()
 
 
 # Instancia global del gestor de datos
@@ -13,20 +13,37 @@ from typing import Dict, Any, List, Optional, Union, Tuple
 from dataclasses import dataclass, asdict
 import numpy as np
 import faiss
-from datetime import datetime, timedelta
+from datetime import datetime
 import hashlib
 import pickle
-import gzip
-from sentence_transformers import SentenceTransformer
-from transformers import AutoTokenizer, AutoModel
-import torch
 from sklearn.metrics.pairwise import cosine_similarity
 import sqlite3
 
+try:
+    from .model_registry import ModelRegistry, LoadedModel, get_model_registry
+    from .tiered_cache import TieredCache, float32_codec
+except ImportError:
+    from model_registry import ModelRegistry, LoadedModel, get_model_registry
+    from tiered_cache import TieredCache, float32_codec
+
 # Configuración de logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Modelos de embeddings disponibles (se cargan al primer uso)
+MODELS_CONFIG = {
+    "all-MiniLM-L6-v2": {
+        "type": "sentence_transformer",
+        "dimension": 384,
+        "description": "Modelo de embeddings para oraciones",
+    },
+    "microsoft/Phi-3-mini-4k-instruct": {
+        "type": "transformer",
+        "dimension": 3072,
+        "description": "Modelo de generación de texto",
+    },
+}
+
 
 @dataclass
 class EmbeddingInfo:
@@ -55,13 +72,15 @@ class SearchResult:
 class EmbeddingsManager:
     """Gestor principal de embeddings del sistema NeuroFusion"""
 
-    def __init__(self, data_dir: str = "data"):
+    def __init__(
+        self, data_dir: str = "data", model_registry: Optional[ModelRegistry] = None
+    ):
         self.data_dir = Path(data_dir)
-        self.models = {}
-        self.tokenizers = {}
+        self.model_registry = model_registry or get_model_registry()
+        self.acquired_models = set()
         self.indices = {}
         self.cache = {}
-        self.locks = {}
+        self.locks = {"models": threading.Lock()}
         self.connection = None
 
         # Inicializar directorios y conexiones
@@ -69,6 +88,14 @@ class EmbeddingsManager:
         self._initialize_database()
         self._initialize_models()
 
+        # Caché de embeddings: LRU float32 en memoria + almacén SQLite único
+        self.embedding_cache = TieredCache(
+            self.data_dir / "embeddings" / "cache" / "embeddings_cache.db",
+            memory_max_items=10000,
+            disk_max_items=500000,
+            codec=float32_codec(),
+        )
+
     def _initialize_directories(self):
         """Inicializa los directorios necesarios"""
         directories = [
@@ -149,35 +176,55 @@ class EmbeddingsManager:
             self.connection.commit()
 
     def _initialize_models(self):
-        """Inicializa los modelos de embeddings"""
-        models_config = {
-            "all-MiniLM-L6-v2": {
-                "type": "sentence_transformer",
-                "dimension": 384,
-                "description": "Modelo de embeddings para oraciones",
-            },
-            "microsoft/Phi-3-mini-4k-instruct": {
-                "type": "transformer",
-                "dimension": 3072,
-                "description": "Modelo de generación de texto",
-            },
-        }
-
-        for model_name, config in models_config.items():
-            try:
-                if config["type"] == "sentence_transformer":
-                    model = SentenceTransformer(model_name)
-                    self.models[model_name] = model
-                    logger.info(f"Modelo cargado: {model_name}")
-                elif config["type"] == "transformer":
-                    tokenizer = AutoTokenizer.from_pretrained(model_name)
-                    model = AutoModel.from_pretrained(model_name)
-                    self.tokenizers[model_name] = tokenizer
-                    self.models[model_name] = model
-                    logger.info(f"Modelo cargado: {model_name}")
+        """Registra los modelos de embeddings sin cargarlos"""
+        for model_name, config in MODELS_CONFIG.items():
+            if not self.model_registry.is_registered(model_name):
+                self.model_registry.register(
+                    model_name,
+                    config["type"],
+                    config["dimension"],
+                    description=config["description"],
+                )
 
-            except Exception as e:
-                logger.warning(f"Error cargando modelo {model_name}: {e}")
+    def _get_model(self, model_name: str) -> Optional[LoadedModel]:
+        """Obtiene un modelo del registro, cargándolo en el primer uso"""
+        with self.locks["models"]:
+            if model_name in self.acquired_models:
+                entry = self.model_registry.loaded.get(model_name)
+                if entry is not None:
+                    self.model_registry.touch(model_name)
+                    return entry
+                # El modelo se descargó de forma forzada: volver a adquirirlo
+                self.acquired_models.discard(model_name)
+
+            entry = self.model_registry.acquire(model_name)
+            if entry is not None:
+                self.acquired_models.add(model_name)
+            return entry
+
+    def get_available_models(self) -> List[str]:
+        """Lista los modelos registrados (cargados o no)"""
+        return list(self.model_registry.specs.keys())
+
+    def release_models(self, model_names: Optional[List[str]] = None):
+        """Libera las referencias de este gestor a los modelos"""
+        with self.locks["models"]:
+            for model_name in list(model_names or self.acquired_models):
+                if model_name in self.acquired_models:
+                    self.acquired_models.discard(model_name)
+                    self.model_registry.release(model_name)
+
+    def unload_idle_models(self, max_idle_seconds: float = 600.0) -> List[str]:
+        """Libera y descarga los modelos que llevan tiempo sin usarse"""
+        now_stats = self.model_registry.get_stats()
+        idle_models = [
+            model_name
+            for model_name in list(self.acquired_models)
+            if (now_stats.get(model_name, {}).get("idle_seconds") or 0)
+            >= max_idle_seconds
+        ]
+        self.release_models(idle_models)
+        return self.model_registry.unload_idle(max_idle_seconds)
 
     def generate_embedding(
         self, text: str, model_name: str = "all-MiniLM-L6-v2"
@@ -193,20 +240,23 @@ class EmbeddingsManager:
             if cached_embedding is not None:
                 return cached_embedding
 
-            model = self.models.get(model_name)
-            if not model:
+            entry = self._get_model(model_name)
+            if not entry:
                 logger.error(f"Modelo no encontrado: {model_name}")
                 return None
+            model = entry.model
 
             # Generar embedding
-            if isinstance(model, SentenceTransformer):
+            if entry.spec.type == "sentence_transformer":
                 embedding = model.encode(text, convert_to_tensor=False)
                 embedding_list = (
                     embedding.tolist() if hasattr(embedding, "tolist") else embedding
                 )
             else:
                 # Modelo transformer
-                tokenizer = self.tokenizers.get(model_name)
+                import torch
+
+                tokenizer = entry.tokenizer
                 if not tokenizer:
                     logger.error(f"Tokenizer no encontrado para: {model_name}")
                     return None
@@ -241,10 +291,11 @@ class EmbeddingsManager:
             return []
 
         try:
-            model = self.models.get(model_name)
-            if not model:
+            entry = self._get_model(model_name)
+            if not entry:
                 logger.error(f"Modelo no encontrado: {model_name}")
                 return [None] * len(texts)
+            model = entry.model
 
             # Filtrar textos no vacíos
             valid_texts = [(i, text) for i, text in enumerate(texts) if text]
@@ -255,14 +306,16 @@ class EmbeddingsManager:
                 return [None] * len(texts)
 
             # Generar embeddings en lote
-            if isinstance(model, SentenceTransformer):
+            if entry.spec.type == "sentence_transformer":
                 embeddings = model.encode(valid_text_list, convert_to_tensor=False)
                 embeddings_list = (
                     embeddings.tolist() if hasattr(embeddings, "tolist") else embeddings
                 )
             else:
                 # Modelo transformer
-                tokenizer = self.tokenizers.get(model_name)
+                import torch
+
+                tokenizer = entry.tokenizer
                 if not tokenizer:
                     logger.error(f"Tokenizer no encontrado para: {model_name}")
                     return [None] * len(texts)
@@ -584,57 +637,20 @@ class EmbeddingsManager:
 
     def get_cached_embedding(self, cache_key: str) -> Optional[List[float]]:
         """Obtiene un embedding del caché"""
-        cache_path = self.data_dir / "embeddings" / "cache" / f"{cache_key}.pkl.gz"
-
-        if not cache_path.exists():
-            return None
-
-        try:
-            with gzip.open(cache_path, "rb") as f:
-                data = pickle.load(f)
-
-            # Verificar expiración
-            if "expires_at" in data:
-                if datetime.now() > datetime.fromisoformat(data["expires_at"]):
-                    cache_path.unlink()
-                    return None
-
-            return data.get("embedding")
-
-        except Exception as e:
-            logger.error(f"Error cargando caché: {e}")
-            return None
+        embedding = self.embedding_cache.get(cache_key)
+        return embedding.tolist() if embedding is not None else None
 
     def set_cached_embedding(
         self, cache_key: str, embedding: List[float], ttl_hours: int = 24
     ):
         """Guarda un embedding en el caché"""
-        cache_path = self.data_dir / "embeddings" / "cache" / f"{cache_key}.pkl.gz"
-
-        try:
-            data = {
-                "embedding": embedding,
-                "created_at": datetime.now().isoformat(),
-                "expires_at": (datetime.now() + timedelta(hours=ttl_hours)).isoformat(),
-            }
-
-            with gzip.open(cache_path, "wb") as f:
-                pickle.dump(data, f)
-
-        except Exception as e:
-            logger.error(f"Error guardando caché: {e}")
+        self.embedding_cache.set(cache_key, embedding, ttl_seconds=ttl_hours * 3600)
 
     def clear_cache(self, pattern: str = "*") -> int:
         """Limpia el caché de embeddings"""
-        cache_dir = self.data_dir / "embeddings" / "cache"
-        cleared_count = 0
-
         try:
-            for cache_file in cache_dir.glob(f"{pattern}.pkl.gz"):
-                cache_file.unlink()
-                cleared_count += 1
-
-            logger.info(f"Caché limpiado: {cleared_count} archivos eliminados")
+            cleared_count = self.embedding_cache.clear(pattern)
+            logger.info(f"Caché limpiado: {cleared_count} entradas eliminadas")
             return cleared_count
 
         except Exception as e:
@@ -669,9 +685,9 @@ class EmbeddingsManager:
                     "total_embeddings": total_embeddings,
                     "model_stats": model_stats,
                     "index_stats": index_stats,
-                    "cache_size": len(
-                        list((self.data_dir / "embeddings" / "cache").glob("*.pkl.gz"))
-                    ),
+                    "cache_size": len(self.embedding_cache),
+                    "cache_stats": self.embedding_cache.get_stats(),
+                    "models": self.model_registry.get_stats(),
                 }
 
         except Exception as e:
@@ -711,7 +727,10 @@ class EmbeddingsManager:
             raise
 
     def close_connection(self):
-        """Cierra la conexión a la base de datos"""
+        """Cierra la conexión a la base de datos y libera los modelos"""
+        self.release_models()
+        self.embedding_cache.close()
+
         if self.connection:
             try:
                 self.connection.close()
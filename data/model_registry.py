@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Registro de Modelos del Sistema NeuroFusion
+Carga perezosa, conteo de referencias y descarga de modelos inactivos
+"""
+
+import gc
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Segundos durante los que no se reintenta cargar un modelo que falló
+LOAD_FAILURE_TTL = 60.0
+
+
+@dataclass
+class ModelSpec:
+    """Especificación de un modelo registrado"""
+
+    name: str
+    type: str
+    dimension: int
+    description: str = ""
+    loader: Optional[Callable[[], Tuple[Any, Any]]] = None
+
+
+@dataclass
+class LoadedModel:
+    """Modelo cargado en memoria y compartido entre gestores"""
+
+    spec: ModelSpec
+    model: Any
+    tokenizer: Any = None
+    ref_count: int = 0
+    loaded_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+    load_seconds: float = 0.0
+
+
+def _load_sentence_transformer(name: str) -> Tuple[Any, Any]:
+    """Cargar un modelo SentenceTransformer (sin tokenizer aparte)"""
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(name), None
+
+
+def _load_transformer(name: str) -> Tuple[Any, Any]:
+    """Cargar un modelo transformers con su tokenizer"""
+    from transformers import AutoTokenizer, AutoModel
+
+    tokenizer = AutoTokenizer.from_pretrained(name)
+    model = AutoModel.from_pretrained(name)
+    model.eval()
+    return model, tokenizer
+
+
+MODEL_LOADERS = {
+    "sentence_transformer": _load_sentence_transformer,
+    "transformer": _load_transformer,
+}
+
+
+class ModelRegistry:
+    """
+    Registro de modelos compartido por proceso
+
+    Los modelos se cargan la primera vez que se adquieren, se comparten
+    entre todos los gestores del proceso y pueden descargarse cuando
+    nadie los referencia y llevan tiempo sin usarse.
+    """
+
+    def __init__(self, failure_ttl: float = LOAD_FAILURE_TTL):
+        self.specs: Dict[str, ModelSpec] = {}
+        self.loaded: Dict[str, LoadedModel] = {}
+        self.lock = threading.RLock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        # Cargas fallidas: nombre -> (instante monotónico, error)
+        self.failure_ttl = failure_ttl
+        self.failures: Dict[str, Tuple[float, str]] = {}
+
+    def register(
+        self,
+        name: str,
+        model_type: str,
+        dimension: int,
+        description: str = "",
+        loader: Optional[Callable[[], Tuple[Any, Any]]] = None,
+    ):
+        """Registrar un modelo sin cargarlo"""
+        with self.lock:
+            self.specs[name] = ModelSpec(
+                name=name,
+                type=model_type,
+                dimension=dimension,
+                description=description,
+                loader=loader,
+            )
+            self._load_locks.setdefault(name, threading.Lock())
+            # Una especificación nueva merece un nuevo intento
+            self.failures.pop(name, None)
+
+    def is_registered(self, name: str) -> bool:
+        """Indica si un modelo está registrado"""
+        return name in self.specs
+
+    def is_loaded(self, name: str) -> bool:
+        """Indica si un modelo está cargado en memoria"""
+        return name in self.loaded
+
+    def acquire(self, name: str) -> Optional[LoadedModel]:
+        """
+        Obtener un modelo, cargándolo si es el primer uso
+
+        Cada llamada incrementa el contador de referencias; el llamador
+        debe invocar release() cuando deje de necesitarlo.
+        """
+        entry = self._get_or_load(name)
+        if entry is None:
+            return None
+
+        with self.lock:
+            entry.ref_count += 1
+            entry.last_used = time.monotonic()
+        return entry
+
+    def touch(self, name: str):
+        """Marcar un modelo como usado recientemente"""
+        entry = self.loaded.get(name)
+        if entry is not None:
+            entry.last_used = time.monotonic()
+
+    def release(self, name: str):
+        """Liberar una referencia a un modelo"""
+        with self.lock:
+            entry = self.loaded.get(name)
+            if entry is not None and entry.ref_count > 0:
+                entry.ref_count -= 1
+
+    def _get_or_load(self, name: str) -> Optional[LoadedModel]:
+        """Devolver el modelo cargado o cargarlo (una sola vez por proceso)"""
+        entry = self.loaded.get(name)
+        if entry is not None:
+            return entry
+
+        spec = self.specs.get(name)
+        if spec is None:
+            logger.error(f"Modelo no registrado: {name}")
+            return None
+
+        if self._recent_failure(name):
+            return None
+
+        # Un lock por modelo: cargas distintas no se bloquean entre sí
+        with self._load_locks[name]:
+            entry = self.loaded.get(name)
+            if entry is not None:
+                return entry
+            # Otro hilo pudo fallar mientras esperábamos el lock
+            if self._recent_failure(name):
+                return None
+
+            loader = spec.loader or (lambda: MODEL_LOADERS[spec.type](spec.name))
+            start_time = time.monotonic()
+            try:
+                model, tokenizer = loader()
+            except Exception as e:
+                logger.warning(
+                    f"Error cargando modelo {name}: {e} "
+                    f"(sin reintentos durante {self.failure_ttl:.0f}s)"
+                )
+                with self.lock:
+                    self.failures[name] = (time.monotonic(), str(e))
+                return None
+
+            entry = LoadedModel(
+                spec=spec,
+                model=model,
+                tokenizer=tokenizer,
+                load_seconds=time.monotonic() - start_time,
+            )
+            with self.lock:
+                self.loaded[name] = entry
+                self.failures.pop(name, None)
+
+            logger.info(f"Modelo cargado: {name} ({entry.load_seconds:.1f}s)")
+            return entry
+
+    def _recent_failure(self, name: str) -> bool:
+        """Indica si la última carga del modelo falló hace menos de failure_ttl"""
+        failure = self.failures.get(name)
+        if failure is None:
+            return False
+        if time.monotonic() - failure[0] < self.failure_ttl:
+            return True
+        with self.lock:
+            self.failures.pop(name, None)
+        return False
+
+    def clear_failure(self, name: str):
+        """Olvidar un fallo de carga para reintentar de inmediato"""
+        with self.lock:
+            self.failures.pop(name, None)
+
+    def unload(self, name: str, force: bool = False) -> bool:
+        """
+        Descargar un modelo de memoria
+
+        Args:
+            name: Nombre del modelo
+            force: Descargar aunque tenga referencias activas
+
+        Returns:
+            True si el modelo se descargó
+        """
+        with self.lock:
+            entry = self.loaded.get(name)
+            if entry is None or (entry.ref_count > 0 and not force):
+                return False
+            del self.loaded[name]
+
+        del entry
+        gc.collect()
+        try:
+            import torch
+
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+        logger.info(f"Modelo descargado: {name}")
+        return True
+
+    def unload_idle(self, max_idle_seconds: float = 600.0) -> List[str]:
+        """
+        Descargar los modelos sin referencias que llevan tiempo sin usarse
+
+        Args:
+            max_idle_seconds: Segundos de inactividad para considerar un modelo ocioso
+
+        Returns:
+            Nombres de los modelos descargados
+        """
+        now = time.monotonic()
+        with self.lock:
+            idle = [
+                name
+                for name, entry in self.loaded.items()
+                if entry.ref_count == 0 and now - entry.last_used >= max_idle_seconds
+            ]
+
+        return [name for name in idle if self.unload(name)]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Obtener estado de los modelos registrados"""
+        now = time.monotonic()
+        with self.lock:
+            return {
+                name: {
+                    "type": spec.type,
+                    "dimension": spec.dimension,
+                    "loaded": name in self.loaded,
+                    "ref_count": (
+                        self.loaded[name].ref_count if name in self.loaded else 0
+                    ),
+                    "idle_seconds": (
+                        now - self.loaded[name].last_used
+                        if name in self.loaded
+                        else None
+                    ),
+                    "load_seconds": (
+                        self.loaded[name].load_seconds if name in self.loaded else None
+                    ),
+                    "load_error": (
+                        self.failures[name][1] if name in self.failures else None
+                    ),
+                }
+                for name, spec in self.specs.items()
+            }
+
+
+# Registro global del proceso
+_model_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Obtiene el registro de modelos compartido del proceso"""
+    global _model_registry
+    if _model_registry is None:
+        with _registry_lock:
+            if _model_registry is None:
+                _model_registry = ModelRegistry()
+    return _model_registry
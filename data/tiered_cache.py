@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Caché en Dos Niveles del Sistema NeuroFusion
+LRU en memoria delante de un almacén SQLite único, con TTL y límites de tamaño
+"""
+
+import fnmatch
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Codificador/decodificador de valores para el nivel en disco
+Codec = Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]
+
+PICKLE_CODEC: Codec = (
+    lambda value: pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL),
+    pickle.loads,
+)
+
+
+def float32_codec() -> Codec:
+    """Codec para vectores: bytes float32 crudos, sin pickle ni gzip"""
+    import numpy as np
+
+    def encode(value: Any) -> bytes:
+        return np.asarray(value, dtype=np.float32).tobytes()
+
+    def decode(blob: bytes) -> Any:
+        return np.frombuffer(blob, dtype=np.float32)
+
+    return encode, decode
+
+
+@dataclass
+class CacheStats:
+    """Contadores de uso de la caché"""
+
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    sets: int = 0
+    expirations: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+
+
+class TieredCache:
+    """
+    Caché en dos niveles
+
+    Nivel 1: LRU en proceso (OrderedDict) con los valores ya decodificados.
+    Nivel 2: una única base SQLite (WAL) con los valores serializados.
+    Ambos niveles respetan el TTL de cada entrada y tienen un tamaño máximo.
+    """
+
+    def __init__(
+        self,
+        db_path: Union[str, Path],
+        memory_max_items: int = 10000,
+        disk_max_items: int = 200000,
+        default_ttl_seconds: float = 24 * 3600,
+        codec: Codec = PICKLE_CODEC,
+        access_flush_size: int = 256,
+    ):
+        self.db_path = Path(db_path)
+        self.memory_max_items = memory_max_items
+        self.disk_max_items = disk_max_items
+        self.default_ttl_seconds = default_ttl_seconds
+        self.encode, self.decode = codec
+        self.access_flush_size = access_flush_size
+
+        self.memory: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        # Accesos pendientes de volcar a last_access (se escriben por lotes)
+        self.pending_access: Dict[str, float] = {}
+        self.stats = CacheStats()
+        self.lock = threading.RLock()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._initialize_database()
+        self.disk_count = self._count_disk_entries()
+
+    def _initialize_database(self):
+        """Crea la tabla de caché y su índice de expiración"""
+        with self.lock:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache_entries(expires_at)"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_cache_access ON cache_entries(last_access)"
+            )
+            self.connection.commit()
+
+    def _count_disk_entries(self) -> int:
+        with self.lock:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM cache_entries"
+            ).fetchone()[0]
+
+    def _remember(self, key: str, value: Any, expires_at: float):
+        """Guarda en el nivel de memoria respetando el límite LRU"""
+        self.memory[key] = (value, expires_at)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_max_items:
+            self.memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Obtiene un valor (memoria primero, luego disco) o None"""
+        now = time.time()
+
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self.memory.move_to_end(key)
+                    self._touch(key, now)
+                    self.stats.memory_hits += 1
+                    return value
+                del self.memory[key]
+
+            try:
+                row = self.connection.execute(
+                    "SELECT value, expires_at FROM cache_entries WHERE key = ?",
+                    (key,),
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.error(f"Error leyendo caché {key}: {e}")
+                row = None
+
+            if row is None:
+                self.stats.misses += 1
+                return None
+
+            blob, expires_at = row
+            if expires_at <= now:
+                self._delete_disk(key)
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+
+            value = self.decode(blob)
+            self._remember(key, value, expires_at)
+            self._touch(key, now)
+            self.stats.disk_hits += 1
+            return value
+
+    def _touch(self, key: str, now: float):
+        """Anota un acceso; last_access se actualiza en disco por lotes"""
+        self.pending_access[key] = now
+        if len(self.pending_access) >= self.access_flush_size:
+            self._flush_access()
+
+    def _flush_access(self):
+        """Vuelca los accesos pendientes a la columna last_access"""
+        if not self.pending_access:
+            return
+        try:
+            self.connection.executemany(
+                "UPDATE cache_entries SET last_access = ? WHERE key = ?",
+                [(ts, key) for key, ts in self.pending_access.items()],
+            )
+            self.connection.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error actualizando accesos de caché: {e}")
+        self.pending_access.clear()
+
+    def _forget(self, keys):
+        """Quita claves eliminadas del disco también del nivel de memoria"""
+        for key in keys:
+            self.memory.pop(key, None)
+            self.pending_access.pop(key, None)
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> bool:
+        """Guarda un valor en ambos niveles"""
+        now = time.time()
+        ttl = self.default_ttl_seconds if ttl_seconds is None else ttl_seconds
+        expires_at = now + ttl
+
+        try:
+            blob = self.encode(value)
+        except Exception as e:
+            logger.error(f"Error serializando caché {key}: {e}")
+            return False
+
+        with self.lock:
+            try:
+                cursor = self.connection.execute(
+                    "UPDATE cache_entries SET value = ?, created_at = ?, "
+                    "expires_at = ?, last_access = ? WHERE key = ?",
+                    (blob, now, expires_at, now, key),
+                )
+                if cursor.rowcount == 0:
+                    self.connection.execute(
+                        "INSERT INTO cache_entries "
+                        "(key, value, created_at, expires_at, last_access) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (key, blob, now, expires_at, now),
+                    )
+                    self.disk_count += 1
+                self.connection.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Error guardando caché {key}: {e}")
+                return False
+            self.pending_access.pop(key, None)
+
+            # En memoria se guarda el valor ya decodificado (p. ej. float32)
+            self._remember(key, self.decode(blob), expires_at)
+            self.stats.sets += 1
+
+            if self.disk_count > self.disk_max_items:
+                self._enforce_disk_limit()
+
+        return True
+
+    def _delete_disk(self, key: str):
+        cursor = self.connection.execute(
+            "DELETE FROM cache_entries WHERE key = ?", (key,)
+        )
+        self.connection.commit()
+        self.disk_count -= cursor.rowcount
+        self.pending_access.pop(key, None)
+
+    def _enforce_disk_limit(self):
+        """Elimina expirados y, si hace falta, las menos usadas recientemente"""
+        self.purge_expired()
+        excess = self.disk_count - self.disk_max_items
+        if excess > 0:
+            self._flush_access()
+            keys = [
+                row[0]
+                for row in self.connection.execute(
+                    "SELECT key FROM cache_entries ORDER BY last_access LIMIT ?",
+                    (excess,),
+                )
+            ]
+            cursor = self.connection.executemany(
+                "DELETE FROM cache_entries WHERE key = ?", [(k,) for k in keys]
+            )
+            self.connection.commit()
+            self.disk_count -= cursor.rowcount
+            self.stats.evictions += cursor.rowcount
+            self._forget(keys)
+
+    def purge_expired(self, older_than: Optional[float] = None) -> int:
+        """
+        Elimina entradas expiradas (o creadas antes de ``older_than``)
+
+        Returns:
+            Número de entradas eliminadas del disco
+        """
+        now = time.time()
+        if older_than is None:
+            condition, params = "expires_at <= ?", (now,)
+        else:
+            condition, params = "expires_at <= ? OR created_at < ?", (now, older_than)
+
+        with self.lock:
+            # Las claves borradas del disco tampoco deben servirse desde memoria
+            keys = [
+                row[0]
+                for row in self.connection.execute(
+                    f"SELECT key FROM cache_entries WHERE {condition}", params
+                )
+            ]
+            cursor = self.connection.execute(
+                f"DELETE FROM cache_entries WHERE {condition}", params
+            )
+            self.connection.commit()
+            removed = cursor.rowcount
+            self.disk_count -= removed
+            self.stats.expirations += removed
+
+            self._forget(keys)
+            for key in [k for k, (_, exp) in self.memory.items() if exp <= now]:
+                del self.memory[key]
+
+        return removed
+
+    def clear(self, pattern: str = "*") -> int:
+        """
+        Limpia las entradas cuya clave coincide con un patrón glob
+
+        Returns:
+            Número de entradas eliminadas del disco
+        """
+        with self.lock:
+            if pattern == "*":
+                cursor = self.connection.execute("DELETE FROM cache_entries")
+                self.memory.clear()
+            else:
+                cursor = self.connection.execute(
+                    "DELETE FROM cache_entries WHERE key GLOB ?", (pattern,)
+                )
+                for key in [k for k in self.memory if fnmatch.fnmatchcase(k, pattern)]:
+                    del self.memory[key]
+            self.connection.commit()
+            removed = cursor.rowcount
+            self.disk_count -= removed
+
+        return removed
+
+    def __len__(self) -> int:
+        return self.disk_count
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Obtiene contadores y tamaños de ambos niveles"""
+        with self.lock:
+            stats = asdict(self.stats)
+            stats.update(
+                {
+                    "hit_rate": self.stats.hit_rate,
+                    "memory_entries": len(self.memory),
+                    "disk_entries": self.disk_count,
+                    "memory_max_items": self.memory_max_items,
+                    "disk_max_items": self.disk_max_items,
+                }
+            )
+            return stats
+
+    def close(self):
+        """Cierra el almacén en disco"""
+        with self.lock:
+            self._flush_access()
+            try:
+                self.connection.close()
+            except sqlite3.Error as e:
+                logger.error(f"Error cerrando caché: {e}")
@@ -1,14 +1,33 @@
 import numpy as np
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Iterable
 import re
 import logging
+import threading
+from collections import Counter
 from pathlib import Path
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 
+from modules.utils.keyword_matcher import KeywordMatcher
+
+try:
+    from .tokenization import TokenizedText, load_spanish_stopwords
+except ImportError:
+    from tokenization import TokenizedText, load_spanish_stopwords
+
 
 class CoherenceEvaluator:
-    def __init__(self, model_path: str = "models/custom/shaili-personal-model"):
+    # Pares puntuados antes de comprobar la tasa de similitud por par
+    FALLBACK_RATE_MIN_PAIRS = 20
+
+    def __init__(
+        self,
+        model_path: str = "models/custom/shaili-personal-model",
+        reference_corpus: Optional[Iterable[str]] = None,
+        language: str = "spanish",
+        min_corpus_documents: int = 0,
+        max_fallback_rate: Optional[float] = None,
+    ):
         """
         Inicializar evaluador de coherencia
 
@@ -16,18 +35,32 @@ class CoherenceEvaluator:
         - Análisis semántico de coherencia
         - Evaluación de relevancia
         - Análisis de estructura lógica
+
+        Args:
+            model_path: Ruta del modelo principal
+            reference_corpus: Corpus para ajustar el vectorizador TF-IDF una sola vez
+            language: Idioma de las stopwords ("spanish" o "english")
+            min_corpus_documents: Tamaño mínimo del corpus; si es menor se sigue
+                ajustando TF-IDF por par
+            max_fallback_rate: Proporción de pares fuera del vocabulario del
+                corpus a partir de la que se deja de usar (None: sin límite)
         """
         # Configurar logging
         self.logger = logging.getLogger(__name__)
 
         # Inicializar vectorizador TF-IDF para similitud semántica
-        self.vectorizer = TfidfVectorizer(
-            max_features=1000,
-            stop_words="english",
-            ngram_range=(1, 2),
-            min_df=1,
-            max_df=0.95,
-        )
+        self.language = language
+        self.min_corpus_documents = min_corpus_documents
+        self.max_fallback_rate = max_fallback_rate
+        self.vectorizer = self._new_vectorizer(max_df=0.95)
+        self.vectorizer_fitted = False
+        self._vectorizer_lock = threading.Lock()
+
+        # Pares puntuados con el vectorizador ajustado y cuántos de ellos
+        # no compartían vocabulario con el corpus (TF-IDF ajustado por par)
+        self.semantic_scored = 0
+        self.semantic_fallbacks = 0
+        self._stats_lock = threading.Lock()
 
         # Palabras de conexión lógica
         self.logical_connectors = {
@@ -56,6 +89,11 @@ class CoherenceEvaluator:
             ],
         }
 
+        # Autómata de conectores (una pasada por texto en lugar de un regex por conector)
+        self.connector_matcher = KeywordMatcher.from_lexicons(
+            self.logical_connectors, fold_accents=False
+        )
+
         # Palabras clave comunes por dominio
         self.domain_keywords = {
             "ciencia": [
@@ -92,6 +130,133 @@ class CoherenceEvaluator:
             ],
         }
 
+        if reference_corpus is not None:
+            self.fit_vectorizer(reference_corpus)
+
+    def _new_vectorizer(self, max_df: float) -> TfidfVectorizer:
+        """Crear un vectorizador TF-IDF con las stopwords del idioma"""
+        stop_words = (
+            "english"
+            if self.language == "english"
+            else sorted(load_spanish_stopwords())
+        )
+        return TfidfVectorizer(
+            stop_words=stop_words,
+            ngram_range=(1, 2),
+            min_df=1,
+            max_df=max_df,
+        )
+
+    def fit_vectorizer(self, corpus: Iterable[str]) -> bool:
+        """
+        Ajustar el vectorizador TF-IDF una sola vez sobre un corpus de referencia
+
+        Con menos de min_corpus_documents documentos no se ajusta: el
+        vocabulario no cubriría las consultas reales y se sigue ajustando
+        TF-IDF sobre cada par.
+
+        Args:
+            corpus: Textos de referencia
+
+        Returns:
+            True si el vectorizador quedó ajustado
+        """
+        documents = [doc for doc in corpus if doc and doc.strip()]
+        if not documents:
+            return False
+        if len(documents) < self.min_corpus_documents:
+            self.logger.warning(
+                f"Corpus de referencia pequeño ({len(documents)} documentos, "
+                f"mínimo {self.min_corpus_documents}): se ajusta TF-IDF por par"
+            )
+            return False
+
+        with self._vectorizer_lock:
+            try:
+                self.vectorizer.fit(documents)
+                self.vectorizer_fitted = True
+            except Exception as e:
+                self.logger.warning(f"No se pudo ajustar el vectorizador: {e}")
+                self.vectorizer_fitted = False
+
+        return self.vectorizer_fitted
+
+    def calculate_semantic_coherence_batch(
+        self, queries: List[str], responses: List[str]
+    ) -> List[float]:
+        """
+        Calcular coherencia semántica de muchos pares con el vectorizador ajustado
+
+        Args:
+            queries: Consultas originales
+            responses: Respuestas generadas (mismo orden que las consultas)
+
+        Returns:
+            Lista de puntuaciones de coherencia semántica (0-1)
+        """
+        if not self.vectorizer_fitted:
+            return [
+                self.calculate_semantic_coherence(query, response)
+                for query, response in zip(queries, responses)
+            ]
+
+        try:
+            query_matrix = self.vectorizer.transform(queries)
+            response_matrix = self.vectorizer.transform(responses)
+        except Exception as e:
+            self.logger.warning(f"Error en similitud semántica por lotes: {e}")
+            return [
+                self._simple_similarity(query, response)
+                for query, response in zip(queries, responses)
+            ]
+
+        # Las filas TF-IDF están normalizadas (L2): el coseno es el producto punto
+        similarities = np.asarray(
+            query_matrix.multiply(response_matrix).sum(axis=1)
+        ).ravel()
+
+        scores = []
+        fallbacks = 0
+        for index, (query, response) in enumerate(zip(queries, responses)):
+            if query_matrix[index].nnz == 0 or response_matrix[index].nnz == 0:
+                # Vocabulario fuera del corpus: TF-IDF ajustado sobre el par
+                scores.append(self._pair_similarity(query, response))
+                fallbacks += 1
+            else:
+                scores.append(float(similarities[index]))
+
+        with self._stats_lock:
+            self.semantic_scored += len(scores)
+            self.semantic_fallbacks += fallbacks
+            scored, total_fallbacks = self.semantic_scored, self.semantic_fallbacks
+
+        if (
+            self.max_fallback_rate is not None
+            and scored >= self.FALLBACK_RATE_MIN_PAIRS
+            and total_fallbacks / scored > self.max_fallback_rate
+        ):
+            self.logger.warning(
+                f"El corpus de referencia no cubre {total_fallbacks}/{scored} "
+                "pares: se deja de usar y se ajusta TF-IDF por par"
+            )
+            self.vectorizer_fitted = False
+        return scores
+
+    def get_fallback_stats(self) -> Dict[str, Any]:
+        """
+        Proporción de pares que no usaron el vectorizador ajustado
+
+        Una tasa alta indica que el corpus de referencia no cubre el
+        vocabulario de las consultas reales.
+        """
+        with self._stats_lock:
+            scored, fallbacks = self.semantic_scored, self.semantic_fallbacks
+        return {
+            "scored": scored,
+            "fallbacks": fallbacks,
+            "fallback_rate": fallbacks / scored if scored else 0.0,
+        }
+
     def calculate_semantic_coherence(self, query: str, response: str) -> float:
         """
         Calcular coherencia semántica entre consulta y respuesta usando TF-IDF
@@ -103,10 +268,26 @@ class CoherenceEvaluator:
         Returns:
             Puntuación de coherencia semántica (0-1)
         """
+        if self.vectorizer_fitted:
+            return self.calculate_semantic_coherence_batch([query], [response])[0]
+        return self._pair_similarity(query, response)
+
+    def _pair_similarity(self, query: str, response: str) -> float:
+        """
+        Similitud TF-IDF con un vectorizador ajustado solo sobre el par
+
+        Args:
+            query: Consulta original
+            response: Respuesta generada
+
+        Returns:
+            Puntuación de similitud (0-1)
+        """
         try:
-            # Vectorizar consulta y respuesta
+            # Vectorizar consulta y respuesta (con dos documentos, max_df < 1
+            # descartaría justo los términos que comparten)
             documents = [query, response]
-            tfidf_matrix = self.vectorizer.fit_transform(documents)
+            tfidf_matrix = self._new_vectorizer(max_df=1.0).fit_transform(documents)
 
             # Calcular similitud coseno
             similarity = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])[0][0]
@@ -117,7 +298,13 @@ class CoherenceEvaluator:
             # Fallback: similitud simple basada en palabras comunes
             return self._simple_similarity(query, response)
 
-    def _simple_similarity(self, query: str, response: str) -> float:
+    def _simple_similarity(
+        self,
+        query: str,
+        response: str,
+        query_doc: Optional[TokenizedText] = None,
+        response_doc: Optional[TokenizedText] = None,
+    ) -> float:
         """
         Calcular similitud simple basada en palabras comunes
 
@@ -128,9 +315,17 @@ class CoherenceEvaluator:
         Returns:
             Puntuación de similitud (0-1)
         """
-        # Limpiar y tokenizar
-        query_words = set(re.findall(r"\b\w+\b", query.lower()))
-        response_words = set(re.findall(r"\b\w+\b", response.lower()))
+        # Limpiar y tokenizar (o reutilizar los tokens ya calculados)
+        query_words = (
+            query_doc.word_set
+            if query_doc
+            else set(re.findall(r"\b\w+\b", query.lower()))
+        )
+        response_words = (
+            response_doc.word_set
+            if response_doc
+            else set(re.findall(r"\b\w+\b", response.lower()))
+        )
 
         if not query_words or not response_words:
             return 0.0
@@ -167,14 +362,9 @@ class CoherenceEvaluator:
 
         # Contar conectores lógicos
         connector_counts = {category: 0 for category in self.logical_connectors}
-        text_lower = text.lower()
 
-        for category, connectors in self.logical_connectors.items():
-            for connector in connectors:
-                # Buscar conector con límites de palabra
-                pattern = r"\b" + re.escape(connector) + r"\b"
-                matches = re.findall(pattern, text_lower)
-                connector_counts[category] += len(matches)
+        for match in self.connector_matcher.find_all(text.lower()):
+            connector_counts[match.label] += 1
 
         # Calcular densidad de conectores
         total_connectors = sum(connector_counts.values())
@@ -191,7 +381,13 @@ class CoherenceEvaluator:
             "total_sentences": len(sentences),
         }
 
-    def evaluate_relevance(self, query: str, response: str) -> float:
+    def evaluate_relevance(
+        self,
+        query: str,
+        response: str,
+        query_doc: Optional[TokenizedText] = None,
+        response_doc: Optional[TokenizedText] = None,
+    ) -> float:
         """
         Evaluar relevancia de la respuesta respecto a la consulta
 
@@ -203,7 +399,11 @@ class CoherenceEvaluator:
             Puntuación de relevancia (0-1)
         """
         # Extraer palabras clave de la consulta
-        query_words = set(re.findall(r"\b\w+\b", query.lower()))
+        query_words = (
+            query_doc.word_set
+            if query_doc
+            else set(re.findall(r"\b\w+\b", query.lower()))
+        )
 
         # Filtrar palabras muy comunes
         common_words = {
@@ -243,15 +443,17 @@ class CoherenceEvaluator:
         if not query_keywords:
             return 0.5  # Puntuación neutral si no hay palabras clave claras
 
-        # Contar palabras clave en la respuesta
-        response_lower = response.lower()
+        # Contar palabras clave en la respuesta (conteo de palabras \w+)
+        response_counts = (
+            response_doc.word_counts
+            if response_doc
+            else Counter(re.findall(r"\b\w+\b", response.lower()))
+        )
         keyword_matches = 0
 
         for keyword in query_keywords:
             if len(keyword) > 2:  # Solo palabras significativas
-                pattern = r"\b" + re.escape(keyword) + r"\b"
-                matches = re.findall(pattern, response_lower)
-                keyword_matches += len(matches)
+                keyword_matches += response_counts.get(keyword, 0)
 
         # Calcular puntuación de relevancia
         relevance_score = keyword_matches / len(query_keywords)
@@ -302,20 +504,31 @@ class CoherenceEvaluator:
             "numbers": numbers,
         }
 
-    def calculate_coherence(self, query: str, response: str) -> float:
+    def calculate_coherence(
+        self,
+        query: str,
+        response: str,
+        query_doc: Optional[TokenizedText] = None,
+        response_doc: Optional[TokenizedText] = None,
+        semantic_coherence: Optional[float] = None,
+    ) -> float:
         """
         Calcular puntuación general de coherencia
 
         Args:
             query: Consulta original
             response: Respuesta generada
+            query_doc: Consulta ya tokenizada (opcional)
+            response_doc: Respuesta ya tokenizada (opcional)
+            semantic_coherence: Similitud semántica precalculada (opcional)
 
         Returns:
             Puntuación de coherencia (0-1)
         """
         # Calcular métricas individuales
-        semantic_coherence = self.calculate_semantic_coherence(query, response)
-        relevance = self.evaluate_relevance(query, response)
+        if semantic_coherence is None:
+            semantic_coherence = self.calculate_semantic_coherence(query, response)
+        relevance = self.evaluate_relevance(query, response, query_doc, response_doc)
 
         # Analizar estructura lógica
         logical_structure = self.analyze_logical_structure(response)
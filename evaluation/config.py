@@ -132,6 +132,21 @@ class PipelineConfig:
     BATCH_SIZE = 10
     MAX_WORKERS = 4
 
+    # Corpus de referencia para ajustar una sola vez el vectorizador de coherencia
+    # (un documento por línea). El corpus incluido en el repositorio solo
+    # tiene unas decenas de líneas sobre IA, por debajo del mínimo: con él se
+    # sigue ajustando TF-IDF sobre cada par. Para ajustar una sola vez hay que
+    # apuntar SHEILY_REFERENCE_CORPUS a un corpus representativo (p. ej. un
+    # volcado de consultas y respuestas reales).
+    REFERENCE_CORPUS_PATH = os.getenv(
+        "SHEILY_REFERENCE_CORPUS", "data/spanish_corpus/corpus_completo_espanol.txt"
+    )
+    # Por debajo de este tamaño el corpus no se usa (TF-IDF por par)
+    MIN_REFERENCE_CORPUS_DOCUMENTS = 500
+    # Proporción de pares fuera del vocabulario del corpus a partir de la que
+    # se deja de usar
+    MAX_SEMANTIC_FALLBACK_RATE = 0.5
+
     # Configuración de cache
     ENABLE_CACHE = True
     CACHE_TTL = 3600  # 1 hora
@@ -150,6 +165,9 @@ class PipelineConfig:
         return {
             "batch_size": cls.BATCH_SIZE,
             "max_workers": cls.MAX_WORKERS,
+            "reference_corpus_path": cls.REFERENCE_CORPUS_PATH,
+            "min_reference_corpus_documents": cls.MIN_REFERENCE_CORPUS_DOCUMENTS,
+            "max_semantic_fallback_rate": cls.MAX_SEMANTIC_FALLBACK_RATE,
             "enable_cache": cls.ENABLE_CACHE,
             "cache_ttl": cls.CACHE_TTL,
             "max_conversation_length": cls.MAX_CONVERSATION_LENGTH,
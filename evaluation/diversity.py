@@ -1,12 +1,14 @@
 import numpy as np
-import nltk
-from nltk.tokenize import word_tokenize, sent_tokenize
 from nltk.util import ngrams
-from typing import List, Dict, Any
-import re
+from typing import List, Dict, Any, Optional
 import logging
 from pathlib import Path
 
+try:
+    from .tokenization import TokenizedText, load_spanish_stopwords, tokenize_text
+except ImportError:
+    from tokenization import TokenizedText, load_spanish_stopwords, tokenize_text
+
 
 class DiversityEvaluator:
     def __init__(self):
@@ -18,105 +20,26 @@ class DiversityEvaluator:
         - Complejidad sintáctica
         - Variación de estructuras
         """
-        # Descargar recursos de NLTK
-        try:
-            nltk.download("punkt", quiet=True)
-            nltk.download("stopwords", quiet=True)
-        except Exception as e:
-            print(f"Advertencia: No se pudieron descargar recursos NLTK: {e}")
-
         # Configurar logging
         self.logger = logging.getLogger(__name__)
 
-        # Cargar stopwords en español
-        try:
-            from nltk.corpus import stopwords
-
-            self.stopwords = set(stopwords.words("spanish"))
-        except:
-            self.stopwords = set(
-                [
-                    "el",
-                    "la",
-                    "de",
-                    "que",
-                    "y",
-                    "a",
-                    "en",
-                    "un",
-                    "es",
-                    "se",
-                    "no",
-                    "te",
-                    "lo",
-                    "le",
-                    "da",
-                    "su",
-                    "por",
-                    "son",
-                    "con",
-                    "para",
-                    "al",
-                    "del",
-                    "los",
-                    "las",
-                    "una",
-                    "como",
-                    "pero",
-                    "sus",
-                    "me",
-                    "hasta",
-                    "hay",
-                    "donde",
-                    "han",
-                    "quien",
-                    "están",
-                    "estado",
-                    "desde",
-                    "todo",
-                    "nos",
-                    "durante",
-                    "todos",
-                    "uno",
-                    "les",
-                    "ni",
-                    "contra",
-                    "otros",
-                    "ese",
-                    "eso",
-                    "ante",
-                    "ellos",
-                    "e",
-                    "esto",
-                    "mí",
-                    "antes",
-                    "algunos",
-                    "qué",
-                    "unos",
-                    "yo",
-                    "otro",
-                    "otras",
-                    "otra",
-                    "él",
-                    "tanto",
-                    "esa",
-                    "estos",
-                    "mucho",
-                    "quienes",
-                    "nada",
-                    "muchos",
-                    "cual",
-                    "poco",
-                    "ella",
-                    "estar",
-                    "estas",
-                    "algunas",
-                    "algo",
-                    "nosotros",
-                ]
-            )
-
-    def lexical_diversity(self, text: str) -> Dict[str, float]:
+        # Los recursos NLTK se comprueban al primer uso, no al construir
+        self._stopwords = None
+
+    @property
+    def stopwords(self) -> set:
+        """Stopwords en español, cargadas una sola vez"""
+        if self._stopwords is None:
+            self._stopwords = self._load_stopwords()
+        return self._stopwords
+
+    def _load_stopwords(self) -> set:
+        """Cargar stopwords de NLTK con lista de respaldo"""
+        return set(load_spanish_stopwords())
+
+    def lexical_diversity(
+        self, text: str, doc: Optional[TokenizedText] = None
+    ) -> Dict[str, float]:
         """
         Calcular diversidad léxica
 
@@ -125,9 +48,9 @@ class DiversityEvaluator:
         - Índice de Guiraud
         - Índice de Herdan
         """
-        # Limpiar y tokenizar texto
-        text_clean = re.sub(r"[^\w\s]", "", text.lower())
-        tokens = word_tokenize(text_clean)
+        # Reutilizar tokens limpios si ya se tokenizó el texto
+        doc = doc or tokenize_text(text)
+        tokens = doc.clean_tokens
 
         # Filtrar tokens válidos
         valid_tokens = [
@@ -147,7 +70,9 @@ class DiversityEvaluator:
 
         return metrics
 
-    def syntactic_complexity(self, text: str) -> Dict[str, Any]:
+    def syntactic_complexity(
+        self, text: str, doc: Optional[TokenizedText] = None
+    ) -> Dict[str, Any]:
         """
         Evaluar complejidad sintáctica
 
@@ -156,8 +81,9 @@ class DiversityEvaluator:
         - Variedad de estructuras gramaticales
         - Complejidad de palabras
         """
-        # Tokenizar oraciones
-        sentences = sent_tokenize(text)
+        # Tokenizar oraciones (o reutilizar las ya tokenizadas)
+        doc = doc or tokenize_text(text)
+        sentences = doc.sentences
 
         if len(sentences) == 0:
             return {
@@ -168,14 +94,13 @@ class DiversityEvaluator:
             }
 
         # Longitud de oraciones
-        sentence_lengths = [len(word_tokenize(sent)) for sent in sentences]
+        sentence_lengths = [len(words) for words in doc.sentence_tokens]
         avg_sentence_length = np.mean(sentence_lengths)
 
         # Análisis de complejidad de palabras
         all_words = []
-        for sent in sentences:
-            words = word_tokenize(sent.lower())
-            all_words.extend([w for w in words if len(w) > 1])
+        for words in doc.sentence_tokens:
+            all_words.extend([w.lower() for w in words if len(w) > 1])
 
         # Calcular complejidad basada en longitud de palabras
         word_lengths = [len(word) for word in all_words]
@@ -212,7 +137,9 @@ class DiversityEvaluator:
             "pattern_counts": pattern_counts,
         }
 
-    def semantic_variation(self, text: str) -> Dict[str, float]:
+    def semantic_variation(
+        self, text: str, doc: Optional[TokenizedText] = None
+    ) -> Dict[str, float]:
         """
         Evaluar variación semántica
 
@@ -220,9 +147,9 @@ class DiversityEvaluator:
         - Entropía de n-gramas
         - Dispersión semántica
         """
-        # Limpiar y tokenizar texto
-        text_clean = re.sub(r"[^\w\s]", "", text.lower())
-        tokens = word_tokenize(text_clean)
+        # Reutilizar tokens limpios si ya se tokenizó el texto
+        doc = doc or tokenize_text(text)
+        tokens = doc.clean_tokens
 
         if len(tokens) < 2:
             return {
@@ -264,11 +191,14 @@ class DiversityEvaluator:
             "semantic_dispersion": semantic_dispersion,
         }
 
-    def evaluate_diversity(self, text: str) -> Dict[str, Any]:
+    def evaluate_diversity(
+        self, text: str, doc: Optional[TokenizedText] = None
+    ) -> Dict[str, Any]:
         """
         Evaluar diversidad general del texto
 
-        Combina múltiples métricas de diversidad
+        Combina múltiples métricas de diversidad. Si se pasa ``doc``
+        (texto ya tokenizado) no se vuelve a tokenizar.
         """
         if not text or len(text.strip()) == 0:
             return {
@@ -286,9 +216,10 @@ class DiversityEvaluator:
                 "semantic_metrics": {"bigram_entropy": 0.0},
             }
 
-        lexical_metrics = self.lexical_diversity(text)
-        syntactic_metrics = self.syntactic_complexity(text)
-        semantic_metrics = self.semantic_variation(text)
+        doc = doc or tokenize_text(text)
+        lexical_metrics = self.lexical_diversity(text, doc)
+        syntactic_metrics = self.syntactic_complexity(text, doc)
+        semantic_metrics = self.semantic_variation(text, doc)
 
         # Calcular puntuación compuesta
         lexical_score = lexical_metrics["type_token_ratio"]
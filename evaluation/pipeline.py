@@ -1,11 +1,15 @@
 import numpy as np
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from .coherence import CoherenceEvaluator
 from .diversity import DiversityEvaluator
 from .toxicity import ToxicityEvaluator
+from .tokenization import tokenize_text
+from .config import PipelineConfig
 import logging
 import json
 import os
+import threading
 from datetime import datetime
 
 
@@ -19,6 +23,8 @@ class QualityEvaluationPipeline:
         coherence_threshold: float = 0.6,
         diversity_threshold: float = 0.5,
         toxicity_threshold: float = 0.3,
+        reference_corpus: Optional[Iterable[str]] = None,
+        max_workers: int = PipelineConfig.MAX_WORKERS,
     ):
         """
         Inicializar pipeline de evaluación de calidad
@@ -31,9 +37,19 @@ class QualityEvaluationPipeline:
             coherence_threshold: Umbral de coherencia
             diversity_threshold: Umbral de diversidad
             toxicity_threshold: Umbral de toxicidad
+            reference_corpus: Corpus para ajustar el vectorizador TF-IDF de coherencia
+            max_workers: Hilos del pool compartido por los evaluadores
         """
-        # Inicializar evaluadores
-        self.coherence_evaluator = CoherenceEvaluator()
+        # Inicializar evaluadores (reutilizados en todas las evaluaciones)
+        if reference_corpus is None:
+            reference_corpus = self._load_reference_corpus(
+                PipelineConfig.REFERENCE_CORPUS_PATH
+            )
+        self.coherence_evaluator = CoherenceEvaluator(
+            reference_corpus=reference_corpus,
+            min_corpus_documents=PipelineConfig.MIN_REFERENCE_CORPUS_DOCUMENTS,
+            max_fallback_rate=PipelineConfig.MAX_SEMANTIC_FALLBACK_RATE,
+        )
         self.diversity_evaluator = DiversityEvaluator()
         self.toxicity_evaluator = ToxicityEvaluator()
 
@@ -53,6 +69,12 @@ class QualityEvaluationPipeline:
         # Configurar logging
         os.makedirs(log_dir, exist_ok=True)
         self.log_dir = log_dir
+        self.log_path = os.path.join(log_dir, "evaluations.jsonl")
+        self._log_lock = threading.Lock()
+
+        # Pool de hilos para ejecutar los evaluadores de forma concurrente
+        self.max_workers = max_workers
+        self._executor = None
 
         # Configurar logger
         logging.basicConfig(
@@ -65,6 +87,38 @@ class QualityEvaluationPipeline:
         )
         self.logger = logging.getLogger(__name__)
 
+    @staticmethod
+    def _load_reference_corpus(path: str) -> Optional[List[str]]:
+        """
+        Cargar el corpus de referencia para el vectorizador TF-IDF
+
+        Args:
+            path: Ruta a un archivo de texto (un documento por línea)
+
+        Returns:
+            Lista de documentos, o None si el archivo no existe
+        """
+        if not path or not os.path.exists(path):
+            return None
+
+        with open(path, "r", encoding="utf-8") as f:
+            documents = [line.strip() for line in f if line.strip()]
+        return documents or None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Obtener (creando si hace falta) el pool de hilos compartido"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="quality-eval"
+            )
+        return self._executor
+
+    def close(self):
+        """Liberar el pool de hilos"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
     def _log_evaluation(
         self, query: str, response: str, evaluation_result: Dict[str, Any]
     ):
@@ -76,47 +130,54 @@ class QualityEvaluationPipeline:
             response: Respuesta generada
             evaluation_result: Resultados de evaluación
         """
-        log_entry = {
-            "timestamp": datetime.now().isoformat(),
-            "query": query,
-            "response": response,
-            "evaluation": evaluation_result,
-        }
+        self._log_evaluations([(query, response, evaluation_result)])
 
-        # Guardar log en archivo JSON
-        log_filename = (
-            f"{self.log_dir}/evaluation_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        )
-        with open(log_filename, "w", encoding="utf-8") as f:
-            json.dump(log_entry, f, ensure_ascii=False, indent=2)
+    def _log_evaluations(self, entries: List[Tuple[str, str, Dict[str, Any]]]):
+        """
+        Añadir varias evaluaciones al flujo JSONL en una sola escritura
 
-    def evaluate_response(
-        self, query: str, response: str, domain: str = None
+        Args:
+            entries: Tuplas (consulta, respuesta, resultado de evaluación)
+        """
+        timestamp = datetime.now().isoformat()
+        lines = [
+            json.dumps(
+                {
+                    "timestamp": timestamp,
+                    "query": query,
+                    "response": response,
+                    "evaluation": evaluation_result,
+                },
+                ensure_ascii=False,
+                default=float,
+            )
+            for query, response, evaluation_result in entries
+        ]
+
+        with self._log_lock:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+
+    def _build_evaluation_result(
+        self,
+        coherence_score: float,
+        diversity_metrics: Dict[str, Any],
+        toxicity_metrics: Dict[str, Any],
+        domain: str = None,
     ) -> Dict[str, Any]:
         """
-        Evaluar calidad de una respuesta
+        Combinar métricas individuales en el resultado de evaluación
 
         Args:
-            query: Consulta original
-            response: Respuesta generada
+            coherence_score: Puntuación de coherencia
+            diversity_metrics: Métricas de diversidad
+            toxicity_metrics: Métricas de toxicidad
             domain: Dominio opcional
 
         Returns:
             Diccionario con métricas de calidad
         """
-        # Evaluar coherencia
-        coherence_metrics = self.coherence_evaluator.calculate_coherence(
-            query, response
-        )
-
-        # Evaluar diversidad
-        diversity_metrics = self.diversity_evaluator.evaluate_diversity(response)
-
-        # Evaluar toxicidad
-        toxicity_metrics = self.toxicity_evaluator.evaluate_toxicity(response)
-
         # Calcular puntuaciones normalizadas
-        coherence_score = coherence_metrics
         diversity_score = diversity_metrics["diversity_score"]
         toxicity_score = (
             1 - toxicity_metrics["toxicity_score"]
@@ -139,7 +200,7 @@ class QualityEvaluationPipeline:
         )
 
         # Preparar resultado de evaluación
-        evaluation_result = {
+        return {
             "composite_score": composite_score,
             "passes_quality": passes_quality,
             "metrics": {
@@ -159,13 +220,118 @@ class QualityEvaluationPipeline:
             "domain": domain,
         }
 
-        # Registrar evaluación
-        self._log_evaluation(query, response, evaluation_result)
+    def evaluate_responses(
+        self, pairs: List[Tuple[str, str]], domain: str = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Evaluar calidad de un lote de respuestas
+
+        Cada texto se tokeniza una sola vez y los tokens se comparten entre
+        los tres evaluadores, que se ejecutan de forma concurrente.
+
+        Args:
+            pairs: Lista de tuplas (consulta, respuesta)
+            domain: Dominio opcional
+
+        Returns:
+            Lista de diccionarios con métricas de calidad, en el mismo orden
+        """
+        if not pairs:
+            return []
+
+        queries = [query for query, _ in pairs]
+        responses = [response for _, response in pairs]
+
+        # Tokenizar una sola vez cada texto
+        query_docs = [tokenize_text(query) for query in queries]
+        response_docs = [tokenize_text(response) for response in responses]
+
+        def run_coherence() -> List[float]:
+            semantic_scores = (
+                self.coherence_evaluator.calculate_semantic_coherence_batch(
+                    queries, responses
+                )
+            )
+            return [
+                self.coherence_evaluator.calculate_coherence(
+                    query,
+                    response,
+                    query_doc=query_doc,
+                    response_doc=response_doc,
+                    semantic_coherence=semantic,
+                )
+                for query, response, query_doc, response_doc, semantic in zip(
+                    queries, responses, query_docs, response_docs, semantic_scores
+                )
+            ]
+
+        def run_diversity() -> List[Dict[str, Any]]:
+            return [
+                self.diversity_evaluator.evaluate_diversity(response, doc)
+                for response, doc in zip(responses, response_docs)
+            ]
+
+        def run_toxicity() -> List[Dict[str, Any]]:
+            return [
+                self.toxicity_evaluator.evaluate_toxicity(response)
+                for response in responses
+            ]
+
+        executor = self._get_executor()
+        coherence_future = executor.submit(run_coherence)
+        diversity_future = executor.submit(run_diversity)
+        toxicity_future = executor.submit(run_toxicity)
+
+        results = [
+            self._build_evaluation_result(coherence, diversity, toxicity, domain)
+            for coherence, diversity, toxicity in zip(
+                coherence_future.result(),
+                diversity_future.result(),
+                toxicity_future.result(),
+            )
+        ]
+
+        # Registrar todas las evaluaciones en una sola escritura
+        self._log_evaluations(
+            [
+                (query, response, result)
+                for query, response, result in zip(queries, responses, results)
+            ]
+        )
+
+        self.logger.info(
+            f"Evaluación de {len(results)} respuestas - Dominio: {domain}"
+        )
+
+        fallback_stats = self.coherence_evaluator.get_fallback_stats()
+        if fallback_stats["scored"]:
+            self.logger.info(
+                f"Coherencia fuera del corpus de referencia: "
+                f"{fallback_stats['fallbacks']}/{fallback_stats['scored']} pares "
+                f"({fallback_stats['fallback_rate']:.0%})"
+            )
+
+        return results
+
+    def evaluate_response(
+        self, query: str, response: str, domain: str = None
+    ) -> Dict[str, Any]:
+        """
+        Evaluar calidad de una respuesta
+
+        Args:
+            query: Consulta original
+            response: Respuesta generada
+            domain: Dominio opcional
+
+        Returns:
+            Diccionario con métricas de calidad
+        """
+        evaluation_result = self.evaluate_responses([(query, response)], domain)[0]
 
         # Registrar métricas en log
-        self.logger.info(f"Evaluación de respuesta - Dominio: {domain}")
-        self.logger.info(f"Puntuación compuesta: {composite_score}")
-        self.logger.info(f"Pasa calidad: {passes_quality}")
+        self.logger.info(f"Puntuación compuesta: {evaluation_result['composite_score']}")
+        self.logger.info(f"Pasa calidad: {evaluation_result['passes_quality']}")
 
         return evaluation_result
 
@@ -190,11 +356,10 @@ class QualityEvaluationPipeline:
             msg["content"] for msg in conversation if msg["role"] == "assistant"
         ]
 
-        # Evaluar cada par de mensajes
-        response_evaluations = []
-        for query, response in zip(user_messages, assistant_messages):
-            evaluation = self.evaluate_response(query, response, domain)
-            response_evaluations.append(evaluation)
+        # Evaluar todos los pares de mensajes en un solo lote
+        response_evaluations = self.evaluate_responses(
+            list(zip(user_messages, assistant_messages)), domain
+        )
 
         # Calcular métricas agregadas
         composite_scores = [eval["composite_score"] for eval in response_evaluations]
@@ -147,6 +147,68 @@ def test_coherence_evaluator():
         return False, None
 
 
+def test_coherence_fallback_stats():
+    """Probar que se cuentan los pares que no comparten vocabulario con el corpus"""
+    print("🧪 Probando estadísticas de fallback de coherencia...")
+
+    try:
+        from coherence import CoherenceEvaluator
+        from sklearn.metrics.pairwise import cosine_similarity
+
+        corpus = [
+            "modelos de aprendizaje automático entrenados con datos",
+            "redes neuronales y aprendizaje profundo",
+        ]
+        evaluator = CoherenceEvaluator(reference_corpus=corpus)
+        assert evaluator.vectorizer_fitted
+        # Stopwords en español: "de" y "con" no entran en el vocabulario
+        vocabulary = evaluator.vectorizer.vocabulary_
+        assert "datos" in vocabulary
+        assert "de" not in vocabulary and "con" not in vocabulary
+
+        queries = ["aprendizaje automático con datos", "receta de paella con gambas"]
+        responses = ["modelos de aprendizaje automático", "paella con gambas y arroz"]
+        scores = evaluator.calculate_semantic_coherence_batch(queries, responses)
+
+        # Texto dentro del vocabulario: coseno TF-IDF del corpus, no Jaccard
+        expected = cosine_similarity(
+            evaluator.vectorizer.transform(queries[:1]),
+            evaluator.vectorizer.transform(responses[:1]),
+        )[0][0]
+        assert abs(scores[0] - expected) < 1e-9
+        jaccard = evaluator._simple_similarity(queries[0], responses[0])
+        assert abs(scores[0] - jaccard) > 0.01
+        # Fuera del vocabulario: TF-IDF ajustado sobre el par
+        pair_score = evaluator._pair_similarity(queries[1], responses[1])
+        assert abs(scores[1] - pair_score) < 1e-9
+        assert scores[1] > 0
+
+        stats = evaluator.get_fallback_stats()
+        assert stats["scored"] == 2
+        assert stats["fallbacks"] == 1
+        assert stats["fallback_rate"] == 0.5
+
+        # Corpus por debajo del mínimo: no se ajusta y se puntúa por par
+        small = CoherenceEvaluator(reference_corpus=corpus, min_corpus_documents=10)
+        assert not small.vectorizer_fitted
+        assert small.calculate_semantic_coherence(
+            queries[0], responses[0]
+        ) == small._pair_similarity(queries[0], responses[0])
+
+        # Tasa por encima del máximo: se deja de usar el corpus
+        strict = CoherenceEvaluator(reference_corpus=corpus, max_fallback_rate=0.4)
+        strict.FALLBACK_RATE_MIN_PAIRS = 2
+        strict.calculate_semantic_coherence_batch(queries, responses)
+        assert not strict.vectorizer_fitted
+
+        print(f"  ✅ Tasa de fallback: {stats['fallback_rate']:.0%}")
+        return True, stats
+
+    except Exception as e:
+        print(f"  ❌ Error en estadísticas de fallback: {e}")
+        return False, None
+
+
 def test_quality_pipeline():
     """Probar el pipeline de evaluación de calidad"""
     print("🧪 Probando QualityEvaluationPipeline...")
@@ -180,9 +242,28 @@ def test_quality_pipeline():
             conversation, domain="Biología"
         )
 
+        # Evaluar un lote de respuestas (tokenización compartida)
+        batch_eval = pipeline.evaluate_responses(
+            [
+                (conversation[0]["content"], conversation[1]["content"]),
+                (conversation[2]["content"], conversation[3]["content"]),
+            ],
+            domain="Biología",
+        )
+        assert len(batch_eval) == 2
+        assert all("composite_score" in result for result in batch_eval)
+        # Sin corpus suficiente la coherencia semántica es TF-IDF por par
+        coherence = pipeline.coherence_evaluator
+        assert not coherence.vectorizer_fitted
+        assert coherence.calculate_semantic_coherence(
+            conversation[0]["content"], conversation[1]["content"]
+        ) > 0
+        assert Path(pipeline.log_path).exists()
+
         results = {
             "response_evaluation": response_eval,
             "conversation_evaluation": conversation_eval,
+            "batch_evaluation": batch_eval,
         }
 
         print("  ✅ Pipeline de evaluación de calidad probado")
@@ -327,6 +408,7 @@ def main():
         ("diversity_evaluator", test_diversity_evaluator),
         ("toxicity_evaluator", test_toxicity_evaluator),
         ("coherence_evaluator", test_coherence_evaluator),
+        ("coherence_fallback_stats", test_coherence_fallback_stats),
         ("quality_pipeline", test_quality_pipeline),
         ("performance_benchmark", test_performance_benchmark),
         ("configuration", test_configuration),
@@ -0,0 +1,130 @@
+"""
+Tokenización compartida para el Sistema de Evaluación - Shaili AI
+
+Este módulo tokeniza cada texto una sola vez y expone los flujos de tokens
+que necesitan los evaluadores de coherencia, diversidad y toxicidad.
+"""
+
+import re
+import logging
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import List
+
+import nltk
+from nltk.tokenize import word_tokenize, sent_tokenize
+
+logger = logging.getLogger(__name__)
+
+# Recursos NLTK necesarios (ruta de búsqueda, paquete de descarga)
+NLTK_RESOURCES = [
+    ("tokenizers/punkt", "punkt"),
+    ("corpora/stopwords", "stopwords"),
+]
+
+_nltk_ready = False
+_nltk_lock = threading.Lock()
+
+
+def ensure_nltk_resources() -> bool:
+    """
+    Comprobar (y descargar solo si faltan) los recursos NLTK una vez por proceso
+
+    Returns:
+        True si todos los recursos están disponibles
+    """
+    global _nltk_ready
+    if _nltk_ready:
+        return True
+
+    with _nltk_lock:
+        if _nltk_ready:
+            return True
+
+        available = True
+        for resource_path, package in NLTK_RESOURCES:
+            try:
+                nltk.data.find(resource_path)
+            except LookupError:
+                try:
+                    nltk.download(package, quiet=True)
+                except Exception as e:
+                    logger.warning(f"No se pudo descargar recurso NLTK {package}: {e}")
+                    available = False
+
+        _nltk_ready = available
+        return available
+
+
+# Stopwords en español si NLTK no está disponible
+SPANISH_STOPWORDS_FALLBACK = [
+    "el", "la", "de", "que", "y", "a", "en", "un", "es", "se", "no", "te", "lo", "le",
+    "da", "su", "por", "son", "con", "para", "al", "del", "los", "las", "una", "como",
+    "pero", "sus", "me", "hasta", "hay", "donde", "han", "quien", "están", "estado",
+    "desde", "todo", "nos", "durante", "todos", "uno", "les", "ni", "contra", "otros",
+    "ese", "eso", "ante", "ellos", "e", "esto", "mí", "antes", "algunos", "qué", "unos",
+    "yo", "otro", "otras", "otra", "él", "tanto", "esa", "estos", "mucho", "quienes",
+    "nada", "muchos", "cual", "poco", "ella", "estar", "estas", "algunas", "algo",
+    "nosotros",
+]
+
+_spanish_stopwords = None
+
+
+def load_spanish_stopwords() -> frozenset:
+    """Stopwords en español de NLTK (con lista de respaldo), una vez por proceso"""
+    global _spanish_stopwords
+    if _spanish_stopwords is None:
+        try:
+            from nltk.corpus import stopwords
+
+            ensure_nltk_resources()
+            _spanish_stopwords = frozenset(stopwords.words("spanish"))
+        except Exception:
+            _spanish_stopwords = frozenset(SPANISH_STOPWORDS_FALLBACK)
+    return _spanish_stopwords
+
+
+@dataclass
+class TokenizedText:
+    """Flujos de tokens de un texto, calculados una sola vez"""
+
+    text: str
+    lower: str
+    clean_tokens: List[str] = field(default_factory=list)
+    sentences: List[str] = field(default_factory=list)
+    sentence_tokens: List[List[str]] = field(default_factory=list)
+    word_counts: Counter = field(default_factory=Counter)
+
+    @property
+    def word_set(self) -> set:
+        """Conjunto de palabras (\\w+) en minúsculas"""
+        return set(self.word_counts)
+
+
+def tokenize_text(text: str) -> TokenizedText:
+    """
+    Tokenizar un texto para todos los evaluadores
+
+    Args:
+        text: Texto a tokenizar
+
+    Returns:
+        TokenizedText con tokens limpios, oraciones y conteo de palabras
+    """
+    ensure_nltk_resources()
+
+    text = text or ""
+    lower = text.lower()
+    text_clean = re.sub(r"[^\w\s]", "", lower)
+    sentences = sent_tokenize(text) if text.strip() else []
+
+    return TokenizedText(
+        text=text,
+        lower=lower,
+        clean_tokens=word_tokenize(text_clean),
+        sentences=sentences,
+        sentence_tokens=[word_tokenize(sent) for sent in sentences],
+        word_counts=Counter(re.findall(r"\b\w+\b", lower)),
+    )
@@ -1,4 +1,5 @@
 import re
+import bisect
 import numpy as np
 from typing import List, Dict, Union, Any
 import json
@@ -6,6 +7,11 @@ import os
 import logging
 from pathlib import Path
 
+from modules.utils.keyword_matcher import KeywordMatcher
+
+# Etiqueta reservada para las palabras de negación dentro del autómata
+NEGATION_LABEL = "__negacion__"
+
 
 class ToxicityEvaluator:
     def __init__(self, lexicon_path=None):
@@ -35,6 +41,9 @@ class ToxicityEvaluator:
         # Patrones de negación para reducir falsos positivos
         self.negation_words = ["no", "nunca", "jamás", "tampoco", "ni"]
 
+        # Autómata único con todo el léxico y las negaciones (una pasada por texto)
+        self.keyword_matcher = self._build_keyword_matcher()
+
     def _load_toxic_lexicon(self, lexicon_path=None) -> Dict[str, Dict]:
         """
         Cargar léxico de toxicidad con categorías detalladas
@@ -123,6 +132,20 @@ class ToxicityEvaluator:
 
         return default_lexicon
 
+    def _build_keyword_matcher(self) -> KeywordMatcher:
+        """
+        Construir el autómata de búsqueda a partir del léxico cargado
+
+        Returns:
+            Autómata con las categorías del léxico y las palabras de negación
+        """
+        matcher = KeywordMatcher()
+        for category, data in self.toxic_lexicon.items():
+            matcher.add_keywords(data["palabras"], category)
+        matcher.add_keywords(self.negation_words, NEGATION_LABEL)
+        matcher.build()
+        return matcher
+
     def detect_toxic_language(self, text: str) -> Dict[str, Dict]:
         """
         Detectar lenguaje tóxico con contexto
@@ -133,41 +156,40 @@ class ToxicityEvaluator:
         Returns:
             Diccionario de palabras tóxicas encontradas por categoría
         """
-        text_lower = text.lower()
         toxic_words = {}
+        negation_starts = []
+        negation_ends = []
+        category_matches: Dict[str, List[str]] = {}
+
+        # Una sola pasada sobre el texto; las coincidencias llegan en orden
+        matches = self.keyword_matcher.find_all(text)
+        for match in matches:
+            if match.label == NEGATION_LABEL:
+                negation_starts.append(match.start)
+                negation_ends.append(match.end)
+
+        for match in matches:
+            if match.label == NEGATION_LABEL:
+                continue
+
+            # Buscar palabras de negación en una ventana de 50 caracteres
+            context_start = max(0, match.start - 50)
+            context_end = match.end + 50
+            index = bisect.bisect_left(negation_starts, context_start)
+            has_negation = (
+                index < len(negation_starts) and negation_ends[index] <= context_end
+            )
 
-        for category, data in self.toxic_lexicon.items():
-            category_matches = []
-
-            for word in data["palabras"]:
-                # Buscar palabra con límites de palabra
-                pattern = r"\b" + re.escape(word) + r"\b"
-                matches = re.findall(pattern, text_lower)
-
-                if matches:
-                    # Verificar si hay negación cerca
-                    for match in matches:
-                        match_start = text_lower.find(match)
-                        if match_start != -1:
-                            # Buscar palabras de negación en un radio de 5 palabras
-                            context_start = max(0, match_start - 50)
-                            context_end = min(
-                                len(text_lower), match_start + len(match) + 50
-                            )
-                            context = text_lower[context_start:context_end]
-
-                            has_negation = any(
-                                neg_word in context for neg_word in self.negation_words
-                            )
-
-                            if not has_negation:
-                                category_matches.append(word)
+            if not has_negation:
+                category_matches.setdefault(match.label, []).append(match.keyword)
 
-            if category_matches:
+        for category, data in self.toxic_lexicon.items():
+            words = category_matches.get(category)
+            if words:
                 toxic_words[category] = {
-                    "palabras": list(set(category_matches)),  # Eliminar duplicados
+                    "palabras": list(set(words)),  # Eliminar duplicados
                     "severidad": data["severidad"],
-                    "count": len(category_matches),
+                    "count": len(words),
                 }
 
         return toxic_words
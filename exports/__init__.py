@@ -7,6 +7,7 @@ del sistema en diferentes formatos y con diferentes niveles de detalle.
 
 from .export_manager import ExportManager, ExportConfig, ExportMetadata
 from .data_exporter import DataExporter, ExportSpecification
+from .stream_writer import StreamingExportWriter
 
 # Versión del paquete
 __version__ = "3.1.0"
@@ -60,7 +61,10 @@ def export_user_data(
 
 
 def export_conversations(
-    user_id: str = None, format: str = "jsonl", date_range: tuple = None
+    user_id: str = None,
+    format: str = "jsonl",
+    date_range: tuple = None,
+    incremental: bool = False,
 ) -> dict:
     """
     Exportar conversaciones
@@ -69,6 +73,7 @@ def export_conversations(
         user_id: ID del usuario (opcional)
         format: Formato de exportación
         date_range: Rango de fechas
+        incremental: Solo conversaciones con mensajes nuevos desde la última exportación
 
     Returns:
         Resultado de la exportación
@@ -76,7 +81,7 @@ def export_conversations(
     config = ExportConfig(format=format, include_pii=True, include_metadata=True)
 
     manager = get_export_manager(config)
-    return manager.export_conversations(user_id, date_range)
+    return manager.export_conversations(user_id, date_range, incremental)
 
 
 def export_system_data(
@@ -380,7 +385,7 @@ def get_supported_formats() -> list:
     Returns:
         Lista de formatos soportados
     """
-    return ["jsonl", "json", "csv", "xml", "yaml", "parquet", "pickle"]
+    return ["jsonl", "json", "csv", "xml", "yaml", "parquet", "arrow", "pickle"]
 
 
 def get_supported_data_types() -> list:
@@ -433,6 +438,7 @@ __all__ = [
     "ExportMetadata",
     "DataExporter",
     "ExportSpecification",
+    "StreamingExportWriter",
     # Funciones de conveniencia
     "export_user_data",
     "export_conversations",
@@ -11,17 +11,34 @@ import sqlite3
 import pandas as pd
 from pathlib import Path
 from datetime import datetime, timezone
-from typing import Dict, List, Any, Optional, Union
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Union
 import logging
 import hashlib
 import numpy as np
 from dataclasses import dataclass, asdict
-import pickle
-import gzip
 import sqlalchemy as sa
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
+try:
+    from .stream_writer import (
+        DEFAULT_BATCH_SIZE,
+        STREAMING_FORMATS,
+        StreamingExportWriter,
+        build_filter_clause,
+        iter_keyset_batches,
+        iter_query_batches,
+    )
+except ImportError:
+    from stream_writer import (
+        DEFAULT_BATCH_SIZE,
+        STREAMING_FORMATS,
+        StreamingExportWriter,
+        build_filter_clause,
+        iter_keyset_batches,
+        iter_query_batches,
+    )
+
 
 @dataclass
 class ExportSpecification:
@@ -33,6 +50,8 @@ class ExportSpecification:
     filters: Dict[str, Any] = None
     include_metadata: bool = True
     compress: bool = False
+    batch_size: int = DEFAULT_BATCH_SIZE
+    key_column: Optional[str] = None  # Paginación por clave (p. ej. "rowid")
 
 
 class DataExporter:
@@ -79,30 +98,10 @@ class DataExporter:
         self.logger.info(f"Exportando conversaciones desde {spec.source_path}")
 
         try:
-            # Conectar a la base de datos
-            conn = sqlite3.connect(spec.source_path)
-
-            # Construir consulta
-            query = "SELECT * FROM conversations"
-            if spec.filters:
-                conditions = []
-                for key, value in spec.filters.items():
-                    if isinstance(value, str):
-                        conditions.append(f"{key} = '{value}'")
-                    else:
-                        conditions.append(f"{key} = {value}")
-                if conditions:
-                    query += " WHERE " + " AND ".join(conditions)
-
-            # Ejecutar consulta
-            df = pd.read_sql_query(query, conn)
-            conn.close()
-
-            if df.empty:
-                return {"success": False, "error": "No conversations found"}
-
-            # Exportar datos
-            return self._export_dataframe(df, spec, "conversations")
+            batches = self._iter_table_batches(spec, "conversations")
+            return self._export_batches(
+                batches, spec, "conversations", "No conversations found"
+            )
 
         except Exception as e:
             self.logger.error(f"Error exportando conversaciones: {e}")
@@ -121,39 +120,13 @@ class DataExporter:
         self.logger.info(f"Exportando embeddings desde {spec.source_path}")
 
         try:
-            # Conectar a la base de datos
-            conn = sqlite3.connect(spec.source_path)
-
-            # Obtener embeddings
-            query = "SELECT * FROM embeddings"
-            if spec.filters:
-                conditions = []
-                for key, value in spec.filters.items():
-                    if isinstance(value, str):
-                        conditions.append(f"{key} = '{value}'")
-                    else:
-                        conditions.append(f"{key} = {value}")
-                if conditions:
-                    query += " WHERE " + " AND ".join(conditions)
-
-            df = pd.read_sql_query(query, conn)
-            conn.close()
-
-            if df.empty:
-                return {"success": False, "error": "No embeddings found"}
-
-            # Convertir embeddings de string a numpy arrays
-            if "embedding" in df.columns:
-                df["embedding"] = df["embedding"].apply(
-                    lambda x: (
-                        np.frombuffer(x.encode(), dtype=np.float32)
-                        if isinstance(x, str)
-                        else x
-                    )
-                )
-
-            # Exportar datos
-            return self._export_dataframe(df, spec, "embeddings")
+            batches = (
+                self._decode_embeddings(batch)
+                for batch in self._iter_table_batches(spec, "embeddings")
+            )
+            return self._export_batches(
+                batches, spec, "embeddings", "No embeddings found"
+            )
 
         except Exception as e:
             self.logger.error(f"Error exportando embeddings: {e}")
@@ -172,29 +145,10 @@ class DataExporter:
         self.logger.info(f"Exportando perfiles de usuario desde {spec.source_path}")
 
         try:
-            # Conectar a la base de datos
-            conn = sqlite3.connect(spec.source_path)
-
-            # Obtener perfiles
-            query = "SELECT * FROM user_profiles"
-            if spec.filters:
-                conditions = []
-                for key, value in spec.filters.items():
-                    if isinstance(value, str):
-                        conditions.append(f"{key} = '{value}'")
-                    else:
-                        conditions.append(f"{key} = {value}")
-                if conditions:
-                    query += " WHERE " + " AND ".join(conditions)
-
-            df = pd.read_sql_query(query, conn)
-            conn.close()
-
-            if df.empty:
-                return {"success": False, "error": "No user profiles found"}
-
-            # Exportar datos
-            return self._export_dataframe(df, spec, "user_profiles")
+            batches = self._iter_table_batches(spec, "user_profiles")
+            return self._export_batches(
+                batches, spec, "user_profiles", "No user profiles found"
+            )
 
         except Exception as e:
             self.logger.error(f"Error exportando perfiles de usuario: {e}")
@@ -217,43 +171,10 @@ class DataExporter:
             if not log_path.exists():
                 return {"success": False, "error": "Log file not found"}
 
-            # Leer logs
-            logs = []
-            with open(log_path, "r", encoding="utf-8") as f:
-                for line in f:
-                    line = line.strip()
-                    if line:
-                        try:
-                            # Intentar parsear como JSON
-                            log_entry = json.loads(line)
-                            logs.append(log_entry)
-                        except json.JSONDecodeError:
-                            # Si no es JSON, crear entrada simple
-                            logs.append(
-                                {
-                                    "timestamp": datetime.now().isoformat(),
-                                    "message": line,
-                                    "level": "INFO",
-                                }
-                            )
-
-            if not logs:
-                return {"success": False, "error": "No logs found"}
-
-            # Convertir a DataFrame
-            df = pd.DataFrame(logs)
-
-            # Aplicar filtros
-            if spec.filters:
-                for key, value in spec.filters.items():
-                    if key in df.columns:
-                        df = df[df[key] == value]
-
-            if df.empty:
-                return {"success": False, "error": "No logs match filters"}
-
-            # Exportar datos
-            return self._export_dataframe(df, spec, "system_logs")
+            batches = self._iter_log_batches(log_path, spec)
+            return self._export_batches(
+                batches, spec, "system_logs", "No logs match filters"
+            )
 
         except Exception as e:
             self.logger.error(f"Error exportando logs del sistema: {e}")
@@ -364,57 +285,133 @@ class DataExporter:
             self.logger.error(f"Error exportando resultados de evaluación: {e}")
             return {"success": False, "error": str(e)}
 
+    def _iter_table_batches(
+        self, spec: ExportSpecification, table: str
+    ) -> Iterator[pd.DataFrame]:
+        """Leer una tabla SQLite por lotes aplicando los filtros de la especificación"""
+        where, params = build_filter_clause(spec.filters)
+        conn = sqlite3.connect(spec.source_path)
+        try:
+            if spec.key_column:
+                yield from iter_keyset_batches(
+                    conn, table, spec.key_column, where, params, spec.batch_size
+                )
+            else:
+                query = f"SELECT * FROM {table}"
+                if where:
+                    query += f" WHERE {where}"
+                yield from iter_query_batches(conn, query, params, spec.batch_size)
+        finally:
+            conn.close()
+
+    def _decode_embeddings(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Convertir embeddings de string a numpy arrays"""
+        if "embedding" in df.columns:
+            df["embedding"] = df["embedding"].apply(
+                lambda x: (
+                    np.frombuffer(x.encode(), dtype=np.float32)
+                    if isinstance(x, str)
+                    else x
+                )
+            )
+        return df
+
+    def _iter_log_batches(
+        self, log_path: Path, spec: ExportSpecification
+    ) -> Iterator[pd.DataFrame]:
+        """Leer un archivo de logs por lotes de líneas aplicando los filtros"""
+
+        def to_frame(logs: List[Dict[str, Any]]) -> pd.DataFrame:
+            df = pd.DataFrame(logs)
+            for key, value in (spec.filters or {}).items():
+                if key in df.columns:
+                    df = df[df[key] == value]
+            return df
+
+        logs = []
+        with open(log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    # Intentar parsear como JSON
+                    logs.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Si no es JSON, crear entrada simple
+                    logs.append(
+                        {
+                            "timestamp": datetime.now().isoformat(),
+                            "message": line,
+                            "level": "INFO",
+                        }
+                    )
+                if len(logs) >= spec.batch_size:
+                    yield to_frame(logs)
+                    logs = []
+        if logs:
+            yield to_frame(logs)
+
     def _export_dataframe(
         self, df: pd.DataFrame, spec: ExportSpecification, data_type: str
     ) -> Dict[str, Any]:
         """Exportar DataFrame en el formato especificado"""
+        return self._export_batches([df], spec, data_type)
+
+    def _export_batches(
+        self,
+        batches: Iterable[pd.DataFrame],
+        spec: ExportSpecification,
+        data_type: str,
+        empty_error: str = "No data found",
+    ) -> Dict[str, Any]:
+        """
+        Exportar lotes de filas en streaming
+
+        Los lotes se escriben según llegan; checksum y compresión gzip se
+        calculan en la misma pasada, sin releer el archivo generado.
+        """
         try:
+            extension = STREAMING_FORMATS.get(spec.output_format)
+            if extension is None:
+                return {
+                    "success": False,
+                    "error": f"Unsupported format: {spec.output_format}",
+                }
+
+            batches = (batch for batch in batches if not batch.empty)
+            first_batch = next(batches, None)
+            if first_batch is None:
+                return {"success": False, "error": empty_error}
+
             # Generar nombre de archivo
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{data_type}_{timestamp}"
+            filename = f"{data_type}_{timestamp}{extension}"
+            if spec.compress:
+                filename += ".gz"
 
             # Crear directorio específico
             output_dir = self.base_dir / data_type
             output_dir.mkdir(parents=True, exist_ok=True)
+            file_path = output_dir / filename
 
-            # Exportar según el formato
-            if spec.output_format == "csv":
-                file_path = output_dir / f"{filename}.csv"
-                df.to_csv(file_path, index=False, encoding="utf-8")
-            elif spec.output_format == "json":
-                file_path = output_dir / f"{filename}.json"
-                df.to_json(file_path, orient="records", indent=2, force_ascii=False)
-            elif spec.output_format == "jsonl":
-                file_path = output_dir / f"{filename}.jsonl"
-                with open(file_path, "w", encoding="utf-8") as f:
-                    for _, row in df.iterrows():
-                        f.write(row.to_json() + "\n")
-            elif spec.output_format == "parquet":
-                file_path = output_dir / f"{filename}.parquet"
-                df.to_parquet(file_path, index=False)
-            elif spec.output_format == "pickle":
-                file_path = output_dir / f"{filename}.pkl"
-                with open(file_path, "wb") as f:
-                    pickle.dump(df, f)
-            else:
-                return {
-                    "success": False,
-                    "error": f"Unsupported format: {spec.output_format}",
-                }
-
-            # Comprimir si se solicita
-            if spec.compress:
-                file_path = self._compress_file(file_path)
+            with StreamingExportWriter(
+                file_path, spec.output_format, compress=spec.compress
+            ) as writer:
+                writer.write_batch(first_batch)
+                for batch in batches:
+                    writer.write_batch(batch)
+            written = writer.close()
 
             # Crear metadatos
             metadata = {
                 "data_type": data_type,
                 "timestamp": datetime.now().isoformat(),
                 "format": spec.output_format,
-                "total_records": len(df),
-                "columns": list(df.columns),
-                "file_size": file_path.stat().st_size,
-                "checksum": self._calculate_checksum(file_path),
+                "total_records": written["total_records"],
+                "columns": written["columns"],
+                "file_size": written["file_size"],
+                "checksum": written["checksum"],
                 "source_path": spec.source_path,
                 "filters": spec.filters,
             }
@@ -429,7 +426,7 @@ class DataExporter:
                 "filename": file_path.name,
                 "file_path": str(file_path),
                 "metadata_path": str(metadata_path),
-                "total_records": len(df),
+                "total_records": metadata["total_records"],
                 "file_size": metadata["file_size"],
                 "checksum": metadata["checksum"],
                 "format": spec.output_format,
@@ -443,23 +440,10 @@ class DataExporter:
         """Calcular checksum SHA-256 de un archivo"""
         sha256_hash = hashlib.sha256()
         with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
                 sha256_hash.update(chunk)
         return sha256_hash.hexdigest()
 
-    def _compress_file(self, file_path: Path) -> Path:
-        """Comprimir archivo con gzip"""
-        gz_path = file_path.with_suffix(f"{file_path.suffix}.gz")
-
-        with open(file_path, "rb") as f_in:
-            with gzip.open(gz_path, "wb") as f_out:
-                f_out.writelines(f_in)
-
-        # Eliminar archivo original
-        file_path.unlink()
-
-        return gz_path
-
     def list_available_exports(self) -> Dict[str, List[str]]:
         """Listar exportaciones disponibles"""
         exports = {}
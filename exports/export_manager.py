@@ -6,22 +6,31 @@ Este módulo proporciona funcionalidades completas para exportar datos
 del sistema en diferentes formatos y con diferentes niveles de detalle.
 """
 
+import os
 import json
 import csv
+import gzip
 import xml.etree.ElementTree as ET
 import yaml
 import sqlite3
 import pandas as pd
 from pathlib import Path
 from datetime import datetime, timezone, timedelta
-from typing import Dict, List, Any, Optional, Union
+from typing import Dict, List, Any, Optional, Sequence, Tuple, Union
 import logging
 import hashlib
 import zipfile
 import shutil
 from dataclasses import dataclass, asdict
+from itertools import groupby
+from concurrent.futures import ProcessPoolExecutor
 import uuid
 
+try:
+    from .stream_writer import ChecksumWriter
+except ImportError:
+    from stream_writer import ChecksumWriter
+
 
 @dataclass
 class ExportConfig:
@@ -36,6 +45,13 @@ class ExportConfig:
     max_file_size: int = 100 * 1024 * 1024  # 100MB
     output_dir: str = "exports"
     backup_existing: bool = True
+    chat_db_path: str = "data/sheily_ai.db"  # Base SQLite con chat_sessions/chat_messages
+    chat_db_dsn: Optional[str] = None  # DSN PostgreSQL (tiene prioridad sobre SQLite)
+    workers: int = 4  # Procesos para escribir shards de conversaciones
+    state_file: str = "exports/conversation_export_state.json"
+    # IDs recientes revisados en la siguiente exportación incremental por si
+    # llegan mensajes de transacciones confirmadas fuera de orden (PostgreSQL)
+    message_id_overlap: int = 1000
 
 
 @dataclass
@@ -52,6 +68,268 @@ class ExportMetadata:
     version: str = "3.1.0"
 
 
+def anonymize_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Anonimizar registro con datos PII"""
+    anonymized = record.copy()
+
+    # Anonimizar contenido
+    if "content" in anonymized and isinstance(anonymized["content"], dict):
+        content = dict(anonymized["content"])
+
+        # Anonimizar campos comunes
+        if "name" in content:
+            content["name"] = "[ANONYMIZED]"
+        if "email" in content:
+            content["email"] = "[ANONYMIZED]"
+        if "messages" in content:
+            content["messages"] = "[ANONYMIZED]"
+
+        anonymized["content"] = content
+
+    return anonymized
+
+
+class ChatDatabase:
+    """Acceso de solo lectura a las tablas de chat (SQLite o PostgreSQL)"""
+
+    def __init__(self, db_path: str, dsn: Optional[str] = None):
+        self.db_path = db_path
+        self.dsn = dsn
+        self.is_postgres = bool(dsn)
+        self.placeholder = "%s" if self.is_postgres else "?"
+
+    def exists(self) -> bool:
+        return self.is_postgres or Path(self.db_path).exists()
+
+    def connect(self):
+        if self.is_postgres:
+            import psycopg2
+
+            return psycopg2.connect(self.dsn)
+        return sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+
+    def cursor(self, conn, name: Optional[str] = None):
+        """Cursor de lectura; en PostgreSQL con nombre (cursor del servidor)"""
+        if self.is_postgres and name:
+            return conn.cursor(name=name)
+        return conn.cursor()
+
+    def day_expression(self, column: str) -> str:
+        if self.is_postgres:
+            return f"to_char({column}, 'YYYY-MM-DD')"
+        return f"substr({column}, 1, 10)"
+
+
+def _to_iso(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value).replace(" ", "T", 1)
+
+
+def _parse_datetime(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _db_timestamp(value: Any) -> str:
+    """Normalizar un límite de fecha al formato de CURRENT_TIMESTAMP"""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return str(value).replace("T", " ", 1)
+
+
+def _session_filter(
+    db: ChatDatabase,
+    user_id: Optional[str] = None,
+    date_range: Optional[tuple] = None,
+    since_message_id: int = 0,
+    max_message_id: Optional[int] = None,
+    day: Optional[str] = None,
+    retry_message_ids: Sequence[int] = (),
+) -> tuple:
+    """
+    Condición WHERE sobre chat_sessions (alias s)
+
+    Selecciona las sesiones con mensajes en (since_message_id, max_message_id],
+    lo que permite exportaciones incrementales desde la última ejecución.
+    ``retry_message_ids`` son IDs por debajo de la marca que faltaban en la
+    exportación anterior y se vuelven a buscar.
+    """
+    ph = db.placeholder
+    message_bounds = f"n.id > {ph}"
+    params: List[Any] = [since_message_id]
+    if retry_message_ids:
+        # Enteros propios, en línea para no chocar con el límite de parámetros
+        retry_list = ", ".join(str(int(message_id)) for message_id in retry_message_ids)
+        message_bounds = f"({message_bounds} OR n.id IN ({retry_list}))"
+    if max_message_id is not None:
+        message_bounds += f" AND n.id <= {ph}"
+        params.append(max_message_id)
+
+    conditions = [
+        "EXISTS (SELECT 1 FROM chat_messages n "
+        f"WHERE n.session_id = s.session_id AND {message_bounds})"
+    ]
+
+    if user_id is not None:
+        conditions.append(f"s.user_id = {ph}")
+        params.append(user_id)
+
+    if date_range:
+        start_date, end_date = date_range
+        if start_date:
+            conditions.append(f"s.created_at >= {ph}")
+            params.append(_db_timestamp(start_date))
+        if end_date:
+            conditions.append(f"s.created_at <= {ph}")
+            params.append(_db_timestamp(end_date))
+
+    if day:
+        next_day = (datetime.strptime(day, "%Y-%m-%d") + timedelta(days=1)).strftime(
+            "%Y-%m-%d"
+        )
+        conditions.append(f"s.created_at >= {ph} AND s.created_at < {ph}")
+        params.extend([day, next_day])
+
+    return " AND ".join(conditions), params
+
+
+def iter_conversations(
+    db: ChatDatabase,
+    conn,
+    where: str,
+    params: List[Any],
+    max_message_id: Optional[int] = None,
+    batch_size: int = 1000,
+):
+    """
+    Reconstruir conversaciones con un único recorrido ordenado
+
+    Los mensajes llegan ordenados por (session_id, id), así que cada
+    conversación se completa en cuanto cambia la sesión, sin agrupar en memoria.
+    """
+    query = f"""
+        SELECT s.session_id, s.user_id, s.branch_name, s.created_at,
+               m.id, m.message, m.is_user, m.tokens_used, m.created_at
+        FROM chat_sessions s
+        JOIN chat_messages m ON m.session_id = s.session_id
+        WHERE {where}
+    """
+    query_params = list(params)
+    if max_message_id is not None:
+        query += f" AND m.id <= {db.placeholder}"
+        query_params.append(max_message_id)
+    query += " ORDER BY s.session_id, m.id"
+
+    cursor = db.cursor(conn, name="conversation_export")
+    cursor.execute(query, query_params)
+
+    def rows():
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                return
+            yield from batch
+
+    try:
+        for session_id, session_rows in groupby(rows(), key=lambda row: row[0]):
+            messages = []
+            total_tokens = 0
+            last_message_id = 0
+            for row in session_rows:
+                _, user_id, branch_name, session_created = row[:4]
+                message_id, message, is_user, tokens_used, created_at = row[4:]
+                messages.append(
+                    {
+                        "role": "user" if is_user else "assistant",
+                        "content": message,
+                        "timestamp": _to_iso(created_at),
+                    }
+                )
+                total_tokens += tokens_used or 0
+                last_message_id = message_id
+
+            first_time = _parse_datetime(messages[0]["timestamp"])
+            last_time = _parse_datetime(messages[-1]["timestamp"])
+            duration = (
+                int((last_time - first_time).total_seconds())
+                if first_time and last_time
+                else 0
+            )
+
+            yield {
+                "id": session_id,
+                "user_id": user_id,
+                "domain": "chat",
+                "data_type": "conversation",
+                "content": {
+                    "messages": messages,
+                    "topic": branch_name,
+                    "duration": duration,
+                    "total_tokens": total_tokens,
+                },
+                "timestamp": _to_iso(session_created),
+                "last_message_id": last_message_id,
+                "is_pii": True,
+            }
+    finally:
+        cursor.close()
+
+
+def _export_conversation_shard(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Escribir el shard de conversaciones de un día (ejecutado en un proceso)"""
+    db = ChatDatabase(task["db_path"], task["dsn"])
+    where, params = _session_filter(
+        db,
+        user_id=task["user_id"],
+        date_range=task["date_range"],
+        since_message_id=task["since_message_id"],
+        max_message_id=task["max_message_id"],
+        day=task["day"],
+        retry_message_ids=task["retry_message_ids"],
+    )
+
+    output_path = Path(task["output_path"])
+    records = 0
+    conn = db.connect()
+    try:
+        checksum_writer = ChecksumWriter(open(output_path, "wb"))
+        stream = (
+            gzip.GzipFile(fileobj=checksum_writer, mode="wb")
+            if task["compress"]
+            else checksum_writer
+        )
+        try:
+            for conversation in iter_conversations(
+                db, conn, where, params, task["max_message_id"], task["batch_size"]
+            ):
+                if not task["include_pii"]:
+                    conversation = anonymize_record(conversation)
+                line = json.dumps(conversation, ensure_ascii=False) + "\n"
+                stream.write(line.encode("utf-8"))
+                records += 1
+        finally:
+            if task["compress"]:
+                stream.close()
+            checksum_writer.close()
+    finally:
+        conn.close()
+
+    return {
+        "day": task["day"],
+        "filename": output_path.name,
+        "records": records,
+        "file_size": checksum_writer.size,
+        "checksum": checksum_writer.checksum,
+    }
+
+
 class ExportManager:
     """Gestor principal de exportaciones del sistema"""
 
@@ -194,14 +472,20 @@ class ExportManager:
         return export_result
 
     def export_conversations(
-        self, user_id: str = None, date_range: tuple = None
+        self, user_id: str = None, date_range: tuple = None, incremental: bool = False
     ) -> Dict[str, Any]:
         """
         Exportar conversaciones
 
+        En formato JSONL se generan shards diarios (por fecha de creación de
+        la sesión) escritos en paralelo por procesos; en el resto de formatos
+        se genera un único archivo.
+
         Args:
             user_id: ID del usuario (opcional, si no se especifica exporta todas)
             date_range: Rango de fechas (start_date, end_date)
+            incremental: Exportar solo las sesiones con mensajes nuevos desde
+                la última exportación completa
 
         Returns:
             Diccionario con información de la exportación
@@ -211,98 +495,337 @@ class ExportManager:
         export_id = self._generate_export_id()
         timestamp = datetime.now(timezone.utc).isoformat()
 
-        # Obtener conversaciones
-        conversations = self._get_conversations(user_id, date_range)
-
-        if not conversations:
-            self.logger.warning("No se encontraron conversaciones para exportar")
+        db = self._get_chat_database()
+        if not db.exists():
+            self.logger.warning("Base de datos de chat no encontrada")
             return {"success": False, "error": "No conversations found"}
 
+        # Marca de agua: los mensajes nuevos durante la exportación quedan fuera.
+        # Un ID alto no implica que los menores ya estén confirmados: los huecos
+        # de la ventana reciente se guardan y se reintentan en la siguiente.
+        state = self._load_export_state() if incremental else {}
+        since_message_id = state.get("last_message_id", 0)
+        retry_message_ids = state.get("missing_message_ids", [])
+        max_message_id, missing_message_ids = self._get_message_id_snapshot(db)
+
         # Generar nombre de archivo
         user_suffix = f"_user_{user_id}" if user_id else ""
         filename = self._sanitize_filename(
             f"conversations{user_suffix}_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         )
 
-        # Exportar datos
-        export_result = self._export_data(conversations, filename, export_id, timestamp)
+        if self.config.format == "jsonl":
+            export_result = self._export_conversation_shards(
+                db,
+                filename,
+                export_id,
+                timestamp,
+                user_id,
+                date_range,
+                since_message_id,
+                max_message_id,
+                retry_message_ids,
+            )
+        else:
+            conversations = self._get_conversations(
+                user_id, date_range, since_message_id, max_message_id, retry_message_ids
+            )
+            if not conversations:
+                export_result = {"success": False, "error": "No conversations found"}
+            else:
+                export_result = self._export_data(
+                    conversations, filename, export_id, timestamp
+                )
+
+        if not export_result.get("success"):
+            self.logger.warning("No se encontraron conversaciones para exportar")
+            return export_result
+
+        # Solo una exportación sin filtros avanza la marca de la siguiente
+        if user_id is None and not date_range:
+            self._save_export_state(
+                {
+                    "last_message_id": max_message_id,
+                    "missing_message_ids": missing_message_ids,
+                    "last_export_id": export_id,
+                    "last_export": timestamp,
+                }
+            )
+
+        export_result.update(
+            {
+                "since_message_id": since_message_id,
+                "max_message_id": max_message_id,
+            }
+        )
+        self.export_history.append(
+            {
+                "export_id": export_id,
+                "user_id": user_id,
+                "timestamp": timestamp,
+                "filename": export_result["filename"],
+                "record_count": export_result["total_records"],
+            }
+        )
 
         self.logger.info(
             f"Exportación de conversaciones completada: {export_result['filename']}"
         )
         return export_result
 
+    def _get_chat_database(self) -> ChatDatabase:
+        """Base de datos de chat configurada"""
+        return ChatDatabase(self.config.chat_db_path, self.config.chat_db_dsn)
+
+    def _get_message_id_snapshot(self, db: ChatDatabase) -> Tuple[int, List[int]]:
+        """
+        Último ID de mensaje y huecos recientes al iniciar la exportación
+
+        En PostgreSQL los IDs se asignan al insertar pero se ven al confirmar,
+        así que una transacción lenta puede aparecer por debajo de la marca.
+        Los IDs que faltan en los últimos ``message_id_overlap`` se devuelven
+        para reintentarlos; fuera de esa ventana se dan por descartados.
+        """
+        conn = db.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM chat_messages")
+            max_message_id = cursor.fetchone()[0]
+
+            window_start = max(0, max_message_id - self.config.message_id_overlap)
+            cursor.execute(
+                f"SELECT id FROM chat_messages WHERE id > {db.placeholder} "
+                f"AND id <= {db.placeholder}",
+                (window_start, max_message_id),
+            )
+            present = {row[0] for row in cursor.fetchall()}
+        finally:
+            conn.close()
+
+        missing = [
+            message_id
+            for message_id in range(window_start + 1, max_message_id + 1)
+            if message_id not in present
+        ]
+        return max_message_id, missing
+
+    def _load_export_state(self) -> Dict[str, Any]:
+        """Estado de la última exportación completa de conversaciones"""
+        state_path = Path(self.config.state_file)
+        if not state_path.exists():
+            return {}
+        try:
+            with open(state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            self.logger.warning(f"Estado de exportación ilegible, se ignora: {e}")
+            return {}
+
+    def _save_export_state(self, state: Dict[str, Any]):
+        """Guardar el estado de forma atómica"""
+        state_path = Path(self.config.state_file)
+        state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = state_path.with_suffix(f"{state_path.suffix}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, state_path)
+
+    def _export_conversation_shards(
+        self,
+        db: ChatDatabase,
+        export_name: str,
+        export_id: str,
+        timestamp: str,
+        user_id: Optional[str],
+        date_range: Optional[tuple],
+        since_message_id: int,
+        max_message_id: int,
+        retry_message_ids: Sequence[int] = (),
+    ) -> Dict[str, Any]:
+        """Exportar conversaciones en shards JSONL diarios en paralelo"""
+        try:
+            where, params = _session_filter(
+                db,
+                user_id,
+                date_range,
+                since_message_id,
+                max_message_id,
+                retry_message_ids=retry_message_ids,
+            )
+            day = db.day_expression("s.created_at")
+            conn = db.connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"SELECT {day} AS day FROM chat_sessions s "
+                    f"WHERE {where} GROUP BY 1 ORDER BY 1",
+                    params,
+                )
+                days = [row[0] for row in cursor.fetchall()]
+            finally:
+                conn.close()
+
+            if not days:
+                return {"success": False, "error": "No conversations found"}
+
+            export_path = self.export_dir / export_name
+            export_path.mkdir(parents=True, exist_ok=True)
+            extension = ".jsonl.gz" if self.config.compress else ".jsonl"
+
+            tasks = [
+                {
+                    "db_path": db.db_path,
+                    "dsn": db.dsn,
+                    "day": shard_day,
+                    "output_path": str(
+                        export_path / f"conversations_{shard_day}{extension}"
+                    ),
+                    "user_id": user_id,
+                    "date_range": date_range,
+                    "since_message_id": since_message_id,
+                    "max_message_id": max_message_id,
+                    "retry_message_ids": list(retry_message_ids),
+                    "include_pii": self.config.include_pii,
+                    "compress": self.config.compress,
+                    "batch_size": self.config.batch_size,
+                }
+                for shard_day in days
+            ]
+
+            workers = min(self.config.workers, len(tasks))
+            if workers > 1:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    shards = list(executor.map(_export_conversation_shard, tasks))
+            else:
+                shards = [_export_conversation_shard(task) for task in tasks]
+
+            total_records = sum(shard["records"] for shard in shards)
+            metadata = ExportMetadata(
+                export_id=export_id,
+                timestamp=timestamp,
+                format="jsonl",
+                total_records=total_records,
+                file_size=sum(shard["file_size"] for shard in shards),
+                checksum="",
+                source="chat_database",
+            )
+
+            # El checksum de la exportación cubre los checksums de los shards
+            manifest_hash = hashlib.sha256()
+            for shard in shards:
+                manifest_hash.update(f"{shard['filename']}:{shard['checksum']}\n".encode())
+            metadata.checksum = manifest_hash.hexdigest()
+
+            metadata_path = export_path / "manifest.json"
+            with open(metadata_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        **asdict(metadata),
+                        "since_message_id": since_message_id,
+                        "max_message_id": max_message_id,
+                        "shards": shards,
+                    },
+                    f,
+                    ensure_ascii=False,
+                    indent=2,
+                )
+
+            return {
+                "success": True,
+                "export_id": export_id,
+                "filename": export_path.name,
+                "file_path": str(export_path),
+                "metadata_path": str(metadata_path),
+                "total_records": total_records,
+                "file_size": metadata.file_size,
+                "checksum": metadata.checksum,
+                "format": "jsonl",
+                "shards": len(shards),
+            }
+
+        except Exception as e:
+            self.logger.error(f"Error en exportación de conversaciones: {e}")
+            return {"success": False, "error": str(e)}
+
     def _get_user_data(
         self, user_id: str, data_types: List[str] = None
     ) -> List[Dict[str, Any]]:
         """Obtener datos de usuario desde la base de datos"""
         try:
             # Conectar a la base de datos
-            db_path = Path("data/user_data.duckdb")
-            if not db_path.exists():
+            db = self._get_chat_database()
+            if not db.exists():
                 self.logger.warning("Base de datos de usuarios no encontrada")
                 return []
 
-            # Simular datos de usuario (en un sistema real, esto vendría de la BD)
             user_data = []
+            ph = db.placeholder
+            conn = db.connect()
+            try:
+                cursor = conn.cursor()
+
+                # Datos de perfil
+                if not data_types or "profile" in data_types:
+                    cursor.execute(
+                        "SELECT username, email, full_name, role, tokens, level, "
+                        f"created_at, last_login FROM users WHERE id = {ph}",
+                        (user_id,),
+                    )
+                    row = cursor.fetchone()
+                    if row:
+                        username, email, full_name, role, tokens, level = row[:6]
+                        user_data.append(
+                            {
+                                "id": self._generate_hash(f"profile_{user_id}"),
+                                "domain": "user_profile",
+                                "data_type": "profile",
+                                "content": {
+                                    "name": full_name or username,
+                                    "email": email,
+                                    "role": role,
+                                    "tokens": tokens,
+                                    "level": level,
+                                    "created_at": _to_iso(row[6]),
+                                    "last_login": _to_iso(row[7]),
+                                },
+                                "timestamp": datetime.now(timezone.utc).isoformat(),
+                                "is_pii": True,
+                            }
+                        )
 
-            # Datos de perfil
-            if not data_types or "profile" in data_types:
-                profile_data = {
-                    "id": self._generate_hash(f"profile_{user_id}"),
-                    "domain": "user_profile",
-                    "data_type": "profile",
-                    "content": {
-                        "name": "Usuario Ejemplo",
-                        "email": f"user{user_id}@example.com",
-                        "preferences": {
-                            "language": "es",
-                            "theme": "dark",
-                            "notifications": True,
-                        },
-                    },
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
-                    "is_pii": True,
-                }
-                user_data.append(profile_data)
-
-            # Datos de sesión
-            if not data_types or "sessions" in data_types:
-                session_data = {
-                    "id": self._generate_hash(f"session_{user_id}"),
-                    "domain": "analytics",
-                    "data_type": "session",
-                    "content": {
-                        "last_login": datetime.now().strftime("%Y-%m-%d"),
-                        "session_count": 5,
-                        "total_time": 3600,
-                    },
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
-                    "is_pii": False,
-                }
-                user_data.append(session_data)
+                # Datos de sesión
+                if not data_types or "sessions" in data_types:
+                    cursor.execute(
+                        "SELECT COUNT(*), COALESCE(SUM(total_messages), 0), "
+                        "COALESCE(SUM(total_tokens), 0), MAX(last_activity) "
+                        f"FROM chat_sessions WHERE user_id = {ph}",
+                        (user_id,),
+                    )
+                    session_count, total_messages, total_tokens, last_activity = (
+                        cursor.fetchone()
+                    )
+                    if session_count:
+                        user_data.append(
+                            {
+                                "id": self._generate_hash(f"session_{user_id}"),
+                                "domain": "analytics",
+                                "data_type": "session",
+                                "content": {
+                                    "last_activity": _to_iso(last_activity),
+                                    "session_count": session_count,
+                                    "total_messages": total_messages,
+                                    "total_tokens": total_tokens,
+                                },
+                                "timestamp": datetime.now(timezone.utc).isoformat(),
+                                "is_pii": False,
+                            }
+                        )
+            finally:
+                conn.close()
 
             # Datos de conversaciones
             if not data_types or "conversations" in data_types:
-                conversation_data = {
-                    "id": self._generate_hash(f"conversation_{user_id}"),
-                    "domain": "chat",
-                    "data_type": "conversation",
-                    "content": {
-                        "messages": [
-                            {"role": "user", "content": "¿Qué es la fotosíntesis?"},
-                            {
-                                "role": "assistant",
-                                "content": "La fotosíntesis es un proceso biológico...",
-                            },
-                        ],
-                        "topic": "ciencia",
-                        "duration": 120,
-                    },
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
-                    "is_pii": True,
-                }
-                user_data.append(conversation_data)
+                user_data.extend(self._get_conversations(user_id))
 
             return user_data
 
@@ -357,68 +880,42 @@ class ExportManager:
             return []
 
     def _get_conversations(
-        self, user_id: str = None, date_range: tuple = None
+        self,
+        user_id: str = None,
+        date_range: tuple = None,
+        since_message_id: int = 0,
+        max_message_id: Optional[int] = None,
+        retry_message_ids: Sequence[int] = (),
     ) -> List[Dict[str, Any]]:
-        """Obtener conversaciones"""
+        """Obtener conversaciones desde chat_sessions/chat_messages"""
         try:
-            conversations = []
-
-            # Simular conversaciones (en un sistema real, esto vendría de la BD)
-            sample_conversations = [
-                {
-                    "id": self._generate_hash("conv_1"),
-                    "user_id": "user_123",
-                    "domain": "chat",
-                    "data_type": "conversation",
-                    "content": {
-                        "messages": [
-                            {"role": "user", "content": "¿Qué es la fotosíntesis?"},
-                            {
-                                "role": "assistant",
-                                "content": "La fotosíntesis es un proceso biológico donde las plantas transforman luz solar en energía química.",
-                            },
-                        ],
-                        "topic": "ciencia",
-                        "duration": 120,
-                    },
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
-                    "is_pii": True,
-                },
-                {
-                    "id": self._generate_hash("conv_2"),
-                    "user_id": "user_456",
-                    "domain": "chat",
-                    "data_type": "conversation",
-                    "content": {
-                        "messages": [
-                            {
-                                "role": "user",
-                                "content": "¿Cómo funciona la inteligencia artificial?",
-                            },
-                            {
-                                "role": "assistant",
-                                "content": "La inteligencia artificial es una rama de la computación que busca crear sistemas capaces de realizar tareas que requieren inteligencia humana.",
-                            },
-                        ],
-                        "topic": "tecnología",
-                        "duration": 180,
-                    },
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
-                    "is_pii": True,
-                },
-            ]
-
-            # Filtrar por usuario si se especifica
-            if user_id:
-                conversations = [
-                    conv
-                    for conv in sample_conversations
-                    if conv.get("user_id") == user_id
-                ]
-            else:
-                conversations = sample_conversations
+            db = self._get_chat_database()
+            if not db.exists():
+                self.logger.warning("Base de datos de chat no encontrada")
+                return []
 
-            return conversations
+            where, params = _session_filter(
+                db,
+                user_id,
+                date_range,
+                since_message_id,
+                max_message_id,
+                retry_message_ids=retry_message_ids,
+            )
+            conn = db.connect()
+            try:
+                return list(
+                    iter_conversations(
+                        db,
+                        conn,
+                        where,
+                        params,
+                        max_message_id,
+                        self.config.batch_size,
+                    )
+                )
+            finally:
+                conn.close()
 
         except Exception as e:
             self.logger.error(f"Error obteniendo conversaciones: {e}")
@@ -634,21 +1131,7 @@ class ExportManager:
 
     def _anonymize_record(self, record: Dict[str, Any]) -> Dict[str, Any]:
         """Anonimizar registro con datos PII"""
-        anonymized = record.copy()
-
-        # Anonimizar contenido
-        if "content" in anonymized and isinstance(anonymized["content"], dict):
-            content = anonymized["content"]
-
-            # Anonimizar campos comunes
-            if "name" in content:
-                content["name"] = "[ANONYMIZED]"
-            if "email" in content:
-                content["email"] = "[ANONYMIZED]"
-            if "messages" in content:
-                content["messages"] = "[ANONYMIZED]"
-
-        return anonymized
+        return anonymize_record(record)
 
     def _anonymize_xml_record(self, record_elem):
         """Anonimizar registro XML"""
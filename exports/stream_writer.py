@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+Escritura en Streaming para Exportaciones - Shaili AI
+
+Este módulo lee filas por lotes (cursor incremental o paginación por clave)
+y las escribe serializadas por lotes, calculando el checksum SHA-256 y la
+compresión gzip en la misma pasada de escritura. Parquet y Arrow IPC se
+escriben por grupos de filas, de modo que la memoria no depende del tamaño
+de la exportación.
+"""
+
+import gzip
+import hashlib
+import pickle
+import re
+import shutil
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Filas por lote leídas de la base de datos y escritas en cada paso
+DEFAULT_BATCH_SIZE = 10000
+
+# Formatos soportados y su extensión
+STREAMING_FORMATS = {
+    "csv": ".csv",
+    "json": ".json",
+    "jsonl": ".jsonl",
+    "parquet": ".parquet",
+    "arrow": ".arrow",
+    "pickle": ".pkl",
+}
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _widen_schema(schema: Optional["pa.Schema"], other: "pa.Schema") -> "pa.Schema":
+    """
+    Unificar el esquema escrito con el de un lote nuevo
+
+    null se promueve al tipo concreto, int64 a double si aparecen decimales
+    o NaN, y los tipos incompatibles se amplían a texto.
+    """
+    if schema is None:
+        return other
+
+    fields = []
+    for field in schema:
+        if field.name not in other.names:
+            fields.append(field)
+            continue
+        other_type = other.field(field.name).type
+        if other_type == field.type or pa.types.is_null(other_type):
+            fields.append(field)
+            continue
+        try:
+            fields.append(
+                pa.unify_schemas(
+                    [pa.schema([field]), pa.schema([(field.name, other_type)])],
+                    promote_options="permissive",
+                ).field(0)
+            )
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            fields.append(pa.field(field.name, pa.string()))
+    fields.extend(field for field in other if field.name not in schema.names)
+    return pa.schema(fields)
+
+
+def _conform_to_schema(data, schema: "pa.Schema"):
+    """Adaptar una tabla o lote Arrow al esquema dado (columnas que faltan a null)"""
+    columns = [
+        (
+            data.column(field.name).cast(field.type)
+            if field.name in data.schema.names
+            else pa.nulls(data.num_rows, field.type)
+        )
+        for field in schema
+    ]
+    return type(data).from_arrays(columns, schema=schema)
+
+
+class ChecksumWriter:
+    """Envoltorio de archivo que calcula SHA-256 y tamaño de lo escrito"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.raw.write(data)
+        self.sha256.update(data)
+        self.size += len(data)
+        return len(data)
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.size
+
+    def flush(self):
+        self.raw.flush()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.raw.close()
+
+    @property
+    def checksum(self) -> str:
+        return self.sha256.hexdigest()
+
+
+class StreamingExportWriter:
+    """
+    Escritor de exportaciones por lotes
+
+    Cada lote se serializa y pasa por gzip (opcional) y por el cálculo
+    de checksum antes de llegar al disco, sin releer el archivo después.
+
+    En Parquet y Arrow el esquema se deduce del primer lote y se amplía si
+    un lote posterior trae tipos nuevos (una columna vacía que pasa a tener
+    enteros, enteros que pasan a tener decimales): en ese caso lo ya
+    escrito se reescribe una vez con el esquema ampliado.
+    """
+
+    def __init__(
+        self, file_path: Union[str, Path], output_format: str, compress: bool = False
+    ):
+        if output_format not in STREAMING_FORMATS:
+            raise ValueError(f"Unsupported format: {output_format}")
+        if output_format in ["parquet", "arrow"] and not PYARROW_AVAILABLE:
+            raise ImportError(f"pyarrow es necesario para exportar en {output_format}")
+
+        self.file_path = Path(file_path)
+        self.output_format = output_format
+        self.compress = compress
+
+        self.total_records = 0
+        self.columns: Optional[List[str]] = None
+        self.file_size = 0
+        self.checksum = ""
+
+        self._open_output()
+        self._schema = None
+        self._arrow_writer = None
+        self._pickle_frames: List[pd.DataFrame] = []
+        self._closed = False
+
+    def __enter__(self) -> "StreamingExportWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def write_batch(self, batch: pd.DataFrame):
+        """Serializar y escribir un lote de filas"""
+        if batch.empty:
+            return
+
+        first = self.columns is None
+        fmt = self.output_format
+
+        if fmt == "csv":
+            self._write_text(batch.to_csv(index=False, header=first))
+        elif fmt == "jsonl":
+            body = batch.to_json(orient="records", lines=True, force_ascii=False)
+            self._write_text(body if body.endswith("\n") else body + "\n")
+        elif fmt == "json":
+            body = batch.to_json(orient="records", force_ascii=False)[1:-1]
+            self._write_text(("[\n" if first else ",\n") + body)
+        elif fmt in ["parquet", "arrow"]:
+            self._write_arrow(batch)
+        else:
+            # pickle serializa un único DataFrame: no admite escritura parcial
+            self._pickle_frames.append(batch)
+
+        if first:
+            self.columns = list(batch.columns)
+        self.total_records += len(batch)
+
+    def _open_output(self):
+        self._checksum_writer = ChecksumWriter(open(self.file_path, "wb"))
+        self._stream = (
+            gzip.GzipFile(fileobj=self._checksum_writer, mode="wb")
+            if self.compress
+            else self._checksum_writer
+        )
+
+    def _close_output(self):
+        if self.compress:
+            self._stream.close()
+        self._checksum_writer.close()
+
+    def _write_text(self, text: str):
+        self._stream.write(text.encode("utf-8"))
+
+    def _write_arrow(self, batch: pd.DataFrame):
+        table = pa.Table.from_pandas(batch, preserve_index=False)
+        schema = _widen_schema(self._schema, table.schema.remove_metadata())
+
+        if self._arrow_writer is None:
+            self._schema = schema
+            self._arrow_writer = self._new_arrow_writer(schema)
+        elif not schema.equals(self._schema):
+            self._rewrite_arrow(schema)
+
+        self._arrow_writer.write_table(_conform_to_schema(table, self._schema))
+
+    def _new_arrow_writer(self, schema: "pa.Schema"):
+        if self.output_format == "parquet":
+            return pq.ParquetWriter(self._stream, schema)
+        return pa.ipc.new_file(self._stream, schema)
+
+    def _rewrite_arrow(self, schema: "pa.Schema"):
+        """Reescribir lo ya escrito con un esquema ampliado"""
+        self._arrow_writer.close()
+        self._arrow_writer = None
+        self._close_output()
+
+        previous_path = self.file_path.with_name(self.file_path.name + ".widen")
+        self.file_path.replace(previous_path)
+        plain_path = previous_path
+        try:
+            if self.compress:
+                # Los lectores de Parquet y Arrow necesitan acceso aleatorio
+                plain_path = previous_path.with_name(previous_path.name + ".raw")
+                with gzip.open(previous_path, "rb") as src, open(
+                    plain_path, "wb"
+                ) as dst:
+                    shutil.copyfileobj(src, dst)
+
+            self._open_output()
+            self._schema = schema
+            self._arrow_writer = self._new_arrow_writer(schema)
+            if self.output_format == "parquet":
+                batches = pq.ParquetFile(plain_path).iter_batches()
+                for written in batches:
+                    self._arrow_writer.write_batch(_conform_to_schema(written, schema))
+            else:
+                with pa.memory_map(str(plain_path)) as source:
+                    reader = pa.ipc.open_file(source)
+                    for index in range(reader.num_record_batches):
+                        self._arrow_writer.write_batch(
+                            _conform_to_schema(reader.get_batch(index), schema)
+                        )
+        finally:
+            previous_path.unlink(missing_ok=True)
+            plain_path.unlink(missing_ok=True)
+
+    def close(self) -> Dict[str, Any]:
+        """Cerrar el archivo y devolver tamaño y checksum finales"""
+        if not self._closed:
+            self._closed = True
+            fmt = self.output_format
+
+            if fmt == "json":
+                self._write_text("[]" if self.columns is None else "\n]")
+            elif fmt == "pickle":
+                frames = self._pickle_frames or [pd.DataFrame()]
+                pickle.dump(pd.concat(frames, ignore_index=True), self._stream)
+                self._pickle_frames = []
+            elif self._arrow_writer is not None:
+                self._arrow_writer.close()
+
+            self._close_output()
+
+            self.file_size = self._checksum_writer.size
+            self.checksum = self._checksum_writer.checksum
+
+        return {
+            "file_path": str(self.file_path),
+            "file_size": self.file_size,
+            "checksum": self.checksum,
+            "total_records": self.total_records,
+            "columns": self.columns or [],
+        }
+
+    def abort(self):
+        """Cerrar y eliminar un archivo a medio escribir"""
+        self._closed = True
+        try:
+            if self._arrow_writer is not None:
+                self._arrow_writer.close()
+            if self.compress:
+                self._stream.close()
+        except Exception:
+            pass
+        self._checksum_writer.close()
+        self.file_path.unlink(missing_ok=True)
+
+
+def build_filter_clause(filters: Optional[Dict[str, Any]]) -> Tuple[str, List[Any]]:
+    """
+    Construir una cláusula WHERE parametrizada de igualdades
+
+    Returns:
+        (cláusula sin "WHERE", parámetros)
+    """
+    conditions = []
+    params = []
+    for key, value in (filters or {}).items():
+        if not _IDENTIFIER.match(key):
+            raise ValueError(f"Invalid filter column: {key}")
+        conditions.append(f"{key} = ?")
+        params.append(value)
+    return " AND ".join(conditions), params
+
+
+def iter_query_batches(
+    connection: sqlite3.Connection,
+    query: str,
+    params: Sequence[Any] = (),
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator[pd.DataFrame]:
+    """Leer el resultado de una consulta por lotes con un cursor incremental"""
+    cursor = connection.execute(query, params)
+    columns = [description[0] for description in cursor.description]
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        yield pd.DataFrame.from_records(rows, columns=columns)
+
+
+def iter_keyset_batches(
+    connection: sqlite3.Connection,
+    table: str,
+    key_column: str = "rowid",
+    where: str = "",
+    params: Sequence[Any] = (),
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    tie_breaker: Optional[str] = "rowid",
+) -> Iterator[pd.DataFrame]:
+    """
+    Leer una tabla por lotes paginando por clave (WHERE clave > última)
+
+    Cada lote es una consulta corta e indexada, así que no se mantiene
+    abierta una transacción de lectura durante toda la exportación.
+
+    Si ``key_column`` no es única, las filas que comparten el valor frontera
+    de un lote se perderían con ``clave > última``; por eso se pagina por el
+    par (clave, ``tie_breaker``), que debe ser único (por defecto rowid).
+    Pasar ``tie_breaker=None`` solo es correcto si la clave ya es única
+    (p. ej. en tablas WITHOUT ROWID con clave primaria).
+    """
+    if tie_breaker == key_column:
+        tie_breaker = None
+    for identifier in (table, key_column, tie_breaker or key_column):
+        if not _IDENTIFIER.match(identifier):
+            raise ValueError(f"Invalid identifier: {identifier}")
+
+    order_columns = [key_column] + ([tie_breaker] if tie_breaker else [])
+    selected = ", ".join(
+        f"{column} AS __export_key{index}__"
+        for index, column in enumerate(order_columns)
+    )
+    key_names = [f"__export_key{index}__" for index in range(len(order_columns))]
+
+    last_key = None
+    while True:
+        conditions = [where] if where else []
+        query_params = list(params)
+        if last_key is not None:
+            # Comparación de valores de fila: (clave, desempate) > (?, ?)
+            conditions.append(
+                f"({', '.join(order_columns)}) > "
+                f"({', '.join('?' for _ in order_columns)})"
+            )
+            query_params.extend(last_key)
+
+        query = f"SELECT {selected}, * FROM {table}"
+        if conditions:
+            query += " WHERE " + " AND ".join(f"({c})" for c in conditions)
+        query += f" ORDER BY {', '.join(order_columns)} LIMIT ?"
+        query_params.append(batch_size)
+
+        cursor = connection.execute(query, query_params)
+        columns = [description[0] for description in cursor.description]
+        rows = cursor.fetchall()
+        if not rows:
+            break
+
+        last_key = list(rows[-1][: len(key_names)])
+        batch = pd.DataFrame.from_records(rows, columns=columns)
+        yield batch.drop(columns=key_names)
+
+        if len(rows) < batch_size:
+            break
+
+
+__all__ = [
+    "DEFAULT_BATCH_SIZE",
+    "STREAMING_FORMATS",
+    "ChecksumWriter",
+    "StreamingExportWriter",
+    "build_filter_clause",
+    "iter_query_batches",
+    "iter_keyset_batches",
+]
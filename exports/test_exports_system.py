@@ -8,12 +8,60 @@ del sistema de exportación funcionen correctamente.
 
 import sys
 import json
+import tempfile
 import time
 from pathlib import Path
 from datetime import datetime
 
 
-def test_export_manager():
+def create_test_chat_db(tmp_path: Path) -> str:
+    """Crear una base de chat de prueba con el esquema de HybridDatabaseManager"""
+    import sqlite3
+
+    Path(tmp_path).mkdir(parents=True, exist_ok=True)
+    db_path = str(Path(tmp_path) / "test_chat.db")
+    Path(db_path).unlink(missing_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(
+        """
+        CREATE TABLE users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT, email TEXT,
+            password_hash TEXT, full_name TEXT, role TEXT DEFAULT 'user',
+            tokens INTEGER DEFAULT 100, level INTEGER DEFAULT 1,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP, last_login DATETIME
+        );
+        CREATE TABLE chat_sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER,
+            session_id TEXT UNIQUE NOT NULL, branch_name TEXT NOT NULL,
+            status TEXT DEFAULT 'active', total_messages INTEGER DEFAULT 0,
+            total_tokens INTEGER DEFAULT 0,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            last_activity DATETIME DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE chat_messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT, user_id INTEGER,
+            message TEXT NOT NULL, is_user BOOLEAN NOT NULL,
+            tokens_used INTEGER DEFAULT 0,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        );
+        INSERT INTO users (username, email, password_hash, full_name)
+            VALUES ('ana', 'ana@example.com', 'x', 'Ana Ejemplo');
+        INSERT INTO chat_sessions (user_id, session_id, branch_name, total_messages, created_at)
+            VALUES (1, 'chat_1_a', 'biología', 2, '2024-01-15 10:00:00'),
+                   (1, 'chat_1_b', 'física', 2, '2024-01-16 09:00:00');
+        INSERT INTO chat_messages (session_id, user_id, message, is_user, created_at) VALUES
+            ('chat_1_a', 1, '¿Qué es la fotosíntesis?', 1, '2024-01-15 10:00:00'),
+            ('chat_1_a', 1, 'Un proceso biológico...', 0, '2024-01-15 10:00:05'),
+            ('chat_1_b', 1, '¿Qué es la gravedad?', 1, '2024-01-16 09:00:00'),
+            ('chat_1_b', 1, 'Una interacción...', 0, '2024-01-16 09:00:03');
+        """
+    )
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def test_export_manager(tmp_path):
     """Probar el gestor de exportación"""
     print("🧪 Probando ExportManager...")
 
@@ -22,13 +70,20 @@ def test_export_manager():
 
         # Crear configuración de prueba
         config = ExportConfig(
-            format="jsonl", include_pii=True, include_metadata=True, compress=False
+            format="jsonl",
+            include_pii=True,
+            include_metadata=True,
+            compress=False,
+            output_dir=str(tmp_path / "exports"),
+            chat_db_path=create_test_chat_db(tmp_path),
+            state_file=str(tmp_path / "conversation_export_state.json"),
+            workers=2,
         )
 
         manager = ExportManager(config)
 
         # Probar exportación de datos de usuario
-        result = manager.export_user_data("test_user_123", ["profile", "sessions"])
+        result = manager.export_user_data("1", ["profile", "sessions"])
 
         if result["success"]:
             print(f"  ✅ Exportación de usuario exitosa: {result['filename']}")
@@ -53,6 +108,20 @@ def test_export_manager():
             )
             return False
 
+        if conv_result["shards"] == 2 and conv_result["total_records"] == 2:
+            print("  ✅ Conversaciones exportadas en shards diarios")
+        else:
+            print("  ❌ Shards de conversaciones inesperados")
+            return False
+
+        # Sin mensajes nuevos, la exportación incremental no tiene nada que exportar
+        incremental_result = manager.export_conversations(incremental=True)
+        if not incremental_result["success"]:
+            print("  ✅ Exportación incremental sin cambios")
+        else:
+            print("  ❌ La exportación incremental repitió conversaciones")
+            return False
+
         # Probar exportación de datos del sistema
         sys_result = manager.export_system_data(["config", "performance"])
 
@@ -150,7 +219,7 @@ def test_data_exporter():
             return False
 
         # Probar exportación en diferentes formatos
-        formats_to_test = ["csv", "json", "parquet"]
+        formats_to_test = ["csv", "json", "parquet", "arrow"]
         for fmt in formats_to_test:
             spec = ExportSpecification(
                 data_type="conversations",
@@ -234,7 +303,7 @@ def test_package_imports():
         return False
 
 
-def test_file_operations():
+def test_file_operations(tmp_path):
     """Probar operaciones de archivos"""
     print("🧪 Probando operaciones de archivos...")
 
@@ -246,12 +315,14 @@ def test_file_operations():
             include_pii=True,
             include_metadata=True,
             compress=True,  # Probar compresión
+            output_dir=str(tmp_path / "exports"),
+            chat_db_path=create_test_chat_db(tmp_path),
         )
 
         manager = ExportManager(config)
 
         # Probar exportación con compresión
-        result = manager.export_user_data("test_user_compressed", ["profile"])
+        result = manager.export_user_data("1", ["profile"])
 
         if result["success"]:
             print(f"  ✅ Exportación comprimida exitosa: {result['filename']}")
@@ -282,19 +353,25 @@ def test_file_operations():
         return False
 
 
-def test_metadata_generation():
+def test_metadata_generation(tmp_path):
     """Probar generación de metadatos"""
     print("🧪 Probando generación de metadatos...")
 
     try:
         from export_manager import ExportManager, ExportConfig
 
-        config = ExportConfig(format="json", include_pii=True, include_metadata=True)
+        config = ExportConfig(
+            format="json",
+            include_pii=True,
+            include_metadata=True,
+            output_dir=str(tmp_path / "exports"),
+            chat_db_path=create_test_chat_db(tmp_path),
+        )
 
         manager = ExportManager(config)
 
         # Probar exportación con metadatos
-        result = manager.export_user_data("test_user_metadata", ["profile", "sessions"])
+        result = manager.export_user_data("1", ["profile", "sessions"])
 
         if result["success"]:
             print(f"  ✅ Exportación con metadatos exitosa: {result['filename']}")
@@ -339,6 +416,160 @@ def test_metadata_generation():
         return False
 
 
+def test_incremental_late_commit(tmp_path):
+    """Probar que un mensaje confirmado tarde bajo la marca no se pierde"""
+    print("🧪 Probando exportación incremental con confirmaciones tardías...")
+
+    try:
+        import sqlite3
+        from export_manager import ExportManager, ExportConfig
+
+        db_path = create_test_chat_db(tmp_path)
+        manager = ExportManager(
+            ExportConfig(
+                format="jsonl",
+                include_pii=True,
+                output_dir=str(tmp_path / "exports"),
+                chat_db_path=db_path,
+                state_file=str(tmp_path / "conversation_export_state.json"),
+                workers=1,
+            )
+        )
+
+        # El ID 6 se confirma antes que el 5 (transacción lenta)
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "INSERT INTO chat_messages (id, session_id, user_id, message, is_user) "
+            "VALUES (6, 'chat_1_b', 1, 'Mensaje rápido', 1)"
+        )
+        conn.commit()
+        first = manager.export_conversations(incremental=True)
+
+        conn.execute(
+            "INSERT INTO chat_messages (id, session_id, user_id, message, is_user) "
+            "VALUES (5, 'chat_1_a', 1, 'Mensaje lento', 1)"
+        )
+        conn.commit()
+        conn.close()
+        second = manager.export_conversations(incremental=True)
+
+        if not first["success"] or first["max_message_id"] != 6:
+            print(f"  ❌ Primera exportación inesperada: {first}")
+            return False
+        if second["success"] and second["total_records"] == 1:
+            print("  ✅ El mensaje tardío se exportó en la siguiente ejecución")
+        else:
+            print(f"  ❌ Mensaje tardío perdido: {second}")
+            return False
+
+        third = manager.export_conversations(incremental=True)
+        if third["success"]:
+            print("  ❌ La exportación incremental repitió conversaciones")
+            return False
+        print("  ✅ Sin repeticiones tras el reintento")
+
+        return True
+
+    except Exception as e:
+        print(f"  ❌ Error en exportación incremental: {e}")
+        return False
+
+
+def test_keyset_pagination():
+    """Probar la paginación por clave con valores repetidos en la frontera"""
+    print("🧪 Probando paginación por clave...")
+
+    try:
+        import sqlite3
+        from stream_writer import iter_keyset_batches
+
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE TABLE events (day INTEGER, payload TEXT)")
+        # Tres filas por día: los lotes de 4 cortan en mitad de un valor
+        conn.executemany(
+            "INSERT INTO events VALUES (?, ?)",
+            [(i // 3, f"evento {i}") for i in range(20)],
+        )
+
+        batches = list(iter_keyset_batches(conn, "events", "day", batch_size=4))
+        payloads = [p for batch in batches for p in batch["payload"]]
+        conn.close()
+
+        if sorted(payloads) == sorted(f"evento {i}" for i in range(20)):
+            print(f"  ✅ {len(payloads)} filas en {len(batches)} lotes, sin saltos")
+        else:
+            print(f"  ❌ Filas perdidas o repetidas: {len(payloads)} de 20")
+            return False
+
+        return True
+
+    except Exception as e:
+        print(f"  ❌ Error en paginación por clave: {e}")
+        return False
+
+
+def test_streaming_schema_widening(tmp_path):
+    """Probar Parquet/Arrow con tipos que cambian entre lotes"""
+    print("🧪 Probando ampliación de esquema en Parquet y Arrow...")
+
+    try:
+        import gzip
+        import hashlib
+        import pandas as pd
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        from stream_writer import StreamingExportWriter
+
+        # "vacia": sin valores en el primer lote y enteros después;
+        # "medida": enteros en el primer lote y decimales/NaN después
+        batches = [
+            pd.DataFrame({"vacia": [None, None], "medida": [1, 2]}),
+            pd.DataFrame({"vacia": [3, 4], "medida": [1.5, float("nan")]}),
+            pd.DataFrame({"vacia": [None, 5], "medida": [7, 8]}),
+        ]
+        tmp_path.mkdir(parents=True, exist_ok=True)
+
+        for output_format in ["parquet", "arrow"]:
+            for compress in [False, True]:
+                file_path = tmp_path / f"datos_{compress}.{output_format}"
+                with StreamingExportWriter(file_path, output_format, compress) as w:
+                    for batch in batches:
+                        w.write_batch(batch)
+                result = w.close()
+
+                raw = file_path.read_bytes()
+                if hashlib.sha256(raw).hexdigest() != result["checksum"] or len(
+                    raw
+                ) != result["file_size"]:
+                    print(f"  ❌ Checksum o tamaño incorrectos ({output_format})")
+                    return False
+
+                data = gzip.decompress(raw) if compress else raw
+                if output_format == "parquet":
+                    table = pq.read_table(pa.BufferReader(data))
+                else:
+                    table = pa.ipc.open_file(pa.BufferReader(data)).read_all()
+
+                expected = {
+                    "vacia": [None, None, 3, 4, None, 5],
+                    "medida": [1, 2, 1.5, None, 7, 8],
+                }
+                leftovers = list(tmp_path.glob("*.widen*"))
+                if table.to_pydict() != expected or leftovers:
+                    print(
+                        f"  ❌ {output_format} (gzip={compress}): "
+                        f"{table.to_pydict()} {leftovers}"
+                    )
+                    return False
+                print(f"  ✅ {output_format} (gzip={compress}): {table.schema.types}")
+
+        return True
+
+    except Exception as e:
+        print(f"  ❌ Error ampliando el esquema: {e}")
+        return False
+
+
 def test_error_handling():
     """Probar manejo de errores"""
     print("🧪 Probando manejo de errores...")
@@ -427,12 +658,25 @@ def main():
     start_time = time.time()
 
     # Ejecutar todas las pruebas
+    scratch_dir = Path(tempfile.mkdtemp(prefix="exports_test_"))
     test_functions = [
-        ("export_manager", test_export_manager),
+        ("export_manager", lambda: test_export_manager(scratch_dir / "manager")),
         ("data_exporter", test_data_exporter),
         ("package_imports", test_package_imports),
-        ("file_operations", test_file_operations),
-        ("metadata_generation", test_metadata_generation),
+        ("file_operations", lambda: test_file_operations(scratch_dir / "files")),
+        (
+            "metadata_generation",
+            lambda: test_metadata_generation(scratch_dir / "metadata"),
+        ),
+        (
+            "incremental_late_commit",
+            lambda: test_incremental_late_commit(scratch_dir / "late_commit"),
+        ),
+        ("keyset_pagination", test_keyset_pagination),
+        (
+            "streaming_schema_widening",
+            lambda: test_streaming_schema_widening(scratch_dir / "widening"),
+        ),
         ("error_handling", test_error_handling),
     ]
 
@@ -5,20 +5,49 @@ Sistema de Módulos Unificado para Sheily AI
 Este módulo proporciona acceso unificado a todos los componentes del sistema,
 incluyendo el sistema de expansión dinámica de ramas que puede generar
 cientos de ramas especializadas automáticamente.
+
+Los módulos se registran como descriptores (ruta de importación + argumentos
+del constructor) y se importan e instancian la primera vez que se piden, de
+modo que el arranque no carga transformers, torch ni solana por adelantado.
 """
 
 import asyncio
 import logging
-from typing import Dict, Any, Optional, List
+import os
+import threading
+import time
+from typing import Dict, Any, Optional, List, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime
 import importlib
 import inspect
 
+try:
+    import psutil
+
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
 # Configuración de logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Módulos que se precargan en segundo plano tras initialize()
+# (se puede sobrescribir con SHEILY_HOT_MODULES="mod1,mod2")
+DEFAULT_HOT_MODULES = ["text_processor", "semantic_analyzer", "llm_manager"]
+
+
+def _current_rss() -> Optional[int]:
+    """Memoria residente del proceso en bytes (None si no se puede medir)"""
+    if PSUTIL_AVAILABLE:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
 
 @dataclass
 class ModuleInfo:
@@ -33,6 +62,22 @@ class ModuleInfo:
     is_async: bool = False
     status: str = "active"
     last_used: Optional[datetime] = None
+    # Descriptor perezoso: "paquete.modulo:Clase" relativo a modules
+    import_path: Optional[str] = None
+    factory_args: Tuple = ()
+    factory_kwargs: Dict[str, Any] = field(default_factory=dict)
+    load_error: Optional[str] = None
+    # Perfil de carga (importación + instanciación)
+    import_time_ms: Optional[float] = None
+    init_time_ms: Optional[float] = None
+    rss_delta_bytes: Optional[int] = None
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.import_path is None or self.status in ("active", "error")
 
 
 class ModuleRegistry:
@@ -71,6 +116,89 @@ class ModuleRegistry:
 
         logger.info(f"✅ Módulo registrado: {name} ({category})")
 
+    def register_lazy_module(
+        self,
+        name: str,
+        category: str,
+        description: str,
+        import_path: str,
+        dependencies: List[str] = None,
+        is_async: bool = False,
+        args: Tuple = (),
+        kwargs: Dict[str, Any] = None,
+    ):
+        """
+        Registrar un módulo sin importarlo
+
+        Args:
+            import_path: "paquete.modulo:Clase", relativo a modules si empieza
+                por punto (p. ej. ".ai.llm_models:LLMModelManager")
+            args: Argumentos posicionales del constructor
+            kwargs: Argumentos con nombre del constructor
+        """
+        module_info = ModuleInfo(
+            name=name,
+            category=category,
+            description=description,
+            class_name=import_path.rsplit(":", 1)[-1],
+            instance=None,
+            dependencies=dependencies or [],
+            is_async=is_async,
+            status="registered",
+            import_path=import_path,
+            factory_args=tuple(args),
+            factory_kwargs=dict(kwargs or {}),
+        )
+
+        self.modules[name] = module_info
+
+        if category not in self.categories:
+            self.categories[category] = []
+        self.categories[category].append(name)
+
+        logger.debug(f"📝 Módulo registrado (perezoso): {name} ({category})")
+
+    def _resolve(self, module_info: ModuleInfo) -> Any:
+        """Importar e instanciar un descriptor una sola vez"""
+        if module_info.is_loaded:
+            return module_info.instance
+
+        with module_info._lock:
+            if module_info.is_loaded:
+                return module_info.instance
+
+            module_path, class_name = module_info.import_path.rsplit(":", 1)
+            rss_before = _current_rss()
+            start = time.perf_counter()
+            try:
+                module = importlib.import_module(module_path, package=__name__)
+                imported = time.perf_counter()
+                factory = getattr(module, class_name)
+                instance = factory(
+                    *module_info.factory_args, **module_info.factory_kwargs
+                )
+            except Exception as e:
+                module_info.status = "error"
+                module_info.load_error = str(e)
+                logger.error(f"❌ Error cargando módulo {module_info.name}: {e}")
+                return None
+            finally:
+                finished = time.perf_counter()
+                rss_after = _current_rss()
+                if rss_before is not None and rss_after is not None:
+                    module_info.rss_delta_bytes = rss_after - rss_before
+
+            module_info.import_time_ms = (imported - start) * 1000
+            module_info.init_time_ms = (finished - imported) * 1000
+            module_info.instance = instance
+            module_info.status = "active"
+
+            logger.info(
+                f"✅ Módulo cargado: {module_info.name} "
+                f"({(finished - start) * 1000:.0f} ms)"
+            )
+            return instance
+
     def get_module(self, name: str) -> Optional[ModuleInfo]:
         """Obtener información de un módulo"""
         return self.modules.get(name)
@@ -85,23 +213,87 @@ class ModuleRegistry:
         return self.categories.copy()
 
     def get_module_instance(self, name: str) -> Any:
-        """Obtener la instancia de un módulo"""
+        """Obtener la instancia de un módulo (se carga en el primer uso)"""
         module_info = self.get_module(name)
         if module_info:
             module_info.last_used = datetime.now()
-            return module_info.instance
+            return self._resolve(module_info)
         return None
 
+    def get_import_profile(self) -> List[Dict[str, Any]]:
+        """
+        Perfil de carga de los módulos ya resueltos, del más lento al más rápido
+
+        El delta de RSS es aproximado: los imports compartidos se atribuyen al
+        primer módulo que los carga, y durante el precalentamiento en segundo
+        plano pueden solaparse con otras cargas.
+        """
+        profile = [
+            {
+                "name": info.name,
+                "category": info.category,
+                "status": info.status,
+                "import_time_ms": info.import_time_ms,
+                "init_time_ms": info.init_time_ms,
+                "total_time_ms": (info.import_time_ms or 0) + (info.init_time_ms or 0),
+                "rss_delta_bytes": info.rss_delta_bytes,
+                "error": info.load_error,
+            }
+            for info in self.modules.values()
+            if info.import_path is not None and info.is_loaded
+        ]
+        return sorted(profile, key=lambda entry: entry["total_time_ms"], reverse=True)
+
+    def format_import_profile(self, limit: int = 20) -> str:
+        """Informe de texto con los módulos que más tardan en cargar"""
+        profile = self.get_import_profile()
+        lines = [
+            f"📊 Perfil de carga de módulos ({len(profile)} cargados)",
+            f"  {'módulo':<32} {'import ms':>10} {'init ms':>10} {'RSS MB':>8}",
+        ]
+        for entry in profile[:limit]:
+            rss = entry["rss_delta_bytes"]
+            rss_text = f"{rss / 1024 / 1024:8.1f}" if rss is not None else f"{'-':>8}"
+            if entry["status"] == "error":
+                lines.append(f"  {entry['name']:<32} ❌ {entry['error']}")
+                continue
+            lines.append(
+                f"  {entry['name']:<32} {entry['import_time_ms']:>10.1f} "
+                f"{entry['init_time_ms']:>10.1f} {rss_text}"
+            )
+        return "\n".join(lines)
+
 
 class UnifiedModuleSystem:
     """Sistema unificado para gestionar todos los módulos"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        hot_modules: Optional[List[str]] = None,
+        background_warmup: bool = True,
+    ):
         self.registry = ModuleRegistry()
         self.initialized = False
 
+        if hot_modules is None:
+            env_hot_modules = os.environ.get("SHEILY_HOT_MODULES")
+            hot_modules = (
+                [name.strip() for name in env_hot_modules.split(",") if name.strip()]
+                if env_hot_modules is not None
+                else list(DEFAULT_HOT_MODULES)
+            )
+        self.hot_modules = hot_modules
+        self.background_warmup = background_warmup
+        self.warmup_thread: Optional[threading.Thread] = None
+
     async def initialize(self):
-        """Inicializar todos los módulos del sistema"""
+        """
+        Registrar todos los módulos del sistema
+
+        Solo se registran descriptores; cada módulo se importa al pedirlo por
+        primera vez. Los módulos de hot_modules se precargan en un hilo en
+        segundo plano.
+        """
         if self.initialized:
             return
 
@@ -176,45 +368,97 @@ class UnifiedModuleSystem:
         self.initialized = True
         logger.info(f"✅ Sistema inicializado con {len(self.registry.modules)} módulos")
 
+        if self.hot_modules and self.background_warmup:
+            self.warm_up(self.hot_modules)
+
+    def warm_up(
+        self, names: Optional[List[str]] = None, background: bool = True
+    ) -> Optional[threading.Thread]:
+        """
+        Precargar módulos (y sus dependencias) antes de que se pidan
+
+        Args:
+            names: Módulos a precargar (hot_modules por defecto)
+            background: Cargar en un hilo daemon en vez de bloquear
+
+        Returns:
+            El hilo de precarga si background es True
+        """
+        ordered: List[str] = []
+
+        def visit(name: str):
+            module_info = self.registry.get_module(name)
+            if module_info is None or name in ordered:
+                return
+            ordered.append(name)
+            for dependency in module_info.dependencies:
+                visit(dependency)
+
+        for name in names if names is not None else self.hot_modules:
+            visit(name)
+        # Las dependencias primero
+        ordered.reverse()
+
+        def load():
+            start = time.perf_counter()
+            for name in ordered:
+                self.registry.get_module_instance(name)
+            logger.info(
+                f"🔥 Precarga completada: {len(ordered)} módulos en "
+                f"{time.perf_counter() - start:.2f} s"
+            )
+
+        if not background:
+            load()
+            return None
+
+        self.warmup_thread = threading.Thread(
+            target=load, name="module-warmup", daemon=True
+        )
+        self.warmup_thread.start()
+        return self.warmup_thread
+
     async def _register_ai_modules(self):
         """Registrar módulos de IA"""
         try:
-            from .ai.llm_models import LLMModelManager
-            from .ai.ml_components import MLModelManager
-            from .ai.response_generator import ResponseGenerator
-            from .ai.semantic_analyzer import SemanticAnalyzer
-            from .ai.text_processor import TextProcessor
-
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "llm_manager",
                 "ai",
                 "Gestor de modelos de lenguaje",
-                LLMModelManager(),
+                ".ai.llm_models:LLMModelManager",
                 ["text_processor"],
             )
 
-            self.registry.register_module(
-                "ml_manager", "ai", "Gestor de modelos de ML", MLModelManager(), []
+            self.registry.register_lazy_module(
+                "ml_manager",
+                "ai",
+                "Gestor de modelos de ML",
+                ".ai.ml_components:MLModelManager",
+                [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "response_generator",
                 "ai",
                 "Generador de respuestas",
-                ResponseGenerator(),
+                ".ai.response_generator:ResponseGenerator",
                 ["semantic_analyzer"],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "semantic_analyzer",
                 "ai",
                 "Analizador semántico",
-                SemanticAnalyzer(),
+                ".ai.semantic_analyzer:SemanticAnalyzer",
                 [],
             )
 
-            self.registry.register_module(
-                "text_processor", "ai", "Procesador de texto", TextProcessor(), []
+            self.registry.register_lazy_module(
+                "text_processor",
+                "ai",
+                "Procesador de texto",
+                ".ai.text_processor:TextProcessor",
+                [],
             )
 
         except Exception as e:
@@ -223,40 +467,35 @@ class UnifiedModuleSystem:
     async def _register_memory_modules(self):
         """Registrar módulos de memoria"""
         try:
-            from .memory.data_management import DataManagementService
-            from .memory.intelligent_backup_system import IntelligentBackupSystem
-            from .memory.rag import RAGRetriever
-            from .memory.short_term import ShortTermMemory
-
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "data_management",
                 "memory",
                 "Servicio de gestión de datos",
-                DataManagementService(),
+                ".memory.data_management:DataManagementService",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "backup_system",
                 "memory",
                 "Sistema de respaldo inteligente",
-                IntelligentBackupSystem(),
+                ".memory.intelligent_backup_system:IntelligentBackupSystem",
                 ["rag_retriever"],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "rag_retriever",
                 "memory",
                 "Sistema RAG para recuperación",
-                RAGRetriever(),
+                ".memory.rag:RAGRetriever",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "short_term_memory",
                 "memory",
                 "Memoria a corto plazo",
-                ShortTermMemory(),
+                ".memory.short_term:ShortTermMemory",
                 [],
             )
 
@@ -266,22 +505,19 @@ class UnifiedModuleSystem:
     async def _register_training_modules(self):
         """Registrar módulos de entrenamiento"""
         try:
-            from .training.advanced_training_system import AdvancedTrainingSystem
-            from .training.automatic_lora_trainer import AutomaticLoRATrainer
-
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "advanced_training",
                 "training",
                 "Sistema de entrenamiento avanzado",
-                AdvancedTrainingSystem(),
+                ".training.advanced_training_system:AdvancedTrainingSystem",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "lora_trainer",
                 "training",
                 "Entrenador automático LoRA",
-                AutomaticLoRATrainer(),
+                ".training.automatic_lora_trainer:AutomaticLoRATrainer",
                 [],
             )
 
@@ -291,64 +527,67 @@ class UnifiedModuleSystem:
     async def _register_blockchain_modules(self):
         """Registrar módulos de blockchain"""
         try:
-            from .blockchain.rate_limiter import RateLimiter
-            from .blockchain.secure_key_management import SecureKeyManagement
-            from .blockchain.sheily_spl_manager import SheilySPLManager
-            from .blockchain.sheily_spl_real import SheilySPLReal
-            from .blockchain.sheily_token_manager import SheilyTokenManager
-            from .blockchain.solana_blockchain_real import SolanaBlockchainReal
-            from .blockchain.spl_data_persistence import SPLDataPersistence
-            from .blockchain.transaction_monitor import TransactionMonitor
-
-            self.registry.register_module(
-                "rate_limiter", "blockchain", "Limitador de tasa", RateLimiter(), []
+            self.registry.register_lazy_module(
+                "rate_limiter",
+                "blockchain",
+                "Limitador de tasa",
+                ".blockchain.rate_limiter:RateLimiter",
+                [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "key_management",
                 "blockchain",
                 "Gestión segura de claves",
-                SecureKeyManagement(),
+                ".blockchain.secure_key_management:SecureKeyManagement",
                 [],
             )
 
-            self.registry.register_module(
-                "spl_manager", "blockchain", "Gestor SPL", SheilySPLManager(), []
+            self.registry.register_lazy_module(
+                "spl_manager",
+                "blockchain",
+                "Gestor SPL",
+                ".blockchain.sheily_spl_manager:SheilySPLManager",
+                [],
             )
 
-            self.registry.register_module(
-                "spl_real", "blockchain", "SPL real", SheilySPLReal(), []
+            self.registry.register_lazy_module(
+                "spl_real",
+                "blockchain",
+                "SPL real",
+                ".blockchain.sheily_spl_real:SheilySPLReal",
+                [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "token_manager",
                 "blockchain",
                 "Gestor de tokens",
-                SheilyTokenManager(),
+                ".blockchain.sheily_token_manager:SheilyTokenManager",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "solana_blockchain",
                 "blockchain",
                 "Blockchain Solana",
-                SolanaBlockchainReal(),
+                ".blockchain.solana_blockchain_real:SolanaBlockchainReal",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "spl_persistence",
                 "blockchain",
                 "Persistencia SPL",
-                SPLDataPersistence(),
+                ".blockchain.spl_data_persistence:SPLDataPersistence",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "transaction_monitor",
                 "blockchain",
                 "Monitor de transacciones",
-                TransactionMonitor(),
+                ".blockchain.transaction_monitor:TransactionMonitor",
                 [],
             )
 
@@ -358,22 +597,19 @@ class UnifiedModuleSystem:
     async def _register_security_modules(self):
         """Registrar módulos de seguridad"""
         try:
-            from .security.neurofusion_unified_core import NeuroFusionUnifiedCore
-            from .security.neurofusion_unified_launcher import NeuroFusionLauncher
-
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "unified_core",
                 "security",
                 "Núcleo unificado de seguridad",
-                NeuroFusionUnifiedCore(),
+                ".security.neurofusion_unified_core:NeuroFusionUnifiedCore",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "unified_launcher",
                 "security",
                 "Lanzador unificado",
-                NeuroFusionLauncher(),
+                ".security.neurofusion_unified_launcher:NeuroFusionLauncher",
                 [],
             )
 
@@ -383,62 +619,51 @@ class UnifiedModuleSystem:
     async def _register_evaluation_modules(self):
         """Registrar módulos de evaluación"""
         try:
-            from .evaluation.model_validator import ModelValidator
-            from .evaluation.performance_metrics import (
-                PerformanceMonitor,
-                MetricsCalculator,
-            )
-            from .evaluation.quality_evaluator import (
-                DataQualityEvaluator,
-                ModelQualityEvaluator,
-            )
-            from .evaluation.result_analyzer import ResultAnalyzer
-
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "model_validator",
                 "evaluation",
                 "Validador de modelos",
-                ModelValidator(),
+                ".evaluation.model_validator:ModelValidator",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "performance_monitor",
                 "evaluation",
                 "Monitor de rendimiento",
-                PerformanceMonitor(),
+                ".evaluation.performance_metrics:PerformanceMonitor",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "metrics_calculator",
                 "evaluation",
                 "Calculador de métricas",
-                MetricsCalculator(),
+                ".evaluation.performance_metrics:MetricsCalculator",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "data_quality_evaluator",
                 "evaluation",
                 "Evaluador de calidad de datos",
-                DataQualityEvaluator(),
+                ".evaluation.quality_evaluator:DataQualityEvaluator",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "model_quality_evaluator",
                 "evaluation",
                 "Evaluador de calidad de modelos",
-                ModelQualityEvaluator(),
+                ".evaluation.quality_evaluator:ModelQualityEvaluator",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "result_analyzer",
                 "evaluation",
                 "Analizador de resultados",
-                ResultAnalyzer(),
+                ".evaluation.result_analyzer:ResultAnalyzer",
                 [],
             )
 
@@ -448,36 +673,36 @@ class UnifiedModuleSystem:
     async def _register_token_modules(self):
         """Registrar módulos de tokens"""
         try:
-            from .tokens.advanced_sheily_token_system import AdvancedSheilyTokenSystem
-            from .tokens.sheily_token_manager import SheilyTokenManager
-            from .tokens.sheily_tokens_system import SheilyTokensSystem
-            from .tokens.unified_sheily_token_system import UnifiedSheilyTokenSystem
-
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "advanced_token_system",
                 "tokens",
                 "Sistema avanzado de tokens",
-                AdvancedSheilyTokenSystem(),
+                ".tokens.advanced_sheily_token_system:AdvancedSheilyTokenSystem",
                 [],
             )
 
-            self.registry.register_module(
-                "token_manager", "tokens", "Gestor de tokens", SheilyTokenManager(), []
+            self.registry.register_lazy_module(
+                "token_manager",
+                "tokens",
+                "Gestor de tokens",
+                ".tokens.sheily_token_manager:SheilyTokenManager",
+                [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "tokens_system",
                 "tokens",
                 "Sistema de tokens",
-                SheilyTokensSystem({}),
+                ".tokens.sheily_tokens_system:SheilyTokensSystem",
                 [],
+                args=({},),
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "unified_token_system",
                 "tokens",
                 "Sistema unificado de tokens",
-                UnifiedSheilyTokenSystem(),
+                ".tokens.unified_sheily_token_system:UnifiedSheilyTokenSystem",
                 [],
             )
 
@@ -487,15 +712,11 @@ class UnifiedModuleSystem:
     async def _register_recommendation_modules(self):
         """Registrar módulos de recomendaciones"""
         try:
-            from .recommendations.personalized_recommendations import (
-                PersonalizedRecommendations,
-            )
-
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "personalized_recommendations",
                 "recommendations",
                 "Recomendaciones personalizadas",
-                PersonalizedRecommendations(),
+                ".recommendations.personalized_recommendations:PersonalizedRecommendations",
                 [],
             )
 
@@ -505,24 +726,20 @@ class UnifiedModuleSystem:
     async def _register_embedding_modules(self):
         """Registrar módulos de embeddings"""
         try:
-            from .embeddings.embedding_performance_monitor import (
-                EmbeddingPerformanceMonitor,
-            )
-            from .embeddings.semantic_search_engine import SemanticSearchEngine
-
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "embedding_monitor",
                 "embeddings",
                 "Monitor de rendimiento de embeddings",
-                EmbeddingPerformanceMonitor("default"),
+                ".embeddings.embedding_performance_monitor:EmbeddingPerformanceMonitor",
                 [],
+                args=("default",),
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "semantic_search",
                 "embeddings",
                 "Motor de búsqueda semántica",
-                SemanticSearchEngine(),
+                ".embeddings.semantic_search_engine:SemanticSearchEngine",
                 [],
             )
 
@@ -532,120 +749,99 @@ class UnifiedModuleSystem:
     async def _register_core_modules(self):
         """Registrar módulos del núcleo"""
         try:
-            from .core.advanced_system_integrator import AdvancedSystemIntegrator
-            from .core.cognitive_understanding_module import (
-                CognitiveUnderstandingModule,
-            )
-            from .core.continuous_improvement import ContinuousImprovement
-            from .core.daily_exercise_generator import DailyExerciseGenerator
-            from .core.daily_exercise_integrator import DailyExerciseIntegrator
-            from .core.dynamic_knowledge_generator import DynamicKnowledgeGenerator
-            from .core.enhanced_daily_exercise_generator import (
-                EnhancedDailyExerciseGenerator,
-            )
-            from .core.enhanced_daily_exercise_integrator import (
-                EnhancedDailyExerciseIntegrator,
-            )
-            from .core.integration_manager import IntegrationManager
-            from .core.neurofusion_compatibility_validator import (
-                NeuroFusionCompatibilitySystem,
-            )
-            from .core.neurofusion_core import NeuroFusionCore
-            from .core.semantic_adaptation_manager import SemanticAdaptationManager
-
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "system_integrator",
                 "core",
                 "Integrador de sistema avanzado",
-                AdvancedSystemIntegrator(),
+                ".core.advanced_system_integrator:AdvancedSystemIntegrator",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "cognitive_understanding",
                 "core",
                 "Módulo de comprensión cognitiva",
-                CognitiveUnderstandingModule(),
+                ".core.cognitive_understanding_module:CognitiveUnderstandingModule",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "continuous_improvement",
                 "core",
                 "Mejora continua",
-                ContinuousImprovement(),
+                ".core.continuous_improvement:ContinuousImprovement",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "daily_exercise_generator",
                 "core",
                 "Generador de ejercicios diarios",
-                DailyExerciseGenerator(),
+                ".core.daily_exercise_generator:DailyExerciseGenerator",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "daily_exercise_integrator",
                 "core",
                 "Integrador de ejercicios diarios",
-                DailyExerciseIntegrator(),
+                ".core.daily_exercise_integrator:DailyExerciseIntegrator",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "knowledge_generator",
                 "core",
                 "Generador de conocimiento dinámico",
-                DynamicKnowledgeGenerator(),
+                ".core.dynamic_knowledge_generator:DynamicKnowledgeGenerator",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "enhanced_exercise_generator",
                 "core",
                 "Generador mejorado de ejercicios",
-                EnhancedDailyExerciseGenerator(),
+                ".core.enhanced_daily_exercise_generator:EnhancedDailyExerciseGenerator",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "enhanced_exercise_integrator",
                 "core",
                 "Integrador mejorado de ejercicios",
-                EnhancedDailyExerciseIntegrator(),
+                ".core.enhanced_daily_exercise_integrator:EnhancedDailyExerciseIntegrator",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "integration_manager",
                 "core",
                 "Gestor de integración",
-                IntegrationManager(),
+                ".core.integration_manager:IntegrationManager",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "compatibility_validator",
                 "core",
                 "Validador de compatibilidad",
-                NeuroFusionCompatibilitySystem(),
+                ".core.neurofusion_compatibility_validator:NeuroFusionCompatibilitySystem",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "neurofusion_core",
                 "core",
                 "Núcleo de NeuroFusion",
-                NeuroFusionCore(),
+                ".core.neurofusion_core:NeuroFusionCore",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "semantic_adaptation",
                 "core",
                 "Gestor de adaptación semántica",
-                SemanticAdaptationManager(),
+                ".core.semantic_adaptation_manager:SemanticAdaptationManager",
                 [],
             )
 
@@ -655,14 +851,11 @@ class UnifiedModuleSystem:
     async def _register_orchestrator_modules(self):
         """Registrar módulos de orquestación"""
         try:
-            from .orchestrator.domain_classifier import DomainClassifier
-            from .orchestrator.router import SemanticRouter
-
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "domain_classifier",
                 "orchestrator",
                 "Clasificador de dominios",
-                DomainClassifier(),
+                ".orchestrator.domain_classifier:DomainClassifier",
                 [],
             )
 
@@ -681,14 +874,13 @@ class UnifiedModuleSystem:
     async def _register_reinforcement_modules(self):
         """Registrar módulos de refuerzo"""
         try:
-            from .reinforcement.adaptive_learning_agent import AdaptiveLearningAgent
-
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "adaptive_learning_agent",
                 "reinforcement",
                 "Agente de aprendizaje adaptativo",
-                AdaptiveLearningAgent(None, None),
+                ".reinforcement.adaptive_learning_agent:AdaptiveLearningAgent",
                 [],
+                args=(None, None),
             )
 
         except Exception as e:
@@ -697,58 +889,51 @@ class UnifiedModuleSystem:
     async def _register_rewards_modules(self):
         """Registrar módulos de recompensas"""
         try:
-            from .rewards.adaptive_rewards import AdaptiveRewardsOptimizer
-            from .rewards.advanced_optimization import AdvancedRewardsOptimizer
-            from .rewards.contextual_accuracy import ContextualAccuracyEvaluator
-            from .rewards.integration_example import SheilyRewardsIntegration
-            from .rewards.reward_system import SheilyRewardSystem
-            from .rewards.tracker import SessionTracker
-
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "adaptive_rewards",
                 "rewards",
                 "Optimizador de recompensas adaptativo",
-                AdaptiveRewardsOptimizer(),
+                ".rewards.adaptive_rewards:AdaptiveRewardsOptimizer",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "advanced_optimization",
                 "rewards",
                 "Optimización avanzada",
-                AdvancedRewardsOptimizer(),
+                ".rewards.advanced_optimization:AdvancedRewardsOptimizer",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "contextual_accuracy",
                 "rewards",
                 "Evaluador de precisión contextual",
-                ContextualAccuracyEvaluator(),
+                ".rewards.contextual_accuracy:ContextualAccuracyEvaluator",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "rewards_integration",
                 "rewards",
                 "Integración de recompensas",
-                SheilyRewardsIntegration(),
+                ".rewards.integration_example:SheilyRewardsIntegration",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "reward_system",
                 "rewards",
                 "Sistema de recompensas",
-                SheilyRewardSystem(),
+                ".rewards.reward_system:SheilyRewardSystem",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "session_tracker",
                 "rewards",
                 "Rastreador de sesiones",
-                SessionTracker(),
+                ".rewards.tracker:SessionTracker",
                 [],
             )
 
@@ -758,33 +943,27 @@ class UnifiedModuleSystem:
     async def _register_adapter_modules(self):
         """Registrar módulos de adaptadores"""
         try:
-            from .adapters.compatibility_adapter import CompatibilityAdapter
-            from .adapters.neurofusion_migration_toolkit import (
-                ComponentMigrationRegistry,
-                ComponentTransformer,
-            )
-
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "compatibility_adapter",
                 "adapters",
                 "Adaptador de compatibilidad",
-                CompatibilityAdapter(),
+                ".adapters.compatibility_adapter:CompatibilityAdapter",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "migration_registry",
                 "adapters",
                 "Registro de migración",
-                ComponentMigrationRegistry(),
+                ".adapters.neurofusion_migration_toolkit:ComponentMigrationRegistry",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "component_transformer",
                 "adapters",
                 "Transformador de componentes",
-                ComponentTransformer(),
+                ".adapters.neurofusion_migration_toolkit:ComponentTransformer",
                 [],
             )
 
@@ -794,10 +973,12 @@ class UnifiedModuleSystem:
     async def _register_plugin_modules(self):
         """Registrar módulos de plugins"""
         try:
-            from .plugins.logging_plugin import LoggingPlugin
-
-            self.registry.register_module(
-                "logging_plugin", "plugins", "Plugin de logging", LoggingPlugin(), []
+            self.registry.register_lazy_module(
+                "logging_plugin",
+                "plugins",
+                "Plugin de logging",
+                ".plugins.logging_plugin:LoggingPlugin",
+                [],
             )
 
         except Exception as e:
@@ -806,120 +987,116 @@ class UnifiedModuleSystem:
     async def _register_script_modules(self):
         """Registrar módulos de scripts"""
         try:
-            from .scripts.audit import SheilyAudit
-            from .scripts.data_curation import DataCurator
-            from .scripts.dependency_manager import DependencyManager
-            from .scripts.download_branch_datasets import BranchDatasetDownloader
-            from .scripts.download_datasets import DatasetDownloader
-            from .scripts.download_models import download_sentence_transformers
-            from .scripts.env_manager import EnvManager
-            from .scripts.integrate_llm_with_server import LLMIntegrationManager
-            from .scripts.layer_manager import LayerManager
-            from .scripts.load_local_llm import LocalLLMLoader
-            from .scripts.prepare_training_datasets import TrainingDatasetPreparation
-            from .scripts.restore_branch_structure import BranchStructureRestorer
-            from .scripts.security_audit import SecurityAuditor
-            from .scripts.select_micro_branches import select_representative_branches
-            from .scripts.slack_notification import (
-                generate_slack_message,
-                send_slack_message,
-            )
-            from .scripts.train_branch_adapters import BranchAdapterTrainer
-            from .scripts.version_manager import VersionManager
-
-            self.registry.register_module(
-                "audit", "scripts", "Auditoría del sistema", SheilyAudit(), []
+            self.registry.register_lazy_module(
+                "audit",
+                "scripts",
+                "Auditoría del sistema",
+                ".scripts.audit:SheilyAudit",
+                [],
             )
 
-            self.registry.register_module(
-                "data_curator", "scripts", "Curador de datos", DataCurator(), []
+            self.registry.register_lazy_module(
+                "data_curator",
+                "scripts",
+                "Curador de datos",
+                ".scripts.data_curation:DataCurator",
+                [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "dependency_manager",
                 "scripts",
                 "Gestor de dependencias",
-                DependencyManager(),
+                ".scripts.dependency_manager:DependencyManager",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "branch_dataset_downloader",
                 "scripts",
                 "Descargador de datasets de ramas",
-                BranchDatasetDownloader(),
+                ".scripts.download_branch_datasets:BranchDatasetDownloader",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "dataset_downloader",
                 "scripts",
                 "Descargador de datasets",
-                DatasetDownloader(),
+                ".scripts.download_datasets:DatasetDownloader",
                 [],
             )
 
-            self.registry.register_module(
-                "env_manager", "scripts", "Gestor de entorno", EnvManager(), []
+            self.registry.register_lazy_module(
+                "env_manager",
+                "scripts",
+                "Gestor de entorno",
+                ".scripts.env_manager:EnvManager",
+                [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "llm_integration_manager",
                 "scripts",
                 "Gestor de integración LLM",
-                LLMIntegrationManager(),
+                ".scripts.integrate_llm_with_server:LLMIntegrationManager",
                 [],
             )
 
-            self.registry.register_module(
-                "layer_manager", "scripts", "Gestor de capas", LayerManager(), []
+            self.registry.register_lazy_module(
+                "layer_manager",
+                "scripts",
+                "Gestor de capas",
+                ".scripts.layer_manager:LayerManager",
+                [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "local_llm_loader",
                 "scripts",
                 "Cargador de LLM local",
-                LocalLLMLoader(),
+                ".scripts.load_local_llm:LocalLLMLoader",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "training_dataset_preparation",
                 "scripts",
                 "Preparación de datasets de entrenamiento",
-                TrainingDatasetPreparation(),
+                ".scripts.prepare_training_datasets:TrainingDatasetPreparation",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "branch_structure_restorer",
                 "scripts",
                 "Restaurador de estructura de ramas",
-                BranchStructureRestorer(),
+                ".scripts.restore_branch_structure:BranchStructureRestorer",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "security_auditor",
                 "scripts",
                 "Auditor de seguridad",
-                SecurityAuditor("http://localhost"),
+                ".scripts.security_audit:SecurityAuditor",
                 [],
+                args=("http://localhost",),
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "branch_adapter_trainer",
                 "scripts",
                 "Entrenador de adaptadores de ramas",
-                BranchAdapterTrainer(),
+                ".scripts.train_branch_adapters:BranchAdapterTrainer",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "version_manager",
                 "scripts",
                 "Gestor de versiones",
-                VersionManager(),
+                ".scripts.version_manager:VersionManager",
                 [],
             )
 
@@ -939,8 +1116,6 @@ class UnifiedModuleSystem:
     async def _register_visualization_modules(self):
         """Registrar módulos de visualización"""
         try:
-            from .visualization.insights_dashboard import main as insights_dashboard
-
             self.registry.register_module(
                 "insights_dashboard", "visualization", "Dashboard de insights", None, []
             )
@@ -951,13 +1126,11 @@ class UnifiedModuleSystem:
     async def _register_learning_modules(self):
         """Registrar módulos de aprendizaje"""
         try:
-            from .learning.neural_plasticity_manager import NeuralPlasticityManager
-
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "neural_plasticity",
                 "learning",
                 "Gestor de plasticidad neural",
-                NeuralPlasticityManager(),
+                ".learning.neural_plasticity_manager:NeuralPlasticityManager",
                 [],
             )
 
@@ -967,82 +1140,67 @@ class UnifiedModuleSystem:
     async def _register_ai_components_modules(self):
         """Registrar módulos de componentes de IA"""
         try:
-            from .ai_components.advanced_ai_system import AdvancedAISystem
-            from .ai_components.advanced_algorithm_refinement import (
-                AlgorithmRefinementEngine,
-            )
-            from .ai_components.advanced_contextual_reasoning import (
-                ContextualReasoningEngine,
-            )
-            from .ai_components.advanced_module_enhancer import AdvancedModuleEnhancer
-            from .ai_components.module_enhancer import ModuleEnhancer
-            from .ai_components.neurofusion_component_adapters import (
-                MLModelAdapter,
-                NLPComponentAdapter,
-                EmbeddingAdapter,
-            )
-
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "advanced_ai_system",
                 "ai_components",
                 "Sistema de IA avanzado",
-                AdvancedAISystem(),
+                ".ai_components.advanced_ai_system:AdvancedAISystem",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "algorithm_refinement",
                 "ai_components",
                 "Motor de refinamiento de algoritmos",
-                AlgorithmRefinementEngine(),
+                ".ai_components.advanced_algorithm_refinement:AlgorithmRefinementEngine",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "contextual_reasoning",
                 "ai_components",
                 "Motor de razonamiento contextual",
-                ContextualReasoningEngine(),
+                ".ai_components.advanced_contextual_reasoning:ContextualReasoningEngine",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "advanced_module_enhancer",
                 "ai_components",
                 "Mejorador avanzado de módulos",
-                AdvancedModuleEnhancer(),
+                ".ai_components.advanced_module_enhancer:AdvancedModuleEnhancer",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "module_enhancer",
                 "ai_components",
                 "Mejorador de módulos",
-                ModuleEnhancer(),
+                ".ai_components.module_enhancer:ModuleEnhancer",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "ml_model_adapter",
                 "ai_components",
                 "Adaptador de modelos ML",
-                MLModelAdapter(),
+                ".ai_components.neurofusion_component_adapters:MLModelAdapter",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "nlp_component_adapter",
                 "ai_components",
                 "Adaptador de componentes NLP",
-                NLPComponentAdapter(),
+                ".ai_components.neurofusion_component_adapters:NLPComponentAdapter",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "embedding_adapter",
                 "ai_components",
                 "Adaptador de embeddings",
-                EmbeddingAdapter(),
+                ".ai_components.neurofusion_component_adapters:EmbeddingAdapter",
                 [],
             )
 
@@ -1052,35 +1210,27 @@ class UnifiedModuleSystem:
     async def _register_clustering_modules(self):
         """Registrar módulos de clustering y expansión de dominio"""
         try:
-            from .src.advanced_clustering.domain_adapter_optimizer import (
-                DomainAdapterOptimizer,
-            )
-            from .src.advanced_clustering.domain_expansion import DomainExpansionEngine
-            from .src.advanced_clustering.semantic_clustering import (
-                AdvancedSemanticClustering,
-            )
-
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "domain_adapter_optimizer",
                 "clustering",
                 "Optimizador de adaptadores de dominio",
-                DomainAdapterOptimizer(),
+                ".src.advanced_clustering.domain_adapter_optimizer:DomainAdapterOptimizer",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "domain_expansion",
                 "clustering",
                 "Motor de expansión de dominio",
-                DomainExpansionEngine(),
+                ".src.advanced_clustering.domain_expansion:DomainExpansionEngine",
                 [],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy_module(
                 "semantic_clustering",
                 "clustering",
                 "Clustering semántico avanzado",
-                AdvancedSemanticClustering(),
+                ".src.advanced_clustering.semantic_clustering:AdvancedSemanticClustering",
                 [],
             )
 
@@ -1101,6 +1251,14 @@ class UnifiedModuleSystem:
         """Obtener un módulo por nombre"""
         return self.registry.get_module_instance(name)
 
+    def get_import_profile(self) -> List[Dict[str, Any]]:
+        """Perfil de carga (tiempo y RSS) de los módulos ya cargados"""
+        return self.registry.get_import_profile()
+
+    def log_import_profile(self, limit: int = 20):
+        """Escribir en el log los módulos que más tardan en cargar"""
+        logger.info(self.registry.format_import_profile(limit))
+
     def list_modules(self, category: str = None) -> Dict[str, Any]:
         """Listar módulos disponibles"""
         if category:
@@ -1130,6 +1288,8 @@ class UnifiedModuleSystem:
                 "is_async": module_info.is_async,
                 "status": module_info.status,
                 "last_used": module_info.last_used,
+                "import_path": module_info.import_path,
+                "load_error": module_info.load_error,
             }
         return None
 
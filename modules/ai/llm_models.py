@@ -6,10 +6,17 @@ Componentes para manejo de modelos de lenguaje locales y remotos.
 """
 
 import logging
-from typing import Dict, Any, Optional, List
+import threading
+import time
+from typing import Dict, Any, Iterator, Optional, List
 from dataclasses import dataclass
 import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
+from transformers import (
+    AutoTokenizer,
+    AutoModelForCausalLM,
+    TextIteratorStreamer,
+    pipeline,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -20,10 +27,20 @@ class ModelConfig:
 
     model_name: str
     model_path: str
+    # Longitud total máxima (prompt incluido): limita max_new_tokens cuando
+    # no se indica explícitamente
     max_length: int = 512
     temperature: float = 0.7
     top_p: float = 0.9
     device: str = "auto"
+    # Tokens generados por respuesta (sin contar el prompt)
+    max_new_tokens: int = 256
+    # "auto" (fp16 en GPU, fp32 en CPU), "float32", "float16" o "bfloat16"
+    torch_dtype: str = "auto"
+    # "int8": cuantización dinámica de las capas Linear (solo CPU)
+    quantization: Optional[str] = None
+    # Prompts por llamada a generate en generate_batch
+    max_batch_size: int = 8
 
 
 class LocalLLMModel:
@@ -34,6 +51,7 @@ class LocalLLMModel:
         self.model = None
         self.tokenizer = None
         self.device = self._get_device()
+        self.last_generation_stats: Dict[str, float] = {}
         self._load_model()
 
     def _get_device(self) -> str:
@@ -50,13 +68,30 @@ class LocalLLMModel:
             self.tokenizer = AutoTokenizer.from_pretrained(
                 self.config.model_path, trust_remote_code=True
             )
+            # Relleno a la izquierda: en lotes, todos los prompts terminan en
+            # la misma posición y la generación continúa justo después
+            self.tokenizer.padding_side = "left"
+            if self.tokenizer.pad_token is None:
+                self.tokenizer.pad_token = self.tokenizer.eos_token
 
             self.model = AutoModelForCausalLM.from_pretrained(
                 self.config.model_path,
-                torch_dtype=torch.float16 if self.device == "cuda" else torch.float32,
+                torch_dtype=self._get_dtype(),
                 device_map=self.device,
                 trust_remote_code=True,
             )
+            self.model.eval()
+
+            if self.config.quantization == "int8":
+                if self.device == "cpu":
+                    self.model = torch.quantization.quantize_dynamic(
+                        self.model, {torch.nn.Linear}, dtype=torch.qint8
+                    )
+                    logger.info("⚙️ Cuantización dinámica int8 aplicada")
+                else:
+                    logger.warning(
+                        "⚠️ La cuantización int8 dinámica solo se aplica en CPU"
+                    )
 
             logger.info(f"✅ Modelo {self.config.model_name} cargado exitosamente")
 
@@ -65,33 +100,215 @@ class LocalLLMModel:
             self.model = None
             self.tokenizer = None
 
-    def generate_text(self, prompt: str, max_length: int = None) -> str:
-        """Genera texto usando el modelo local"""
+    def _get_dtype(self) -> torch.dtype:
+        """Tipo de los pesos según la configuración"""
+        dtypes = {
+            "float32": torch.float32,
+            "float16": torch.float16,
+            "bfloat16": torch.bfloat16,
+        }
+        if self.config.torch_dtype in dtypes:
+            return dtypes[self.config.torch_dtype]
+        return torch.float16 if self.device == "cuda" else torch.float32
+
+    def _generation_kwargs(
+        self,
+        prompt_length: int,
+        max_new_tokens: Optional[int] = None,
+        max_length: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Parámetros comunes de model.generate
+
+        Sin max_new_tokens explícito se generan config.max_new_tokens, sin
+        pasar de config.max_length tokens en total.
+        """
+        kwargs = {
+            "temperature": self.config.temperature,
+            "top_p": self.config.top_p,
+            "do_sample": True,
+            "use_cache": True,
+            "pad_token_id": self.tokenizer.pad_token_id,
+        }
+        if max_length is not None and max_new_tokens is None:
+            # Semántica anterior: longitud total incluyendo el prompt
+            kwargs["max_length"] = max_length
+        elif max_new_tokens is not None:
+            kwargs["max_new_tokens"] = max_new_tokens
+        else:
+            kwargs["max_new_tokens"] = max(
+                1,
+                min(self.config.max_new_tokens, self.config.max_length - prompt_length),
+            )
+        return kwargs
+
+    def _count_new_tokens(self, new_tokens: torch.Tensor) -> int:
+        """Tokens generados sin contar relleno ni fin de secuencia"""
+        special = [
+            token_id
+            for token_id in (self.tokenizer.pad_token_id, self.tokenizer.eos_token_id)
+            if token_id is not None
+        ]
+        if not special:
+            return int(new_tokens.numel())
+        special_ids = torch.tensor(special, device=new_tokens.device)
+        return int((~torch.isin(new_tokens, special_ids)).sum())
+
+    def _generate(
+        self,
+        prompts: List[str],
+        max_new_tokens: Optional[int] = None,
+        max_length: Optional[int] = None,
+    ) -> List[str]:
+        """Generar para un lote de prompts y decodificar solo los tokens nuevos"""
+        inputs = self.tokenizer(prompts, return_tensors="pt", padding=True).to(
+            self.device
+        )
+        prompt_length = inputs["input_ids"].shape[1]
+
+        start = time.perf_counter()
+        with torch.inference_mode():
+            outputs = self.model.generate(
+                **inputs,
+                **self._generation_kwargs(prompt_length, max_new_tokens, max_length),
+            )
+        elapsed = time.perf_counter() - start
+
+        new_tokens = outputs[:, prompt_length:]
+        self._record_stats(self._count_new_tokens(new_tokens), elapsed, len(prompts))
+
+        return [
+            text.strip()
+            for text in self.tokenizer.batch_decode(
+                new_tokens, skip_special_tokens=True
+            )
+        ]
+
+    def _record_stats(self, new_tokens: int, elapsed: float, prompts: int):
+        self.last_generation_stats = {
+            "prompts": prompts,
+            "new_tokens": new_tokens,
+            "seconds": elapsed,
+            "tokens_per_second": new_tokens / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def generate_text(
+        self,
+        prompt: str,
+        max_length: int = None,
+        max_new_tokens: Optional[int] = None,
+    ) -> str:
+        """
+        Genera texto usando el modelo local
+
+        Args:
+            prompt: Texto de entrada
+            max_length: Longitud total (prompt incluido), como antes
+            max_new_tokens: Tokens a generar (por defecto config.max_new_tokens,
+                sin pasar de config.max_length en total)
+        """
         if not self.model or not self.tokenizer:
             return "Modelo no disponible"
 
         try:
-            inputs = self.tokenizer(prompt, return_tensors="pt").to(self.device)
-
-            max_len = max_length or self.config.max_length
-
-            with torch.no_grad():
-                outputs = self.model.generate(
-                    **inputs,
-                    max_length=max_len,
-                    temperature=self.config.temperature,
-                    top_p=self.config.top_p,
-                    do_sample=True,
-                    pad_token_id=self.tokenizer.eos_token_id,
-                )
-
-            response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-            return response[len(prompt) :].strip()
+            return self._generate([prompt], max_new_tokens, max_length)[0]
 
         except Exception as e:
             logger.error(f"❌ Error generando texto: {e}")
             return "Error en generación de texto"
 
+    def generate_batch(
+        self,
+        prompts: List[str],
+        max_new_tokens: Optional[int] = None,
+        batch_size: Optional[int] = None,
+    ) -> List[str]:
+        """
+        Genera respuestas para varios prompts en lotes
+
+        Los prompts se ordenan por longitud en tokens antes de agruparlos,
+        así cada lote rellena (a la izquierda) lo mínimo; las respuestas se
+        devuelven en el orden original.
+        """
+        if not self.model or not self.tokenizer:
+            return ["Modelo no disponible"] * len(prompts)
+        if not prompts:
+            return []
+
+        batch_size = batch_size or self.config.max_batch_size
+        lengths = [len(ids) for ids in self.tokenizer(prompts)["input_ids"]]
+        order = sorted(range(len(prompts)), key=lambda i: lengths[i])
+        responses: List[Optional[str]] = [None] * len(prompts)
+
+        total_tokens = 0
+        start = time.perf_counter()
+        for offset in range(0, len(order), batch_size):
+            indices = order[offset : offset + batch_size]
+            try:
+                texts = self._generate([prompts[i] for i in indices], max_new_tokens)
+                total_tokens += self.last_generation_stats["new_tokens"]
+            except Exception as e:
+                logger.error(f"❌ Error generando lote: {e}")
+                texts = ["Error en generación de texto"] * len(indices)
+            for index, text in zip(indices, texts):
+                responses[index] = text
+
+        self._record_stats(total_tokens, time.perf_counter() - start, len(prompts))
+        return responses
+
+    def stream_text(
+        self, prompt: str, max_new_tokens: Optional[int] = None
+    ) -> Iterator[str]:
+        """
+        Genera texto devolviendo fragmentos a medida que se producen
+
+        model.generate se ejecuta en un hilo y TextIteratorStreamer entrega
+        el texto decodificado de cada token nuevo (sin el prompt).
+        """
+        if not self.model or not self.tokenizer:
+            yield "Modelo no disponible"
+            return
+
+        inputs = self.tokenizer(prompt, return_tensors="pt").to(self.device)
+        prompt_length = inputs["input_ids"].shape[1]
+        streamer = TextIteratorStreamer(
+            self.tokenizer, skip_prompt=True, skip_special_tokens=True
+        )
+        errors: List[Exception] = []
+        outputs = []
+
+        def run():
+            try:
+                with torch.inference_mode():
+                    outputs.append(
+                        self.model.generate(
+                            **inputs,
+                            **self._generation_kwargs(prompt_length, max_new_tokens),
+                            streamer=streamer,
+                        )
+                    )
+            except Exception as e:
+                errors.append(e)
+                # Desbloquear al consumidor del streamer
+                streamer.end()
+
+        thread = threading.Thread(target=run, name="llm-stream", daemon=True)
+        start = time.perf_counter()
+        thread.start()
+
+        for text in streamer:
+            if text:
+                yield text
+        thread.join()
+
+        if errors:
+            logger.error(f"❌ Error generando texto en streaming: {errors[0]}")
+            yield "Error en generación de texto"
+            return
+
+        generated = self._count_new_tokens(outputs[0][:, prompt_length:])
+        self._record_stats(generated, time.perf_counter() - start, 1)
+
 
 class RemoteLLMClient:
     """Cliente para modelos de lenguaje remotos"""
@@ -178,6 +395,16 @@ class LLMModelManager:
         else:
             return f"Modelo {target_model} no encontrado"
 
+    def generate_batch(
+        self, prompts: List[str], model_name: str = None
+    ) -> List[str]:
+        """Genera respuestas en lote (en lotes reales solo con modelos locales)"""
+        target_model = model_name or self.active_model
+
+        if target_model in self.local_models:
+            return self.local_models[target_model].generate_batch(prompts)
+        return [self.generate_text(prompt, target_model) for prompt in prompts]
+
     def get_available_models(self) -> List[str]:
         """Obtiene lista de modelos disponibles"""
         models = list(self.local_models.keys()) + list(self.remote_clients.keys())
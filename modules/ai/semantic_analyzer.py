@@ -5,16 +5,44 @@ Análisis Semántico - Semantic Analyzer
 Componentes para análisis semántico y comprensión de significado.
 """
 
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 import numpy as np
-from sentence_transformers import SentenceTransformer, util
-import torch
+from sentence_transformers import SentenceTransformer
 
 logger = logging.getLogger(__name__)
 
 
+def connected_components(
+    n_nodes: int, rows: np.ndarray, cols: np.ndarray
+) -> np.ndarray:
+    """
+    Componentes conexas de un grafo no dirigido dado como lista de aristas
+
+    Propagación de la etiqueta mínima con saltos de puntero, todo vectorizado.
+
+    Returns:
+        Etiqueta de componente (el menor índice del componente) por nodo
+    """
+    labels = np.arange(n_nodes)
+    if len(rows) == 0:
+        return labels
+
+    while True:
+        previous = labels.copy()
+        np.minimum.at(labels, rows, labels[cols])
+        np.minimum.at(labels, cols, labels[rows])
+        # Saltos de puntero: cada nodo apunta a la etiqueta de su etiqueta
+        labels = labels[labels]
+        if np.array_equal(labels, previous):
+            return labels
+
+
 @dataclass
 class SemanticSimilarity:
     """Resultado de similitud semántica"""
@@ -38,9 +66,21 @@ class SemanticAnalysis:
 class SemanticAnalyzer:
     """Analizador semántico principal"""
 
-    def __init__(self, model_name: str = "paraphrase-multilingual-MiniLM-L12-v2"):
+    def __init__(
+        self,
+        model_name: str = "paraphrase-multilingual-MiniLM-L12-v2",
+        document_cache_size: int = 50000,
+    ):
         self.model_name = model_name
         self.model = None
+
+        # Embeddings de documentos por hash del texto (LRU)
+        self.document_cache_size = document_cache_size
+        self._document_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._document_cache_lock = threading.Lock()
+        # Memo de embeddings de la llamada en curso (por hilo)
+        self._call_state = threading.local()
+
         self._load_model()
 
     def _load_model(self):
@@ -66,15 +106,94 @@ class SemanticAnalyzer:
             logger.error(f"❌ Error generando embeddings: {e}")
             return np.random.rand(len(texts), 384)
 
+    @staticmethod
+    def _text_key(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    @contextmanager
+    def _embedding_memo(self):
+        """
+        Compartir embeddings entre los métodos llamados dentro del bloque
+
+        analyze_semantics codifica las mismas oraciones en varios pasos; con
+        el memo activo cada texto se codifica una sola vez por llamada.
+        """
+        if getattr(self._call_state, "memo", None) is not None:
+            # Bloque anidado: se reutiliza el memo exterior
+            yield
+            return
+
+        self._call_state.memo = {}
+        try:
+            yield
+        finally:
+            self._call_state.memo = None
+
+    def _encode(
+        self, texts: List[str], use_document_cache: bool = False
+    ) -> np.ndarray:
+        """
+        Embeddings normalizados (el producto escalar es la similitud coseno)
+
+        Solo se codifican, en un único lote, los textos distintos que no
+        estén en el memo de la llamada ni (si use_document_cache) en la
+        caché de documentos.
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        memo = getattr(self._call_state, "memo", None)
+        vectors: Dict[str, np.ndarray] = {}
+        missing: List[str] = []
+
+        for text in texts:
+            if text in vectors:
+                continue
+            if memo is not None and text in memo:
+                vectors[text] = memo[text]
+                continue
+            if use_document_cache:
+                key = self._text_key(text)
+                with self._document_cache_lock:
+                    cached = self._document_cache.get(key)
+                    if cached is not None:
+                        self._document_cache.move_to_end(key)
+                if cached is not None:
+                    vectors[text] = cached
+                    continue
+            vectors[text] = None
+            missing.append(text)
+
+        if missing:
+            encoded = self.model.encode(
+                missing, convert_to_numpy=True, normalize_embeddings=True
+            )
+            for text, vector in zip(missing, encoded):
+                vectors[text] = vector
+                if memo is not None:
+                    memo[text] = vector
+            if use_document_cache:
+                with self._document_cache_lock:
+                    for text, vector in zip(missing, encoded):
+                        self._document_cache[self._text_key(text)] = vector
+                    while len(self._document_cache) > self.document_cache_size:
+                        self._document_cache.popitem(last=False)
+
+        return np.stack([vectors[text] for text in texts]).astype(np.float32)
+
+    def clear_document_cache(self):
+        """Vaciar la caché de embeddings de documentos"""
+        with self._document_cache_lock:
+            self._document_cache.clear()
+
     def calculate_similarity(self, text1: str, text2: str) -> float:
         """Calcula similitud semántica entre dos textos"""
         if not self.model:
             return 0.0
 
         try:
-            embeddings = self.model.encode([text1, text2], convert_to_tensor=True)
-            similarity = util.pytorch_cos_sim(embeddings[0], embeddings[1])
-            return float(similarity[0][0])
+            embeddings = self._encode([text1, text2])
+            return float(embeddings[0] @ embeddings[1])
         except Exception as e:
             logger.error(f"❌ Error calculando similitud: {e}")
             return 0.0
@@ -87,70 +206,74 @@ class SemanticAnalyzer:
             return []
 
         try:
-            query_embedding = self.model.encode(query, convert_to_tensor=True)
-            text_embeddings = self.model.encode(texts, convert_to_tensor=True)
-
-            similarities = util.pytorch_cos_sim(query_embedding, text_embeddings)[0]
+            query_embedding = self._encode([query])[0]
+            text_embeddings = self._encode(texts, use_document_cache=True)
 
-            similar_texts = []
-            for i, similarity in enumerate(similarities):
-                if similarity > threshold:
-                    similar_texts.append((i, float(similarity)))
+            similarities = text_embeddings @ query_embedding
+            matches = np.nonzero(similarities > threshold)[0]
 
             # Ordenar por similitud descendente
-            similar_texts.sort(key=lambda x: x[1], reverse=True)
-            return similar_texts
+            order = matches[np.argsort(-similarities[matches], kind="stable")]
+            return [(int(i), float(similarities[i])) for i in order]
 
         except Exception as e:
             logger.error(f"❌ Error buscando textos similares: {e}")
             return []
 
-    def cluster_texts(self, texts: List[str], n_clusters: int = 3) -> List[List[int]]:
-        """Agrupa textos por similitud semántica"""
+    def cluster_texts(
+        self,
+        texts: List[str],
+        n_clusters: int = 3,
+        threshold: float = 0.7,
+        top_k: int = 10,
+        block_size: int = 1024,
+    ) -> List[List[int]]:
+        """
+        Agrupa textos por similitud semántica
+
+        Cada texto se une a sus top_k vecinos más similares por encima del
+        umbral; los clusters son las componentes conexas de ese grafo. Se
+        devuelven los n_clusters más grandes (a igual tamaño, los de mayor
+        similitud interna).
+        """
         if not self.model or len(texts) < n_clusters:
             return []
 
         try:
-            embeddings = self.model.encode(texts, convert_to_tensor=True)
-
-            # Calcular matriz de similitud
-            similarity_matrix = util.pytorch_cos_sim(embeddings, embeddings)
-
-            # Clustering simple basado en similitud
-            clusters = []
-            used_indices = set()
-
-            for _ in range(n_clusters):
-                if len(used_indices) >= len(texts):
-                    break
+            embeddings = self._encode(texts)
+            n_texts = len(texts)
+            k = min(top_k, n_texts - 1)
 
-                # Encontrar el texto más similar a los no usados
-                best_cluster = []
-                best_similarity = -1
+            rows, cols, weights = [], [], []
+            if k > 0:
+                # Similitudes por bloques de filas: memoria O(bloque · n)
+                for start in range(0, n_texts, block_size):
+                    block = embeddings[start : start + block_size] @ embeddings.T
+                    block_rows = np.arange(start, start + len(block))
+                    block[np.arange(len(block)), block_rows] = -np.inf
 
-                for i in range(len(texts)):
-                    if i in used_indices:
-                        continue
+                    neighbours = np.argpartition(-block, k - 1, axis=1)[:, :k]
+                    scores = np.take_along_axis(block, neighbours, axis=1)
+                    keep = scores > threshold
 
-                    cluster_similarity = 0
-                    cluster_members = [i]
+                    rows.append(np.repeat(block_rows, k)[keep.ravel()])
+                    cols.append(neighbours[keep])
+                    weights.append(scores[keep])
 
-                    for j in range(len(texts)):
-                        if j != i and j not in used_indices:
-                            sim = similarity_matrix[i][j]
-                            if sim > 0.7:  # Umbral de similitud
-                                cluster_members.append(j)
-                                cluster_similarity += sim
+            rows = np.concatenate(rows) if rows else np.array([], dtype=int)
+            cols = np.concatenate(cols) if cols else np.array([], dtype=int)
+            weights = np.concatenate(weights) if weights else np.array([])
 
-                    if cluster_similarity > best_similarity:
-                        best_similarity = cluster_similarity
-                        best_cluster = cluster_members
+            labels = connected_components(n_texts, rows, cols)
 
-                if best_cluster:
-                    clusters.append(best_cluster)
-                    used_indices.update(best_cluster)
+            sizes = np.bincount(labels, minlength=n_texts)
+            strength = np.bincount(labels[rows], weights=weights, minlength=n_texts)
+            components = np.unique(labels)
+            ranked = sorted(
+                components, key=lambda c: (-sizes[c], -strength[c], c)
+            )[:n_clusters]
 
-            return clusters
+            return [np.nonzero(labels == c)[0].tolist() for c in ranked]
 
         except Exception as e:
             logger.error(f"❌ Error en clustering: {e}")
@@ -170,16 +293,13 @@ class SemanticAnalyzer:
 
         try:
             # Obtener embeddings de oraciones
-            embeddings = self.model.encode(sentences, convert_to_tensor=True)
+            embeddings = self._encode(sentences)
 
-            # Calcular similitud entre oraciones
-            similarity_matrix = util.pytorch_cos_sim(embeddings, embeddings)
+            # Similitud media de cada oración con todas (sin matriz n×n)
+            mean_scores = embeddings @ embeddings.mean(axis=0)
 
             # Encontrar oraciones más representativas
-            sentence_scores = []
-            for i in range(len(sentences)):
-                score = torch.mean(similarity_matrix[i]).item()
-                sentence_scores.append((i, score))
+            sentence_scores = [(i, float(score)) for i, score in enumerate(mean_scores)]
 
             # Ordenar por score y tomar las mejores
             sentence_scores.sort(key=lambda x: x[1], reverse=True)
@@ -223,26 +343,20 @@ class SemanticAnalyzer:
 
             # Calcular coherencia semántica
             if len(sentences) > 1:
-                embeddings = self.model.encode(sentences, convert_to_tensor=True)
-                similarities = []
-                for i in range(len(sentences) - 1):
-                    sim = util.pytorch_cos_sim(embeddings[i], embeddings[i + 1])
-                    similarities.append(float(sim[0][0]))
-
-                if similarities:
-                    analysis["semantic_coherence"] = np.mean(similarities)
+                embeddings = self._encode(sentences)
+                # Similitud entre cada oración y la siguiente
+                similarities = np.sum(embeddings[:-1] * embeddings[1:], axis=1)
+                analysis["semantic_coherence"] = float(np.mean(similarities))
 
             # Análisis de relevancia con contexto
             if context_texts:
-                text_embedding = self.model.encode(text, convert_to_tensor=True)
-                context_embeddings = self.model.encode(
-                    context_texts, convert_to_tensor=True
+                text_embedding = self._encode([text])[0]
+                context_embeddings = self._encode(
+                    context_texts, use_document_cache=True
                 )
 
-                similarities = util.pytorch_cos_sim(text_embedding, context_embeddings)[
-                    0
-                ]
-                analysis["context_relevance"] = float(torch.mean(similarities))
+                similarities = context_embeddings @ text_embedding
+                analysis["context_relevance"] = float(np.mean(similarities))
 
             return analysis
 
@@ -258,39 +372,43 @@ class SemanticAnalyzer:
             return SemanticAnalysis([], [], [], {}, {})
 
         try:
-            # Extraer conceptos clave
-            key_concepts = self.extract_key_concepts(text)
-
-            # Identificar temas principales
-            main_topics = key_concepts[:3] if key_concepts else []
-
-            # Clustering de oraciones
-            sentences = text.split(".")
-            sentences = [s.strip() for s in sentences if s.strip()]
-            clusters = self.cluster_texts(sentences, min(3, len(sentences)))
-
-            semantic_clusters = []
-            for cluster in clusters:
-                cluster_texts = [sentences[i] for i in cluster if i < len(sentences)]
-                semantic_clusters.append(cluster_texts)
-
-            # Análisis de contexto
-            context_understanding = self.understand_context(text, context_texts)
-
-            # Similitud semántica con conceptos clave
-            semantic_similarity = {}
-            if key_concepts:
-                for concept in key_concepts[:5]:
-                    similarity = self.calculate_similarity(text, concept)
-                    semantic_similarity[concept] = similarity
-
-            return SemanticAnalysis(
-                main_topics=main_topics,
-                semantic_clusters=semantic_clusters,
-                key_concepts=key_concepts,
-                context_understanding=context_understanding,
-                semantic_similarity=semantic_similarity,
-            )
+            # Un único memo de embeddings para todos los pasos
+            with self._embedding_memo():
+                # Extraer conceptos clave
+                key_concepts = self.extract_key_concepts(text)
+
+                # Identificar temas principales
+                main_topics = key_concepts[:3] if key_concepts else []
+
+                # Clustering de oraciones
+                sentences = text.split(".")
+                sentences = [s.strip() for s in sentences if s.strip()]
+                clusters = self.cluster_texts(sentences, min(3, len(sentences)))
+
+                semantic_clusters = []
+                for cluster in clusters:
+                    cluster_texts = [
+                        sentences[i] for i in cluster if i < len(sentences)
+                    ]
+                    semantic_clusters.append(cluster_texts)
+
+                # Análisis de contexto
+                context_understanding = self.understand_context(text, context_texts)
+
+                # Similitud semántica con conceptos clave
+                semantic_similarity = {}
+                if key_concepts:
+                    for concept in key_concepts[:5]:
+                        similarity = self.calculate_similarity(text, concept)
+                        semantic_similarity[concept] = similarity
+
+                return SemanticAnalysis(
+                    main_topics=main_topics,
+                    semantic_clusters=semantic_clusters,
+                    key_concepts=key_concepts,
+                    context_understanding=context_understanding,
+                    semantic_similarity=semantic_similarity,
+                )
 
         except Exception as e:
             logger.error(f"❌ Error en análisis semántico: {e}")
@@ -304,18 +422,20 @@ class SemanticAnalyzer:
             return []
 
         try:
-            query_embedding = self.model.encode(query, convert_to_tensor=True)
-            doc_embeddings = self.model.encode(documents, convert_to_tensor=True)
-
-            similarities = util.pytorch_cos_sim(query_embedding, doc_embeddings)[0]
-
-            # Obtener top-k resultados
-            top_results = []
-            for i, similarity in enumerate(similarities):
-                top_results.append((i, float(similarity)))
-
-            top_results.sort(key=lambda x: x[1], reverse=True)
-            return top_results[:top_k]
+            query_embedding = self._encode([query])[0]
+            doc_embeddings = self._encode(documents, use_document_cache=True)
+
+            similarities = doc_embeddings @ query_embedding
+
+            # Obtener top-k resultados sin ordenar todos los documentos
+            k = min(top_k, len(documents))
+            if k <= 0:
+                return []
+            top_indices = np.argpartition(-similarities, k - 1)[:k]
+            top_indices = top_indices[
+                np.argsort(-similarities[top_indices], kind="stable")
+            ]
+            return [(int(i), float(similarities[i])) for i in top_indices]
 
         except Exception as e:
             logger.error(f"❌ Error en búsqueda semántica: {e}")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Pruebas de LocalLLMModel
+
+Usan un GPT-2 diminuto con pesos aleatorios creado en un directorio
+temporal (sin descargas) y comprueban la generación en lotes, el límite
+de longitud total y que las estadísticas de tokens coinciden entre
+generate_text y stream_text.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import torch
+from tokenizers import Tokenizer
+from tokenizers.models import WordLevel
+from tokenizers.pre_tokenizers import Whitespace
+from transformers import GPT2Config, GPT2LMHeadModel, PreTrainedTokenizerFast
+
+from llm_models import LocalLLMModel, ModelConfig
+
+WORDS = "hola mundo qué es un token modelo texto lote generar respuesta".split()
+
+
+def _tiny_model(path: Path) -> str:
+    """Guardar un modelo y un tokenizer mínimos en path"""
+    vocab = {"<unk>": 0, "<eos>": 1}
+    vocab.update({word: i + 2 for i, word in enumerate(WORDS)})
+    backend = Tokenizer(WordLevel(vocab, unk_token="<unk>"))
+    backend.pre_tokenizer = Whitespace()
+    tokenizer = PreTrainedTokenizerFast(
+        tokenizer_object=backend, unk_token="<unk>", eos_token="<eos>"
+    )
+
+    torch.manual_seed(0)
+    model = GPT2LMHeadModel(
+        GPT2Config(
+            vocab_size=len(vocab),
+            n_positions=64,
+            n_embd=16,
+            n_layer=1,
+            n_head=2,
+            bos_token_id=1,
+            eos_token_id=1,
+        )
+    )
+    tokenizer.save_pretrained(str(path))
+    model.save_pretrained(str(path))
+    return str(path)
+
+
+def _model(tmp_path, **options) -> LocalLLMModel:
+    model_path = _tiny_model(Path(tmp_path) / "tiny")
+    model = LocalLLMModel(
+        ModelConfig(
+            model_name="tiny", model_path=model_path, device="cpu", **options
+        )
+    )
+    assert model.model is not None
+    return model
+
+
+def test_generate_batch_keeps_order(tmp_path):
+    """Los lotes se ordenan por longitud pero las respuestas no"""
+    model = _model(tmp_path, max_new_tokens=4, max_batch_size=2)
+    prompts = ["hola mundo qué es un token", "hola", "modelo texto lote"]
+
+    responses = model.generate_batch(prompts)
+    assert len(responses) == 3
+    assert all(isinstance(text, str) for text in responses)
+    assert model.last_generation_stats["prompts"] == 3
+    assert 0 <= model.last_generation_stats["new_tokens"] <= 3 * 4
+    assert model.generate_batch([]) == []
+
+
+def test_max_length_caps_default_new_tokens(tmp_path):
+    """config.max_length limita los tokens nuevos si no se indican"""
+    model = _model(tmp_path, max_length=8, max_new_tokens=50)
+    prompt_length = len(model.tokenizer("hola mundo qué es un")["input_ids"])
+
+    kwargs = model._generation_kwargs(prompt_length)
+    assert kwargs["max_new_tokens"] == 8 - prompt_length
+    # Un prompt más largo que max_length genera al menos un token
+    assert model._generation_kwargs(20)["max_new_tokens"] == 1
+    # Explícitos: max_new_tokens manda; max_length conserva su semántica
+    assert model._generation_kwargs(prompt_length, 30)["max_new_tokens"] == 30
+    assert model._generation_kwargs(prompt_length, None, 40)["max_length"] == 40
+
+    model.generate_text("hola mundo qué es un")
+    assert model.last_generation_stats["new_tokens"] <= 8 - prompt_length
+
+
+def test_stream_and_generate_count_tokens_alike(tmp_path):
+    """Relleno y fin de secuencia no cuentan en ninguno de los dos caminos"""
+    model = _model(tmp_path, max_new_tokens=6)
+    eos = model.tokenizer.eos_token_id
+    assert model._count_new_tokens(torch.tensor([[5, 6, eos, eos]])) == 2
+
+    torch.manual_seed(1)
+    text = model.generate_text("hola mundo")
+    generated = model.last_generation_stats["new_tokens"]
+
+    torch.manual_seed(1)
+    streamed = "".join(model.stream_text("hola mundo"))
+    assert model.last_generation_stats["new_tokens"] == generated
+    assert streamed.strip() == text
+
+
+def main():
+    """Ejecutar las pruebas sin pytest"""
+    tests = [
+        test_generate_batch_keeps_order,
+        test_max_length_caps_default_new_tokens,
+        test_stream_and_generate_count_tokens_alike,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test(tempfile.mkdtemp(prefix="llm_models_test_"))
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,8 +7,11 @@ Control de frecuencia de transacciones y operaciones
 
 import time
 import logging
+import sqlite3
+import zlib
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, Iterator, List, Optional, Any, Tuple
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 import threading
@@ -51,30 +54,225 @@ class RateLimitViolation:
     cooldown_until: Optional[datetime] = None
 
 
-class RateLimiter:
-    """Sistema de rate limiting"""
+# Ventana del límite de ráfaga (segundos)
+BURST_WINDOW = 60
+
+
+class RateLimitState:
+    """
+    Estado GCRA de un (usuario, regla): tamaño constante
+
+    tat y burst_tat son los "theoretical arrival time" de los límites
+    sostenido y de ráfaga; cooldown_until es epoch (0 si no hay cooldown).
+    """
+
+    __slots__ = ("tat", "burst_tat", "cooldown_until")
+
+    def __init__(self, tat: float = 0.0, burst_tat: float = 0.0, cooldown_until: float = 0.0):
+        self.tat = tat
+        self.burst_tat = burst_tat
+        self.cooldown_until = cooldown_until
+
+    def as_tuple(self) -> Tuple[float, float, float]:
+        return (self.tat, self.burst_tat, self.cooldown_until)
+
+
+class MemoryRateLimitStore:
+    """
+    Estado de rate limit en memoria con locks por franjas de usuarios
+
+    Cada usuario cae en una franja según el hash de su id, así que las
+    comprobaciones de usuarios distintos no compiten por un lock global.
+    """
+
+    def __init__(self, stripes: int = 64):
+        self.stripes = stripes
+        self.locks = [threading.Lock() for _ in range(stripes)]
+        self.states: List[Dict[str, Dict[str, RateLimitState]]] = [
+            {} for _ in range(stripes)
+        ]
+        self.cooldowns: Dict[str, float] = {}
+        self.cooldowns_lock = threading.Lock()
+
+    def _stripe(self, user_id: str) -> int:
+        return zlib.crc32(user_id.encode("utf-8")) % self.stripes
+
+    @contextmanager
+    def locked(self, user_id: str, rule_id: str) -> Iterator[RateLimitState]:
+        """Estado de (usuario, regla) bloqueado durante el bloque"""
+        stripe = self._stripe(user_id)
+        with self.locks[stripe]:
+            user_states = self.states[stripe].setdefault(user_id, {})
+            state = user_states.get(rule_id)
+            if state is None:
+                state = user_states[rule_id] = RateLimitState()
+            cooldown_until = state.cooldown_until
+            yield state
+            if state.cooldown_until != cooldown_until:
+                with self.cooldowns_lock:
+                    self.cooldowns[user_id] = max(
+                        self.cooldowns.get(user_id, 0.0), state.cooldown_until
+                    )
+
+    def get(self, user_id: str, rule_id: str) -> Optional[RateLimitState]:
+        stripe = self._stripe(user_id)
+        with self.locks[stripe]:
+            state = self.states[stripe].get(user_id, {}).get(rule_id)
+            return RateLimitState(*state.as_tuple()) if state else None
+
+    def reset_user(self, user_id: str):
+        stripe = self._stripe(user_id)
+        with self.locks[stripe]:
+            self.states[stripe].pop(user_id, None)
+        with self.cooldowns_lock:
+            self.cooldowns.pop(user_id, None)
+
+    def total_users(self) -> int:
+        return sum(len(states) for states in self.states)
+
+    def users_in_cooldown(self, now: float) -> int:
+        with self.cooldowns_lock:
+            expired = [u for u, until in self.cooldowns.items() if until <= now]
+            for user_id in expired:
+                del self.cooldowns[user_id]
+            return len(self.cooldowns)
+
+
+class SQLiteRateLimitStore:
+    """
+    Estado de rate limit compartido entre procesos en SQLite
+
+    Cada comprobación es una transacción BEGIN IMMEDIATE sobre una fila
+    (usuario, regla), de modo que varios procesos workers aplican los
+    mismos límites.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS rate_limit_state (
+                user_id TEXT NOT NULL,
+                rule_id TEXT NOT NULL,
+                tat REAL NOT NULL DEFAULT 0,
+                burst_tat REAL NOT NULL DEFAULT 0,
+                cooldown_until REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, rule_id)
+            )
+        """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_rate_limit_cooldown "
+            "ON rate_limit_state(cooldown_until)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Conexión persistente del hilo actual"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def locked(self, user_id: str, rule_id: str) -> Iterator[RateLimitState]:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tat, burst_tat, cooldown_until FROM rate_limit_state "
+                "WHERE user_id = ? AND rule_id = ?",
+                (user_id, rule_id),
+            ).fetchone()
+            state = RateLimitState(*row) if row else RateLimitState()
+            original = state.as_tuple()
+            yield state
+            if state.as_tuple() != original:
+                conn.execute(
+                    """
+                    INSERT INTO rate_limit_state
+                    (user_id, rule_id, tat, burst_tat, cooldown_until)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(user_id, rule_id) DO UPDATE SET
+                        tat = excluded.tat,
+                        burst_tat = excluded.burst_tat,
+                        cooldown_until = excluded.cooldown_until
+                """,
+                    (user_id, rule_id) + state.as_tuple(),
+                )
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    def get(self, user_id: str, rule_id: str) -> Optional[RateLimitState]:
+        row = self._connection().execute(
+            "SELECT tat, burst_tat, cooldown_until FROM rate_limit_state "
+            "WHERE user_id = ? AND rule_id = ?",
+            (user_id, rule_id),
+        ).fetchone()
+        return RateLimitState(*row) if row else None
+
+    def reset_user(self, user_id: str):
+        self._connection().execute(
+            "DELETE FROM rate_limit_state WHERE user_id = ?", (user_id,)
+        )
+
+    def total_users(self) -> int:
+        return self._connection().execute(
+            "SELECT COUNT(DISTINCT user_id) FROM rate_limit_state"
+        ).fetchone()[0]
+
+    def users_in_cooldown(self, now: float) -> int:
+        return self._connection().execute(
+            "SELECT COUNT(DISTINCT user_id) FROM rate_limit_state WHERE cooldown_until > ?",
+            (now,),
+        ).fetchone()[0]
+
 
-    def __init__(self, config_path: str = "shaili_ai/config/rate_limits.json"):
+class RateLimiter:
+    """
+    Sistema de rate limiting
+
+    Usa GCRA (equivalente a un token bucket) con estado constante por
+    (usuario, regla): max_requests por time_window como límite sostenido y
+    burst_limit por minuto como límite de ráfaga. Con shared_state_path el
+    estado vive en SQLite y lo comparten todos los procesos.
+    """
+
+    def __init__(
+        self,
+        config_path: str = "shaili_ai/config/rate_limits.json",
+        shared_state_path: Optional[str] = None,
+        lock_stripes: int = 64,
+        max_violation_history: int = 10000,
+    ):
         self.config_path = Path(config_path)
         self.lock = threading.Lock()
 
         # Configuración de rate limits
         self.rules: Dict[str, RateLimitRule] = {}
+        self.shared_state_path = shared_state_path
 
-        # Almacenamiento de requests por usuario
-        self.user_requests: Dict[str, Dict[str, deque]] = defaultdict(
-            lambda: defaultdict(deque)
-        )
-
-        # Historial de violaciones
-        self.violations: List[RateLimitViolation] = []
-
-        # Usuarios en cooldown
-        self.cooldown_users: Dict[str, Dict[str, datetime]] = defaultdict(dict)
+        # Historial de violaciones (acotado) y contadores por regla
+        self.violations: deque = deque(maxlen=max_violation_history)
+        self.violations_by_rule: Dict[str, int] = defaultdict(int)
 
         # Cargar configuración
         self._load_config()
 
+        # Estado GCRA por (usuario, regla)
+        if self.shared_state_path:
+            self.store = SQLiteRateLimitStore(self.shared_state_path)
+        else:
+            self.store = MemoryRateLimitStore(lock_stripes)
+
         logger.info("🚦 Sistema de rate limiting inicializado")
 
     def _load_config(self):
@@ -83,6 +281,10 @@ class RateLimiter:
             with open(self.config_path, "r", encoding="utf-8") as f:
                 config_data = json.load(f)
 
+            self.shared_state_path = self.shared_state_path or config_data.get(
+                "shared_state_path"
+            )
+
             for rule_data in config_data.get("rules", []):
                 rule = RateLimitRule(
                     rule_id=rule_data["rule_id"],
@@ -151,6 +353,7 @@ class RateLimiter:
     def _save_config(self):
         """Guardar configuración"""
         config_data = {
+            "shared_state_path": self.shared_state_path,
             "rules": [
                 {
                     "rule_id": rule.rule_id,
@@ -171,91 +374,72 @@ class RateLimiter:
         with open(self.config_path, "w", encoding="utf-8") as f:
             json.dump(config_data, f, indent=2)
 
-    def _cleanup_old_requests(self, user_id: str, rule_id: str):
-        """Limpiar requests antiguos"""
-        current_time = time.time()
-        rule = self.rules.get(rule_id)
-        if not rule:
-            return
-
-        # Remover requests fuera de la ventana de tiempo
-        cutoff_time = current_time - rule.config.time_window
-        requests = self.user_requests[user_id][rule_id]
-
-        while requests and requests[0] < cutoff_time:
-            requests.popleft()
-
-    def _is_in_cooldown(self, user_id: str, rule_id: str) -> bool:
-        """Verificar si usuario está en cooldown"""
-        if user_id in self.cooldown_users and rule_id in self.cooldown_users[user_id]:
-            cooldown_until = self.cooldown_users[user_id][rule_id]
-            if datetime.now() < cooldown_until:
-                return True
-            else:
-                # Remover cooldown expirado
-                del self.cooldown_users[user_id][rule_id]
-        return False
+    @staticmethod
+    def _limits(rule: RateLimitRule) -> Tuple[float, float, float, float]:
+        """
+        Parámetros GCRA de una regla
+
+        Returns:
+            (intervalo, tolerancia, intervalo de ráfaga, tolerancia de ráfaga)
+        """
+        config = rule.config
+        interval = config.time_window / max(config.max_requests, 1)
+        burst_interval = BURST_WINDOW / max(config.burst_limit, 1)
+        return (
+            interval,
+            config.time_window - interval,
+            burst_interval,
+            BURST_WINDOW - burst_interval,
+        )
 
     def check_rate_limit(
         self, user_id: str, rule_id: str
     ) -> Tuple[bool, Optional[str]]:
         """Verificar rate limit para usuario y regla"""
         try:
-            with self.lock:
-                rule = self.rules.get(rule_id)
-                if not rule or not rule.enabled:
-                    return True, None  # Sin límite
-
-                # Verificar cooldown
-                if self._is_in_cooldown(user_id, rule_id):
-                    cooldown_until = self.cooldown_users[user_id][rule_id]
-                    return False, f"Usuario en cooldown hasta {cooldown_until}"
+            rule = self.rules.get(rule_id)
+            if not rule or not rule.enabled:
+                return True, None  # Sin límite
 
-                # Limpiar requests antiguos
-                self._cleanup_old_requests(user_id, rule_id)
+            interval, tolerance, burst_interval, burst_tolerance = self._limits(rule)
 
-                # Obtener requests actuales
-                requests = self.user_requests[user_id][rule_id]
-                current_count = len(requests)
+            with self.store.locked(user_id, rule_id) as state:
+                now = time.time()
 
-                # Verificar límite
-                if current_count >= rule.config.max_requests:
-                    # Aplicar cooldown
-                    cooldown_until = datetime.now() + timedelta(
-                        seconds=rule.config.cooldown_period
-                    )
-                    self.cooldown_users[user_id][rule_id] = cooldown_until
-
-                    # Registrar violación
-                    violation = RateLimitViolation(
-                        user_id=user_id,
-                        rule_id=rule_id,
-                        timestamp=datetime.now(),
-                        request_count=current_count,
-                        max_allowed=rule.config.max_requests,
-                        time_window=rule.config.time_window,
-                        cooldown_until=cooldown_until,
-                    )
-                    self.violations.append(violation)
-
-                    logger.warning(f"🚫 Rate limit violado: {user_id} - {rule_id}")
-                    return (
-                        False,
-                        f"Rate limit excedido. Cooldown hasta {cooldown_until}",
-                    )
-
-                # Verificar burst limit
-                if current_count >= rule.config.burst_limit:
-                    # Verificar si hay requests recientes
-                    current_time = time.time()
-                    recent_requests = sum(
-                        1 for req_time in requests if current_time - req_time < 60
-                    )  # últimos 60 segundos
+                # Verificar cooldown
+                if state.cooldown_until > now:
+                    cooldown_until = datetime.fromtimestamp(state.cooldown_until)
+                    return False, f"Usuario en cooldown hasta {cooldown_until}"
 
-                    if recent_requests >= rule.config.burst_limit:
+                # Límite sostenido: la siguiente petición llegaría demasiado pronto
+                if now < state.tat - tolerance:
+                    state.cooldown_until = now + rule.config.cooldown_period
+                    cooldown_until = datetime.fromtimestamp(state.cooldown_until)
+                    current_count = self._estimate_requests(state.tat, now, interval)
+                else:
+                    # Verificar burst limit
+                    if now < state.burst_tat - burst_tolerance:
                         return False, "Burst limit excedido. Intente más tarde"
+                    return True, None
+
+            # Registrar violación
+            self._record_violation(
+                RateLimitViolation(
+                    user_id=user_id,
+                    rule_id=rule_id,
+                    timestamp=datetime.now(),
+                    request_count=current_count,
+                    max_allowed=rule.config.max_requests,
+                    time_window=rule.config.time_window,
+                    cooldown_until=cooldown_until,
+                )
+            )
 
-                return True, None
+            logger.warning(f"🚫 Rate limit violado: {user_id} - {rule_id}")
+            return (
+                False,
+                f"Rate limit excedido. Cooldown hasta {cooldown_until}",
+            )
 
         except Exception as e:
             logger.error(f"❌ Error verificando rate limit: {e}")
@@ -264,27 +448,41 @@ class RateLimiter:
     def record_request(self, user_id: str, rule_id: str) -> bool:
         """Registrar request de usuario"""
         try:
-            with self.lock:
-                current_time = time.time()
-                self.user_requests[user_id][rule_id].append(current_time)
-
-                # Limitar tamaño del historial
-                max_history = (
-                    self.rules.get(
-                        rule_id, RateLimitRule("", "", RateLimitConfig(100, 3600))
-                    ).config.max_requests
-                    * 2
+            rule = self.rules.get(
+                rule_id, RateLimitRule("", "", RateLimitConfig(100, 3600))
+            )
+            interval, _, burst_interval, _ = self._limits(rule)
+
+            with self.store.locked(user_id, rule_id) as state:
+                now = time.time()
+                # La deuda acumulada se limita a dos ventanas (2 * max_requests
+                # intervalos), como el historial de 2 * max_requests de antes
+                state.tat = min(
+                    max(state.tat, now) + interval,
+                    now + 2 * rule.config.time_window,
+                )
+                state.burst_tat = min(
+                    max(state.burst_tat, now) + burst_interval, now + BURST_WINDOW * 2
                 )
-                requests = self.user_requests[user_id][rule_id]
-                while len(requests) > max_history:
-                    requests.popleft()
 
-                return True
+            return True
 
         except Exception as e:
             logger.error(f"❌ Error registrando request: {e}")
             return False
 
+    @staticmethod
+    def _estimate_requests(tat: float, now: float, interval: float) -> int:
+        """Peticiones equivalentes aún dentro de la ventana según el TAT"""
+        if tat <= now:
+            return 0
+        return int(-(-(tat - now) // interval))
+
+    def _record_violation(self, violation: RateLimitViolation):
+        with self.lock:
+            self.violations.append(violation)
+            self.violations_by_rule[violation.rule_id] += 1
+
     def get_user_stats(self, user_id: str) -> Dict[str, Any]:
         """Obtener estadísticas de usuario"""
         try:
@@ -292,34 +490,26 @@ class RateLimiter:
             current_time = time.time()
 
             for rule_id, rule in self.rules.items():
-                if rule_id in self.user_requests[user_id]:
-                    requests = self.user_requests[user_id][rule_id]
-
-                    # Limpiar requests antiguos
-                    cutoff_time = current_time - rule.config.time_window
-                    recent_requests = [
-                        req_time for req_time in requests if req_time >= cutoff_time
-                    ]
-
-                    stats[rule_id] = {
-                        "current_requests": len(recent_requests),
-                        "max_requests": rule.config.max_requests,
-                        "time_window": rule.config.time_window,
-                        "burst_limit": rule.config.burst_limit,
-                        "in_cooldown": self._is_in_cooldown(user_id, rule_id),
-                        "cooldown_until": self.cooldown_users.get(user_id, {}).get(
-                            rule_id
-                        ),
-                    }
-                else:
-                    stats[rule_id] = {
-                        "current_requests": 0,
-                        "max_requests": rule.config.max_requests,
-                        "time_window": rule.config.time_window,
-                        "burst_limit": rule.config.burst_limit,
-                        "in_cooldown": False,
-                        "cooldown_until": None,
-                    }
+                state = self.store.get(user_id, rule_id)
+                interval = self._limits(rule)[0]
+                in_cooldown = bool(state and state.cooldown_until > current_time)
+
+                stats[rule_id] = {
+                    "current_requests": (
+                        self._estimate_requests(state.tat, current_time, interval)
+                        if state
+                        else 0
+                    ),
+                    "max_requests": rule.config.max_requests,
+                    "time_window": rule.config.time_window,
+                    "burst_limit": rule.config.burst_limit,
+                    "in_cooldown": in_cooldown,
+                    "cooldown_until": (
+                        datetime.fromtimestamp(state.cooldown_until)
+                        if in_cooldown
+                        else None
+                    ),
+                }
 
             return stats
 
@@ -330,25 +520,16 @@ class RateLimiter:
     def get_system_stats(self) -> Dict[str, Any]:
         """Obtener estadísticas del sistema"""
         try:
-            total_users = len(self.user_requests)
-            total_violations = len(self.violations)
-
-            # Violaciones por regla
-            violations_by_rule = defaultdict(int)
-            for violation in self.violations:
-                violations_by_rule[violation.rule_id] += 1
-
-            # Usuarios en cooldown
-            users_in_cooldown = sum(
-                1 for user_cooldowns in self.cooldown_users.values() if user_cooldowns
-            )
+            with self.lock:
+                violations_by_rule = dict(self.violations_by_rule)
 
             return {
-                "total_users": total_users,
-                "total_violations": total_violations,
-                "violations_by_rule": dict(violations_by_rule),
-                "users_in_cooldown": users_in_cooldown,
+                "total_users": self.store.total_users(),
+                "total_violations": sum(violations_by_rule.values()),
+                "violations_by_rule": violations_by_rule,
+                "users_in_cooldown": self.store.users_in_cooldown(time.time()),
                 "active_rules": len([r for r in self.rules.values() if r.enabled]),
+                "shared_state": bool(self.shared_state_path),
                 "last_updated": datetime.now().isoformat(),
             }
 
@@ -427,15 +608,10 @@ class RateLimiter:
     def reset_user_limits(self, user_id: str) -> bool:
         """Resetear límites de usuario"""
         try:
-            with self.lock:
-                if user_id in self.user_requests:
-                    del self.user_requests[user_id]
-
-                if user_id in self.cooldown_users:
-                    del self.cooldown_users[user_id]
+            self.store.reset_user(user_id)
 
-                logger.info(f"✅ Límites reseteados para usuario: {user_id}")
-                return True
+            logger.info(f"✅ Límites reseteados para usuario: {user_id}")
+            return True
 
         except Exception as e:
             logger.error(f"❌ Error reseteando límites de usuario: {e}")
@@ -448,9 +624,13 @@ class RateLimiter:
                 cutoff_date = datetime.now() - timedelta(days=days)
                 original_count = len(self.violations)
 
-                self.violations = [
-                    v for v in self.violations if v.timestamp >= cutoff_date
-                ]
+                self.violations = deque(
+                    (v for v in self.violations if v.timestamp >= cutoff_date),
+                    maxlen=self.violations.maxlen,
+                )
+                self.violations_by_rule = defaultdict(int)
+                for violation in self.violations:
+                    self.violations_by_rule[violation.rule_id] += 1
 
                 cleared_count = original_count - len(self.violations)
                 logger.info(f"✅ {cleared_count} violaciones limpiadas")
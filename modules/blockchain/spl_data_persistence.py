@@ -6,17 +6,26 @@ Almacenamiento persistente de transacciones, cuentas y balances
 """
 
 import json
+import queue
 import sqlite3
 import logging
 from pathlib import Path
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass, asdict
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
 import threading
 from contextlib import contextmanager
 
 logger = logging.getLogger(__name__)
 
+# Filas por lote al rellenar las columnas de epoch de bases de datos antiguas
+EPOCH_BACKFILL_BATCH_SIZE = 10000
+
+
+def to_epoch(moment: Optional[datetime]) -> Optional[int]:
+    """Segundos desde epoch de un datetime (hora local si no tiene zona)"""
+    return int(moment.timestamp()) if moment else None
+
 
 @dataclass
 class TokenAccountRecord:
@@ -66,12 +75,28 @@ class TokenBalanceRecord:
 
 
 class SPLDataPersistence:
-    """Sistema de persistencia de datos para SPL"""
-
-    def __init__(self, db_path: str = "shaili_ai/data/spl_database.db"):
+    """
+    Sistema de persistencia de datos para SPL
+
+    La base de datos usa WAL: cada hilo escritor mantiene una conexión
+    abierta y las lecturas toman conexiones de un pool, así que leer no
+    bloquea a los escritores. Dentro de batch() todas las escrituras del
+    hilo se confirman en un único commit.
+    """
+
+    def __init__(
+        self, db_path: str = "shaili_ai/data/spl_database.db", read_pool_size: int = 4
+    ):
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self.lock = threading.Lock()
+        self.lock = threading.RLock()
+        self.read_pool_size = read_pool_size
+
+        # Conexión de escritura por hilo y pool de conexiones de lectura
+        self._local = threading.local()
+        self._read_pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
 
         # Inicializar base de datos
         self._init_database()
@@ -80,8 +105,11 @@ class SPLDataPersistence:
 
     def _init_database(self):
         """Inicializar base de datos"""
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
+        # El modo WAL queda guardado en el archivo de la base de datos
+        # (no se puede cambiar dentro de una transacción)
+        self._get_write_connection().execute("PRAGMA journal_mode=WAL")
+
+        with self._write_transaction() as cursor:
 
             # Tabla de cuentas de token
             cursor.execute(
@@ -118,10 +146,34 @@ class SPLDataPersistence:
                     confirmation_status TEXT,
                     created_at TIMESTAMP NOT NULL,
                     confirmed_at TIMESTAMP,
-                    metadata TEXT
+                    metadata TEXT,
+                    created_at_epoch INTEGER,
+                    confirmed_at_epoch INTEGER
+                )
+            """
+            )
+            self._migrate_transaction_epochs(cursor)
+
+            # Agregados diarios por tipo y estado para los resúmenes
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                "AND name = 'transaction_daily_rollups'"
+            )
+            rollups_exist = cursor.fetchone() is not None
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS transaction_daily_rollups (
+                    day TEXT NOT NULL,
+                    transaction_type TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    transaction_count INTEGER NOT NULL DEFAULT 0,
+                    total_fees REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (day, transaction_type, status)
                 )
             """
             )
+            if not rollups_exist:
+                self._rebuild_daily_rollups(cursor)
 
             # Tabla de balances
             cursor.execute(
@@ -165,6 +217,13 @@ class SPLDataPersistence:
             cursor.execute(
                 "CREATE INDEX IF NOT EXISTS idx_transactions_created ON transactions(created_at)"
             )
+            # Índice de cobertura: el resumen no necesita leer la tabla
+            cursor.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_transactions_summary
+                ON transactions(created_at_epoch, transaction_type, status, fee)
+            """
+            )
             cursor.execute(
                 "CREATE INDEX IF NOT EXISTS idx_balances_user ON token_balances(user_id)"
             )
@@ -172,48 +231,248 @@ class SPLDataPersistence:
                 "CREATE INDEX IF NOT EXISTS idx_balances_mint ON token_balances(token_mint)"
             )
 
-            conn.commit()
+    def _migrate_transaction_epochs(self, cursor: sqlite3.Cursor):
+        """Añadir y rellenar las columnas de epoch en bases de datos antiguas"""
+        cursor.execute("PRAGMA table_info(transactions)")
+        columns = {row["name"] for row in cursor.fetchall()}
+
+        for column in ("created_at_epoch", "confirmed_at_epoch"):
+            if column not in columns:
+                cursor.execute(f"ALTER TABLE transactions ADD COLUMN {column} INTEGER")
+
+        # Las fechas ISO son hora local: se convierten en Python, no en SQL
+        last_rowid = 0
+        updated = 0
+        while True:
+            cursor.execute(
+                """
+                SELECT rowid, created_at, confirmed_at FROM transactions
+                WHERE created_at_epoch IS NULL AND rowid > ?
+                ORDER BY rowid LIMIT ?
+            """,
+                (last_rowid, EPOCH_BACKFILL_BATCH_SIZE),
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+
+            cursor.executemany(
+                """
+                UPDATE transactions SET created_at_epoch = ?, confirmed_at_epoch = ?
+                WHERE rowid = ?
+            """,
+                [
+                    (
+                        to_epoch(datetime.fromisoformat(row["created_at"])),
+                        (
+                            to_epoch(datetime.fromisoformat(row["confirmed_at"]))
+                            if row["confirmed_at"]
+                            else None
+                        ),
+                        row["rowid"],
+                    )
+                    for row in rows
+                ],
+            )
+            last_rowid = rows[-1]["rowid"]
+            updated += len(rows)
+
+        if updated:
+            logger.info(f"🔄 Columnas de epoch rellenadas en {updated} transacciones")
+
+    def _rebuild_daily_rollups(self, cursor: sqlite3.Cursor):
+        """Recalcular los agregados diarios desde la tabla de transacciones"""
+        cursor.execute("DELETE FROM transaction_daily_rollups")
+        cursor.execute(
+            """
+            INSERT INTO transaction_daily_rollups
+            (day, transaction_type, status, transaction_count, total_fees)
+            SELECT substr(created_at, 1, 10), transaction_type, status,
+                   COUNT(*), COALESCE(SUM(fee), 0)
+            FROM transactions
+            GROUP BY substr(created_at, 1, 10), transaction_type, status
+        """
+        )
+
+    def _apply_daily_rollup(
+        self,
+        cursor: sqlite3.Cursor,
+        created_at: datetime,
+        transaction_type: str,
+        status: str,
+        count_delta: int,
+        fee_delta: Optional[float],
+    ):
+        """Sumar (o restar) una transacción al agregado de su día"""
+        cursor.execute(
+            """
+            INSERT INTO transaction_daily_rollups
+            (day, transaction_type, status, transaction_count, total_fees)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(day, transaction_type, status) DO UPDATE SET
+                transaction_count = transaction_count + excluded.transaction_count,
+                total_fees = total_fees + excluded.total_fees
+        """,
+            (
+                created_at.date().isoformat(),
+                transaction_type,
+                status,
+                count_delta,
+                fee_delta or 0,
+            ),
+        )
+
+    def _open_connection(self) -> sqlite3.Connection:
+        """Abrir una conexión configurada para WAL"""
+        conn = sqlite3.connect(
+            self.db_path, check_same_thread=False, isolation_level=None, timeout=30
+        )
+        conn.row_factory = sqlite3.Row
+        # En WAL, synchronous=NORMAL solo sincroniza en los checkpoints
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        with self._connections_lock:
+            self._connections.append(conn)
+        return conn
+
+    def _get_write_connection(self) -> sqlite3.Connection:
+        """Conexión de escritura del hilo actual (se abre una sola vez)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open_connection()
+            self._local.conn = conn
+            self._local.batch_depth = 0
+        return conn
+
+    def _in_batch(self) -> bool:
+        return getattr(self._local, "batch_depth", 0) > 0
 
     @contextmanager
     def _get_connection(self):
-        """Obtener conexión a la base de datos"""
-        conn = sqlite3.connect(self.db_path, check_same_thread=False)
-        conn.row_factory = sqlite3.Row
+        """Obtener una conexión de lectura del pool"""
+        if self._in_batch():
+            # Dentro de un lote se leen también las escrituras sin confirmar
+            yield self._get_write_connection()
+            return
+
+        try:
+            conn = self._read_pool.get_nowait()
+        except queue.Empty:
+            conn = self._open_connection()
         try:
             yield conn
         finally:
-            conn.close()
+            if self._read_pool.qsize() < self.read_pool_size:
+                self._read_pool.put(conn)
+            else:
+                self._close_connection(conn)
+
+    @contextmanager
+    def _write_transaction(self):
+        """
+        Transacción de escritura
+
+        Fuera de un lote hace commit al terminar; dentro de batch() usa un
+        savepoint para que un error deshaga solo esta operación.
+        """
+        with self.lock:
+            conn = self._get_write_connection()
+            cursor = conn.cursor()
+
+            if self._in_batch():
+                cursor.execute("SAVEPOINT spl_operation")
+                try:
+                    yield cursor
+                except Exception:
+                    cursor.execute("ROLLBACK TO spl_operation")
+                    cursor.execute("RELEASE spl_operation")
+                    raise
+                cursor.execute("RELEASE spl_operation")
+                return
+
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                yield cursor
+            except Exception:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    @contextmanager
+    def batch(self):
+        """
+        Agrupar escrituras en un único commit
+
+        Ejemplo:
+            with persistence.batch():
+                for tx in transactions:
+                    persistence.save_transaction(tx)
+                    persistence.update_token_balance(...)
+
+        Las operaciones que fallan dentro del lote se deshacen
+        individualmente (devuelven False como fuera del lote). Si el bloque
+        lanza una excepción se deshace el lote completo. Otros hilos
+        esperan a que termine para escribir.
+        """
+        with self.lock:
+            conn = self._get_write_connection()
+            if self._local.batch_depth == 0:
+                conn.execute("BEGIN IMMEDIATE")
+            self._local.batch_depth += 1
+            try:
+                yield self
+            except Exception:
+                self._local.batch_depth -= 1
+                if self._local.batch_depth == 0:
+                    conn.rollback()
+                raise
+            self._local.batch_depth -= 1
+            if self._local.batch_depth == 0:
+                conn.commit()
+
+    def _close_connection(self, conn: sqlite3.Connection):
+        with self._connections_lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        conn.close()
+
+    def close(self):
+        """Cerrar todas las conexiones abiertas"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._read_pool = queue.Queue()
+        self._local = threading.local()
 
     def save_token_account(self, account: TokenAccountRecord) -> bool:
         """Guardar cuenta de token"""
         try:
-            with self.lock:
-                with self._get_connection() as conn:
-                    cursor = conn.cursor()
-
-                    cursor.execute(
-                        """
-                        INSERT OR REPLACE INTO token_accounts 
-                        (user_id, token_account, associated_token_account, mint_address, 
-                         balance, created_at, last_updated, is_active)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                        (
-                            account.user_id,
-                            account.token_account,
-                            account.associated_token_account,
-                            account.mint_address,
-                            account.balance,
-                            account.created_at.isoformat(),
-                            account.last_updated.isoformat(),
-                            account.is_active,
-                        ),
-                    )
-
-                    conn.commit()
+            with self._write_transaction() as cursor:
+                cursor.execute(
+                    """
+                    INSERT OR REPLACE INTO token_accounts 
+                    (user_id, token_account, associated_token_account, mint_address, 
+                     balance, created_at, last_updated, is_active)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                    (
+                        account.user_id,
+                        account.token_account,
+                        account.associated_token_account,
+                        account.mint_address,
+                        account.balance,
+                        account.created_at.isoformat(),
+                        account.last_updated.isoformat(),
+                        account.is_active,
+                    ),
+                )
 
-                    logger.info(f"✅ Cuenta de token guardada: {account.user_id}")
-                    return True
+                logger.info(f"✅ Cuenta de token guardada: {account.user_id}")
+                return True
 
         except Exception as e:
             logger.error(f"❌ Error guardando cuenta de token: {e}")
@@ -255,45 +514,40 @@ class SPLDataPersistence:
     ) -> bool:
         """Actualizar balance de token"""
         try:
-            with self.lock:
-                with self._get_connection() as conn:
-                    cursor = conn.cursor()
-
-                    now = datetime.now()
-
-                    # Actualizar cuenta de token
-                    cursor.execute(
-                        """
-                        UPDATE token_accounts 
-                        SET balance = ?, last_updated = ?
-                        WHERE user_id = ? AND mint_address = ?
-                    """,
-                        (new_balance, now.isoformat(), user_id, token_mint),
-                    )
+            with self._write_transaction() as cursor:
+                now = datetime.now()
 
-                    # Actualizar balance
-                    cursor.execute(
-                        """
-                        INSERT OR REPLACE INTO token_balances 
-                        (user_id, token_mint, balance, last_updated, transaction_count)
-                        VALUES (?, ?, ?, ?, 
-                            COALESCE((SELECT transaction_count FROM token_balances 
-                                     WHERE user_id = ? AND token_mint = ?), 0) + 1)
-                    """,
-                        (
-                            user_id,
-                            token_mint,
-                            new_balance,
-                            now.isoformat(),
-                            user_id,
-                            token_mint,
-                        ),
-                    )
+                # Actualizar cuenta de token
+                cursor.execute(
+                    """
+                    UPDATE token_accounts 
+                    SET balance = ?, last_updated = ?
+                    WHERE user_id = ? AND mint_address = ?
+                """,
+                    (new_balance, now.isoformat(), user_id, token_mint),
+                )
 
-                    conn.commit()
+                # Actualizar balance
+                cursor.execute(
+                    """
+                    INSERT OR REPLACE INTO token_balances 
+                    (user_id, token_mint, balance, last_updated, transaction_count)
+                    VALUES (?, ?, ?, ?, 
+                        COALESCE((SELECT transaction_count FROM token_balances 
+                                 WHERE user_id = ? AND token_mint = ?), 0) + 1)
+                """,
+                    (
+                        user_id,
+                        token_mint,
+                        new_balance,
+                        now.isoformat(),
+                        user_id,
+                        token_mint,
+                    ),
+                )
 
-                    logger.info(f"✅ Balance actualizado: {user_id} = {new_balance}")
-                    return True
+                logger.info(f"✅ Balance actualizado: {user_id} = {new_balance}")
+                return True
 
         except Exception as e:
             logger.error(f"❌ Error actualizando balance: {e}")
@@ -302,52 +556,58 @@ class SPLDataPersistence:
     def save_transaction(self, transaction: TransactionRecord) -> bool:
         """Guardar transacción"""
         try:
-            with self.lock:
-                with self._get_connection() as conn:
-                    cursor = conn.cursor()
-
-                    cursor.execute(
-                        """
-                        INSERT INTO transactions 
-                        (transaction_id, signature, from_user, to_user, amount, token_mint,
-                         transaction_type, reason, status, block_height, fee, slot,
-                         confirmation_status, created_at, confirmed_at, metadata)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
+            with self._write_transaction() as cursor:
+                cursor.execute(
+                    """
+                    INSERT INTO transactions 
+                    (transaction_id, signature, from_user, to_user, amount, token_mint,
+                     transaction_type, reason, status, block_height, fee, slot,
+                     confirmation_status, created_at, confirmed_at, metadata,
+                     created_at_epoch, confirmed_at_epoch)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                    (
+                        transaction.transaction_id,
+                        transaction.signature,
+                        transaction.from_user,
+                        transaction.to_user,
+                        transaction.amount,
+                        transaction.token_mint,
+                        transaction.transaction_type,
+                        transaction.reason,
+                        transaction.status,
+                        transaction.block_height,
+                        transaction.fee,
+                        transaction.slot,
+                        transaction.confirmation_status,
+                        transaction.created_at.isoformat(),
                         (
-                            transaction.transaction_id,
-                            transaction.signature,
-                            transaction.from_user,
-                            transaction.to_user,
-                            transaction.amount,
-                            transaction.token_mint,
-                            transaction.transaction_type,
-                            transaction.reason,
-                            transaction.status,
-                            transaction.block_height,
-                            transaction.fee,
-                            transaction.slot,
-                            transaction.confirmation_status,
-                            transaction.created_at.isoformat(),
-                            (
-                                transaction.confirmed_at.isoformat()
-                                if transaction.confirmed_at
-                                else None
-                            ),
-                            (
-                                json.dumps(transaction.metadata)
-                                if transaction.metadata
-                                else None
-                            ),
+                            transaction.confirmed_at.isoformat()
+                            if transaction.confirmed_at
+                            else None
                         ),
-                    )
-
-                    conn.commit()
+                        (
+                            json.dumps(transaction.metadata)
+                            if transaction.metadata
+                            else None
+                        ),
+                        to_epoch(transaction.created_at),
+                        to_epoch(transaction.confirmed_at),
+                    ),
+                )
+                self._apply_daily_rollup(
+                    cursor,
+                    transaction.created_at,
+                    transaction.transaction_type,
+                    transaction.status,
+                    1,
+                    transaction.fee,
+                )
 
-                    logger.info(
-                        f"✅ Transacción guardada: {transaction.transaction_id}"
-                    )
-                    return True
+                logger.info(
+                    f"✅ Transacción guardada: {transaction.transaction_id}"
+                )
+                return True
 
         except Exception as e:
             logger.error(f"❌ Error guardando transacción: {e}")
@@ -494,37 +754,59 @@ class SPLDataPersistence:
     ) -> bool:
         """Actualizar estado de transacción"""
         try:
-            with self.lock:
-                with self._get_connection() as conn:
-                    cursor = conn.cursor()
-
-                    now = datetime.now()
-
-                    cursor.execute(
-                        """
-                        UPDATE transactions 
-                        SET status = ?, signature = ?, block_height = ?, fee = ?, 
-                            slot = ?, confirmation_status = ?, confirmed_at = ?
-                        WHERE transaction_id = ?
-                    """,
-                        (
-                            status,
-                            signature,
-                            block_height,
-                            fee,
-                            slot,
-                            confirmation_status,
-                            now.isoformat(),
-                            transaction_id,
-                        ),
-                    )
+            with self._write_transaction() as cursor:
+                now = datetime.now()
 
-                    conn.commit()
+                cursor.execute(
+                    """
+                    SELECT created_at, transaction_type, status, fee
+                    FROM transactions WHERE transaction_id = ?
+                """,
+                    (transaction_id,),
+                )
+                previous = cursor.fetchone()
 
-                    logger.info(
-                        f"✅ Estado de transacción actualizado: {transaction_id} = {status}"
+                cursor.execute(
+                    """
+                    UPDATE transactions 
+                    SET status = ?, signature = ?, block_height = ?, fee = ?, 
+                        slot = ?, confirmation_status = ?, confirmed_at = ?,
+                        confirmed_at_epoch = ?
+                    WHERE transaction_id = ?
+                """,
+                    (
+                        status,
+                        signature,
+                        block_height,
+                        fee,
+                        slot,
+                        confirmation_status,
+                        now.isoformat(),
+                        to_epoch(now),
+                        transaction_id,
+                    ),
+                )
+
+                # Mover la transacción al agregado de su nuevo estado y fee
+                if previous:
+                    created_at = datetime.fromisoformat(previous["created_at"])
+                    transaction_type = previous["transaction_type"]
+                    self._apply_daily_rollup(
+                        cursor,
+                        created_at,
+                        transaction_type,
+                        previous["status"],
+                        -1,
+                        -(previous["fee"] or 0),
+                    )
+                    self._apply_daily_rollup(
+                        cursor, created_at, transaction_type, status, 1, fee
                     )
-                    return True
+
+                logger.info(
+                    f"✅ Estado de transacción actualizado: {transaction_id} = {status}"
+                )
+                return True
 
         except Exception as e:
             logger.error(f"❌ Error actualizando estado de transacción: {e}")
@@ -541,34 +823,29 @@ class SPLDataPersistence:
     ) -> bool:
         """Guardar estadísticas del token"""
         try:
-            with self.lock:
-                with self._get_connection() as conn:
-                    cursor = conn.cursor()
-
-                    now = datetime.now()
-
-                    cursor.execute(
-                        """
-                        INSERT OR REPLACE INTO token_statistics 
-                        (token_mint, total_supply, circulating_supply, burned_supply,
-                         total_accounts, total_transactions, last_updated)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                    """,
-                        (
-                            token_mint,
-                            total_supply,
-                            circulating_supply,
-                            burned_supply,
-                            total_accounts,
-                            total_transactions,
-                            now.isoformat(),
-                        ),
-                    )
+            with self._write_transaction() as cursor:
+                now = datetime.now()
 
-                    conn.commit()
+                cursor.execute(
+                    """
+                    INSERT OR REPLACE INTO token_statistics 
+                    (token_mint, total_supply, circulating_supply, burned_supply,
+                     total_accounts, total_transactions, last_updated)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                    (
+                        token_mint,
+                        total_supply,
+                        circulating_supply,
+                        burned_supply,
+                        total_accounts,
+                        total_transactions,
+                        now.isoformat(),
+                    ),
+                )
 
-                    logger.info(f"✅ Estadísticas guardadas para {token_mint}")
-                    return True
+                logger.info(f"✅ Estadísticas guardadas para {token_mint}")
+                return True
 
         except Exception as e:
             logger.error(f"❌ Error guardando estadísticas: {e}")
@@ -605,58 +882,58 @@ class SPLDataPersistence:
             return None
 
     def get_transaction_summary(self, days: int = 30) -> Dict[str, Any]:
-        """Obtener resumen de transacciones"""
+        """
+        Obtener resumen de transacciones
+
+        Los días completos se leen de los agregados diarios y solo el día
+        parcial inicial recorre transacciones (con el índice de cobertura),
+        así que el coste depende del número de días, no de transacciones.
+        """
         try:
             with self._get_connection() as conn:
                 cursor = conn.cursor()
 
                 since_date = datetime.now() - timedelta(days=days)
+                first_full_day = since_date.date() + timedelta(days=1)
 
-                # Total de transacciones
                 cursor.execute(
                     """
-                    SELECT COUNT(*) as total FROM transactions 
-                    WHERE created_at >= ?
+                    SELECT transaction_type, status,
+                           COUNT(*) AS count, SUM(fee) AS fees
+                    FROM transactions
+                    WHERE created_at_epoch >= ? AND created_at_epoch < ?
+                    GROUP BY transaction_type, status
+                    UNION ALL
+                    SELECT transaction_type, status,
+                           SUM(transaction_count) AS count, SUM(total_fees) AS fees
+                    FROM transaction_daily_rollups
+                    WHERE day >= ?
+                    GROUP BY transaction_type, status
                 """,
-                    (since_date.isoformat(),),
+                    (
+                        to_epoch(since_date),
+                        to_epoch(datetime.combine(first_full_day, time())),
+                        first_full_day.isoformat(),
+                    ),
                 )
-                total_transactions = cursor.fetchone()["total"]
 
-                # Transacciones por tipo
-                cursor.execute(
-                    """
-                    SELECT transaction_type, COUNT(*) as count FROM transactions 
-                    WHERE created_at >= ?
-                    GROUP BY transaction_type
-                """,
-                    (since_date.isoformat(),),
-                )
-                transactions_by_type = {
-                    row["transaction_type"]: row["count"] for row in cursor.fetchall()
-                }
-
-                # Transacciones por estado
-                cursor.execute(
-                    """
-                    SELECT status, COUNT(*) as count FROM transactions 
-                    WHERE created_at >= ?
-                    GROUP BY status
-                """,
-                    (since_date.isoformat(),),
-                )
-                transactions_by_status = {
-                    row["status"]: row["count"] for row in cursor.fetchall()
-                }
+                total_transactions = 0
+                transactions_by_type: Dict[str, int] = {}
+                transactions_by_status: Dict[str, int] = {}
+                total_fees = 0
 
-                # Total de fees
-                cursor.execute(
-                    """
-                    SELECT SUM(fee) as total_fees FROM transactions 
-                    WHERE created_at >= ? AND fee IS NOT NULL
-                """,
-                    (since_date.isoformat(),),
-                )
-                total_fees = cursor.fetchone()["total_fees"] or 0
+                for row in cursor.fetchall():
+                    count = row["count"]
+                    if not count:
+                        continue
+                    total_transactions += count
+                    transactions_by_type[row["transaction_type"]] = (
+                        transactions_by_type.get(row["transaction_type"], 0) + count
+                    )
+                    transactions_by_status[row["status"]] = (
+                        transactions_by_status.get(row["status"], 0) + count
+                    )
+                    total_fees += row["fees"] or 0
 
                 return {
                     "period_days": days,
@@ -674,12 +951,16 @@ class SPLDataPersistence:
     def backup_database(self, backup_path: str) -> bool:
         """Crear backup de la base de datos"""
         try:
-            import shutil
-
             backup_file = Path(backup_path)
             backup_file.parent.mkdir(parents=True, exist_ok=True)
 
-            shutil.copy2(self.db_path, backup_file)
+            # Copia consistente que incluye las páginas aún en el WAL
+            with self._get_connection() as conn:
+                target = sqlite3.connect(backup_file)
+                try:
+                    conn.backup(target)
+                finally:
+                    target.close()
 
             logger.info(f"✅ Backup creado: {backup_file}")
             return True
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Pruebas del sistema de rate limiting
+
+Comprueban los límites sostenido y de ráfaga, el cooldown, el tope de la
+deuda acumulada y que el estado en SQLite se comparte entre instancias.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from rate_limiter import (
+    MemoryRateLimitStore,
+    RateLimitConfig,
+    RateLimiter,
+    RateLimitRule,
+    SQLiteRateLimitStore,
+)
+
+USER = "usuario_prueba"
+
+
+def _limiter(tmp_path, shared_state_path=None, **config) -> RateLimiter:
+    """RateLimiter con su propia configuración y una regla "prueba" """
+    limiter = RateLimiter(
+        config_path=str(Path(tmp_path) / "rate_limits.json"),
+        shared_state_path=shared_state_path,
+    )
+    limiter.add_rate_limit_rule(
+        RateLimitRule("prueba", "Regla de prueba", RateLimitConfig(**config))
+    )
+    return limiter
+
+
+def _allowed_in_a_row(limiter: RateLimiter, attempts: int) -> int:
+    """Peticiones seguidas permitidas antes del primer rechazo"""
+    for allowed in range(attempts):
+        ok, _ = limiter.check_rate_limit(USER, "prueba")
+        if not ok:
+            return allowed
+        limiter.record_request(USER, "prueba")
+    return attempts
+
+
+def test_sustained_limit_and_cooldown(tmp_path):
+    """Tras max_requests seguidas la siguiente se rechaza y empieza el cooldown"""
+    limiter = _limiter(tmp_path, max_requests=5, time_window=3600, burst_limit=100)
+    assert isinstance(limiter.store, MemoryRateLimitStore)
+
+    assert _allowed_in_a_row(limiter, 10) == 5
+    assert len(limiter.violations) == 1
+    assert limiter.violations[0].max_allowed == 5
+
+    ok, message = limiter.check_rate_limit(USER, "prueba")
+    assert not ok and "cooldown" in message
+    assert limiter.get_user_stats(USER)["prueba"]["in_cooldown"]
+
+    assert limiter.reset_user_limits(USER)
+    assert limiter.check_rate_limit(USER, "prueba") == (True, None)
+
+
+def test_burst_limit(tmp_path):
+    """El límite de ráfaga corta antes que el sostenido y no pone cooldown"""
+    limiter = _limiter(tmp_path, max_requests=100, time_window=3600, burst_limit=2)
+
+    assert _allowed_in_a_row(limiter, 10) == 2
+    ok, message = limiter.check_rate_limit(USER, "prueba")
+    assert not ok and "Burst" in message
+    assert not limiter.get_user_stats(USER)["prueba"]["in_cooldown"]
+    assert len(limiter.violations) == 0
+
+
+def test_accumulated_debt_capped_at_two_windows(tmp_path):
+    """Registrar sin comprobar no acumula más de dos ventanas de deuda"""
+    limiter = _limiter(tmp_path, max_requests=5, time_window=100, burst_limit=100)
+
+    for _ in range(50):
+        assert limiter.record_request(USER, "prueba")
+
+    state = limiter.store.get(USER, "prueba")
+    debt = state.tat - time.time()
+    assert 199 < debt <= 200, debt
+    stats = limiter.get_user_stats(USER)["prueba"]
+    assert stats["current_requests"] == 2 * 5
+
+
+def test_shared_state_between_instances(tmp_path):
+    """Con shared_state_path dos instancias ven el mismo estado"""
+    shared = str(Path(tmp_path) / "rate_state.db")
+    first = _limiter(
+        tmp_path, shared, max_requests=3, time_window=3600, burst_limit=100
+    )
+    second = RateLimiter(
+        config_path=str(Path(tmp_path) / "rate_limits.json"),
+        shared_state_path=shared,
+    )
+    assert isinstance(second.store, SQLiteRateLimitStore)
+    assert "prueba" in second.rules
+
+    assert _allowed_in_a_row(first, 2) == 2
+    assert second.get_user_stats(USER)["prueba"]["current_requests"] == 2
+    assert _allowed_in_a_row(second, 5) == 1
+
+    # El cooldown puesto por una instancia lo respeta la otra
+    ok, message = first.check_rate_limit(USER, "prueba")
+    assert not ok and "cooldown" in message
+    assert second.get_system_stats()["users_in_cooldown"] == 1
+
+    assert first.reset_user_limits(USER)
+    assert second.check_rate_limit(USER, "prueba") == (True, None)
+
+
+def main():
+    """Ejecutar las pruebas sin pytest"""
+    tests = [
+        test_sustained_limit_and_cooldown,
+        test_burst_limit,
+        test_accumulated_debt_capped_at_two_windows,
+        test_shared_state_between_instances,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test(tempfile.mkdtemp(prefix="rate_limiter_test_"))
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
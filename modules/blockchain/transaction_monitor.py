@@ -7,6 +7,7 @@ Monitoreo y alertas de transacciones en tiempo real
 
 import json
 import logging
+import math
 from pathlib import Path
 from typing import Dict, List, Optional, Any, Callable
 from dataclasses import dataclass
@@ -68,6 +69,70 @@ class Alert:
     metadata: Optional[Dict[str, Any]] = None
 
 
+class SlidingWindowCounter:
+    """
+    Contador de eventos en una ventana deslizante por intervalos
+
+    Un anillo de num_buckets intervalos de bucket_seconds segundos con un
+    total acumulado: añadir y contar la ventana completa es O(1)
+    (amortizado), y una subventana suma como mucho num_buckets intervalos.
+    La precisión es de un intervalo.
+    """
+
+    def __init__(self, window_seconds: float, bucket_seconds: float = 10):
+        self.bucket_seconds = bucket_seconds
+        self.num_buckets = max(1, math.ceil(window_seconds / bucket_seconds))
+        self.counts = [0] * self.num_buckets
+        self.head: Optional[int] = None  # índice absoluto del intervalo más reciente
+        self.total = 0
+
+    @property
+    def window_seconds(self) -> float:
+        return self.num_buckets * self.bucket_seconds
+
+    def _advance(self, bucket: int):
+        """Mover el anillo hasta un intervalo, vaciando los que caducan"""
+        if self.head is None:
+            self.head = bucket
+            return
+        if bucket <= self.head:
+            return
+
+        if bucket - self.head >= self.num_buckets:
+            self.counts = [0] * self.num_buckets
+            self.total = 0
+        else:
+            for absolute in range(self.head + 1, bucket + 1):
+                slot = absolute % self.num_buckets
+                self.total -= self.counts[slot]
+                self.counts[slot] = 0
+        self.head = bucket
+
+    def add(self, timestamp: float, amount: int = 1):
+        """Contar un evento en el instante indicado (epoch)"""
+        bucket = int(timestamp // self.bucket_seconds)
+        self._advance(bucket)
+        if bucket <= self.head - self.num_buckets:
+            return  # Fuera de la ventana
+
+        self.counts[bucket % self.num_buckets] += amount
+        self.total += amount
+
+    def count(self, now: Optional[float] = None, window: Optional[float] = None) -> int:
+        """Eventos en los últimos `window` segundos (por defecto la ventana completa)"""
+        now = time.time() if now is None else now
+        self._advance(int(now // self.bucket_seconds))
+
+        if window is None or window >= self.window_seconds:
+            return self.total
+
+        buckets = min(self.num_buckets, math.ceil(window / self.bucket_seconds))
+        return sum(
+            self.counts[(self.head - offset) % self.num_buckets]
+            for offset in range(buckets)
+        )
+
+
 @dataclass
 class MonitoringRule:
     """Regla de monitoreo"""
@@ -90,8 +155,16 @@ class TransactionMonitor:
         # Configuración de monitoreo
         self.monitoring_rules: Dict[str, MonitoringRule] = {}
 
-        # Eventos de transacciones
-        self.transaction_events: List[TransactionEvent] = []
+        # Eventos de transacciones (historial acotado)
+        self.event_history_size = 1000
+        self.transaction_events: deque = deque(maxlen=self.event_history_size)
+
+        # Contadores por ventana de tiempo para evaluar reglas en O(1)
+        self.counter_bucket_seconds = 10
+        self.status_window_seconds = 3600
+        self.user_window_seconds = 300
+        self.status_counters: Dict[TransactionStatus, SlidingWindowCounter] = {}
+        self.user_counters: Dict[str, SlidingWindowCounter] = {}
 
         # Alertas activas
         self.active_alerts: List[Alert] = []
@@ -113,6 +186,7 @@ class TransactionMonitor:
 
         # Cargar configuración
         self._load_config()
+        self._configure_windows()
 
         # Iniciar monitoreo en background
         self._start_background_monitoring()
@@ -129,6 +203,12 @@ class TransactionMonitor:
             self.alert_thresholds = config_data.get(
                 "alert_thresholds", self.alert_thresholds
             )
+            self.event_history_size = config_data.get(
+                "event_history_size", self.event_history_size
+            )
+            self.counter_bucket_seconds = config_data.get(
+                "counter_bucket_seconds", self.counter_bucket_seconds
+            )
 
             # Cargar reglas de monitoreo
             for rule_data in config_data.get("monitoring_rules", []):
@@ -188,6 +268,8 @@ class TransactionMonitor:
         config_data = {
             "enabled": self.monitoring_enabled,
             "alert_thresholds": self.alert_thresholds,
+            "event_history_size": self.event_history_size,
+            "counter_bucket_seconds": self.counter_bucket_seconds,
             "monitoring_rules": [
                 {
                     "rule_id": rule.rule_id,
@@ -205,6 +287,58 @@ class TransactionMonitor:
         with open(self.config_path, "w", encoding="utf-8") as f:
             json.dump(config_data, f, indent=2)
 
+    def _configure_windows(self):
+        """
+        Ajustar historial y ventanas de los contadores a las reglas
+
+        La ventana por estado cubre la mayor time_window de las reglas (y la
+        hora de las métricas generales); la ventana por usuario, la de la
+        regla de actividad sospechosa. Los contadores se reconstruyen a
+        partir del historial de eventos.
+        """
+        status_window = 3600
+        user_window = 0
+        for rule in self.monitoring_rules.values():
+            window = (rule.conditions or {}).get("time_window")
+            if not window:
+                continue
+            status_window = max(status_window, window)
+            if rule.rule_id == "suspicious_activity":
+                user_window = max(user_window, window)
+
+        self.status_window_seconds = status_window
+        self.user_window_seconds = user_window or 300
+
+        if self.transaction_events.maxlen != self.event_history_size:
+            self.transaction_events = deque(
+                self.transaction_events, maxlen=self.event_history_size
+            )
+
+        self.status_counters = {}
+        self.user_counters = {}
+        for event in self.transaction_events:
+            self._count_event(event)
+
+    def _count_event(self, event: TransactionEvent):
+        """Sumar un evento a los contadores por estado y por usuario"""
+        timestamp = event.timestamp.timestamp()
+
+        counter = self.status_counters.get(event.status)
+        if counter is None:
+            counter = SlidingWindowCounter(
+                self.status_window_seconds, self.counter_bucket_seconds
+            )
+            self.status_counters[event.status] = counter
+        counter.add(timestamp)
+
+        counter = self.user_counters.get(event.user_id)
+        if counter is None:
+            counter = SlidingWindowCounter(
+                self.user_window_seconds, self.counter_bucket_seconds
+            )
+            self.user_counters[event.user_id] = counter
+        counter.add(timestamp)
+
     def _start_background_monitoring(self):
         """Iniciar monitoreo en background"""
 
@@ -225,7 +359,9 @@ class TransactionMonitor:
         """Registrar evento de transacción"""
         try:
             with self.lock:
+                # El deque descarta el evento más antiguo al llenarse
                 self.transaction_events.append(event)
+                self._count_event(event)
 
                 # Actualizar métricas
                 self._update_metrics(event)
@@ -233,10 +369,6 @@ class TransactionMonitor:
                 # Verificar reglas de monitoreo
                 self._check_event_rules(event)
 
-                # Limpiar eventos antiguos (mantener solo últimos 1000)
-                if len(self.transaction_events) > 1000:
-                    self.transaction_events = self.transaction_events[-1000:]
-
                 logger.debug(
                     f"📝 Evento registrado: {event.transaction_id} - {event.event_type}"
                 )
@@ -308,22 +440,13 @@ class TransactionMonitor:
 
     def _get_failed_transactions_count(self, time_window: int) -> int:
         """Obtener cantidad de transacciones fallidas en ventana de tiempo"""
-        cutoff_time = datetime.now() - timedelta(seconds=time_window)
-        return sum(
-            1
-            for event in self.transaction_events
-            if event.status == TransactionStatus.FAILED
-            and event.timestamp >= cutoff_time
-        )
+        counter = self.status_counters.get(TransactionStatus.FAILED)
+        return counter.count(window=time_window) if counter else 0
 
     def _get_user_transactions_count(self, user_id: str, time_window: int) -> int:
         """Obtener cantidad de transacciones de usuario en ventana de tiempo"""
-        cutoff_time = datetime.now() - timedelta(seconds=time_window)
-        return sum(
-            1
-            for event in self.transaction_events
-            if event.user_id == user_id and event.timestamp >= cutoff_time
-        )
+        counter = self.user_counters.get(user_id)
+        return counter.count(window=time_window) if counter else 0
 
     def _trigger_alert(self, rule: MonitoringRule, event: TransactionEvent):
         """Disparar alerta"""
@@ -366,6 +489,9 @@ class TransactionMonitor:
             # Limpiar alertas antiguas
             self._cleanup_old_alerts()
 
+            # Olvidar usuarios sin actividad en la ventana
+            self._cleanup_idle_user_counters()
+
         except Exception as e:
             logger.error(f"❌ Error verificando reglas de monitoreo: {e}")
 
@@ -375,7 +501,10 @@ class TransactionMonitor:
             seconds=self.alert_thresholds["pending_timeout"]
         )
 
-        for event in self.transaction_events:
+        with self.lock:
+            events = list(self.transaction_events)
+
+        for event in events:
             if (
                 event.status == TransactionStatus.PENDING
                 and event.timestamp <= cutoff_time
@@ -396,7 +525,8 @@ class TransactionMonitor:
     def _check_general_metrics(self):
         """Verificar métricas generales"""
         # Verificar transacciones fallidas
-        failed_count = self._get_failed_transactions_count(3600)  # última hora
+        with self.lock:
+            failed_count = self._get_failed_transactions_count(3600)  # última hora
         if failed_count >= self.alert_thresholds["failed_transactions"]:
             alert = Alert(
                 alert_id=f"high_failure_rate_{int(time.time())}",
@@ -414,6 +544,17 @@ class TransactionMonitor:
             alert for alert in self.active_alerts if alert.timestamp >= cutoff_time
         ]
 
+    def _cleanup_idle_user_counters(self):
+        """Eliminar contadores de usuarios sin eventos en su ventana"""
+        with self.lock:
+            idle_users = [
+                user_id
+                for user_id, counter in self.user_counters.items()
+                if counter.count() == 0
+            ]
+            for user_id in idle_users:
+                del self.user_counters[user_id]
+
     def add_alert_callback(self, callback: Callable[[Alert], None]):
         """Agregar callback de alerta"""
         self.alert_callbacks.append(callback)
@@ -423,7 +564,8 @@ class TransactionMonitor:
         self, user_id: Optional[str] = None, limit: int = 100
     ) -> List[TransactionEvent]:
         """Obtener eventos de transacciones"""
-        events = self.transaction_events
+        with self.lock:
+            events = list(self.transaction_events)
 
         if user_id:
             events = [e for e in events if e.user_id == user_id]
@@ -480,10 +622,9 @@ class TransactionMonitor:
                 metrics[key] = self.transaction_metrics.get(key, 0)
 
             # Métricas por evento
-            event_types = set(event.event_type for event in self.transaction_events)
-            for event_type in event_types:
-                key = f"event_{event_type}"
-                metrics[key] = self.transaction_metrics.get(key, 0)
+            for key, value in list(self.transaction_metrics.items()):
+                if key.startswith("event_"):
+                    metrics[key] = value
 
             return metrics
 
@@ -521,6 +662,7 @@ class TransactionMonitor:
         try:
             with self.lock:
                 self.monitoring_rules[rule.rule_id] = rule
+                self._configure_windows()
                 self._save_config()
 
                 logger.info(f"✅ Nueva regla de monitoreo agregada: {rule.rule_id}")
@@ -530,6 +672,31 @@ class TransactionMonitor:
             logger.error(f"❌ Error agregando regla de monitoreo: {e}")
             return False
 
+    def configure_event_windows(
+        self,
+        event_history_size: Optional[int] = None,
+        counter_bucket_seconds: Optional[float] = None,
+    ) -> bool:
+        """Cambiar el tamaño del historial de eventos y la precisión de las ventanas"""
+        try:
+            with self.lock:
+                if event_history_size is not None:
+                    self.event_history_size = event_history_size
+                if counter_bucket_seconds is not None:
+                    self.counter_bucket_seconds = counter_bucket_seconds
+                self._configure_windows()
+                self._save_config()
+
+                logger.info(
+                    f"✅ Ventanas de eventos actualizadas: historial={self.event_history_size}, "
+                    f"intervalo={self.counter_bucket_seconds}s"
+                )
+                return True
+
+        except Exception as e:
+            logger.error(f"❌ Error actualizando ventanas de eventos: {e}")
+            return False
+
     def update_alert_thresholds(self, thresholds: Dict[str, Any]) -> bool:
         """Actualizar umbrales de alerta"""
         try:
@@ -4,7 +4,7 @@ import re
 import json
 import logging
 import hashlib
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 import numpy as np
 import pandas as pd
 import spacy
@@ -16,6 +16,14 @@ from urllib.parse import urlparse
 from bs4 import BeautifulSoup
 import chardet
 
+from modules.training.tokenized_dataset_cache import (
+    TokenizedDataset,
+    TokenizedDatasetCache,
+)
+
+# Plantilla de texto de los ejemplos del pipeline para tokenizar
+PIPELINE_TEXT_TEMPLATE = "Instruction: {instruction}\nInput: {input}\nOutput: {output}"
+
 
 class DataCurationPipeline:
     def __init__(
@@ -242,17 +250,27 @@ class DataCurationPipeline:
         return unique_docs
 
     def prepare_training_dataset(
-        self, documents: List[Dict[str, Any]], domain: str
-    ) -> DatasetDict:
+        self,
+        documents: List[Dict[str, Any]],
+        domain: str,
+        tokenizer: Optional[Any] = None,
+        max_length: int = 1024,
+        pack: bool = True,
+    ) -> Union[DatasetDict, Dict[str, TokenizedDataset]]:
         """
         Preparar dataset de entrenamiento
 
         Args:
             documents (list): Lista de documentos procesados
             domain (str): Dominio de entrenamiento
+            tokenizer: Tokenizador opcional; si se indica, se devuelven los
+                splits ya tokenizados (con caché en disco) en lugar del texto
+            max_length (int): Longitud máxima de ejemplo y de bloque
+            pack (bool): Empaquetar ejemplos en bloques de max_length tokens
 
         Returns:
-            Dataset de Hugging Face
+            Dataset de Hugging Face, o con tokenizador un TokenizedDataset
+            mapeado en memoria por split (usar con PaddedBatchCollator)
         """
         # Formatear documentos para entrenamiento
         formatted_data = []
@@ -288,7 +306,19 @@ class DataCurationPipeline:
         dataset_path = os.path.join(self.output_dir, domain.lower().replace(" ", "_"))
         dataset.save_to_disk(dataset_path)
 
-        return dataset
+        if tokenizer is None:
+            return dataset
+
+        # Tokenizar una sola vez por contenido y tokenizador. Los splits se
+        # devuelven tal cual: copiarlos a un Dataset de Hugging Face pasaría
+        # los ids del archivo mapeado a listas de Python
+        cache = TokenizedDatasetCache(os.path.join(self.output_dir, "tokenized_cache"))
+        return {
+            split_name: cache.from_records(
+                split_data, tokenizer, max_length, PIPELINE_TEXT_TEMPLATE, pack
+            )
+            for split_name, split_data in [("train", train_data), ("validation", val_data)]
+        }
 
     def process_domain(self, domain: str, sources: List[Dict[str, Any]]) -> DatasetDict:
         """
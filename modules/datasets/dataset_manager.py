@@ -5,13 +5,15 @@ Gestiona la carga, procesamiento y gestión de datasets para entrenamiento
 """
 
 import os
+import io
 import json
+import re
 import sqlite3
 import logging
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional, Tuple, Union
+from typing import Dict, Any, Iterator, List, Optional, Tuple, Union
 from pathlib import Path
 import threading
 import hashlib
@@ -22,6 +24,27 @@ import gzip
 import zipfile
 import tarfile
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Filas por lote en el modo por lotes (streaming)
+STREAMING_BATCH_SIZE = 65536
+
+# Formatos de salida que admiten escritura incremental
+STREAMING_OUTPUT_FORMATS = ["parquet", "csv", "jsonl"]
+
+# Tamaño de bloque de lectura al ingerir archivos
+INGEST_CHUNK_SIZE = 1024 * 1024
+
+# Filas de muestra para deducir el esquema al ingerir
+SCHEMA_SAMPLE_ROWS = 1000
+
 
 @dataclass
 class Dataset:
@@ -42,6 +65,212 @@ class Dataset:
     metadata: Dict[str, Any] = None
 
 
+class _JsonArrayScanner:
+    """Cuenta los elementos de un array JSON de primer nivel leyendo por bloques"""
+
+    _TOKENS = re.compile(rb'["\\\[\]{},]')
+
+    def __init__(self):
+        self.offset = 0
+        self.depth = 0
+        self.in_string = False
+        self.escaped_at = -1
+        self.top_level = None
+        self.commas = 0
+        self.empty = True
+
+    def feed(self, chunk: bytes):
+        """Procesar el siguiente bloque del archivo"""
+        if self.top_level is None:
+            stripped = chunk.lstrip()
+            if stripped:
+                self.top_level = stripped[:1]
+
+        for match in self._TOKENS.finditer(chunk):
+            position = self.offset + match.start()
+            token = match.group()
+            if self.in_string:
+                if position == self.escaped_at:
+                    continue
+                if token == b"\\":
+                    self.escaped_at = position + 1
+                elif token == b'"':
+                    self.in_string = False
+                continue
+
+            if token == b'"':
+                self.in_string = True
+                if self.depth == 1:
+                    self.empty = False
+            elif token in (b"[", b"{"):
+                if self.depth == 1:
+                    self.empty = False
+                self.depth += 1
+            elif token in (b"]", b"}"):
+                self.depth -= 1
+            elif token == b"," and self.depth == 1:
+                self.commas += 1
+
+        # Números, booleanos o null sueltos en el array también son elementos
+        if self.empty and self.top_level == b"[":
+            if chunk.strip(b" \t\r\n[]"):
+                self.empty = False
+
+        self.offset += len(chunk)
+
+    @property
+    def row_count(self) -> int:
+        if self.top_level != b"[":
+            return 1 if self.top_level else 0
+        return 0 if self.empty else self.commas + 1
+
+
+def _widen_schema(schema: Optional["pa.Schema"], other: "pa.Schema") -> "pa.Schema":
+    """
+    Unificar el esquema acumulado con el de un lote nuevo
+
+    Las columnas nuevas se añaden al final, null se promueve al tipo concreto
+    (p. ej. int64) y los tipos incompatibles se amplían a texto.
+    """
+    if schema is None:
+        return other
+
+    fields = []
+    for field in schema:
+        if field.name not in other.names:
+            fields.append(field)
+            continue
+        other_type = other.field(field.name).type
+        if other_type == field.type:
+            fields.append(field)
+            continue
+        try:
+            fields.append(
+                pa.unify_schemas(
+                    [pa.schema([field]), pa.schema([(field.name, other_type)])],
+                    promote_options="permissive",
+                ).field(0)
+            )
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            fields.append(pa.field(field.name, pa.string()))
+    fields.extend(field for field in other if field.name not in schema.names)
+    return pa.schema(fields)
+
+
+def _conform_to_schema(data, schema: "pa.Schema"):
+    """Adaptar una tabla o lote Arrow al esquema dado (columnas que faltan a null)"""
+    columns = [
+        (
+            data.column(field.name).cast(field.type)
+            if field.name in data.schema.names
+            else pa.nulls(data.num_rows, field.type)
+        )
+        for field in schema
+    ]
+    return type(data).from_arrays(columns, schema=schema)
+
+
+class _BatchWriter:
+    """
+    Escritor incremental de lotes (Parquet, CSV o JSONL)
+
+    En Parquet el esquema puede fijarse con ``schema``; si no, se deduce y se
+    amplía lote a lote. Cuando un lote trae columnas o tipos nuevos, lo ya
+    escrito se reescribe una vez con el esquema ampliado.
+    """
+
+    def __init__(
+        self,
+        output_path: Path,
+        output_format: str,
+        schema: Optional["pa.Schema"] = None,
+    ):
+        if output_format not in STREAMING_OUTPUT_FORMATS:
+            raise ValueError(
+                f"Formato de salida no soportado en modo por lotes: {output_format}"
+            )
+        self.output_path = Path(output_path)
+        self.output_format = output_format
+        self.columns: Optional[List[str]] = None
+        self.row_count = 0
+        self._schema = schema
+        self._fixed_schema = schema is not None
+        self._parquet_writer = None
+
+    def write(self, df: pd.DataFrame):
+        """Añadir un lote al archivo de salida"""
+        if df.empty:
+            return
+
+        if self.output_format == "parquet":
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if not self._fixed_schema:
+                schema = _widen_schema(self._schema, table.schema.remove_metadata())
+                if self._parquet_writer is not None and schema != self._schema:
+                    self._rewrite_parquet(schema)
+                self._schema = schema
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(
+                    str(self.output_path), self._schema
+                )
+            self._parquet_writer.write_table(_conform_to_schema(table, self._schema))
+        elif self.output_format == "csv":
+            if self.columns is not None:
+                new_columns = [col for col in df.columns if col not in self.columns]
+                if new_columns:
+                    logging.getLogger(__name__).warning(
+                        f"⚠️ Columnas nuevas ignoradas en CSV (cabecera ya "
+                        f"escrita): {new_columns}"
+                    )
+                df = df.reindex(columns=self.columns)
+            df.to_csv(
+                self.output_path,
+                mode="a" if self.columns else "w",
+                header=not self.columns,
+                index=False,
+            )
+        else:
+            with open(self.output_path, "a", encoding="utf-8") as f:
+                df.to_json(f, orient="records", lines=True, force_ascii=False)
+
+        if self.columns is None:
+            self.columns = df.columns.tolist()
+        self.row_count += len(df)
+
+    def _rewrite_parquet(self, schema: "pa.Schema"):
+        """Reescribir lo ya escrito con un esquema ampliado"""
+        self._parquet_writer.close()
+        previous_path = self.output_path.with_name(self.output_path.name + ".widen")
+        self.output_path.replace(previous_path)
+        try:
+            self._parquet_writer = pq.ParquetWriter(str(self.output_path), schema)
+            for batch in pq.ParquetFile(previous_path).iter_batches():
+                self._parquet_writer.write_batch(_conform_to_schema(batch, schema))
+        finally:
+            previous_path.unlink()
+
+    def close(self, fallback_columns: Optional[List[str]] = None):
+        """Cerrar el archivo (creándolo vacío si no se escribió ningún lote)"""
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+            return
+
+        if self.columns is None:
+            self.columns = list(fallback_columns or [])
+            if self.output_format == "parquet":
+                schema = self._schema or pa.schema(
+                    [(column, pa.string()) for column in self.columns]
+                )
+                pq.write_table(schema.empty_table(), str(self.output_path))
+            elif self.output_format == "csv":
+                pd.DataFrame(columns=self.columns).to_csv(
+                    self.output_path, index=False
+                )
+            else:
+                self.output_path.touch()
+
+
 class DatasetManager:
     """Gestor completo de datasets con funciones reales"""
 
@@ -157,7 +386,7 @@ class DatasetManager:
         """Calcular checksum SHA-256 del archivo"""
         hash_sha256 = hashlib.sha256()
         with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
+            for chunk in iter(lambda: f.read(INGEST_CHUNK_SIZE), b""):
                 hash_sha256.update(chunk)
         return hash_sha256.hexdigest()
 
@@ -194,15 +423,11 @@ class DatasetManager:
                     self.datasets_dir / target_dir / f"{dataset_id}{source_path.suffix}"
                 )
 
-                # Copiar archivo
-                shutil.copy2(source_path, target_path)
-
-                # Obtener información del archivo
-                file_size, file_format = self._get_file_info(target_path)
-                checksum = self._calculate_file_checksum(target_path)
-
-                # Analizar dataset
-                columns, row_count = self._analyze_dataset(target_path, file_format)
+                # Copiar, calcular checksum y analizar en una sola lectura
+                file_format = source_path.suffix.lower().lstrip(".")
+                file_size, checksum, columns, row_count = self._ingest_file(
+                    source_path, target_path, file_format
+                )
 
                 # Registrar en base de datos
                 with sqlite3.connect(self.db_path) as conn:
@@ -235,61 +460,185 @@ class DatasetManager:
                 self.logger.error(f"❌ Error cargando dataset: {e}")
                 raise
 
+    def _ingest_file(
+        self, source_path: Path, target_path: Path, file_format: str
+    ) -> Tuple[int, str, List[str], int]:
+        """
+        Copiar un archivo calculando checksum, filas y esquema en una sola lectura
+
+        Returns:
+            (tamaño, checksum SHA-256, columnas, número de filas)
+        """
+        hash_sha256 = hashlib.sha256()
+        line_based = file_format not in ["json", "parquet", "xlsx", "xls"]
+        json_scanner = _JsonArrayScanner() if file_format == "json" else None
+
+        file_size = 0
+        newline_count = 0
+        last_byte = b"\n"
+        sample = bytearray()
+        sample_lines = SCHEMA_SAMPLE_ROWS + 1  # Cabecera CSV incluida
+
+        with open(source_path, "rb") as src, open(target_path, "wb") as dst:
+            for chunk in iter(lambda: src.read(INGEST_CHUNK_SIZE), b""):
+                dst.write(chunk)
+                hash_sha256.update(chunk)
+                file_size += len(chunk)
+
+                if line_based:
+                    newline_count += chunk.count(b"\n")
+                    last_byte = chunk[-1:]
+                    if sample_lines > 0:
+                        sample.extend(chunk)
+                        sample_lines -= chunk.count(b"\n")
+                elif json_scanner is not None:
+                    json_scanner.feed(chunk)
+                    if len(sample) < INGEST_CHUNK_SIZE:
+                        sample.extend(chunk)
+
+        shutil.copystat(source_path, target_path)
+
+        # Una última línea sin salto final también es una fila
+        line_count = newline_count + (1 if file_size and last_byte != b"\n" else 0)
+        columns, row_count = self._analyze_dataset(
+            target_path,
+            file_format,
+            sample=bytes(sample),
+            line_count=line_count,
+            json_row_count=json_scanner.row_count if json_scanner else None,
+        )
+        return file_size, hash_sha256.hexdigest(), columns, row_count
+
+    def _sample_lines(self, sample: bytes, max_lines: int) -> List[str]:
+        """Primeras líneas completas de una muestra de bytes"""
+        lines = sample.split(b"\n")[:max_lines]
+        return [line.decode("utf-8", errors="replace") for line in lines if line.strip()]
+
+    def _sample_json_records(self, sample: bytes) -> List[Any]:
+        """Decodificar los primeros elementos completos de un array JSON"""
+        text = sample.decode("utf-8", errors="ignore").lstrip()
+        if not text.startswith("["):
+            return []
+
+        decoder = json.JSONDecoder()
+        records = []
+        position = 1
+        while len(records) < SCHEMA_SAMPLE_ROWS:
+            while position < len(text) and text[position] in " \t\r\n,":
+                position += 1
+            if position >= len(text) or text[position] == "]":
+                break
+            try:
+                record, position = decoder.raw_decode(text, position)
+            except json.JSONDecodeError:
+                break  # Elemento truncado al final de la muestra
+            records.append(record)
+        return records
+
     def _analyze_dataset(
-        self, file_path: Path, file_format: str
+        self,
+        file_path: Path,
+        file_format: str,
+        sample: bytes = None,
+        line_count: int = None,
+        json_row_count: int = None,
     ) -> Tuple[List[str], int]:
-        """Analizar estructura del dataset"""
+        """
+        Analizar estructura del dataset
+
+        Con la muestra y los conteos de _ingest_file no vuelve a leer el
+        archivo; Parquet y Excel se resuelven con sus metadatos.
+        """
         try:
             if file_format in ["csv", "tsv"]:
-                df = pd.read_csv(
-                    file_path, nrows=1000
-                )  # Leer solo las primeras 1000 filas para análisis
+                sep = "\t" if file_format == "tsv" else ","
+                if sample is not None:
+                    lines = sample.split(b"\n")[: SCHEMA_SAMPLE_ROWS + 1]
+                    df = pd.read_csv(io.BytesIO(b"\n".join(lines)), sep=sep)
+                else:
+                    df = pd.read_csv(file_path, sep=sep, nrows=SCHEMA_SAMPLE_ROWS)
                 columns = df.columns.tolist()
 
                 # Contar filas totales
-                with open(file_path, "r", encoding="utf-8") as f:
-                    row_count = sum(1 for line in f) - 1  # Restar header
-
-            elif file_format in ["json", "jsonl"]:
-                if file_format == "json":
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                    if isinstance(data, list):
-                        df = pd.DataFrame(data[:1000])
-                    else:
-                        df = pd.DataFrame([data])
-                else:  # jsonl
-                    data = []
+                if line_count is None:
+                    with open(file_path, "rb") as f:
+                        line_count = sum(1 for line in f)
+                row_count = max(line_count - 1, 0)  # Restar header
+
+            elif file_format == "jsonl":
+                if sample is not None:
+                    lines = self._sample_lines(sample, SCHEMA_SAMPLE_ROWS)
+                else:
                     with open(file_path, "r", encoding="utf-8") as f:
-                        for i, line in enumerate(f):
-                            if i >= 1000:
-                                break
-                            data.append(json.loads(line))
-                    df = pd.DataFrame(data)
-
-                columns = df.columns.tolist()
+                        lines = [
+                            line for _, line in zip(range(SCHEMA_SAMPLE_ROWS), f)
+                        ]
+                data = []
+                for line in lines:
+                    try:
+                        data.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        break  # Línea truncada al final de la muestra
+                columns = pd.DataFrame(data).columns.tolist()
 
                 # Contar líneas totales
-                with open(file_path, "r", encoding="utf-8") as f:
-                    row_count = sum(1 for line in f)
-                if file_format == "json":
-                    row_count = len(data) if isinstance(data, list) else 1
+                if line_count is None:
+                    with open(file_path, "rb") as f:
+                        line_count = sum(1 for line in f)
+                row_count = line_count
+
+            elif file_format == "json":
+                data = self._sample_json_records(sample) if sample else []
+                if json_row_count is None or (not data and json_row_count):
+                    # Objeto único o muestra insuficiente: lectura completa
+                    with open(file_path, "r", encoding="utf-8") as f:
+                        content = json.load(f)
+                    data = content if isinstance(content, list) else [content]
+                    json_row_count = len(data)
+                    data = data[:SCHEMA_SAMPLE_ROWS]
+                columns = pd.DataFrame(data).columns.tolist()
+                row_count = json_row_count
+
+            elif file_format == "xlsx":
+                from openpyxl import load_workbook
+
+                workbook = load_workbook(file_path, read_only=True)
+                try:
+                    sheet = workbook.active
+                    rows = sheet.iter_rows(values_only=True)
+                    header = next(rows, ())
+                    columns = [str(value) for value in header if value is not None]
+                    if sheet.max_row is not None:
+                        # Dimensión guardada en los metadatos de la hoja
+                        row_count = max(sheet.max_row - 1, 0)
+                    else:
+                        row_count = sum(1 for _ in rows)
+                finally:
+                    workbook.close()
 
-            elif file_format in ["xlsx", "xls"]:
-                df = pd.read_excel(file_path, nrows=1000)
+            elif file_format == "xls":
+                df = pd.read_excel(file_path, nrows=SCHEMA_SAMPLE_ROWS)
                 columns = df.columns.tolist()
-                row_count = len(pd.read_excel(file_path))
+                row_count = len(pd.read_excel(file_path, usecols=[0]))
 
             elif file_format in ["parquet"]:
-                df = pd.read_parquet(file_path)
-                columns = df.columns.tolist()
-                row_count = len(df)
+                if PYARROW_AVAILABLE:
+                    # Solo el pie del archivo: esquema y número de filas
+                    parquet_metadata = pq.read_metadata(file_path)
+                    columns = parquet_metadata.schema.to_arrow_schema().names
+                    row_count = parquet_metadata.num_rows
+                else:
+                    df = pd.read_parquet(file_path)
+                    columns = df.columns.tolist()
+                    row_count = len(df)
 
             else:
                 # Formato no soportado, intentar como texto
                 columns = ["text"]
-                with open(file_path, "r", encoding="utf-8") as f:
-                    row_count = sum(1 for line in f)
+                if line_count is None:
+                    with open(file_path, "rb") as f:
+                        line_count = sum(1 for line in f)
+                row_count = line_count
 
             return columns, row_count
 
@@ -469,10 +818,263 @@ class DatasetManager:
             self.logger.error(f"❌ Error leyendo dataset: {e}")
             return None
 
+    def _require_pyarrow(self):
+        """Comprobar que pyarrow está disponible para el modo por lotes"""
+        if not PYARROW_AVAILABLE:
+            raise ImportError(
+                "pyarrow es necesario para el modo por lotes: pip install pyarrow"
+            )
+
+    def _records_to_batch(
+        self,
+        records: List[Dict[str, Any]],
+        schema: Optional["pa.Schema"],
+        columns: List[str] = None,
+    ) -> "pa.RecordBatch":
+        """
+        Convertir registros en un lote Arrow con el esquema acumulado
+
+        El esquema se amplía con cada lote: claves vistas por primera vez y
+        columnas que eran null pasan a los lotes siguientes en vez de perderse.
+        """
+        if columns:
+            records = [{col: record.get(col) for col in columns} for record in records]
+        batch = pa.RecordBatch.from_pylist(records)
+        return _conform_to_schema(batch, _widen_schema(schema, batch.schema))
+
+    def _iter_record_lines(
+        self, file_path: Path, parse_line
+    ) -> Iterator[Dict[str, Any]]:
+        """Leer un archivo línea a línea como registros"""
+        with open(file_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield parse_line(line)
+
+    def iter_record_batches(
+        self,
+        dataset_id: str,
+        batch_size: int = STREAMING_BATCH_SIZE,
+        columns: List[str] = None,
+    ) -> Iterator["pa.RecordBatch"]:
+        """Leer dataset como lotes Arrow sin cargar el archivo completo"""
+        self._require_pyarrow()
+
+        dataset = self.get_dataset(dataset_id)
+        if not dataset:
+            raise ValueError(f"Dataset {dataset_id} no encontrado")
+
+        file_path = Path(dataset.file_path)
+        if not file_path.exists():
+            raise FileNotFoundError(f"Archivo de dataset no encontrado: {file_path}")
+
+        if dataset.format in ["csv", "tsv"]:
+            reader = pa_csv.open_csv(
+                file_path,
+                parse_options=pa_csv.ParseOptions(
+                    delimiter="\t" if dataset.format == "tsv" else ","
+                ),
+                convert_options=pa_csv.ConvertOptions(include_columns=columns or []),
+            )
+            # Los bloques CSV se miden en bytes: se recortan a batch_size filas
+            for block in reader:
+                for offset in range(0, block.num_rows, batch_size):
+                    yield block.slice(offset, batch_size)
+            return
+
+        if dataset.format == "parquet":
+            yield from pq.ParquetFile(file_path).iter_batches(
+                batch_size=batch_size, columns=columns
+            )
+            return
+
+        if dataset.format == "json":
+            # Un documento JSON no admite lectura parcial: se carga una vez y se trocea
+            with open(file_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            records = iter(data if isinstance(data, list) else [data])
+        elif dataset.format in ["xlsx", "xls"]:
+            df = pd.read_excel(file_path, usecols=columns)
+            records = iter(df.to_dict(orient="records"))
+        elif dataset.format == "jsonl":
+            records = self._iter_record_lines(file_path, json.loads)
+        else:
+            # Formato no soportado, leer como texto
+            records = self._iter_record_lines(
+                file_path, lambda line: {"text": line.rstrip("\n")}
+            )
+
+        schema = None
+        pending = []
+        for record in records:
+            pending.append(record)
+            if len(pending) >= batch_size:
+                batch = self._records_to_batch(pending, schema, columns)
+                schema = batch.schema
+                pending = []
+                yield batch
+        if pending:
+            yield self._records_to_batch(pending, schema, columns)
+
+    def iter_dataset_chunks(
+        self,
+        dataset_id: str,
+        batch_size: int = STREAMING_BATCH_SIZE,
+        columns: List[str] = None,
+    ) -> Iterator[pd.DataFrame]:
+        """Leer dataset como DataFrames de tamaño acotado"""
+        for batch in self.iter_record_batches(dataset_id, batch_size, columns):
+            yield batch.to_pandas()
+
+    def _drop_seen_rows(self, df: pd.DataFrame, seen_rows: set) -> pd.DataFrame:
+        """Eliminar filas ya vistas en lotes anteriores o en el mismo lote"""
+        if df.empty:
+            return df
+
+        # Hash de 64 bits por fila: la memoria crece con las filas únicas, no con el texto
+        row_hashes = pd.util.hash_pandas_object(df, index=False).tolist()
+        keep = np.zeros(len(row_hashes), dtype=bool)
+        for position, row_hash in enumerate(row_hashes):
+            if row_hash not in seen_rows:
+                seen_rows.add(row_hash)
+                keep[position] = True
+        return df[keep]
+
+    def _register_dataset_file(
+        self,
+        dataset_id: str,
+        name: str,
+        description: str,
+        file_path: Path,
+        file_format: str,
+        columns: List[str],
+        row_count: int,
+        metadata: Dict[str, Any],
+    ):
+        """Registrar en base de datos un archivo de dataset ya escrito"""
+        file_size, _ = self._get_file_info(file_path)
+        checksum = self._calculate_file_checksum(file_path)
+
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                """
+                INSERT INTO datasets
+                (id, name, description, file_path, file_size, format, columns, row_count, checksum, metadata)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+                (
+                    dataset_id,
+                    name,
+                    description,
+                    str(file_path),
+                    file_size,
+                    file_format,
+                    json.dumps(columns),
+                    row_count,
+                    checksum,
+                    json.dumps(metadata),
+                ),
+            )
+
+    def process_dataset_streaming(
+        self,
+        dataset_id: str,
+        processing_config: Dict[str, Any],
+        batch_size: int = STREAMING_BATCH_SIZE,
+    ) -> str:
+        """
+        Procesar dataset por lotes Arrow con memoria acotada
+
+        Admite la misma configuración que process_dataset. La deduplicación
+        es global (hash por fila) y la salida por defecto es Parquet.
+        """
+        with self._lock:
+            try:
+                self._require_pyarrow()
+
+                dataset = self.get_dataset(dataset_id)
+                if not dataset:
+                    raise ValueError(f"Dataset {dataset_id} no encontrado")
+
+                processed_id = (
+                    f"{dataset_id}_processed_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                )
+                output_format = processing_config.get("output_format", "parquet")
+                output_path = (
+                    self.datasets_dir / "processed" / f"{processed_id}.{output_format}"
+                )
+
+                clean_data = processing_config.get("clean_data", False)
+                remove_nulls = clean_data and processing_config.get(
+                    "remove_nulls", False
+                )
+                row_limit = processing_config.get("row_limit")
+
+                # Limpieza y límite de filas se aplican entre lotes, no por lote
+                batch_config = {
+                    key: value
+                    for key, value in processing_config.items()
+                    if key not in ["clean_data", "remove_nulls", "row_limit"]
+                }
+
+                seen_rows = set()
+                rows_read = 0
+                writer = _BatchWriter(output_path, output_format)
+                try:
+                    for batch in self.iter_record_batches(dataset_id, batch_size):
+                        if row_limit is not None and writer.row_count >= row_limit:
+                            break
+
+                        rows_read += batch.num_rows
+                        df = batch.to_pandas()
+                        if clean_data:
+                            df = self._drop_seen_rows(df, seen_rows)
+                            if remove_nulls:
+                                df = df.dropna()
+
+                        df = self._apply_processing(df, batch_config)
+                        if row_limit is not None:
+                            df = df.head(row_limit - writer.row_count)
+                        writer.write(df)
+                finally:
+                    writer.close(
+                        processing_config.get("columns") or dataset.columns
+                    )
+
+                self._register_dataset_file(
+                    processed_id,
+                    f"{dataset.name} (Procesado)",
+                    f"Dataset procesado de {dataset.name}",
+                    output_path,
+                    output_format,
+                    writer.columns,
+                    writer.row_count,
+                    {
+                        "original_dataset": dataset_id,
+                        "processing_config": processing_config,
+                        "processing_date": datetime.now().isoformat(),
+                        "streaming": True,
+                        "rows_read": rows_read,
+                    },
+                )
+
+                self.logger.info(
+                    f"✅ Dataset procesado por lotes: {processed_id} "
+                    f"({rows_read} → {writer.row_count} filas)"
+                )
+                return processed_id
+
+            except Exception as e:
+                self.logger.error(f"❌ Error procesando dataset por lotes: {e}")
+                raise
+
     def process_dataset(
         self, dataset_id: str, processing_config: Dict[str, Any]
     ) -> str:
         """Procesar dataset con configuración específica"""
+        if processing_config.get("streaming", False):
+            return self.process_dataset_streaming(dataset_id, processing_config)
+
         with self._lock:
             try:
                 dataset = self.get_dataset(dataset_id)
@@ -593,10 +1195,116 @@ class DatasetManager:
 
         return processed_df
 
+    def split_dataset_streaming(
+        self,
+        dataset_id: str,
+        split_config: Dict[str, float],
+        key_columns: List[str] = None,
+        seed: str = "neurofusion",
+        output_format: str = "parquet",
+        batch_size: int = STREAMING_BATCH_SIZE,
+    ) -> Dict[str, str]:
+        """
+        Dividir dataset por lotes con asignación determinista por hash
+
+        Cada fila va al split que corresponde al hash de sus key_columns
+        (o de la fila completa), de modo que la misma fila cae siempre en
+        el mismo split aunque cambie el orden o el tamaño del dataset.
+        """
+        with self._lock:
+            try:
+                self._require_pyarrow()
+
+                dataset = self.get_dataset(dataset_id)
+                if not dataset:
+                    raise ValueError(f"Dataset {dataset_id} no encontrado")
+
+                total_ratio = sum(split_config.values())
+                if abs(total_ratio - 1.0) > 0.01:
+                    raise ValueError("Las proporciones de división deben sumar 1.0")
+
+                split_names = list(split_config.keys())
+                boundaries = np.cumsum([split_config[name] for name in split_names])
+                boundaries[-1] = 1.0
+
+                # pandas exige una clave de hash de 16 bytes
+                hash_key = hashlib.sha256(seed.encode("utf-8")).hexdigest()[:16]
+
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                split_ids = {}
+                writers = {}
+                for split_name in split_names:
+                    split_ids[split_name] = f"{dataset_id}_{split_name}_{timestamp}"
+                    split_dir = self.datasets_dir / split_name
+                    split_dir.mkdir(exist_ok=True)
+                    writers[split_name] = _BatchWriter(
+                        split_dir / f"{split_ids[split_name]}.{output_format}",
+                        output_format,
+                    )
+
+                try:
+                    for batch in self.iter_record_batches(dataset_id, batch_size):
+                        df = batch.to_pandas()
+                        if df.empty:
+                            continue
+
+                        key_df = df[key_columns] if key_columns else df
+                        row_hashes = pd.util.hash_pandas_object(
+                            key_df, index=False, hash_key=hash_key
+                        ).to_numpy(dtype=np.uint64)
+
+                        # 53 bits superiores → fracción uniforme en [0, 1)
+                        fractions = (row_hashes >> np.uint64(11)).astype(
+                            np.float64
+                        ) / float(1 << 53)
+                        assignment = np.searchsorted(boundaries, fractions, side="right")
+
+                        for position, split_name in enumerate(split_names):
+                            writers[split_name].write(df[assignment == position])
+                finally:
+                    for writer in writers.values():
+                        writer.close(dataset.columns)
+
+                for split_name, writer in writers.items():
+                    self._register_dataset_file(
+                        split_ids[split_name],
+                        f"{dataset.name} ({split_name})",
+                        f"Split {split_name} de {dataset.name}",
+                        writer.output_path,
+                        output_format,
+                        writer.columns,
+                        writer.row_count,
+                        {
+                            "original_dataset": dataset_id,
+                            "split_type": split_name,
+                            "split_ratio": split_config[split_name],
+                            "split_date": datetime.now().isoformat(),
+                            "split_method": "hash",
+                            "key_columns": key_columns,
+                            "seed": seed,
+                        },
+                    )
+
+                self.logger.info(f"✅ Dataset dividido por lotes: {split_ids}")
+                return split_ids
+
+            except Exception as e:
+                self.logger.error(f"❌ Error dividiendo dataset por lotes: {e}")
+                raise
+
     def split_dataset(
-        self, dataset_id: str, split_config: Dict[str, float]
+        self,
+        dataset_id: str,
+        split_config: Dict[str, float],
+        streaming: bool = False,
+        **streaming_options,
     ) -> Dict[str, str]:
         """Dividir dataset en conjuntos de entrenamiento, validación y test"""
+        if streaming:
+            return self.split_dataset_streaming(
+                dataset_id, split_config, **streaming_options
+            )
+
         with self._lock:
             try:
                 dataset = self.get_dataset(dataset_id)
@@ -138,6 +138,9 @@ class ModuleInitializer:
                     f"Error en {module_name}: {e}"
                 )
 
+        # Tiempo de importación y RSS por módulo
+        self.initialization_report["import_profile"] = self.system.get_import_profile()
+
     async def _validate_critical_modules(self):
         """Validar módulos críticos del sistema"""
         logger.info("🔍 Validando módulos críticos...")
@@ -233,6 +236,18 @@ class ModuleInitializer:
             for category, modules in report["categories"].items():
                 print(f"  • {category}: {len(modules)} módulos")
 
+        slowest = [
+            entry
+            for entry in report.get("import_profile", [])
+            if entry["status"] == "active"
+        ][:5]
+        if slowest:
+            print("\n🐢 Módulos más lentos en cargar:")
+            for entry in slowest:
+                rss = entry["rss_delta_bytes"]
+                rss_text = f", +{rss / 1024 / 1024:.1f} MB" if rss is not None else ""
+                print(f"  • {entry['name']}: {entry['total_time_ms']:.0f} ms{rss_text}")
+
         if report["errors"]:
             print(f"\n❌ Errores encontrados ({len(report['errors'])}):")
             for error in report["errors"][:5]:  # Mostrar solo los primeros 5
@@ -9,12 +9,14 @@ import json
 import logging
 import sqlite3
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any
 from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
 import math
 from collections import defaultdict, Counter
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
 
@@ -68,6 +70,45 @@ class LearningPath:
     created_at: datetime
 
 
+class ExerciseFeatureIndex:
+    """
+    Matriz de características del catálogo de ejercicios
+
+    Cada fila es un ejercicio codificado con one-hot de categoría y de
+    dificultad, de modo que la puntuación de todo el catálogo frente a un
+    perfil es un único producto matriz-vector.
+    """
+
+    def __init__(self, exercises: List[Any]):
+        self.exercises = list(exercises)
+        self.signature = tuple(exercise.id for exercise in self.exercises)
+
+        self.categories = sorted({exercise.category for exercise in self.exercises})
+        self.difficulties = sorted(
+            {exercise.difficulty for exercise in self.exercises}
+        )
+        category_index = {category: i for i, category in enumerate(self.categories)}
+        difficulty_index = {
+            difficulty: len(self.categories) + i
+            for i, difficulty in enumerate(self.difficulties)
+        }
+
+        rows = np.arange(len(self.exercises))
+        self.features = np.zeros(
+            (len(self.exercises), len(self.categories) + len(self.difficulties))
+        )
+        self.features[
+            rows, [category_index[exercise.category] for exercise in self.exercises]
+        ] = 1.0
+        self.features[
+            rows,
+            [difficulty_index[exercise.difficulty] for exercise in self.exercises],
+        ] = 1.0
+
+    def __len__(self) -> int:
+        return len(self.exercises)
+
+
 class PersonalizedRecommendations:
     """Sistema de recomendaciones personalizadas"""
 
@@ -76,6 +117,12 @@ class PersonalizedRecommendations:
         self.user_profiles: Dict[str, UserProfile] = {}
         self.recommendation_cache: Dict[str, List[ExerciseRecommendation]] = {}
         self.learning_paths: Dict[str, LearningPath] = {}
+        # Versión de los agregados con la que se calculó cada perfil en memoria
+        self._profile_versions: Dict[str, int] = {}
+        # Matriz de características del catálogo (se reconstruye si cambia)
+        self._exercise_index: Optional[ExerciseFeatureIndex] = None
+        # Puntuación mínima para recomendar un ejercicio
+        self.min_confidence_score = 0.3
 
         # Pesos para diferentes factores de recomendación
         self.weights = {
@@ -167,106 +214,349 @@ class PersonalizedRecommendations:
                 """
                 )
 
+                # Agregados de perfil por usuario (actualizados al insertar)
+                cursor.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS user_profile_aggregates (
+                        user_id TEXT PRIMARY KEY,
+                        total_answers INTEGER NOT NULL DEFAULT 0,
+                        correct_answers INTEGER NOT NULL DEFAULT 0,
+                        total_score INTEGER NOT NULL DEFAULT 0,
+                        exercise_count INTEGER NOT NULL DEFAULT 0,
+                        first_activity TIMESTAMP,
+                        last_activity TIMESTAMP,
+                        feedback_count INTEGER NOT NULL DEFAULT 0,
+                        rating_sum INTEGER NOT NULL DEFAULT 0,
+                        completed_count INTEGER NOT NULL DEFAULT 0,
+                        version INTEGER NOT NULL DEFAULT 0
+                    )
+                """
+                )
+
+                cursor.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS user_category_aggregates (
+                        user_id TEXT NOT NULL,
+                        category TEXT NOT NULL,
+                        answers INTEGER NOT NULL DEFAULT 0,
+                        correct_answers INTEGER NOT NULL DEFAULT 0,
+                        PRIMARY KEY (user_id, category)
+                    )
+                """
+                )
+
+                cursor.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS user_difficulty_aggregates (
+                        user_id TEXT NOT NULL,
+                        difficulty TEXT NOT NULL,
+                        answers INTEGER NOT NULL DEFAULT 0,
+                        PRIMARY KEY (user_id, difficulty)
+                    )
+                """
+                )
+
+                # Ejercicios distintos por usuario (para contar sesiones)
+                cursor.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS user_exercises_seen (
+                        user_id TEXT NOT NULL,
+                        exercise_id TEXT NOT NULL,
+                        PRIMARY KEY (user_id, exercise_id)
+                    )
+                """
+                )
+
                 conn.commit()
 
         except Exception as e:
             logger.error(f"❌ Error inicializando base de datos: {e}")
 
     def generate_user_profile(self, user_id: str) -> UserProfile:
-        """Generar perfil de usuario basado en historial de entrenamiento"""
+        """Generar perfil de usuario a partir de sus agregados de entrenamiento"""
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
 
-                # Obtener historial de entrenamiento
+                if self._ensure_user_aggregates(cursor, user_id):
+                    conn.commit()
+
                 cursor.execute(
                     """
-                    SELECT exercise_id, category, difficulty, points, is_correct, created_at
-                    FROM lora_training_data
+                    SELECT total_answers, total_score, exercise_count,
+                           first_activity, last_activity, version
+                    FROM user_profile_aggregates
                     WHERE user_id = ?
-                    ORDER BY created_at DESC
                 """,
                     (user_id,),
                 )
-
-                training_history = cursor.fetchall()
-
-                if not training_history:
+                (
+                    total_answers,
+                    total_score,
+                    exercise_count,
+                    first_activity,
+                    last_activity,
+                    version,
+                ) = cursor.fetchone()
+
+                # Sin cambios desde el último cálculo: perfil en memoria
+                cached = self.user_profiles.get(user_id)
+                if cached is not None and self._profile_versions.get(user_id) == version:
+                    return cached
+
+                if total_answers == 0:
                     # Usuario nuevo - perfil por defecto
                     return self._create_default_profile(user_id)
 
-                # Analizar patrones de entrenamiento
-                total_sessions = len(set(row[0] for row in training_history))
-                total_score = sum(
-                    row[3] for row in training_history if row[4]
-                )  # Solo respuestas correctas
-                average_score = (
-                    total_score / len(training_history) if training_history else 0
+                cursor.execute(
+                    """
+                    SELECT category, answers, correct_answers
+                    FROM user_category_aggregates
+                    WHERE user_id = ?
+                    ORDER BY answers DESC, category
+                """,
+                    (user_id,),
                 )
+                category_rows = cursor.fetchall()
 
-                # Categorías preferidas
-                categories = [row[1] for row in training_history]
-                category_counts = Counter(categories)
-                preferred_categories = [
-                    cat for cat, count in category_counts.most_common(3)
-                ]
-
-                # Dificultades preferidas
-                difficulties = [row[2] for row in training_history]
-                difficulty_counts = Counter(difficulties)
-                preferred_difficulties = [
-                    diff for diff, count in difficulty_counts.most_common(2)
-                ]
-
-                # Áreas débiles y fuertes
-                correct_by_category = defaultdict(list)
-                for row in training_history:
-                    correct_by_category[row[1]].append(row[4])
-
-                weak_areas = []
-                strong_areas = []
-
-                for category, results in correct_by_category.items():
-                    success_rate = sum(results) / len(results)
-                    if success_rate < 0.6:
-                        weak_areas.append(category)
-                    elif success_rate > 0.8:
-                        strong_areas.append(category)
-
-                # Estilo de aprendizaje
-                learning_style = self._determine_learning_style(training_history)
-
-                # Patrón de estudio
-                study_pattern = self._determine_study_pattern(training_history)
-
-                # Última actividad
-                last_activity = max(row[5] for row in training_history)
-
-                profile = UserProfile(
-                    user_id=user_id,
-                    total_sessions=total_sessions,
-                    total_score=total_score,
-                    average_score=average_score,
-                    preferred_categories=preferred_categories,
-                    preferred_difficulties=preferred_difficulties,
-                    weak_areas=weak_areas,
-                    strong_areas=strong_areas,
-                    learning_style=learning_style,
-                    study_pattern=study_pattern,
-                    last_activity=datetime.fromisoformat(last_activity),
-                    created_at=datetime.now(),
+                cursor.execute(
+                    """
+                    SELECT difficulty FROM user_difficulty_aggregates
+                    WHERE user_id = ?
+                    ORDER BY answers DESC, difficulty
+                    LIMIT 2
+                """,
+                    (user_id,),
                 )
+                preferred_difficulties = [row[0] for row in cursor.fetchall()]
+
+            # Categorías preferidas
+            preferred_categories = [row[0] for row in category_rows[:3]]
+
+            # Áreas débiles y fuertes
+            weak_areas = []
+            strong_areas = []
+
+            for category, answers, correct_answers in category_rows:
+                success_rate = correct_answers / answers
+                if success_rate < 0.6:
+                    weak_areas.append(category)
+                elif success_rate > 0.8:
+                    strong_areas.append(category)
+
+            profile = UserProfile(
+                user_id=user_id,
+                total_sessions=exercise_count,
+                total_score=total_score,
+                average_score=total_score / total_answers,
+                preferred_categories=preferred_categories,
+                preferred_difficulties=preferred_difficulties,
+                weak_areas=weak_areas,
+                strong_areas=strong_areas,
+                learning_style=self._determine_learning_style(
+                    {row[0]: row[1] for row in category_rows}, total_answers
+                ),
+                study_pattern=self._determine_study_pattern(
+                    total_answers, first_activity, last_activity
+                ),
+                last_activity=datetime.fromisoformat(last_activity),
+                created_at=datetime.now(),
+            )
 
-                # Guardar perfil
-                self._save_user_profile(profile)
-                self.user_profiles[user_id] = profile
+            # Guardar perfil
+            self._save_user_profile(profile)
+            self.user_profiles[user_id] = profile
+            self._profile_versions[user_id] = version
 
-                return profile
+            return profile
 
         except Exception as e:
             logger.error(f"❌ Error generando perfil: {e}")
             return self._create_default_profile(user_id)
 
+    def _ensure_user_aggregates(self, cursor: sqlite3.Cursor, user_id: str) -> bool:
+        """
+        Crear los agregados de un usuario si no existen
+
+        La primera vez se reconstruyen desde todo su historial en
+        lora_training_data; a partir de ahí se mantienen incrementalmente.
+
+        Returns:
+            True si se acaban de construir (ya incluyen todo el historial)
+        """
+        cursor.execute(
+            "SELECT 1 FROM user_profile_aggregates WHERE user_id = ?", (user_id,)
+        )
+        if cursor.fetchone() is not None:
+            return False
+
+        cursor.execute(
+            """
+            SELECT name FROM sqlite_master
+            WHERE type = 'table' AND name = 'lora_training_data'
+        """
+        )
+        if cursor.fetchone() is None:
+            cursor.execute(
+                "INSERT INTO user_profile_aggregates (user_id) VALUES (?)", (user_id,)
+            )
+            return True
+
+        cursor.execute(
+            """
+            INSERT INTO user_profile_aggregates
+            (user_id, total_answers, correct_answers, total_score, exercise_count,
+             first_activity, last_activity, version)
+            SELECT ?, COUNT(*), COALESCE(SUM(is_correct), 0),
+                   COALESCE(SUM(CASE WHEN is_correct THEN points ELSE 0 END), 0),
+                   COUNT(DISTINCT exercise_id), MIN(created_at), MAX(created_at), 1
+            FROM lora_training_data
+            WHERE user_id = ?
+        """,
+            (user_id, user_id),
+        )
+        cursor.execute(
+            """
+            INSERT INTO user_category_aggregates (user_id, category, answers, correct_answers)
+            SELECT user_id, category, COUNT(*), COALESCE(SUM(is_correct), 0)
+            FROM lora_training_data
+            WHERE user_id = ?
+            GROUP BY category
+        """,
+            (user_id,),
+        )
+        cursor.execute(
+            """
+            INSERT INTO user_difficulty_aggregates (user_id, difficulty, answers)
+            SELECT user_id, difficulty, COUNT(*)
+            FROM lora_training_data
+            WHERE user_id = ?
+            GROUP BY difficulty
+        """,
+            (user_id,),
+        )
+        cursor.execute(
+            """
+            INSERT OR IGNORE INTO user_exercises_seen (user_id, exercise_id)
+            SELECT DISTINCT user_id, exercise_id
+            FROM lora_training_data
+            WHERE user_id = ?
+        """,
+            (user_id,),
+        )
+        return True
+
+    def record_training_data(self, training_data_list: List[Any]):
+        """
+        Actualizar los agregados de perfil con nuevos datos de entrenamiento
+
+        Se llama después de guardar los datos en lora_training_data; cada
+        elemento debe tener user_id, exercise_id, category, difficulty,
+        points, is_correct y created_at.
+        """
+        data_by_user = defaultdict(list)
+        for training_data in training_data_list:
+            data_by_user[training_data.user_id].append(training_data)
+
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+
+                for user_id, user_data in data_by_user.items():
+                    # Recién construidos desde el historial: ya incluyen estos datos
+                    if self._ensure_user_aggregates(cursor, user_id):
+                        continue
+                    self._apply_training_data(cursor, user_id, user_data)
+
+                conn.commit()
+
+        except Exception as e:
+            logger.error(f"❌ Error actualizando agregados de perfil: {e}")
+
+    def _apply_training_data(
+        self, cursor: sqlite3.Cursor, user_id: str, user_data: List[Any]
+    ):
+        """Sumar un lote de datos de un usuario a sus agregados"""
+        category_answers = Counter()
+        category_correct = Counter()
+        difficulty_answers = Counter()
+        new_exercises = 0
+
+        for training_data in user_data:
+            category_answers[training_data.category] += 1
+            category_correct[training_data.category] += int(training_data.is_correct)
+            difficulty_answers[training_data.difficulty] += 1
+
+        for exercise_id in set(data.exercise_id for data in user_data):
+            cursor.execute(
+                "INSERT OR IGNORE INTO user_exercises_seen (user_id, exercise_id) VALUES (?, ?)",
+                (user_id, exercise_id),
+            )
+            new_exercises += cursor.rowcount
+
+        timestamps = [
+            (
+                data.created_at.isoformat()
+                if isinstance(data.created_at, datetime)
+                else data.created_at
+            )
+            for data in user_data
+        ]
+        first_activity = min(timestamps)
+        last_activity = max(timestamps)
+
+        cursor.execute(
+            """
+            UPDATE user_profile_aggregates
+            SET total_answers = total_answers + ?,
+                correct_answers = correct_answers + ?,
+                total_score = total_score + ?,
+                exercise_count = exercise_count + ?,
+                first_activity = MIN(COALESCE(first_activity, ?), ?),
+                last_activity = MAX(COALESCE(last_activity, ?), ?),
+                version = version + 1
+            WHERE user_id = ?
+        """,
+            (
+                len(user_data),
+                sum(category_correct.values()),
+                sum(data.points for data in user_data if data.is_correct),
+                new_exercises,
+                first_activity,
+                first_activity,
+                last_activity,
+                last_activity,
+                user_id,
+            ),
+        )
+
+        cursor.executemany(
+            """
+            INSERT INTO user_category_aggregates (user_id, category, answers, correct_answers)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(user_id, category) DO UPDATE SET
+                answers = answers + excluded.answers,
+                correct_answers = correct_answers + excluded.correct_answers
+        """,
+            [
+                (user_id, category, answers, category_correct[category])
+                for category, answers in category_answers.items()
+            ],
+        )
+
+        cursor.executemany(
+            """
+            INSERT INTO user_difficulty_aggregates (user_id, difficulty, answers)
+            VALUES (?, ?, ?)
+            ON CONFLICT(user_id, difficulty) DO UPDATE SET
+                answers = answers + excluded.answers
+        """,
+            [
+                (user_id, difficulty, answers)
+                for difficulty, answers in difficulty_answers.items()
+            ],
+        )
+
     def _create_default_profile(self, user_id: str) -> UserProfile:
         """Crear perfil por defecto para usuario nuevo"""
         return UserProfile(
@@ -284,22 +574,23 @@ class PersonalizedRecommendations:
             created_at=datetime.now(),
         )
 
-    def _determine_learning_style(self, training_history: List[Tuple]) -> str:
+    def _determine_learning_style(
+        self, category_counts: Dict[str, int], total_answers: int
+    ) -> str:
         """Determinar estilo de aprendizaje basado en patrones"""
         # Análisis simplificado - en producción sería más sofisticado
-        if len(training_history) < 5:
+        if total_answers < 5:
             return "mixed"
 
-        # Analizar tipos de preguntas y respuestas
-        theoretical_count = 0
-        practical_count = 0
-
-        for row in training_history:
-            # Clasificar por categoría (simplificado)
-            if row[1] in ["comprehension", "critical_analysis"]:
-                theoretical_count += 1
-            elif row[1] in ["programming", "problem_solving"]:
-                practical_count += 1
+        # Clasificar por categoría (simplificado)
+        theoretical_count = sum(
+            category_counts.get(category, 0)
+            for category in ["comprehension", "critical_analysis"]
+        )
+        practical_count = sum(
+            category_counts.get(category, 0)
+            for category in ["programming", "problem_solving"]
+        )
 
         if theoretical_count > practical_count * 1.5:
             return "theoretical"
@@ -308,25 +599,20 @@ class PersonalizedRecommendations:
         else:
             return "mixed"
 
-    def _determine_study_pattern(self, training_history: List[Tuple]) -> str:
+    def _determine_study_pattern(
+        self, total_answers: int, first_activity: str, last_activity: str
+    ) -> str:
         """Determinar patrón de estudio basado en frecuencia"""
-        if len(training_history) < 3:
+        if total_answers < 3:
             return "consistent"
 
-        # Analizar frecuencia de entrenamiento
-        dates = [datetime.fromisoformat(row[5]) for row in training_history]
-        dates.sort()
-
-        # Calcular intervalos entre sesiones
-        intervals = []
-        for i in range(1, len(dates)):
-            interval = (dates[i] - dates[i - 1]).total_seconds() / 3600  # horas
-            intervals.append(interval)
-
-        if not intervals:
-            return "consistent"
-
-        avg_interval = sum(intervals) / len(intervals)
+        # La media de intervalos entre actividades ordenadas es
+        # (última - primera) / (n - 1)
+        span_hours = (
+            datetime.fromisoformat(last_activity)
+            - datetime.fromisoformat(first_activity)
+        ).total_seconds() / 3600
+        avg_interval = span_hours / (total_answers - 1)
 
         if avg_interval < 24:  # Menos de 1 día
             return "intensive"
@@ -382,23 +668,23 @@ class PersonalizedRecommendations:
             from ..training.advanced_training_system import get_advanced_training_system
 
             training_system = get_advanced_training_system()
-            available_exercises = training_system.get_all_exercises()
-
-            # Calcular puntuaciones de recomendación
-            recommendations = []
+            index = self._get_exercise_index(training_system.get_all_exercises())
 
-            for exercise in available_exercises:
-                confidence_score = self._calculate_recommendation_score(
-                    exercise, profile
-                )
+            # Puntuar todo el catálogo de una vez y quedarse con los mejores
+            scores = self._score_exercises(index, profile)
+            selected = self._select_top_k(scores, limit)
 
-                if confidence_score > 0.3:  # Umbral mínimo
-                    recommendation = ExerciseRecommendation(
+            # Explicación y puntuación esperada solo para los seleccionados
+            recommendations = []
+            for position in selected:
+                exercise = index.exercises[position]
+                recommendations.append(
+                    ExerciseRecommendation(
                         exercise_id=exercise.id,
                         title=exercise.title,
                         category=exercise.category,
                         difficulty=exercise.difficulty,
-                        confidence_score=confidence_score,
+                        confidence_score=float(scores[position]),
                         reasoning=self._generate_recommendation_reasoning(
                             exercise, profile
                         ),
@@ -407,13 +693,7 @@ class PersonalizedRecommendations:
                         learning_objectives=exercise.learning_objectives,
                         prerequisites=exercise.prerequisites,
                     )
-                    recommendations.append(recommendation)
-
-            # Ordenar por puntuación de confianza
-            recommendations.sort(key=lambda x: x.confidence_score, reverse=True)
-
-            # Limitar resultados
-            recommendations = recommendations[:limit]
+                )
 
             # Guardar recomendaciones
             self._save_recommendations(user_id, recommendations)
@@ -424,40 +704,81 @@ class PersonalizedRecommendations:
             logger.error(f"❌ Error generando recomendaciones: {e}")
             return []
 
-    def _calculate_recommendation_score(self, exercise, profile: UserProfile) -> float:
-        """Calcular puntuación de recomendación para un ejercicio"""
-        score = 0.0
-
-        # Preferencia de categoría
-        if exercise.category in profile.preferred_categories:
-            score += self.weights["category_preference"]
-        elif exercise.category in profile.weak_areas:
-            score += (
-                self.weights["category_preference"] * 0.8
-            )  # Priorizar áreas débiles
-
-        # Adaptación de dificultad
-        if exercise.difficulty in profile.preferred_difficulties:
-            score += self.weights["difficulty_adaptation"]
-        else:
-            # Ajustar dificultad basado en rendimiento
-            if profile.average_score > 80 and exercise.difficulty == "medium":
-                score += self.weights["difficulty_adaptation"] * 0.7
-            elif profile.average_score > 90 and exercise.difficulty == "hard":
-                score += self.weights["difficulty_adaptation"] * 0.6
-
-        # Brecha de habilidades
-        if exercise.category in profile.weak_areas:
-            score += self.weights["skill_gap"]
-
-        # Diversidad
-        if exercise.category not in profile.strong_areas:
-            score += self.weights["diversity"]
-
-        # Factor de recencia (ejercicios más recientes tienen prioridad)
-        score += self.weights["recency"] * 0.5
-
-        return min(score, 1.0)
+    def _get_exercise_index(self, exercises: List[Any]) -> ExerciseFeatureIndex:
+        """Obtener la matriz de características, reconstruida si cambia el catálogo"""
+        signature = tuple(exercise.id for exercise in exercises)
+        if self._exercise_index is None or self._exercise_index.signature != signature:
+            self._exercise_index = ExerciseFeatureIndex(exercises)
+        return self._exercise_index
+
+    def _profile_vector(
+        self, index: ExerciseFeatureIndex, profile: UserProfile
+    ) -> np.ndarray:
+        """
+        Pesos del perfil por columna de la matriz de características
+
+        Cada término de la puntuación depende solo de la categoría o solo
+        de la dificultad del ejercicio.
+        """
+        category_weights = []
+        for category in index.categories:
+            weight = 0.0
+            if category in profile.preferred_categories:
+                weight += self.weights["category_preference"]
+            elif category in profile.weak_areas:
+                weight += self.weights["category_preference"] * 0.8
+            if category in profile.weak_areas:
+                weight += self.weights["skill_gap"]
+            if category not in profile.strong_areas:
+                weight += self.weights["diversity"]
+            category_weights.append(weight)
+
+        difficulty_weights = []
+        for difficulty in index.difficulties:
+            weight = 0.0
+            if difficulty in profile.preferred_difficulties:
+                weight += self.weights["difficulty_adaptation"]
+            elif profile.average_score > 80 and difficulty == "medium":
+                weight += self.weights["difficulty_adaptation"] * 0.7
+            elif profile.average_score > 90 and difficulty == "hard":
+                weight += self.weights["difficulty_adaptation"] * 0.6
+            difficulty_weights.append(weight)
+
+        return np.array(category_weights + difficulty_weights)
+
+    def _score_exercises(
+        self, index: ExerciseFeatureIndex, profile: UserProfile
+    ) -> np.ndarray:
+        """Puntuación de recomendación de todos los ejercicios del catálogo"""
+        if not len(index):
+            return np.zeros(0)
+
+        # Factor de recencia (igual para todos los ejercicios)
+        recency = self.weights["recency"] * 0.5
+        scores = index.features @ self._profile_vector(index, profile) + recency
+        return np.minimum(scores, 1.0)
+
+    def _select_top_k(self, scores: np.ndarray, limit: int) -> np.ndarray:
+        """
+        Posiciones de los mejores ejercicios por encima del umbral
+
+        Orden descendente por puntuación; los empates conservan el orden
+        del catálogo.
+        """
+        candidates = np.flatnonzero(scores > self.min_confidence_score)
+        if limit <= 0 or not len(candidates):
+            return candidates[:0]
+
+        candidate_scores = scores[candidates]
+        if len(candidates) > limit:
+            top = np.argpartition(-candidate_scores, limit - 1)[:limit]
+            threshold = candidate_scores[top].min()
+            above = candidates[candidate_scores > threshold]
+            ties = candidates[candidate_scores == threshold][: limit - len(above)]
+            candidates = np.concatenate([above, ties])
+            candidate_scores = scores[candidates]
+
+        return candidates[np.lexsort((candidates, -candidate_scores))]
 
     def _generate_recommendation_reasoning(self, exercise, profile: UserProfile) -> str:
         """Generar explicación para la recomendación"""
@@ -676,6 +997,20 @@ class PersonalizedRecommendations:
                         (recommendation_id,),
                     )
 
+                # Actualizar agregados del perfil
+                self._ensure_user_aggregates(cursor, user_id)
+                cursor.execute(
+                    """
+                    UPDATE user_profile_aggregates
+                    SET feedback_count = feedback_count + 1,
+                        rating_sum = rating_sum + ?,
+                        completed_count = completed_count + ?,
+                        version = version + 1
+                    WHERE user_id = ?
+                """,
+                    (rating, int(bool(completed)), user_id),
+                )
+
                 conn.commit()
 
         except Exception as e:
@@ -695,6 +1030,7 @@ class PersonalizedRecommendations:
                 "average_performance": profile.average_score,
                 "consistency_score": self._calculate_consistency_score(user_id),
                 "progress_trend": self._calculate_progress_trend(user_id),
+                "feedback": self._get_feedback_summary(user_id),
                 "recommendations": {
                     "next_exercises": [
                         ex.exercise_id
@@ -711,6 +1047,32 @@ class PersonalizedRecommendations:
             logger.error(f"❌ Error obteniendo insights: {e}")
             return {}
 
+    def _get_feedback_summary(self, user_id: str) -> Dict[str, Any]:
+        """Resumen del feedback del usuario desde sus agregados"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    SELECT feedback_count, rating_sum, completed_count
+                    FROM user_profile_aggregates
+                    WHERE user_id = ?
+                """,
+                    (user_id,),
+                )
+                row = cursor.fetchone() or (0, 0, 0)
+
+            feedback_count, rating_sum, completed_count = row
+            return {
+                "total_feedback": feedback_count,
+                "average_rating": rating_sum / feedback_count if feedback_count else 0.0,
+                "completed_exercises": completed_count,
+            }
+
+        except Exception as e:
+            logger.error(f"❌ Error obteniendo resumen de feedback: {e}")
+            return {}
+
     def _calculate_consistency_score(self, user_id: str) -> float:
         """Calcular puntuación de consistencia en el estudio"""
         try:
@@ -6,15 +6,24 @@ Implementación completa de encriptación de datos y archivos
 """
 
 import os
+import io
 import base64
 import hashlib
 import json
 import logging
+import struct
+import tarfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, Optional, Union, Tuple
+from typing import BinaryIO, Callable, Dict, Any, Iterable, List, Optional, Union, Tuple
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+from cryptography.exceptions import InvalidTag
 from cryptography.fernet import Fernet
 import secrets
 import time
@@ -25,6 +34,265 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Formato de encriptación en streaming (AEAD por bloques)
+#
+#   cabecera: magic | versión | algoritmo | tamaño de bloque | salt | prefijo de nonce
+#   registros: longitud (4 bytes) | bloque encriptado con tag
+#
+# El registro 0 contiene los metadatos (JSON) y los siguientes los datos.
+# Cada nonce es prefijo || índice de bloque || marca de último bloque, y la
+# cabecera va como datos asociados en todos los bloques, así que reordenar,
+# truncar o alterar la cabecera hace fallar la autenticación.
+STREAM_MAGIC = b"SHSTREAM"
+STREAM_VERSION = 1
+STREAM_CHUNK_SIZE = 1024 * 1024
+STREAM_ALGORITHMS = {"aes-256-gcm": (1, AESGCM), "chacha20-poly1305": (2, ChaCha20Poly1305)}
+STREAM_MAX_METADATA_SIZE = 16 * 1024 * 1024
+_STREAM_HEADER = struct.Struct(">8sBBI16s7s")
+_STREAM_RECORD = struct.Struct(">I")
+_AEAD_TAG_SIZE = 16
+
+# Iteraciones de PBKDF2 para derivar la clave de la clave maestra
+KDF_ITERATIONS = 100000
+
+# Claves derivadas por (huella de la clave maestra, salt, iteraciones)
+_derived_key_cache: Dict[Tuple[str, bytes, int], bytes] = {}
+_derived_key_lock = threading.Lock()
+
+# Prefijo de los campos encriptados con encrypt_many (AES-256-GCM)
+FIELD_TOKEN_PREFIX = "f1:"
+_FIELD_NONCE_SIZE = 12
+
+# Estado de una rotación de clave en curso
+KEY_ROTATION_CHECKPOINT = Path("modules/security/key_rotation.json")
+KEY_ROTATION_PENDING_KEY = Path("modules/security/master.key.pending")
+
+
+def derive_master_key(
+    master_key: str, salt: bytes, iterations: int = KDF_ITERATIONS
+) -> bytes:
+    """
+    Derivar la clave de 32 bytes con PBKDF2, una sola vez por proceso
+
+    PBKDF2 es deliberadamente lento; crear instancias de DataEncryption por
+    registro reutiliza la clave ya derivada para la misma clave maestra y
+    salt.
+    """
+    fingerprint = hashlib.sha256(master_key.encode()).hexdigest()
+    cache_key = (fingerprint, bytes(salt), iterations)
+
+    with _derived_key_lock:
+        cached = _derived_key_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=salt,
+        iterations=iterations,
+    )
+    derived = kdf.derive(master_key.encode())
+
+    with _derived_key_lock:
+        _derived_key_cache[cache_key] = derived
+    return derived
+
+
+class StreamCipher:
+    """
+    AEAD por bloques de un flujo encriptado
+
+    La clave de cada flujo se deriva con HKDF de la clave maestra y un salt
+    aleatorio de la cabecera, de modo que los nonces nunca se repiten entre
+    archivos.
+    """
+
+    def __init__(self, raw_key: bytes, header: bytes):
+        (
+            magic,
+            version,
+            algorithm_id,
+            self.chunk_size,
+            salt,
+            self.nonce_prefix,
+        ) = _STREAM_HEADER.unpack(header)
+
+        if magic != STREAM_MAGIC:
+            raise ValueError("No es un flujo encriptado de Shaili AI")
+        if version != STREAM_VERSION:
+            raise ValueError(f"Versión de flujo encriptado no soportada: {version}")
+
+        algorithms_by_id = {
+            algorithm_id: (name, cls)
+            for name, (algorithm_id, cls) in STREAM_ALGORITHMS.items()
+        }
+        if algorithm_id not in algorithms_by_id:
+            raise ValueError(f"Algoritmo de flujo no soportado: {algorithm_id}")
+        self.algorithm, aead_class = algorithms_by_id[algorithm_id]
+
+        stream_key = HKDF(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=salt,
+            info=b"shaili-ai/stream/v1/" + self.algorithm.encode(),
+        ).derive(raw_key)
+        self.aead = aead_class(stream_key)
+        self.header = header
+
+    @classmethod
+    def create(
+        cls,
+        raw_key: bytes,
+        algorithm: str = "aes-256-gcm",
+        chunk_size: int = STREAM_CHUNK_SIZE,
+    ) -> "StreamCipher":
+        """Nuevo flujo con salt y prefijo de nonce aleatorios"""
+        if algorithm not in STREAM_ALGORITHMS:
+            raise ValueError(f"Algoritmo de flujo no soportado: {algorithm}")
+        header = _STREAM_HEADER.pack(
+            STREAM_MAGIC,
+            STREAM_VERSION,
+            STREAM_ALGORITHMS[algorithm][0],
+            chunk_size,
+            os.urandom(16),
+            os.urandom(7),
+        )
+        return cls(raw_key, header)
+
+    def _nonce(self, index: int, last: bool) -> bytes:
+        return self.nonce_prefix + struct.pack(">IB", index, 1 if last else 0)
+
+    def encrypt(self, index: int, last: bool, data: bytes) -> bytes:
+        return self.aead.encrypt(self._nonce(index, last), bytes(data), self.header)
+
+    def decrypt(self, index: int, last: bool, data: bytes) -> bytes:
+        return self.aead.decrypt(self._nonce(index, last), data, self.header)
+
+
+class EncryptingWriter(io.RawIOBase):
+    """
+    Objeto de archivo que encripta lo que se escribe en él
+
+    Acumula como mucho un bloque en memoria (más los bloques en vuelo si
+    workers > 1), así que puede recibir un tar en streaming o archivos de
+    cualquier tamaño con memoria constante.
+    """
+
+    def __init__(
+        self,
+        dst: BinaryIO,
+        cipher: StreamCipher,
+        metadata: Optional[Dict[str, Any]] = None,
+        workers: int = 1,
+    ):
+        super().__init__()
+        self.dst = dst
+        self.cipher = cipher
+        self.buffer = bytearray()
+        self.index = 1
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+        self.pending: deque = deque()
+
+        self._write_raw(cipher.header)
+        self._write_record(
+            cipher.encrypt(
+                0, False, json.dumps(metadata or {}, ensure_ascii=False).encode("utf-8")
+            )
+        )
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.buffer += data
+        self.bytes_in += len(data)
+
+        chunk_size = self.cipher.chunk_size
+        if len(self.buffer) >= chunk_size:
+            view = memoryview(self.buffer)
+            full = len(self.buffer) - len(self.buffer) % chunk_size
+            for start in range(0, full, chunk_size):
+                self._emit(bytes(view[start : start + chunk_size]), last=False)
+            view.release()
+            del self.buffer[:full]
+
+        return len(data)
+
+    def _emit(self, chunk: bytes, last: bool):
+        index = self.index
+        self.index += 1
+
+        if self.executor is None:
+            self._write_record(self.cipher.encrypt(index, last, chunk))
+            return
+
+        self.pending.append(self.executor.submit(self.cipher.encrypt, index, last, chunk))
+        # Ventana acotada de bloques en vuelo, escritos en orden
+        while len(self.pending) > self.workers * 2:
+            self._write_record(self.pending.popleft().result())
+
+    def _write_raw(self, data: bytes):
+        self.dst.write(data)
+        self.bytes_out += len(data)
+
+    def _write_record(self, encrypted: bytes):
+        self._write_raw(_STREAM_RECORD.pack(len(encrypted)))
+        self._write_raw(encrypted)
+
+    def close(self):
+        """Encriptar el último bloque (marcado como final) y vaciar la cola"""
+        if self.closed:
+            return
+        try:
+            self._emit(bytes(self.buffer), last=True)
+            self.buffer = bytearray()
+            while self.pending:
+                self._write_record(self.pending.popleft().result())
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown(wait=True)
+            super().close()
+
+    def abort(self):
+        """Cerrar sin el bloque final: el flujo queda inválido (truncado)"""
+        if self.closed:
+            return
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+        self.pending.clear()
+        super().close()
+
+
+def _read_exact(src: BinaryIO, size: int) -> bytes:
+    data = src.read(size)
+    if len(data) != size:
+        raise ValueError("Flujo encriptado truncado")
+    return data
+
+
+def _read_record(src: BinaryIO, max_size: int) -> Optional[bytes]:
+    """Leer un registro (None al final del flujo)"""
+    prefix = src.read(_STREAM_RECORD.size)
+    if not prefix:
+        return None
+    if len(prefix) != _STREAM_RECORD.size:
+        raise ValueError("Flujo encriptado truncado")
+    (length,) = _STREAM_RECORD.unpack(prefix)
+    if length > max_size:
+        raise ValueError("Registro encriptado demasiado grande")
+    return _read_exact(src, length)
+
+
+def is_encrypted_stream(path: Union[str, Path]) -> bool:
+    """Indica si un archivo usa el formato de encriptación en streaming"""
+    with open(path, "rb") as f:
+        return f.read(len(STREAM_MAGIC)) == STREAM_MAGIC
+
 
 class DataEncryption:
     """Sistema de encriptación de datos"""
@@ -82,14 +350,197 @@ class DataEncryption:
         return salt
 
     def _derive_key(self):
-        """Derivar clave de encriptación"""
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=self.salt,
-            iterations=100000,
+        """Derivar clave de encriptación (en caché por clave maestra y salt)"""
+        self.raw_key = derive_master_key(self.master_key, self.salt)
+        self.key = base64.urlsafe_b64encode(self.raw_key)
+        self._field_cipher = None
+
+    def _get_field_cipher(self) -> AESGCM:
+        """Cipher de campos, creado una vez por instancia"""
+        if self._field_cipher is None:
+            field_key = HKDF(
+                algorithm=hashes.SHA256(),
+                length=32,
+                salt=None,
+                info=b"shaili-ai/fields/v1",
+            ).derive(self.raw_key)
+            self._field_cipher = AESGCM(field_key)
+        return self._field_cipher
+
+    def encrypt_many(
+        self,
+        values: Iterable[Optional[Union[str, bytes]]],
+        associated_data: Optional[bytes] = None,
+    ) -> List[Optional[str]]:
+        """
+        Encriptar muchos campos con un único cipher
+
+        Pensado para columnas de exportaciones y migraciones: cada valor
+        se sella con AES-256-GCM y un nonce aleatorio, y se devuelve como
+        token de texto. Los None se conservan.
+
+        Args:
+            values: Valores str o bytes
+            associated_data: Datos autenticados comunes (p. ej. el nombre
+                de la columna); hay que pasar los mismos al desencriptar
+        """
+        cipher = self._get_field_cipher()
+        tokens: List[Optional[str]] = []
+
+        for value in values:
+            if value is None:
+                tokens.append(None)
+                continue
+            if isinstance(value, str):
+                # El primer byte distingue texto de bytes al desencriptar
+                plaintext = b"s" + value.encode("utf-8")
+            elif isinstance(value, (bytes, bytearray)):
+                plaintext = b"b" + bytes(value)
+            else:
+                raise ValueError("Tipo de datos no soportado")
+
+            nonce = os.urandom(_FIELD_NONCE_SIZE)
+            sealed = cipher.encrypt(nonce, plaintext, associated_data)
+            tokens.append(
+                FIELD_TOKEN_PREFIX + base64.urlsafe_b64encode(nonce + sealed).decode()
+            )
+
+        return tokens
+
+    def decrypt_many(
+        self,
+        tokens: Iterable[Optional[str]],
+        associated_data: Optional[bytes] = None,
+    ) -> List[Optional[Union[str, bytes]]]:
+        """Desencriptar campos producidos por encrypt_many"""
+        cipher = self._get_field_cipher()
+        values: List[Optional[Union[str, bytes]]] = []
+
+        for token in tokens:
+            if token is None:
+                values.append(None)
+                continue
+            if not token.startswith(FIELD_TOKEN_PREFIX):
+                raise ValueError("Token de campo encriptado inválido")
+
+            raw = base64.urlsafe_b64decode(token[len(FIELD_TOKEN_PREFIX) :])
+            plaintext = cipher.decrypt(
+                raw[:_FIELD_NONCE_SIZE], raw[_FIELD_NONCE_SIZE:], associated_data
+            )
+            kind, body = plaintext[:1], plaintext[1:]
+            values.append(body.decode("utf-8") if kind == b"s" else body)
+
+        return values
+
+    def open_encrypting_writer(
+        self,
+        dst: BinaryIO,
+        metadata: Optional[Dict[str, Any]] = None,
+        algorithm: str = "aes-256-gcm",
+        chunk_size: int = STREAM_CHUNK_SIZE,
+        workers: int = 1,
+    ) -> EncryptingWriter:
+        """Objeto de archivo que escribe en dst un flujo encriptado"""
+        cipher = StreamCipher.create(self.raw_key, algorithm, chunk_size)
+        return EncryptingWriter(dst, cipher, metadata, workers)
+
+    def encrypt_stream(
+        self,
+        src: BinaryIO,
+        dst: BinaryIO,
+        metadata: Optional[Dict[str, Any]] = None,
+        algorithm: str = "aes-256-gcm",
+        chunk_size: int = STREAM_CHUNK_SIZE,
+        workers: int = 1,
+    ) -> int:
+        """
+        Encriptar un flujo por bloques con memoria constante
+
+        Args:
+            src: Origen en claro (se lee por bloques)
+            dst: Destino del flujo encriptado
+            metadata: Metadatos que se guardan encriptados con el flujo
+            algorithm: "aes-256-gcm" o "chacha20-poly1305"
+            chunk_size: Bytes por bloque
+            workers: Hilos que encriptan bloques en paralelo
+
+        Returns:
+            Bytes en claro encriptados
+        """
+        writer = self.open_encrypting_writer(
+            dst, metadata, algorithm, chunk_size, workers
         )
-        self.key = base64.urlsafe_b64encode(kdf.derive(self.master_key.encode()))
+        try:
+            for chunk in iter(lambda: src.read(chunk_size), b""):
+                writer.write(chunk)
+        except Exception:
+            writer.abort()
+            raise
+        writer.close()
+        return writer.bytes_in
+
+    def decrypt_stream(
+        self, src: BinaryIO, dst: BinaryIO, workers: int = 1
+    ) -> Dict[str, Any]:
+        """
+        Desencriptar un flujo por bloques verificando cada bloque
+
+        Returns:
+            Metadatos guardados con el flujo
+        """
+        cipher, metadata = self._open_stream(src)
+        self._decrypt_records(src, cipher, dst, workers)
+        return metadata
+
+    def _open_stream(self, src: BinaryIO) -> Tuple[StreamCipher, Dict[str, Any]]:
+        """Leer la cabecera y los metadatos de un flujo encriptado"""
+        cipher = StreamCipher(self.raw_key, _read_exact(src, _STREAM_HEADER.size))
+
+        metadata_record = _read_record(src, STREAM_MAX_METADATA_SIZE)
+        if metadata_record is None:
+            raise ValueError("Flujo encriptado truncado")
+        return cipher, json.loads(cipher.decrypt(0, False, metadata_record))
+
+    def _decrypt_records(
+        self, src: BinaryIO, cipher: StreamCipher, dst: BinaryIO, workers: int = 1
+    ):
+        """Desencriptar los bloques de datos de un flujo ya abierto"""
+        max_record = cipher.chunk_size + _AEAD_TAG_SIZE
+        executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+        pending: deque = deque()
+        try:
+            index = 1
+            record = _read_record(src, max_record)
+            while record is not None:
+                next_record = _read_record(src, max_record)
+                last = next_record is None
+
+                if executor is None:
+                    dst.write(cipher.decrypt(index, last, record))
+                else:
+                    pending.append(executor.submit(cipher.decrypt, index, last, record))
+                    while len(pending) > workers * 2:
+                        dst.write(pending.popleft().result())
+
+                index += 1
+                record = next_record
+
+            if index == 1:
+                raise ValueError("Flujo encriptado truncado")
+            while pending:
+                dst.write(pending.popleft().result())
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+
+    def can_open_stream(self, path: Union[str, Path]) -> bool:
+        """Indica si un archivo es un flujo encriptado con esta clave"""
+        try:
+            with open(path, "rb") as src:
+                self._open_stream(src)
+            return True
+        except (InvalidTag, ValueError, OSError):
+            return False
 
     def encrypt_data(self, data: Union[str, bytes, Dict[str, Any]]) -> Dict[str, str]:
         """Encriptar datos"""
@@ -107,8 +558,8 @@ class DataEncryption:
             # Generar IV
             iv = os.urandom(16)
 
-            # Crear cipher
-            cipher = Cipher(algorithms.AES(self.key), modes.CBC(iv))
+            # Crear cipher (clave de 32 bytes: AES-256)
+            cipher = Cipher(algorithms.AES(self.raw_key), modes.CBC(iv))
             encryptor = cipher.encryptor()
 
             # Padding
@@ -124,7 +575,7 @@ class DataEncryption:
                 "iv": base64.b64encode(iv).decode(),
                 "salt": base64.b64encode(self.salt).decode(),
                 "algorithm": "AES-256-CBC",
-                "iterations": 100000,
+                "iterations": KDF_ITERATIONS,
             }
 
         except Exception as e:
@@ -140,8 +591,8 @@ class DataEncryption:
             encrypted_data = base64.b64decode(encrypted_dict["encrypted_data"])
             iv = base64.b64decode(encrypted_dict["iv"])
 
-            # Crear cipher
-            cipher = Cipher(algorithms.AES(self.key), modes.CBC(iv))
+            # Crear cipher (clave de 32 bytes: AES-256)
+            cipher = Cipher(algorithms.AES(self.raw_key), modes.CBC(iv))
             decryptor = cipher.decryptor()
 
             # Desencriptar
@@ -164,7 +615,10 @@ class DataEncryption:
             raise
 
     def encrypt_file(
-        self, file_path: Union[str, Path], output_path: Union[str, Path] = None
+        self,
+        file_path: Union[str, Path],
+        output_path: Union[str, Path] = None,
+        workers: int = 1,
     ) -> Path:
         """Encriptar archivo"""
         try:
@@ -180,16 +634,9 @@ class DataEncryption:
             else:
                 output_path = Path(output_path)
 
-            # Leer archivo
-            with open(file_path, "rb") as f:
-                file_data = f.read()
-
-            # Encriptar datos
-            encrypted_dict = self.encrypt_data(file_data)
-
-            # Guardar archivo encriptado
-            with open(output_path, "w") as f:
-                json.dump(encrypted_dict, f, indent=2)
+            # Encriptar por bloques sin cargar el archivo en memoria
+            with open(file_path, "rb") as src, open(output_path, "wb") as dst:
+                self.encrypt_stream(src, dst, workers=workers)
 
             logger.info(f"✅ Archivo encriptado: {file_path} -> {output_path}")
             return output_path
@@ -202,6 +649,7 @@ class DataEncryption:
         self,
         encrypted_file_path: Union[str, Path],
         output_path: Union[str, Path] = None,
+        workers: int = 1,
     ) -> Path:
         """Desencriptar archivo"""
         try:
@@ -212,16 +660,6 @@ class DataEncryption:
                     f"Archivo encriptado no encontrado: {encrypted_file_path}"
                 )
 
-            # Leer archivo encriptado
-            with open(encrypted_file_path, "r") as f:
-                encrypted_dict = json.load(f)
-
-            # Desencriptar datos
-            decrypted_data = self.decrypt_data(encrypted_dict)
-
-            if isinstance(decrypted_data, str):
-                decrypted_data = decrypted_data.encode("utf-8")
-
             # Determinar ruta de salida
             if output_path is None:
                 if encrypted_file_path.name.endswith(".encrypted"):
@@ -236,9 +674,28 @@ class DataEncryption:
             else:
                 output_path = Path(output_path)
 
-            # Guardar archivo desencriptado
-            with open(output_path, "wb") as f:
-                f.write(decrypted_data)
+            if is_encrypted_stream(encrypted_file_path):
+                # Desencriptar por bloques; si falla no queda un archivo a medias
+                temp_path = output_path.with_name(output_path.name + ".partial")
+                try:
+                    with open(encrypted_file_path, "rb") as src, open(
+                        temp_path, "wb"
+                    ) as dst:
+                        self.decrypt_stream(src, dst, workers=workers)
+                    os.replace(temp_path, output_path)
+                finally:
+                    temp_path.unlink(missing_ok=True)
+            else:
+                # Formato anterior: JSON con los datos en base64
+                with open(encrypted_file_path, "r") as f:
+                    encrypted_dict = json.load(f)
+
+                decrypted_data = self.decrypt_data(encrypted_dict)
+                if isinstance(decrypted_data, str):
+                    decrypted_data = decrypted_data.encode("utf-8")
+
+                with open(output_path, "wb") as f:
+                    f.write(decrypted_data)
 
             logger.info(
                 f"✅ Archivo desencriptado: {encrypted_file_path} -> {output_path}"
@@ -324,7 +781,7 @@ class DataEncryption:
             raise
 
     def create_secure_backup(
-        self, source_path: Union[str, Path], backup_name: str = None
+        self, source_path: Union[str, Path], backup_name: str = None, workers: int = 1
     ) -> Path:
         """Crear backup seguro encriptado"""
         try:
@@ -342,21 +799,25 @@ class DataEncryption:
             )
 
             if source_path.is_file():
-                self.encrypt_file(source_path, backup_path)
+                self.encrypt_file(source_path, backup_path, workers=workers)
             elif source_path.is_dir():
-                # Crear archivo temporal con contenido del directorio
-                import tarfile
-
-                temp_archive = Path("modules/security/temp_backup.tar.gz")
-
-                with tarfile.open(temp_archive, "w:gz") as tar:
-                    tar.add(source_path, arcname=source_path.name)
-
-                # Encriptar archivo temporal
-                self.encrypt_file(temp_archive, backup_path)
-
-                # Limpiar archivo temporal
-                temp_archive.unlink()
+                # tar.gz en streaming directamente hacia el encriptador:
+                # no se crea ningún archivo temporal en claro
+                with open(backup_path, "wb") as dst:
+                    writer = self.open_encrypting_writer(
+                        dst,
+                        metadata={"format": "tar.gz", "source": source_path.name},
+                        workers=workers,
+                    )
+                    try:
+                        with tarfile.open(fileobj=writer, mode="w|gz") as tar:
+                            tar.add(source_path, arcname=source_path.name)
+                    except Exception:
+                        writer.abort()
+                        dst.close()
+                        backup_path.unlink(missing_ok=True)
+                        raise
+                    writer.close()
 
             logger.info(f"✅ Backup seguro creado: {backup_path}")
             return backup_path
@@ -396,36 +857,75 @@ class DataEncryption:
             logger.error(f"❌ Error verificando integridad: {e}")
             return False
 
-    def rotate_encryption_key(self, new_master_key: str = None) -> bool:
-        """Rotar clave de encriptación"""
+    def rotate_encryption_key(
+        self,
+        new_master_key: str = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> bool:
+        """
+        Rotar clave de encriptación
+
+        Cada archivo se re-encripta en su mismo formato (los flujos en
+        streaming, alimentando el encriptador de la clave nueva con lo que
+        desencripta la antigua; los JSON anteriores, como JSON) y se
+        sustituye de forma atómica. El progreso se guarda en un checkpoint
+        junto con la clave nueva pendiente, así que una rotación
+        interrumpida se reanuda con la misma clave en la siguiente llamada.
+        """
         try:
-            # Generar nueva clave maestra si no se proporciona
-            if new_master_key is None:
-                new_master_key = secrets.token_urlsafe(32)
+            checkpoint = self._load_rotation_checkpoint()
+
+            if checkpoint is not None:
+                pending_key = KEY_ROTATION_PENDING_KEY.read_text().strip()
+                if new_master_key is not None and new_master_key != pending_key:
+                    raise ValueError(
+                        "Hay una rotación de clave a medias con otra clave; "
+                        "reanúdala sin indicar clave nueva"
+                    )
+                new_master_key = pending_key
+                logger.info(
+                    f"🔄 Reanudando rotación de clave: "
+                    f"{len(checkpoint['completed'])} archivos ya rotados"
+                )
+            else:
+                # Generar nueva clave maestra si no se proporciona
+                if new_master_key is None:
+                    new_master_key = secrets.token_urlsafe(32)
+
+                KEY_ROTATION_PENDING_KEY.parent.mkdir(parents=True, exist_ok=True)
+                KEY_ROTATION_PENDING_KEY.write_text(new_master_key)
+                checkpoint = {"started_at": time.time(), "completed": []}
+                self._save_rotation_checkpoint(checkpoint)
 
             # Crear nueva instancia con la nueva clave
             new_encryption = DataEncryption(new_master_key)
+            completed = set(checkpoint["completed"])
 
             # Re-encriptar todos los archivos encriptados
             encrypted_dir = Path("modules/security/encrypted")
-            if encrypted_dir.exists():
-                for encrypted_file in encrypted_dir.glob("*.encrypted"):
-                    try:
-                        # Desencriptar con clave antigua
-                        decrypted_data = self.decrypt_file(encrypted_file)
-
-                        # Encriptar con nueva clave
-                        new_encryption.encrypt_file(decrypted_data, encrypted_file)
-
-                        # Limpiar archivo temporal
-                        decrypted_data.unlink()
+            encrypted_files = (
+                sorted(encrypted_dir.glob("*.encrypted"))
+                if encrypted_dir.exists()
+                else []
+            )
 
+            for position, encrypted_file in enumerate(encrypted_files, start=1):
+                if encrypted_file.name not in completed:
+                    try:
+                        self._reencrypt_file(encrypted_file, new_encryption)
                     except Exception as e:
                         logger.error(
                             f"❌ Error rotando clave para {encrypted_file}: {e}"
                         )
                         return False
 
+                    completed.add(encrypted_file.name)
+                    checkpoint["completed"] = sorted(completed)
+                    self._save_rotation_checkpoint(checkpoint)
+
+                if progress_callback:
+                    progress_callback(position, len(encrypted_files))
+
             # Actualizar clave maestra
             key_path = Path("modules/security/master.key")
             with open(key_path, "w") as f:
@@ -436,6 +936,10 @@ class DataEncryption:
             with open(salt_path, "wb") as f:
                 f.write(new_encryption.salt)
 
+            # Rotación terminada: eliminar checkpoint y clave pendiente
+            KEY_ROTATION_CHECKPOINT.unlink(missing_ok=True)
+            KEY_ROTATION_PENDING_KEY.unlink(missing_ok=True)
+
             # Actualizar instancia actual
             self.master_key = new_master_key
             self.salt = new_encryption.salt
@@ -448,6 +952,66 @@ class DataEncryption:
             logger.error(f"❌ Error rotando clave de encriptación: {e}")
             return False
 
+    def _reencrypt_file(self, encrypted_file: Path, new_encryption: "DataEncryption"):
+        """Re-encriptar un archivo con otra clave sin escribir texto en claro"""
+        temp_path = encrypted_file.with_name(encrypted_file.name + ".rotating")
+
+        try:
+            if is_encrypted_stream(encrypted_file):
+                # Reemplazado antes de guardar el checkpoint: ya está rotado
+                if not self.can_open_stream(encrypted_file) and (
+                    new_encryption.can_open_stream(encrypted_file)
+                ):
+                    return
+
+                with open(encrypted_file, "rb") as src, open(temp_path, "wb") as dst:
+                    cipher, metadata = self._open_stream(src)
+                    writer = new_encryption.open_encrypting_writer(
+                        dst, metadata, cipher.algorithm, cipher.chunk_size
+                    )
+                    try:
+                        self._decrypt_records(src, cipher, writer)
+                    except Exception:
+                        writer.abort()
+                        raise
+                    writer.close()
+            else:
+                # Formato anterior (JSON): se mantiene en JSON, porque
+                # decrypt_config y los paquetes de FileEncryption lo leen así
+                with open(encrypted_file, "r") as f:
+                    encrypted_dict = json.load(f)
+                try:
+                    decrypted_data = self.decrypt_data(encrypted_dict)
+                except Exception:
+                    # Reemplazado antes de guardar el checkpoint: ya está rotado
+                    if new_encryption.verify_encryption_integrity(encrypted_dict):
+                        return
+                    raise
+                if not isinstance(decrypted_data, (dict, str)):
+                    # JSON escalar o lista: decrypt_data lo vuelve a parsear
+                    decrypted_data = json.dumps(decrypted_data, ensure_ascii=False)
+
+                reencrypted = new_encryption.encrypt_data(decrypted_data)
+                with open(temp_path, "w") as dst:
+                    json.dump(reencrypted, dst, indent=2)
+
+            os.replace(temp_path, encrypted_file)
+        finally:
+            temp_path.unlink(missing_ok=True)
+
+    def _load_rotation_checkpoint(self) -> Optional[Dict[str, Any]]:
+        """Checkpoint de una rotación interrumpida (si existe)"""
+        if not KEY_ROTATION_CHECKPOINT.exists() or not KEY_ROTATION_PENDING_KEY.exists():
+            return None
+        with open(KEY_ROTATION_CHECKPOINT, "r") as f:
+            return json.load(f)
+
+    def _save_rotation_checkpoint(self, checkpoint: Dict[str, Any]):
+        temp_path = KEY_ROTATION_CHECKPOINT.with_suffix(".tmp")
+        with open(temp_path, "w") as f:
+            json.dump(checkpoint, f, indent=2)
+        os.replace(temp_path, KEY_ROTATION_CHECKPOINT)
+
 
 class FileEncryption:
     """Encriptación de archivos con metadatos"""
@@ -474,29 +1038,16 @@ class FileEncryption:
                     "original_filename": file_path.name,
                     "original_size": file_path.stat().st_size,
                     "encryption_timestamp": time.time(),
-                    "encryption_algorithm": "AES-256-CBC",
+                    "encryption_algorithm": "AES-256-GCM-STREAM",
                 }
             )
 
-            # Leer archivo
-            with open(file_path, "rb") as f:
-                file_data = f.read()
-
-            # Crear paquete con datos y metadatos
-            package = {
-                "metadata": metadata,
-                "data": base64.b64encode(file_data).decode(),
-            }
-
-            # Encriptar paquete
-            encrypted_dict = self.encryption.encrypt_data(package)
-
-            # Guardar archivo encriptado
+            # Metadatos y datos en el mismo flujo encriptado por bloques
             output_path = (
                 Path("modules/security/encrypted") / f"{file_path.name}.encrypted"
             )
-            with open(output_path, "w") as f:
-                json.dump(encrypted_dict, f, indent=2)
+            with open(file_path, "rb") as src, open(output_path, "wb") as dst:
+                self.encryption.encrypt_stream(src, dst, metadata=metadata)
 
             logger.info(f"✅ Archivo encriptado con metadatos: {file_path}")
             return output_path
@@ -517,7 +1068,17 @@ class FileEncryption:
                     f"Archivo encriptado no encontrado: {encrypted_file_path}"
                 )
 
-            # Leer archivo encriptado
+            if is_encrypted_stream(encrypted_file_path):
+                output = io.BytesIO()
+                with open(encrypted_file_path, "rb") as src:
+                    metadata = self.encryption.decrypt_stream(src, output)
+
+                logger.info(
+                    f"✅ Archivo desencriptado con metadatos: {encrypted_file_path}"
+                )
+                return output.getvalue(), metadata
+
+            # Formato anterior: paquete JSON con los datos en base64
             with open(encrypted_file_path, "r") as f:
                 encrypted_dict = json.load(f)
 
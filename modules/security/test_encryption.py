@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Pruebas del sistema de encriptación
+
+Comprueban el formato en streaming (AEAD por bloques): ida y vuelta con
+ambos algoritmos y detección de flujos truncados, reordenados o alterados;
+la encriptación de campos en lote y la rotación de clave reanudable, que
+conserva el formato JSON anterior.
+"""
+
+import base64
+import io
+import json
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cryptography.exceptions import InvalidTag
+
+from encryption import (
+    FIELD_TOKEN_PREFIX,
+    KEY_ROTATION_CHECKPOINT,
+    KEY_ROTATION_PENDING_KEY,
+    STREAM_ALGORITHMS,
+    DataEncryption,
+    FileEncryption,
+    _STREAM_HEADER,
+    _STREAM_RECORD,
+    derive_master_key,
+    is_encrypted_stream,
+)
+
+MASTER_KEY = "clave-maestra-de-prueba"
+
+
+@contextmanager
+def _inside(tmp_path):
+    """DataEncryption usa rutas relativas (modules/security/...)"""
+    previous = os.getcwd()
+    os.chdir(tmp_path)
+    try:
+        Path("modules/security").mkdir(parents=True, exist_ok=True)
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def _encrypt(encryption: DataEncryption, data: bytes, **options) -> bytes:
+    dst = io.BytesIO()
+    encryption.encrypt_stream(io.BytesIO(data), dst, **options)
+    return dst.getvalue()
+
+
+def _decrypt(encryption: DataEncryption, stream: bytes, **options):
+    dst = io.BytesIO()
+    metadata = encryption.decrypt_stream(io.BytesIO(stream), dst, **options)
+    return dst.getvalue(), metadata
+
+
+def _records(stream: bytes):
+    """Separar un flujo en cabecera y registros"""
+    header, offset, records = stream[: _STREAM_HEADER.size], _STREAM_HEADER.size, []
+    while offset < len(stream):
+        (length,) = _STREAM_RECORD.unpack_from(stream, offset)
+        offset += _STREAM_RECORD.size
+        records.append(stream[offset : offset + length])
+        offset += length
+    return header, records
+
+
+def _join(header: bytes, records) -> bytes:
+    return header + b"".join(_STREAM_RECORD.pack(len(r)) + r for r in records)
+
+
+def _raises(exceptions, function, *args, **kwargs) -> bool:
+    try:
+        function(*args, **kwargs)
+    except exceptions:
+        return True
+    return False
+
+
+def test_stream_round_trip(tmp_path):
+    """Ida y vuelta con ambos algoritmos, varios tamaños y en paralelo"""
+    with _inside(tmp_path):
+        encryption = DataEncryption(MASTER_KEY)
+        for algorithm in STREAM_ALGORITHMS:
+            for size in (0, 1, 64, 64 * 3, 64 * 3 + 5):
+                data = os.urandom(size)
+                for workers in (1, 3):
+                    stream = _encrypt(
+                        encryption,
+                        data,
+                        metadata={"nombre": "datos.bin", "tamaño": size},
+                        algorithm=algorithm,
+                        chunk_size=64,
+                        workers=workers,
+                    )
+                    plain, metadata = _decrypt(encryption, stream, workers=workers)
+                    assert plain == data, (algorithm, size, workers)
+                    assert metadata == {"nombre": "datos.bin", "tamaño": size}
+
+
+def test_stream_detects_truncation_and_tampering(tmp_path):
+    """Quitar, reordenar o alterar bloques hace fallar la autenticación"""
+    with _inside(tmp_path):
+        encryption = DataEncryption(MASTER_KEY)
+        stream = _encrypt(encryption, os.urandom(64 * 3), chunk_size=64)
+        header, records = _records(stream)
+        # metadatos + 3 bloques llenos + bloque final vacío
+        assert len(records) == 5
+
+        errors = (InvalidTag, ValueError)
+        # Truncado en un límite de registro: falta el bloque final
+        assert _raises(errors, _decrypt, encryption, _join(header, records[:-1]))
+        # Solo metadatos
+        assert _raises(errors, _decrypt, encryption, _join(header, records[:1]))
+        # Truncado a mitad de un registro
+        assert _raises(errors, _decrypt, encryption, stream[:-3])
+        # Bloques reordenados
+        swapped = [records[0], records[2], records[1]] + records[3:]
+        assert _raises(errors, _decrypt, encryption, _join(header, swapped))
+        # Bit alterado en un bloque
+        altered = bytearray(records[2])
+        altered[0] ^= 1
+        tampered = records[:2] + [bytes(altered)] + records[3:]
+        assert _raises(errors, _decrypt, encryption, _join(header, tampered))
+        # Cabecera alterada (último byte del tamaño de bloque)
+        bad_header = bytearray(header)
+        bad_header[13] ^= 1
+        assert _raises(errors, _decrypt, encryption, _join(bytes(bad_header), records))
+        # Otra clave maestra
+        other = DataEncryption("otra-clave-maestra")
+        assert _raises(errors, _decrypt, other, stream)
+
+
+def test_file_round_trip_leaves_no_partial_output(tmp_path):
+    """encrypt_file/decrypt_file en streaming; un fallo no deja salida"""
+    with _inside(tmp_path):
+        encryption = DataEncryption(MASTER_KEY)
+        source = Path("original.bin")
+        data = os.urandom(3 * 1024 * 1024 + 17)
+        source.write_bytes(data)
+
+        encrypted = encryption.encrypt_file(source, "original.bin.encrypted")
+        assert is_encrypted_stream(encrypted)
+        assert encryption.can_open_stream(encrypted)
+        assert not DataEncryption("otra-clave-maestra").can_open_stream(encrypted)
+
+        restored = encryption.decrypt_file(encrypted, "restaurado.bin", workers=2)
+        assert restored.read_bytes() == data
+
+        # Archivo truncado: error y ni salida ni temporal a medias
+        truncated = Path("truncado.bin.encrypted")
+        truncated.write_bytes(encrypted.read_bytes()[:-100])
+        assert _raises(
+            (InvalidTag, ValueError), encryption.decrypt_file, truncated, "roto.bin"
+        )
+        assert not Path("roto.bin").exists()
+        assert not Path("roto.bin.partial").exists()
+
+
+def test_encrypt_many_round_trip(tmp_path):
+    """Campos str, bytes y None en lote, con datos asociados"""
+    with _inside(tmp_path):
+        encryption = DataEncryption(MASTER_KEY)
+        values = ["hola", "", "ñandú", b"\x00\xffbinario", None, "hola"]
+        tokens = encryption.encrypt_many(values, associated_data=b"email")
+
+        assert tokens[4] is None
+        assert all(t.startswith(FIELD_TOKEN_PREFIX) for t in tokens if t)
+        # Nonce aleatorio: el mismo valor no produce el mismo token
+        assert tokens[0] != tokens[5]
+
+        # Otra instancia con la misma clave maestra reutiliza la clave derivada
+        same_key = DataEncryption(MASTER_KEY)
+        assert same_key.raw_key is encryption.raw_key
+        assert same_key.decrypt_many(tokens, associated_data=b"email") == values
+
+        # Datos asociados distintos (otra columna) o token ajeno: error
+        assert _raises(InvalidTag, encryption.decrypt_many, tokens[:1], b"telefono")
+        assert _raises(ValueError, encryption.decrypt_many, ["sin-prefijo"])
+        assert _raises(ValueError, encryption.encrypt_many, [42])
+
+
+def test_derived_key_cache():
+    """PBKDF2 se calcula una vez por clave maestra, salt e iteraciones"""
+    salt = os.urandom(16)
+    first = derive_master_key(MASTER_KEY, salt, iterations=1000)
+    assert derive_master_key(MASTER_KEY, salt, iterations=1000) is first
+    assert derive_master_key(MASTER_KEY, os.urandom(16), iterations=1000) != first
+    assert derive_master_key("otra", salt, iterations=1000) != first
+
+
+def test_key_rotation_resumes_after_failure(tmp_path):
+    """Una rotación interrumpida se reanuda con la misma clave nueva"""
+    with _inside(tmp_path):
+        encryption = DataEncryption(MASTER_KEY)
+        contents = {}
+        for name in ("a.txt", "b.txt", "c.txt"):
+            contents[name] = os.urandom(1000)
+            Path(name).write_bytes(contents[name])
+            encryption.encrypt_file(name)
+
+        original = encryption._reencrypt_file
+        rotated = []
+
+        def failing_on_b(encrypted_file, new_encryption):
+            if encrypted_file.name == "b.txt.encrypted":
+                raise OSError("disco lleno")
+            rotated.append(encrypted_file.name)
+            original(encrypted_file, new_encryption)
+
+        encryption._reencrypt_file = failing_on_b
+        assert not encryption.rotate_encryption_key("clave-nueva")
+        assert rotated == ["a.txt.encrypted"]
+        assert KEY_ROTATION_PENDING_KEY.read_text() == "clave-nueva"
+        with open(KEY_ROTATION_CHECKPOINT) as f:
+            assert json.load(f)["completed"] == ["a.txt.encrypted"]
+
+        # Reanudar con otra clave se rechaza; sin clave se usa la pendiente
+        assert not encryption.rotate_encryption_key("otra-clave")
+
+        def resumed(encrypted_file, new_encryption):
+            rotated.append(encrypted_file.name)
+            original(encrypted_file, new_encryption)
+
+        encryption._reencrypt_file = resumed
+        progress = []
+        assert encryption.rotate_encryption_key(
+            progress_callback=lambda done, total: progress.append((done, total))
+        )
+        assert rotated.count("a.txt.encrypted") == 1
+        assert progress[-1] == (3, 3)
+        assert not KEY_ROTATION_CHECKPOINT.exists()
+        assert not KEY_ROTATION_PENDING_KEY.exists()
+        assert Path("modules/security/master.key").read_text() == "clave-nueva"
+
+        # Todo se abre con la clave nueva y nada con la antigua
+        new_encryption = DataEncryption("clave-nueva")
+        old_encryption = DataEncryption(MASTER_KEY)
+        for name, data in contents.items():
+            encrypted = Path("modules/security/encrypted") / f"{name}.encrypted"
+            assert is_encrypted_stream(encrypted)
+            assert not old_encryption.can_open_stream(encrypted)
+            restored = new_encryption.decrypt_file(encrypted, f"restaurado_{name}")
+            assert restored.read_bytes() == data, name
+
+
+def test_key_rotation_keeps_legacy_json_files(tmp_path):
+    """Configuraciones y paquetes JSON anteriores siguen legibles tras rotar"""
+    with _inside(tmp_path):
+        encryption = DataEncryption(MASTER_KEY)
+        encrypted_dir = Path("modules/security/encrypted")
+        config = {"api_key": "sk-prueba", "límite": 3}
+        config_path = encryption.encrypt_config(config, "servicio")
+
+        # Paquete de FileEncryption en el formato anterior (datos en base64)
+        legacy_data = os.urandom(300)
+        legacy_metadata = {"original_filename": "antiguo.bin", "original_size": 300}
+        package = {
+            "metadata": legacy_metadata,
+            "data": base64.b64encode(legacy_data).decode(),
+        }
+        legacy_path = encrypted_dir / "antiguo.bin.encrypted"
+        legacy_path.write_text(json.dumps(encryption.encrypt_data(package)))
+
+        # Y uno en streaming con metadatos
+        Path("nuevo.bin").write_bytes(b"datos nuevos")
+        stream_path = FileEncryption(encryption).encrypt_file_with_metadata(
+            "nuevo.bin", {"origen": "prueba"}
+        )
+
+        # La configuración ya se rotó pero el checkpoint no llegó a guardarse
+        DataEncryption(MASTER_KEY)._reencrypt_file(
+            config_path, DataEncryption("clave-nueva")
+        )
+        assert encryption.rotate_encryption_key("clave-nueva")
+
+        assert not is_encrypted_stream(config_path)
+        assert not is_encrypted_stream(legacy_path)
+        assert encryption.decrypt_config("servicio") == config
+        assert DataEncryption("clave-nueva").decrypt_config("servicio") == config
+
+        files = FileEncryption(encryption)
+        assert files.decrypt_file_with_metadata(legacy_path) == (
+            legacy_data,
+            legacy_metadata,
+        )
+        data, metadata = files.decrypt_file_with_metadata(stream_path)
+        assert data == b"datos nuevos"
+        assert metadata["origen"] == "prueba"
+        assert metadata["original_filename"] == "nuevo.bin"
+
+        old_encryption = DataEncryption(MASTER_KEY)
+        assert not old_encryption.verify_encryption_integrity(
+            json.loads(config_path.read_text())
+        )
+
+
+def main():
+    """Ejecutar las pruebas sin pytest"""
+    tests = [
+        test_stream_round_trip,
+        test_stream_detects_truncation_and_tampering,
+        test_file_round_trip_leaves_no_partial_output,
+        test_encrypt_many_round_trip,
+        test_key_rotation_resumes_after_failure,
+        test_key_rotation_keeps_legacy_json_files,
+    ]
+    failed = 0
+    for test in tests + [test_derived_key_cache]:
+        try:
+            if test in tests:
+                test(tempfile.mkdtemp(prefix="encryption_test_"))
+            else:
+                test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,13 +3,20 @@
 Sistema de Fine-tuning Automático LoRA
 =====================================
 Entrena automáticamente modelos LoRA cuando se acumulan suficientes datos
+
+Los contadores de datos pendientes por rama se actualizan al insertar datos
+y despiertan al planificador cuando una rama supera su umbral. Los trabajos
+se ejecutan en procesos de entrenamiento persistentes que mantienen el
+modelo base cargado y entrenan un adaptador tras otro sobre él.
 """
 
 import json
 import logging
-import subprocess
+import multiprocessing
+import queue
 import threading
 import time
+import traceback
 from pathlib import Path
 from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, asdict
@@ -17,6 +24,11 @@ from datetime import datetime, timedelta
 import sqlite3
 import os
 
+try:
+    from .tokenized_dataset_cache import PaddedBatchCollator, TokenizedDatasetCache
+except ImportError:
+    from tokenized_dataset_cache import PaddedBatchCollator, TokenizedDatasetCache
+
 logger = logging.getLogger(__name__)
 
 
@@ -39,6 +51,7 @@ class LoRATrainingConfig:
     logging_steps: int = 100
     min_data_points: int = 50  # Mínimo de datos para entrenar
     max_data_points: int = 1000  # Máximo de datos por entrenamiento
+    priority: int = 0  # Mayor prioridad se entrena antes
 
 
 @dataclass
@@ -55,6 +68,141 @@ class LoRATrainingJob:
     metrics: Dict[str, Any] = None
     error_message: str = ""
     created_at: datetime = None
+    data_points: int = 0  # Datos pendientes consumidos por el trabajo
+
+
+@dataclass
+class LoRATrainingWorker:
+    """Proceso de entrenamiento persistente y su trabajo actual"""
+
+    process: Any
+    task_queue: Any
+    job_id: Optional[str] = None
+    started: float = 0.0
+
+
+def _train_adapter(resident: Dict[str, Dict[str, Any]], task: Dict[str, Any]):
+    """Entrenar un adaptador LoRA sobre el modelo base residente del proceso"""
+    from transformers import (
+        AutoTokenizer,
+        AutoModelForCausalLM,
+        TrainingArguments,
+        Trainer,
+    )
+    from peft import LoraConfig, get_peft_model, TaskType
+
+    config = task["config"]
+    model_name = config["model_name"]
+    output_dir = Path(task["output_dir"])
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # Cargar el modelo base solo la primera vez
+    load_seconds = 0.0
+    entry = resident.get(model_name)
+    if entry is None:
+        load_start = time.monotonic()
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        model = AutoModelForCausalLM.from_pretrained(model_name)
+        entry = {"model": model, "tokenizer": tokenizer, "peft_model": None}
+        resident[model_name] = entry
+        load_seconds = time.monotonic() - load_start
+
+    tokenizer = entry["tokenizer"]
+    lora_config = LoraConfig(
+        task_type=TaskType.CAUSAL_LM,
+        r=config["lora_r"],
+        lora_alpha=config["lora_alpha"],
+        lora_dropout=config["lora_dropout"],
+        target_modules=["q_proj", "v_proj"],
+    )
+
+    # Un adaptador nuevo por trabajo; el anterior se elimina tras activar el nuevo
+    adapter_name = task["job_id"]
+    peft_model = entry["peft_model"]
+    if peft_model is None:
+        peft_model = get_peft_model(entry["model"], lora_config, adapter_name=adapter_name)
+        entry["peft_model"] = peft_model
+    else:
+        peft_model.add_adapter(adapter_name, lora_config)
+        peft_model.set_adapter(adapter_name)
+        for previous in [name for name in peft_model.peft_config if name != adapter_name]:
+            peft_model.base_model.delete_adapter(previous)
+
+    # Dataset tokenizado y empaquetado (se reutiliza si ya está en caché)
+    dataset = TokenizedDatasetCache(task["cache_dir"]).from_jsonl(
+        task["dataset_path"], tokenizer, config["max_length"]
+    )
+
+    training_args = TrainingArguments(
+        output_dir=str(output_dir),
+        num_train_epochs=config["num_epochs"],
+        per_device_train_batch_size=config["batch_size"],
+        learning_rate=config["learning_rate"],
+        warmup_steps=config["warmup_steps"],
+        save_steps=config["save_steps"],
+        eval_steps=config["eval_steps"],
+        logging_steps=config["logging_steps"],
+        save_total_limit=2,
+        prediction_loss_only=True,
+        remove_unused_columns=False,
+        group_by_length=True,  # Lotes de bloques de longitud similar
+    )
+
+    trainer = Trainer(
+        model=peft_model,
+        args=training_args,
+        train_dataset=dataset,
+        data_collator=PaddedBatchCollator(tokenizer.pad_token_id),
+    )
+    train_output = trainer.train()
+
+    # Guardar solo el adaptador del trabajo (queda en output_dir/<adaptador>)
+    peft_model.save_pretrained(str(output_dir), selected_adapters=[adapter_name])
+    tokenizer.save_pretrained(str(output_dir))
+
+    return {
+        "training_loss": float(train_output.training_loss),
+        "final_loss": float(train_output.training_loss),
+        "training_time_minutes": train_output.metrics.get("train_runtime", 0.0) / 60,
+        "steps_completed": int(train_output.global_step),
+        "data_points": dataset.num_examples,
+        "packed_blocks": len(dataset),
+        "tokenization_cached": dataset.cache_hit,
+        "model_load_seconds": load_seconds,
+        "model_path": str(output_dir / adapter_name),
+    }
+
+
+def _lora_worker_main(task_queue, result_queue):
+    """
+    Bucle del proceso de entrenamiento persistente
+
+    Recibe trabajos hasta leer None. El modelo base se mantiene cargado
+    entre trabajos; si un entrenamiento falla se descarta para recargarlo.
+    """
+    resident: Dict[str, Dict[str, Any]] = {}
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+
+        try:
+            metrics = _train_adapter(resident, task)
+            result_queue.put(
+                {"job_id": task["job_id"], "status": "completed", "metrics": metrics}
+            )
+        except Exception as e:
+            resident.pop(task["config"]["model_name"], None)
+            result_queue.put(
+                {
+                    "job_id": task["job_id"],
+                    "status": "failed",
+                    "error": f"{e}\n{traceback.format_exc()}",
+                }
+            )
 
 
 class AutomaticLoRATrainer:
@@ -64,10 +212,28 @@ class AutomaticLoRATrainer:
         self.db_path = Path(db_path)
         self.training_queue: List[LoRATrainingJob] = []
         self.running_jobs: Dict[str, LoRATrainingJob] = {}
-        self.max_concurrent_jobs = 2
+        # Cada proceso de entrenamiento mantiene su propia copia del modelo base
+        self.max_concurrent_jobs = 1
+        self.job_timeout_seconds = 3600  # 1 hora máximo por trabajo
+        self.retry_delay_seconds = 3600  # Espera antes de reintentar una rama fallida
+        self.rescan_interval = 300  # Relectura de contadores escritos por otros procesos
+        self.worker_check_interval = 30
+        self.tokenized_cache_dir = "shaili_ai/data/tokenized_cache"
         self.monitoring_thread = None
+        self.result_thread = None
         self.is_running = False
 
+        self.lock = threading.RLock()
+        self.wakeup_event = threading.Event()
+        self.workers: List[LoRATrainingWorker] = []
+        self.result_queue = None
+        self._mp_context = multiprocessing.get_context("spawn")
+
+        # Segundos de entrenamiento consumidos por rama (reparto equitativo)
+        self.branch_usage: Dict[str, float] = {}
+        # Momento (monotónico) a partir del cual se reintenta una rama fallida
+        self.branch_retry_after: Dict[str, float] = {}
+
         # Configuraciones por rama
         self.branch_configs = {
             "ai_ml_specialist": LoRATrainingConfig(
@@ -123,7 +289,9 @@ class AutomaticLoRATrainer:
         }
 
         # Inicializar base de datos
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
         self._init_database()
+        self._recover_interrupted_jobs()
 
         logger.info("🎯 Sistema de fine-tuning automático LoRA inicializado")
 
@@ -146,11 +314,20 @@ class AutomaticLoRATrainer:
                         end_time TIMESTAMP,
                         metrics TEXT,
                         error_message TEXT,
-                        created_at TIMESTAMP NOT NULL
+                        created_at TIMESTAMP NOT NULL,
+                        data_points INTEGER NOT NULL DEFAULT 0
                     )
                 """
                 )
 
+                # Bases anteriores: los datos consumidos por trabajo no se guardaban
+                cursor.execute("PRAGMA table_info(lora_training_jobs)")
+                if "data_points" not in [row[1] for row in cursor.fetchall()]:
+                    cursor.execute(
+                        "ALTER TABLE lora_training_jobs "
+                        "ADD COLUMN data_points INTEGER NOT NULL DEFAULT 0"
+                    )
+
                 # Tabla de modelos LoRA entrenados
                 cursor.execute(
                     """
@@ -168,87 +345,283 @@ class AutomaticLoRATrainer:
                 """
                 )
 
+                # Contadores incrementales de datos por rama
+                cursor.execute(
+                    """
+                    SELECT name FROM sqlite_master
+                    WHERE type = 'table' AND name = 'lora_branch_counters'
+                """
+                )
+                counters_exist = cursor.fetchone() is not None
+
+                cursor.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS lora_branch_counters (
+                        branch_name TEXT PRIMARY KEY,
+                        pending_count INTEGER NOT NULL DEFAULT 0,
+                        total_count INTEGER NOT NULL DEFAULT 0,
+                        trained_seconds REAL NOT NULL DEFAULT 0,
+                        last_trained_at TIMESTAMP
+                    )
+                """
+                )
+
+                if not counters_exist:
+                    self._seed_branch_counters(cursor)
+
                 conn.commit()
 
         except Exception as e:
             logger.error(f"❌ Error inicializando base de datos: {e}")
 
+    def _seed_branch_counters(self, cursor: sqlite3.Cursor):
+        """Inicializar los contadores con los datos ya existentes (una sola vez)"""
+        cursor.execute(
+            """
+            SELECT name FROM sqlite_master
+            WHERE type = 'table' AND name = 'lora_training_data'
+        """
+        )
+        if cursor.fetchone() is None:
+            return
+
+        cursor.execute(
+            """
+            INSERT INTO lora_branch_counters (branch_name, pending_count, total_count)
+            SELECT branch_name, COUNT(*), COUNT(*)
+            FROM lora_training_data
+            GROUP BY branch_name
+        """
+        )
+
+    def _recover_interrupted_jobs(self):
+        """
+        Cerrar los trabajos que quedaron pendientes o en ejecución
+
+        La cola y los procesos de entrenamiento viven en memoria: tras un
+        reinicio esos trabajos no van a terminar. Se marcan como interrumpidos
+        y sus datos vuelven al contador de la rama, en la misma transacción,
+        para que el planificador los programe de nuevo.
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    SELECT job_id, branch_name, data_points
+                    FROM lora_training_jobs
+                    WHERE status IN ('pending', 'running')
+                """
+                )
+                interrupted = cursor.fetchall()
+
+                for job_id, branch_name, data_points in interrupted:
+                    self._execute_counter_update(
+                        cursor, branch_name, pending_delta=data_points or 0
+                    )
+                    cursor.execute(
+                        """
+                        UPDATE lora_training_jobs
+                        SET status = 'failed', end_time = ?, error_message = ?
+                        WHERE job_id = ?
+                    """,
+                        (
+                            datetime.now().isoformat(),
+                            "Interrumpido por un reinicio del entrenador",
+                            job_id,
+                        ),
+                    )
+                conn.commit()
+
+        except Exception as e:
+            logger.error(f"❌ Error recuperando trabajos interrumpidos: {e}")
+            return
+
+        if interrupted:
+            logger.warning(
+                f"⚠️ {len(interrupted)} trabajos interrumpidos; sus datos vuelven "
+                f"a estar pendientes"
+            )
+
+    def record_training_data(self, branch_name: str, count: int) -> int:
+        """
+        Registrar nuevos datos de entrenamiento de una rama
+
+        Actualiza el contador de la rama y despierta al planificador si los
+        datos pendientes alcanzan el umbral de entrenamiento. ``count`` debe
+        ser el número de filas realmente insertadas (no reescritas).
+
+        Returns:
+            Datos pendientes de la rama tras el registro
+        """
+        if count <= 0:
+            return 0
+
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    INSERT INTO lora_branch_counters (branch_name, pending_count, total_count)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT(branch_name) DO UPDATE SET
+                        pending_count = pending_count + excluded.pending_count,
+                        total_count = total_count + excluded.total_count
+                """,
+                    (branch_name, count, count),
+                )
+                cursor.execute(
+                    "SELECT pending_count FROM lora_branch_counters WHERE branch_name = ?",
+                    (branch_name,),
+                )
+                pending = cursor.fetchone()[0]
+                conn.commit()
+
+        except Exception as e:
+            logger.error(f"❌ Error registrando datos de entrenamiento: {e}")
+            return 0
+
+        config = self.branch_configs.get(branch_name)
+        if config is not None and pending >= config.min_data_points:
+            self.wakeup_event.set()
+
+        return pending
+
+    def _load_branch_counters(self) -> Dict[str, Tuple[int, float]]:
+        """Leer contadores por rama: (datos pendientes, segundos entrenados)"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    SELECT branch_name, pending_count, trained_seconds
+                    FROM lora_branch_counters
+                """
+                )
+                return {
+                    branch_name: (pending, trained_seconds)
+                    for branch_name, pending, trained_seconds in cursor.fetchall()
+                }
+
+        except Exception as e:
+            logger.error(f"❌ Error leyendo contadores: {e}")
+            return {}
+
+    def _execute_counter_update(
+        self,
+        cursor: sqlite3.Cursor,
+        branch_name: str,
+        pending_delta: int = 0,
+        trained_seconds: float = 0.0,
+        trained_at: Optional[datetime] = None,
+    ):
+        """Ajustar datos pendientes y tiempo de entrenamiento de una rama"""
+        cursor.execute(
+            """
+            UPDATE lora_branch_counters
+            SET pending_count = MAX(pending_count + ?, 0),
+                trained_seconds = trained_seconds + ?,
+                last_trained_at = COALESCE(?, last_trained_at)
+            WHERE branch_name = ?
+        """,
+            (
+                pending_delta,
+                trained_seconds,
+                trained_at.isoformat() if trained_at else None,
+                branch_name,
+            ),
+        )
+
     def start_monitoring(self):
-        """Iniciar monitoreo automático de datos para entrenamiento"""
+        """Iniciar el planificador automático de entrenamientos"""
         if self.monitoring_thread is None or not self.monitoring_thread.is_alive():
             self.is_running = True
+            self.result_queue = self._mp_context.Queue()
             self.monitoring_thread = threading.Thread(
                 target=self._monitoring_loop, daemon=True
             )
+            self.result_thread = threading.Thread(
+                target=self._result_loop, daemon=True
+            )
             self.monitoring_thread.start()
+            self.result_thread.start()
             logger.info("🔍 Monitoreo automático iniciado")
 
     def stop_monitoring(self):
-        """Detener monitoreo automático"""
+        """Detener el planificador y los procesos de entrenamiento"""
         self.is_running = False
+        self.wakeup_event.set()
         if self.monitoring_thread:
             self.monitoring_thread.join(timeout=5)
+        if self.result_thread:
+            self.result_thread.join(timeout=5)
+
+        with self.lock:
+            workers, self.workers = self.workers, []
+        for worker in workers:
+            self._stop_worker(worker)
+
         logger.info("⏹️ Monitoreo automático detenido")
 
     def _monitoring_loop(self):
-        """Bucle de monitoreo automático"""
+        """
+        Bucle del planificador
+
+        Despierta cuando una rama alcanza su umbral o termina un trabajo.
+        La espera con timeout solo relee los contadores (datos insertados
+        desde otros procesos) y vigila los procesos de entrenamiento.
+        """
         while self.is_running:
             try:
-                # Verificar si hay suficientes datos para entrenar
                 self._check_and_schedule_training()
-
-                # Procesar cola de entrenamiento
                 self._process_training_queue()
+                self._check_workers()
 
-                # Esperar antes de la siguiente verificación
-                time.sleep(300)  # 5 minutos
+                timeout = (
+                    self.worker_check_interval
+                    if self.running_jobs
+                    else self.rescan_interval
+                )
+                self.wakeup_event.wait(timeout)
+                self.wakeup_event.clear()
 
             except Exception as e:
                 logger.error(f"❌ Error en bucle de monitoreo: {e}")
                 time.sleep(60)  # 1 minuto en caso de error
 
     def _check_and_schedule_training(self):
-        """Verificar y programar entrenamientos automáticos"""
+        """Programar entrenamientos de las ramas que alcanzan su umbral"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
+            counters = self._load_branch_counters()
 
-                # Obtener estadísticas de datos por rama
-                cursor.execute(
-                    """
-                    SELECT branch_name, COUNT(*) as data_count
-                    FROM lora_training_data
-                    GROUP BY branch_name
-                """
-                )
-
-                results = cursor.fetchall()
+            for branch_name, (pending, trained_seconds) in counters.items():
+                self.branch_usage[branch_name] = trained_seconds
 
-                for branch_name, data_count in results:
-                    if branch_name in self.branch_configs:
-                        config = self.branch_configs[branch_name]
+                config = self.branch_configs.get(branch_name)
+                if config is None or pending < config.min_data_points:
+                    continue
 
-                        # Verificar si hay suficientes datos y no hay entrenamiento reciente
-                        if data_count >= config.min_data_points:
-                            # Verificar si ya hay un trabajo pendiente o reciente
-                            cursor.execute(
-                                """
-                                SELECT COUNT(*) FROM lora_training_jobs
-                                WHERE branch_name = ? AND status IN ('pending', 'running')
-                                AND created_at > datetime('now', '-1 hour')
-                            """,
-                                (branch_name,),
-                            )
+                # Un solo trabajo pendiente o en ejecución por rama
+                if self._has_active_job(branch_name):
+                    continue
 
-                            recent_jobs = cursor.fetchone()[0]
+                if time.monotonic() < self.branch_retry_after.get(branch_name, 0.0):
+                    continue
 
-                            if recent_jobs == 0:
-                                # Programar entrenamiento automático
-                                self._schedule_training(branch_name, data_count)
+                self._schedule_training(branch_name, pending)
 
         except Exception as e:
             logger.error(f"❌ Error verificando entrenamientos: {e}")
 
+    def _has_active_job(self, branch_name: str) -> bool:
+        """Indica si la rama tiene un trabajo en cola o en ejecución"""
+        with self.lock:
+            return any(
+                job.branch_name == branch_name for job in self.training_queue
+            ) or any(
+                job.branch_name == branch_name for job in self.running_jobs.values()
+            )
+
     def _schedule_training(self, branch_name: str, data_count: int):
         """Programar entrenamiento automático"""
         try:
@@ -271,13 +644,17 @@ class AutomaticLoRATrainer:
                     config=config,
                     status="pending",
                     created_at=datetime.now(),
+                    data_points=data_count,
                 )
 
-                # Guardar en base de datos
-                self._save_training_job(training_job)
+                # Guardar el trabajo; sus datos salen del contador en la misma
+                # transacción y se devuelven si falla o se interrumpe
+                if not self._save_training_job(training_job):
+                    return
 
                 # Agregar a cola
-                self.training_queue.append(training_job)
+                with self.lock:
+                    self.training_queue.append(training_job)
 
                 logger.info(
                     f"📅 Entrenamiento programado para {branch_name} con {data_count} datos"
@@ -286,8 +663,8 @@ class AutomaticLoRATrainer:
         except Exception as e:
             logger.error(f"❌ Error programando entrenamiento: {e}")
 
-    def _save_training_job(self, job: LoRATrainingJob):
-        """Guardar trabajo de entrenamiento en base de datos"""
+    def _save_training_job(self, job: LoRATrainingJob) -> bool:
+        """Guardar trabajo en base de datos y reservar sus datos pendientes"""
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
@@ -296,8 +673,8 @@ class AutomaticLoRATrainer:
                     """
                     INSERT INTO lora_training_jobs 
                     (job_id, branch_name, dataset_path, config, status, start_time, 
-                     end_time, metrics, error_message, created_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                     end_time, metrics, error_message, created_at, data_points)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
                     (
                         job.job_id,
@@ -310,242 +687,229 @@ class AutomaticLoRATrainer:
                         json.dumps(job.metrics) if job.metrics else None,
                         job.error_message,
                         job.created_at.isoformat(),
+                        job.data_points,
                     ),
                 )
+                self._execute_counter_update(
+                    cursor, job.branch_name, pending_delta=-job.data_points
+                )
 
                 conn.commit()
+                return True
 
         except Exception as e:
             logger.error(f"❌ Error guardando trabajo: {e}")
+            return False
+
+    def _job_sort_key(self, job: LoRATrainingJob) -> Tuple[int, float, datetime]:
+        """
+        Orden de la cola: prioridad, después la rama con menos tiempo de
+        entrenamiento acumulado (reparto equitativo) y por último antigüedad
+        """
+        return (
+            -job.config.priority,
+            self.branch_usage.get(job.branch_name, 0.0),
+            job.created_at,
+        )
 
     def _process_training_queue(self):
-        """Procesar cola de entrenamiento"""
-        # Remover trabajos completados
-        self.training_queue = [
-            job for job in self.training_queue if job.status == "pending"
-        ]
-
-        # Procesar trabajos pendientes
-        for job in self.training_queue[: self.max_concurrent_jobs]:
-            if len(self.running_jobs) < self.max_concurrent_jobs:
+        """Asignar trabajos pendientes a los procesos de entrenamiento libres"""
+        with self.lock:
+            # Remover trabajos completados
+            self.training_queue = [
+                job for job in self.training_queue if job.status == "pending"
+            ]
+
+            while (
+                self.training_queue
+                and len(self.running_jobs) < self.max_concurrent_jobs
+            ):
+                job = min(self.training_queue, key=self._job_sort_key)
+                self.training_queue.remove(job)
                 self._start_training_job(job)
 
-    def _start_training_job(self, job: LoRATrainingJob):
-        """Iniciar trabajo de entrenamiento"""
-        try:
-            job.status = "running"
-            job.start_time = datetime.now()
-            self.running_jobs[job.job_id] = job
-
-            # Actualizar en base de datos
-            self._update_job_status(job)
-
-            # Iniciar entrenamiento en hilo separado
-            training_thread = threading.Thread(
-                target=self._run_training_job, args=(job,), daemon=True
-            )
-            training_thread.start()
+    def _spawn_worker(self) -> LoRATrainingWorker:
+        """Lanzar un proceso de entrenamiento persistente"""
+        task_queue = self._mp_context.Queue()
+        process = self._mp_context.Process(
+            target=_lora_worker_main,
+            args=(task_queue, self.result_queue),
+            daemon=True,
+        )
+        process.start()
 
-            logger.info(f"🚀 Iniciando entrenamiento LoRA para {job.branch_name}")
+        worker = LoRATrainingWorker(process=process, task_queue=task_queue)
+        self.workers.append(worker)
+        logger.info(f"🧵 Proceso de entrenamiento LoRA iniciado (pid {process.pid})")
+        return worker
 
+    def _stop_worker(self, worker: LoRATrainingWorker, force: bool = False):
+        """Detener un proceso de entrenamiento"""
+        try:
+            if not force:
+                worker.task_queue.put(None)
+                worker.process.join(timeout=10)
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join(timeout=5)
         except Exception as e:
-            logger.error(f"❌ Error iniciando trabajo: {e}")
-            job.status = "failed"
-            job.error_message = str(e)
-            self._update_job_status(job)
+            logger.error(f"❌ Error deteniendo proceso de entrenamiento: {e}")
+
+    def _get_idle_worker(self) -> LoRATrainingWorker:
+        """Obtener un proceso libre, lanzando uno nuevo si hace falta"""
+        for worker in self.workers:
+            if worker.job_id is None and worker.process.is_alive():
+                return worker
+        return self._spawn_worker()
 
-    def _run_training_job(self, job: LoRATrainingJob):
-        """Ejecutar trabajo de entrenamiento"""
+    def _start_training_job(self, job: LoRATrainingJob):
+        """Enviar un trabajo a un proceso de entrenamiento"""
         try:
-            # Crear directorio de salida
             output_dir = Path(f"shaili_ai/models/lora/{job.branch_name}")
-            output_dir.mkdir(parents=True, exist_ok=True)
-
-            # Generar script de entrenamiento
-            training_script = self._generate_training_script(job, output_dir)
-
-            # Ejecutar entrenamiento
-            result = subprocess.run(
-                ["python", training_script],
-                capture_output=True,
-                text=True,
-                timeout=3600,  # 1 hora máximo
-            )
-
-            if result.returncode == 0:
-                # Entrenamiento exitoso
-                job.status = "completed"
-                job.end_time = datetime.now()
-                job.metrics = self._parse_training_metrics(result.stdout)
-
-                # Guardar modelo entrenado
-                self._save_trained_model(job, output_dir)
+            task = {
+                "job_id": job.job_id,
+                "branch_name": job.branch_name,
+                "dataset_path": job.dataset_path,
+                "output_dir": str(output_dir),
+                "cache_dir": self.tokenized_cache_dir,
+                "config": asdict(job.config),
+            }
 
-                logger.info(f"✅ Entrenamiento completado para {job.branch_name}")
+            worker = self._get_idle_worker()
+            worker.task_queue.put(task)
 
-            else:
-                # Error en entrenamiento
-                job.status = "failed"
-                job.end_time = datetime.now()
-                job.error_message = result.stderr
+        except Exception as e:
+            # El proceso no quedó ocupado: el trabajo falla y devuelve sus datos
+            logger.error(f"❌ Error iniciando trabajo: {e}")
+            self._finish_job(job, "failed", error_message=str(e))
+            return
 
-                logger.error(
-                    f"❌ Error en entrenamiento para {job.branch_name}: {result.stderr}"
-                )
+        # Solo un trabajo ya enviado ocupa el proceso
+        worker.job_id = job.job_id
+        worker.started = time.monotonic()
 
-            # Actualizar estado
-            self._update_job_status(job)
+        job.status = "running"
+        job.start_time = datetime.now()
+        self.running_jobs[job.job_id] = job
 
-            # Remover de trabajos en ejecución
-            if job.job_id in self.running_jobs:
-                del self.running_jobs[job.job_id]
+        # Actualizar en base de datos
+        self._update_job_status(job)
 
-        except Exception as e:
-            logger.error(f"❌ Error ejecutando entrenamiento: {e}")
-            job.status = "failed"
-            job.error_message = str(e)
-            job.end_time = datetime.now()
-            self._update_job_status(job)
-
-    def _generate_training_script(self, job: LoRATrainingJob, output_dir: Path) -> str:
-        """Generar script de entrenamiento LoRA"""
-        script_content = f'''#!/usr/bin/env python3
-"""
-Script de Entrenamiento LoRA Automático para {job.branch_name}
-"""
+        logger.info(f"🚀 Iniciando entrenamiento LoRA para {job.branch_name}")
 
-import os
-import sys
-from pathlib import Path
-
-# Agregar ruta del proyecto
-sys.path.append(str(Path.cwd()))
-
-def train_lora():
-    """Entrenar modelo LoRA"""
-    try:
-        from transformers import (
-            AutoTokenizer, AutoModelForCausalLM, 
-            TrainingArguments, Trainer, DataCollatorForLanguageModeling
-        )
-        from peft import LoraConfig, get_peft_model, TaskType
-        import torch
-        from datasets import Dataset
-        import json
-        
-        # Configuración
-        model_name = "{job.config.model_name}"
-        dataset_path = "{job.dataset_path}"
-        output_dir = "{output_dir}"
-        
-        # Cargar tokenizador y modelo
-        tokenizer = AutoTokenizer.from_pretrained(model_name)
-        model = AutoModelForCausalLM.from_pretrained(model_name)
-        
-        # Configurar LoRA
-        lora_config = LoraConfig(
-            task_type=TaskType.CAUSAL_LM,
-            r={job.config.lora_r},
-            lora_alpha={job.config.lora_alpha},
-            lora_dropout={job.config.lora_dropout},
-            target_modules=["q_proj", "v_proj"]
-        )
-        
-        # Aplicar LoRA al modelo
-        model = get_peft_model(model, lora_config)
-        
-        # Cargar dataset
-        with open(dataset_path, 'r', encoding='utf-8') as f:
-            data = [json.loads(line) for line in f]
-        
-        # Preparar datos
-        def tokenize_function(examples):
-            texts = [f"Instruction: {{ex['instruction']}}\\nOutput: {{ex['output']}}" for ex in examples]
-            return tokenizer(texts, truncation=True, padding=True, max_length={job.config.max_length})
-        
-        dataset = Dataset.from_list(data)
-        tokenized_dataset = dataset.map(tokenize_function, batched=True)
-        
-        # Configurar entrenamiento
-        training_args = TrainingArguments(
-            output_dir=output_dir,
-            num_train_epochs={job.config.num_epochs},
-            per_device_train_batch_size={job.config.batch_size},
-            learning_rate={job.config.learning_rate},
-            warmup_steps={job.config.warmup_steps},
-            save_steps={job.config.save_steps},
-            eval_steps={job.config.eval_steps},
-            logging_steps={job.config.logging_steps},
-            save_total_limit=2,
-            prediction_loss_only=True,
-            remove_unused_columns=False,
-        )
-        
-        # Data collator
-        data_collator = DataCollatorForLanguageModeling(
-            tokenizer=tokenizer,
-            mlm=False
+    def _result_loop(self):
+        """Recibir resultados de los procesos de entrenamiento"""
+        while self.is_running:
+            try:
+                result = self.result_queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            except Exception as e:
+                logger.error(f"❌ Error leyendo resultados de entrenamiento: {e}")
+                time.sleep(1)
+                continue
+
+            self._handle_result(result)
+
+    def _handle_result(self, result: Dict[str, Any]):
+        """Registrar el resultado de un trabajo y liberar su proceso"""
+        with self.lock:
+            job = self.running_jobs.pop(result["job_id"], None)
+            for worker in self.workers:
+                if worker.job_id == result["job_id"]:
+                    worker.job_id = None
+
+        if job is None:
+            return
+
+        self._finish_job(
+            job,
+            result["status"],
+            metrics=result.get("metrics"),
+            error_message=result.get("error", ""),
         )
-        
-        # Trainer
-        trainer = Trainer(
-            model=model,
-            args=training_args,
-            train_dataset=tokenized_dataset,
-            data_collator=data_collator,
+        self.wakeup_event.set()
+
+    def _check_workers(self):
+        """Fallar los trabajos de procesos caídos o que superan el tiempo máximo"""
+        now = time.monotonic()
+
+        with self.lock:
+            for worker in list(self.workers):
+                if worker.process.is_alive() and (
+                    worker.job_id is None
+                    or now - worker.started <= self.job_timeout_seconds
+                ):
+                    continue
+
+                if worker.process.is_alive():
+                    error_message = "Tiempo máximo de entrenamiento superado"
+                    self._stop_worker(worker, force=True)
+                else:
+                    error_message = "El proceso de entrenamiento terminó inesperadamente"
+
+                self.workers.remove(worker)
+                job = self.running_jobs.pop(worker.job_id, None)
+                if job is not None:
+                    self._finish_job(job, "failed", error_message=error_message)
+
+    def _finish_job(
+        self,
+        job: LoRATrainingJob,
+        status: str,
+        metrics: Optional[Dict[str, Any]] = None,
+        error_message: str = "",
+    ):
+        """
+        Cerrar un trabajo y actualizar contadores de su rama
+
+        El estado final y el ajuste del contador se escriben en la misma
+        transacción: un reinicio entre ambos devolvería los datos dos veces.
+        """
+        job.status = status
+        job.end_time = datetime.now()
+        job.metrics = metrics
+        job.error_message = error_message
+
+        training_seconds = (
+            (job.end_time - job.start_time).total_seconds() if job.start_time else 0.0
         )
-        
-        # Entrenar
-        trainer.train()
-        
-        # Guardar modelo
-        trainer.save_model()
-        tokenizer.save_pretrained(output_dir)
-        
-        print("Training completed successfully!")
-        return True
-        
-    except Exception as e:
-        print(f"Training failed: {{e}}")
-        return False
-
-if __name__ == "__main__":
-    success = train_lora()
-    sys.exit(0 if success else 1)
-'''
-
-        # Guardar script
-        script_path = output_dir / "train_lora.py"
-        with open(script_path, "w", encoding="utf-8") as f:
-            f.write(script_content)
-
-        return str(script_path)
-
-    def _parse_training_metrics(self, output: str) -> Dict[str, Any]:
-        """Parsear métricas de entrenamiento desde la salida"""
-        try:
-            metrics = {
-                "training_loss": 0.0,
-                "final_loss": 0.0,
-                "training_time_minutes": 0,
-                "steps_completed": 0,
-            }
 
-            # Parsear métricas básicas (simplificado)
-            lines = output.split("\n")
-            for line in lines:
-                if "loss" in line.lower():
-                    try:
-                        loss = float(line.split()[-1])
-                        metrics["final_loss"] = loss
-                    except:
-                        pass
+        if status == "completed":
+            counter_update = {"trained_at": job.end_time}
+        else:
+            # Devolver los datos a la rama para un próximo intento
+            counter_update = {"pending_delta": job.data_points}
+            self.branch_retry_after[job.branch_name] = (
+                time.monotonic() + self.retry_delay_seconds
+            )
 
-            return metrics
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                self._execute_counter_update(
+                    cursor,
+                    job.branch_name,
+                    trained_seconds=training_seconds,
+                    **counter_update,
+                )
+                self._execute_job_update(cursor, job)
+                conn.commit()
 
         except Exception as e:
-            logger.error(f"❌ Error parseando métricas: {e}")
-            return {"error": str(e)}
+            logger.error(f"❌ Error cerrando trabajo {job.job_id}: {e}")
+
+        if status == "completed":
+            self._save_trained_model(job, Path(metrics["model_path"]))
+            logger.info(f"✅ Entrenamiento completado para {job.branch_name}")
+        else:
+            logger.error(
+                f"❌ Error en entrenamiento para {job.branch_name}: {error_message}"
+            )
+
+        self.branch_usage[job.branch_name] = (
+            self.branch_usage.get(job.branch_name, 0.0) + training_seconds
+        )
 
     def _save_trained_model(self, job: LoRATrainingJob, output_dir: Path):
         """Guardar información del modelo entrenado"""
@@ -571,7 +935,7 @@ if __name__ == "__main__":
                         job.job_id,
                         str(output_dir),
                         json.dumps(job.metrics),
-                        len(self._get_dataset_size(job.dataset_path)),
+                        self._get_dataset_size(job.dataset_path),
                         int(training_duration),
                         datetime.now().isoformat(),
                     ),
@@ -590,29 +954,30 @@ if __name__ == "__main__":
         except:
             return 0
 
+    def _execute_job_update(self, cursor: sqlite3.Cursor, job: LoRATrainingJob):
+        """Escribir el estado del trabajo con el cursor dado"""
+        cursor.execute(
+            """
+            UPDATE lora_training_jobs 
+            SET status = ?, start_time = ?, end_time = ?, 
+                metrics = ?, error_message = ?
+            WHERE job_id = ?
+        """,
+            (
+                job.status,
+                job.start_time.isoformat() if job.start_time else None,
+                job.end_time.isoformat() if job.end_time else None,
+                json.dumps(job.metrics) if job.metrics else None,
+                job.error_message,
+                job.job_id,
+            ),
+        )
+
     def _update_job_status(self, job: LoRATrainingJob):
         """Actualizar estado del trabajo en base de datos"""
         try:
             with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-
-                cursor.execute(
-                    """
-                    UPDATE lora_training_jobs 
-                    SET status = ?, start_time = ?, end_time = ?, 
-                        metrics = ?, error_message = ?
-                    WHERE job_id = ?
-                """,
-                    (
-                        job.status,
-                        job.start_time.isoformat() if job.start_time else None,
-                        job.end_time.isoformat() if job.end_time else None,
-                        json.dumps(job.metrics) if job.metrics else None,
-                        job.error_message,
-                        job.job_id,
-                    ),
-                )
-
+                self._execute_job_update(conn.cursor(), job)
                 conn.commit()
 
         except Exception as e:
@@ -672,6 +1037,11 @@ if __name__ == "__main__":
                     "trained_models": trained_models,
                     "queue_size": len(self.training_queue),
                     "running_jobs": len(self.running_jobs),
+                    "workers": len(self.workers),
+                    "pending_data": {
+                        branch_name: pending
+                        for branch_name, (pending, _) in self._load_branch_counters().items()
+                    },
                 }
 
         except Exception as e:
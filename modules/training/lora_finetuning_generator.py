@@ -362,11 +362,18 @@ class LoRAFinetuningGenerator:
                     training_data_list.append(training_data)
 
             # Guardar datos en base de datos
-            self._save_training_data(training_data_list)
+            new_training_data = self._save_training_data(training_data_list)
 
             # Actualizar métricas del especialista
             self._update_branch_specialist_metrics(branch_name, len(training_data_list))
 
+            # Avisar al entrenador automático y actualizar los agregados de
+            # perfil solo con las filas nuevas realmente guardadas: regenerar
+            # una sesión reescribe los mismos IDs
+            if new_training_data:
+                self._notify_automatic_trainer(branch_name, len(new_training_data))
+                self._notify_recommendations(new_training_data)
+
             logger.info(
                 f"✅ Generados {len(training_data_list)} datos de entrenamiento para {branch_name}"
             )
@@ -432,12 +439,29 @@ class LoRAFinetuningGenerator:
             logger.error(f"❌ Error calculando calidad: {e}")
             return 0.5
 
-    def _save_training_data(self, training_data_list: List[LoRATrainingData]):
-        """Guardar datos de entrenamiento en base de datos"""
+    def _save_training_data(
+        self, training_data_list: List[LoRATrainingData]
+    ) -> List[LoRATrainingData]:
+        """
+        Guardar datos de entrenamiento en base de datos
+
+        Returns:
+            Datos cuyo ID no existía (las reescrituras de un ID existente no
+            cuentan); lista vacía si el guardado falla
+        """
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
 
+                new_ids = {training_data.id for training_data in training_data_list}
+                for training_data in training_data_list:
+                    cursor.execute(
+                        "SELECT 1 FROM lora_training_data WHERE id = ?",
+                        (training_data.id,),
+                    )
+                    if cursor.fetchone() is not None:
+                        new_ids.discard(training_data.id)
+
                 for training_data in training_data_list:
                     cursor.execute(
                         """
@@ -470,11 +494,42 @@ class LoRAFinetuningGenerator:
 
                 conn.commit()
                 logger.info(
-                    f"✅ {len(training_data_list)} datos de entrenamiento guardados"
+                    f"✅ {len(training_data_list)} datos de entrenamiento guardados "
+                    f"({len(new_ids)} nuevos)"
                 )
 
+                new_training_data = []
+                for training_data in training_data_list:
+                    if training_data.id in new_ids:
+                        new_ids.discard(training_data.id)
+                        new_training_data.append(training_data)
+                return new_training_data
+
         except Exception as e:
             logger.error(f"❌ Error guardando datos de entrenamiento: {e}")
+            return []
+
+    def _notify_automatic_trainer(self, branch_name: str, new_data_count: int):
+        """Registrar los nuevos datos en el planificador de entrenamientos LoRA"""
+        try:
+            from .automatic_lora_trainer import get_automatic_trainer
+
+            get_automatic_trainer().record_training_data(branch_name, new_data_count)
+
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo notificar al entrenador automático: {e}")
+
+    def _notify_recommendations(self, training_data_list: List[LoRATrainingData]):
+        """Actualizar los perfiles incrementales del sistema de recomendaciones"""
+        try:
+            from ..recommendations.personalized_recommendations import (
+                get_recommendations_system,
+            )
+
+            get_recommendations_system().record_training_data(training_data_list)
+
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudieron actualizar los perfiles de usuario: {e}")
 
     def _update_branch_specialist_metrics(self, branch_name: str, new_data_count: int):
         """Actualizar métricas del especialista de rama"""
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Pruebas del entrenador automático LoRA
+
+Comprueban que los datos pendientes de cada rama sobreviven a reinicios y
+a fallos al enviar un trabajo a un proceso de entrenamiento.
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from automatic_lora_trainer import (
+    AutomaticLoRATrainer,
+    LoRATrainingJob,
+    LoRATrainingWorker,
+)
+
+BRANCH = "ai_ml_specialist"
+
+
+def _pending(trainer: AutomaticLoRATrainer) -> int:
+    return trainer._load_branch_counters().get(BRANCH, (0, 0.0))[0]
+
+
+def _job_status(trainer: AutomaticLoRATrainer, job_id: str) -> str:
+    import sqlite3
+
+    with sqlite3.connect(trainer.db_path) as conn:
+        return conn.execute(
+            "SELECT status FROM lora_training_jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()[0]
+
+
+def _new_job(trainer: AutomaticLoRATrainer, job_id: str, data_points: int):
+    return LoRATrainingJob(
+        job_id=job_id,
+        branch_name=BRANCH,
+        dataset_path="dataset.jsonl",
+        config=trainer.branch_configs[BRANCH],
+        status="pending",
+        created_at=datetime.now(),
+        data_points=data_points,
+    )
+
+
+class _AliveProcess:
+    pid = 0
+
+    def is_alive(self):
+        return True
+
+
+class _BrokenQueue:
+    def put(self, item):
+        raise OSError("cola cerrada")
+
+
+def test_jobs_survive_restart(tmp_path):
+    """Los trabajos en curso al reiniciar devuelven sus datos a la rama"""
+    db_path = Path(tmp_path) / "lora_training.db"
+    trainer = AutomaticLoRATrainer(db_path=str(db_path))
+    assert trainer.record_training_data(BRANCH, 40) == 40
+
+    pending_job = _new_job(trainer, "job_pending", 25)
+    assert trainer._save_training_job(pending_job)
+    running_job = _new_job(trainer, "job_running", 15)
+    assert trainer._save_training_job(running_job)
+    running_job.status = "running"
+    running_job.start_time = datetime.now()
+    trainer._update_job_status(running_job)
+    assert _pending(trainer) == 0
+
+    # Reinicio: la cola y los procesos en memoria se pierden
+    restarted = AutomaticLoRATrainer(db_path=str(db_path))
+    assert _pending(restarted) == 40
+    assert _job_status(restarted, "job_pending") == "failed"
+    assert _job_status(restarted, "job_running") == "failed"
+
+    # Un segundo reinicio no vuelve a devolver los mismos datos
+    assert _pending(AutomaticLoRATrainer(db_path=str(db_path))) == 40
+
+
+def test_failed_dispatch_frees_worker(tmp_path):
+    """Si el envío al proceso falla, el proceso queda libre y los datos vuelven"""
+    trainer = AutomaticLoRATrainer(db_path=str(Path(tmp_path) / "lora.db"))
+    trainer.record_training_data(BRANCH, 30)
+
+    job = _new_job(trainer, "job_dispatch", 30)
+    assert trainer._save_training_job(job)
+    worker = LoRATrainingWorker(process=_AliveProcess(), task_queue=_BrokenQueue())
+    trainer.workers.append(worker)
+
+    trainer._start_training_job(job)
+
+    assert worker.job_id is None
+    assert job.job_id not in trainer.running_jobs
+    assert job.status == "failed"
+    assert _job_status(trainer, job.job_id) == "failed"
+    assert _pending(trainer) == 30
+
+
+def test_completed_job_consumes_data(tmp_path):
+    """Un trabajo completado consume sus datos y suma tiempo a la rama"""
+    trainer = AutomaticLoRATrainer(db_path=str(Path(tmp_path) / "lora.db"))
+    trainer.record_training_data(BRANCH, 35)
+
+    job = _new_job(trainer, "job_done", 35)
+    assert trainer._save_training_job(job)
+    job.start_time = datetime.now()
+    trainer._finish_job(
+        job, "completed", metrics={"model_path": str(Path(tmp_path) / "adapter")}
+    )
+
+    assert _pending(trainer) == 0
+    assert _job_status(trainer, job.job_id) == "completed"
+    # Tras completarse no hay nada que recuperar en un reinicio
+    restarted = AutomaticLoRATrainer(db_path=str(trainer.db_path))
+    assert _pending(restarted) == 0
+
+
+def main():
+    """Ejecutar las pruebas sin pytest"""
+    tests = [
+        test_jobs_survive_restart,
+        test_failed_dispatch_frees_worker,
+        test_completed_job_consumes_data,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test(tempfile.mkdtemp(prefix="lora_trainer_test_"))
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Pruebas del generador de datos LoRA
+
+Comprueban que regenerar una sesión ya guardada no vuelve a sumar sus
+respuestas en los agregados de recomendaciones ni en el entrenador.
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from modules.recommendations import personalized_recommendations
+from modules.training.lora_finetuning_generator import LoRAFinetuningGenerator
+
+AGGREGATE_TABLES = [
+    "user_profile_aggregates",
+    "user_category_aggregates",
+    "user_difficulty_aggregates",
+    "user_exercises_seen",
+]
+
+
+def _session(session_id: str, answers):
+    return {
+        "session_id": session_id,
+        "exercise_id": "ejercicio_1",
+        "user_id": "usuario_1",
+        "score": 50,
+        "time_spent": 120,
+        "answers": answers,
+    }
+
+
+def _exercise():
+    return {
+        "questions": [
+            {
+                "id": f"p{i}",
+                "question": f"¿Cuánto es {i} + {i}?",
+                "correct_answer": str(2 * i),
+                "explanation": f"{i} + {i} = {2 * i}",
+                "difficulty": "easy" if i < 2 else "hard",
+                "category": "matemáticas",
+                "points": 10,
+                "metadata": {"topic": "sumas"},
+            }
+            for i in range(3)
+        ]
+    }
+
+
+def _aggregates(db_path: Path):
+    with sqlite3.connect(db_path) as conn:
+        return {
+            table: sorted(conn.execute(f"SELECT * FROM {table}").fetchall())
+            for table in AGGREGATE_TABLES
+        }
+
+
+def _generator(tmp_path):
+    """Generador y recomendaciones sobre la misma base temporal"""
+    db_path = Path(tmp_path) / "lora_training.db"
+    generator = LoRAFinetuningGenerator(db_path=str(db_path))
+    personalized_recommendations._recommendations_system = (
+        personalized_recommendations.PersonalizedRecommendations(str(db_path))
+    )
+    notified = []
+    generator._notify_automatic_trainer = lambda branch, count: notified.append(
+        count
+    )
+    return generator, db_path, notified
+
+
+def test_regenerated_session_is_not_counted_twice(tmp_path):
+    """Guardar la misma sesión dos veces deja los agregados igual"""
+    generator, db_path, notified = _generator(tmp_path)
+    # Agregados ya existentes: a partir de aquí se actualizan incrementalmente
+    generator.generate_lora_training_data(
+        _session("s0", {"p0": {"answer": "0", "correct": True}}), _exercise()
+    )
+
+    session = _session(
+        "s1",
+        {
+            "p0": {"answer": "0", "correct": True},
+            "p1": {"answer": "3", "correct": False},
+            "p2": {"answer": "4", "correct": True},
+        },
+    )
+    assert len(generator.generate_lora_training_data(session, _exercise())) == 3
+    after_first = _aggregates(db_path)
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute(
+            "SELECT total_answers, correct_answers FROM user_profile_aggregates"
+        ).fetchall() == [(4, 3)]
+
+    assert len(generator.generate_lora_training_data(session, _exercise())) == 3
+    assert _aggregates(db_path) == after_first
+    assert notified == [1, 3]
+
+
+def test_failed_save_updates_nothing(tmp_path):
+    """Si el guardado falla no se avisa ni se tocan los agregados"""
+    generator, db_path, notified = _generator(tmp_path)
+    generator.generate_lora_training_data(
+        _session("s0", {"p0": {"answer": "0", "correct": True}}), _exercise()
+    )
+    before = _aggregates(db_path)
+
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("DROP TABLE lora_training_data")
+    generator.generate_lora_training_data(
+        _session("s1", {"p1": {"answer": "2", "correct": True}}), _exercise()
+    )
+
+    assert _aggregates(db_path) == before
+    assert notified == [1]
+
+
+def main():
+    """Ejecutar las pruebas sin pytest"""
+    tests = [
+        test_regenerated_session_is_not_counted_twice,
+        test_failed_save_updates_nothing,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test(tempfile.mkdtemp(prefix="lora_generator_test_"))
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la caché de datasets tokenizados
+
+Comprueban los límites del empaquetado, el relleno y las etiquetas del
+collator y los aciertos y fallos de la caché con un tokenizador falso
+(solo numpy, sin transformers ni torch).
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from tokenized_dataset_cache import (
+    PaddedBatchCollator,
+    TokenizedDatasetCache,
+    pack_sequences,
+)
+
+EOS = 1
+
+
+class FakeTokenizer:
+    """Tokenizador mínimo: un id por palabra, con truncado como transformers"""
+
+    name_or_path = "fake"
+    eos_token_id = EOS
+
+    def __init__(self, words):
+        self.vocab = {"<pad>": 0, "<eos>": EOS}
+        self.vocab.update({word: i + 2 for i, word in enumerate(words)})
+        self.special_tokens_map = {"eos_token": "<eos>", "pad_token": "<pad>"}
+        self.calls = 0
+
+    def __len__(self):
+        return len(self.vocab)
+
+    def get_vocab(self):
+        return dict(self.vocab)
+
+    def __call__(self, texts, truncation=False, max_length=None):
+        self.calls += 1
+        input_ids = []
+        for text in texts:
+            ids = [self.vocab[word] for word in text.split()]
+            input_ids.append(ids[:max_length] if truncation else ids)
+        return {"input_ids": input_ids}
+
+
+WORDS = "uno dos tres cuatro cinco seis siete".split()
+
+
+def _texts(requested):
+    """Función de textos que anota cuántas veces se pide"""
+
+    def texts():
+        requested.append(1)
+        return ["uno dos", "tres cuatro cinco seis siete", "uno"]
+
+    return texts
+
+
+def test_pack_sequences_boundaries():
+    """Bloque justo de max_length y ejemplo más largo en su propio bloque"""
+    # Dos ejemplos que suman exactamente max_length van en un bloque
+    assert pack_sequences(np.array([0, 2, 4]), 4).tolist() == [[0, 4]]
+    # Un token más y el tercero empieza bloque nuevo
+    assert pack_sequences(np.array([0, 2, 4, 5]), 4).tolist() == [[0, 4], [4, 5]]
+    # Un ejemplo de exactamente max_length tras otro no se junta con él
+    assert pack_sequences(np.array([0, 3, 7, 9]), 4).tolist() == [
+        [0, 3],
+        [3, 7],
+        [7, 9],
+    ]
+    # Ejemplo más largo que max_length: bloque propio, sin partir ni mezclar
+    assert pack_sequences(np.array([0, 1, 7, 8]), 4).tolist() == [
+        [0, 1],
+        [1, 7],
+        [7, 8],
+    ]
+    assert pack_sequences(np.array([0]), 4).shape == (0, 2)
+
+
+def test_collator_padding_and_labels():
+    """Relleno al múltiplo pedido y -100 solo en el relleno"""
+    collator = PaddedBatchCollator(
+        pad_token_id=EOS, pad_to_multiple_of=4, return_tensors="np"
+    )
+    batch = collator(
+        [{"input_ids": np.array([5, 6, EOS], dtype=np.uint16)}, {"input_ids": [7]}]
+    )
+
+    assert batch["input_ids"].tolist() == [[5, 6, EOS, EOS], [7, EOS, EOS, EOS]]
+    assert batch["attention_mask"].tolist() == [[1, 1, 1, 0], [1, 0, 0, 0]]
+    # El EOS real cuenta aunque coincida con pad_token_id
+    assert batch["labels"].tolist() == [[5, 6, EOS, -100], [7, -100, -100, -100]]
+    assert batch["input_ids"].dtype == np.int64
+
+    unpadded = PaddedBatchCollator(pad_token_id=0, return_tensors="np")(
+        [{"input_ids": [2, 3]}, {"input_ids": [4]}]
+    )
+    assert unpadded["input_ids"].shape == (2, 2)
+
+
+def test_cache_hit_and_miss():
+    """La segunda carga no tokeniza; cambiar max_length o tokenizador sí"""
+    with tempfile.TemporaryDirectory(prefix="tokenized_cache_") as tmp:
+        _check_cache_hit_and_miss(TokenizedDatasetCache(cache_dir=tmp))
+
+
+def _check_cache_hit_and_miss(cache: TokenizedDatasetCache):
+    tokenizer = FakeTokenizer(WORDS)
+    requested = []
+
+    first = cache.load_or_build(_texts(requested), tokenizer, "dataset", 4)
+    assert not first.cache_hit
+    assert (len(requested), tokenizer.calls) == (1, 1)
+    # Truncado a max_length - 1 para dejar hueco al EOS separador
+    assert first.num_examples == 3
+    assert first.tokens.tolist() == [2, 3, EOS, 4, 5, 6, EOS, 2, EOS]
+    assert [item["input_ids"].tolist() for item in first] == [
+        [2, 3, EOS],
+        [4, 5, 6, EOS],
+        [2, EOS],
+    ]
+
+    second = cache.load_or_build(_texts(requested), tokenizer, "dataset", 4)
+    assert second.cache_hit
+    assert (len(requested), tokenizer.calls) == (1, 1)
+    assert second.tokens.tolist() == first.tokens.tolist()
+    # Sin empaquetar, cada ejemplo es un elemento
+    unpacked = cache.load_or_build(_texts(requested), tokenizer, "dataset", 4, False)
+    assert unpacked.cache_hit and len(unpacked) == 3
+
+    assert not cache.load_or_build(_texts(requested), tokenizer, "dataset", 8).cache_hit
+    other = FakeTokenizer(list(reversed(WORDS)))
+    assert not cache.load_or_build(_texts(requested), other, "dataset", 4).cache_hit
+    assert not cache.load_or_build(_texts(requested), tokenizer, "otro", 4).cache_hit
+    assert len(requested) == 4
+    # Sin directorios de construcción a medias
+    assert not list(cache.cache_dir.glob(".build_*"))
+
+
+def main():
+    """Ejecutar las pruebas sin pytest"""
+    tests = [
+        test_pack_sequences_boundaries,
+        test_collator_padding_and_labels,
+        test_cache_hit_and_miss,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Caché de Datasets Tokenizados para Entrenamiento LoRA
+=====================================================
+Tokeniza cada dataset una sola vez y guarda los ids de tokens en archivos
+mapeados en memoria, indexados por el hash del tokenizador y el checksum
+del dataset. Los ejemplos se empaquetan en bloques de hasta max_length
+tokens para no desperdiciar cada lote en relleno.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Se incrementa si cambia el formato de los archivos en caché
+CACHE_FORMAT_VERSION = 1
+
+# Textos tokenizados por llamada al tokenizador
+TOKENIZE_BATCH_SIZE = 1000
+
+# Formato de los ejemplos instrucción-respuesta de los datasets LoRA
+DEFAULT_TEXT_TEMPLATE = "Instruction: {instruction}\nOutput: {output}"
+
+
+def tokenizer_fingerprint(tokenizer: Any) -> str:
+    """Hash del tokenizador: vocabulario, reglas y tokens especiales"""
+    hasher = hashlib.sha256()
+    hasher.update(type(tokenizer).__name__.encode("utf-8"))
+
+    backend = getattr(tokenizer, "backend_tokenizer", None)
+    if backend is not None:
+        hasher.update(backend.to_str().encode("utf-8"))
+    else:
+        vocab = sorted(tokenizer.get_vocab().items())
+        hasher.update(json.dumps(vocab, ensure_ascii=False).encode("utf-8"))
+
+    special_tokens = json.dumps(
+        tokenizer.special_tokens_map, sort_keys=True, default=str
+    )
+    hasher.update(special_tokens.encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def file_checksum(file_path: Union[str, Path], chunk_size: int = 1024 * 1024) -> str:
+    """Checksum SHA-256 de un archivo leído por bloques"""
+    hasher = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def pack_sequences(offsets: np.ndarray, max_length: int) -> np.ndarray:
+    """
+    Agrupar ejemplos consecutivos en bloques de hasta max_length tokens
+
+    Los ejemplos son contiguos en el array plano de tokens, así que cada
+    bloque es un único rango [inicio, fin) y no hace falta copiar datos.
+
+    Returns:
+        Array (bloques, 2) con los rangos de cada bloque
+    """
+    spans = []
+    if len(offsets) < 2:
+        return np.zeros((0, 2), dtype=np.int64)
+
+    block_start = int(offsets[0])
+    for start, end in zip(offsets[:-1], offsets[1:]):
+        if end - block_start > max_length and start > block_start:
+            spans.append((block_start, int(start)))
+            block_start = int(start)
+    spans.append((block_start, int(offsets[-1])))
+
+    return np.asarray(spans, dtype=np.int64)
+
+
+class TokenizedDataset:
+    """
+    Dataset tokenizado y mapeado en memoria
+
+    Cada elemento es un bloque empaquetado (o un ejemplo si pack=False).
+    ``input_ids`` es una vista sin copia del archivo mapeado; se rellena y
+    se convierte en tensores con PaddedBatchCollator sin pasar por listas.
+    """
+
+    def __init__(self, directory: Path, max_length: int, pack: bool = True):
+        self.directory = Path(directory)
+        with open(self.directory / "metadata.json", "r", encoding="utf-8") as f:
+            self.metadata: Dict[str, Any] = json.load(f)
+
+        num_tokens = self.metadata["num_tokens"]
+        dtype = np.dtype(self.metadata["dtype"])
+        self.tokens = (
+            np.memmap(
+                self.directory / "tokens.bin",
+                dtype=dtype,
+                mode="r",
+                shape=(num_tokens,),
+            )
+            if num_tokens
+            else np.zeros(0, dtype=dtype)
+        )
+        self.offsets = np.load(self.directory / "offsets.npy")
+
+        if pack:
+            self.spans = pack_sequences(self.offsets, max_length)
+        else:
+            self.spans = np.stack([self.offsets[:-1], self.offsets[1:]], axis=1)
+
+        self.cache_hit = False
+
+    @property
+    def num_examples(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def lengths(self) -> np.ndarray:
+        """Longitud en tokens de cada elemento"""
+        return self.spans[:, 1] - self.spans[:, 0]
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def __getitem__(self, index: int) -> Dict[str, np.ndarray]:
+        start, end = self.spans[index]
+        return {"input_ids": self.tokens[start:end]}
+
+    def __iter__(self) -> Iterator[Dict[str, np.ndarray]]:
+        for index in range(len(self)):
+            yield self[index]
+
+
+class PaddedBatchCollator:
+    """
+    Collator de bloques numpy con relleno dinámico
+
+    Copia cada bloque una sola vez en la matriz del lote (al ancho del bloque
+    más largo) y devuelve tensores de torch que comparten memoria con ella.
+    Las etiquetas son los propios ids, con -100 solo en el relleno: a
+    diferencia de DataCollatorForLanguageModeling, los EOS reales que separan
+    ejemplos empaquetados siguen contando aunque pad_token sea eos_token.
+    """
+
+    def __init__(
+        self,
+        pad_token_id: int,
+        pad_to_multiple_of: int = None,
+        label_pad_id: int = -100,
+        return_tensors: str = "pt",
+    ):
+        self.pad_token_id = pad_token_id
+        self.pad_to_multiple_of = pad_to_multiple_of
+        self.label_pad_id = label_pad_id
+        self.return_tensors = return_tensors
+
+    def __call__(self, features: List[Dict[str, Any]]) -> Dict[str, Any]:
+        blocks = [np.asarray(feature["input_ids"]) for feature in features]
+        width = max((len(block) for block in blocks), default=0)
+        if self.pad_to_multiple_of:
+            width = -(-width // self.pad_to_multiple_of) * self.pad_to_multiple_of
+
+        input_ids = np.full((len(blocks), width), self.pad_token_id, dtype=np.int64)
+        attention_mask = np.zeros((len(blocks), width), dtype=np.int64)
+        for row, block in enumerate(blocks):
+            input_ids[row, : len(block)] = block
+            attention_mask[row, : len(block)] = 1
+        labels = np.where(attention_mask == 1, input_ids, self.label_pad_id)
+
+        batch = {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "labels": labels,
+        }
+        if self.return_tensors == "pt":
+            import torch
+
+            batch = {key: torch.from_numpy(value) for key, value in batch.items()}
+        return batch
+
+
+class TokenizedDatasetCache:
+    """
+    Caché en disco de datasets tokenizados
+
+    La clave combina el hash del tokenizador, el checksum del dataset
+    (incluida la plantilla de texto) y max_length, de modo que volver a
+    entrenar con los mismos datos no vuelve a tokenizar nada.
+    """
+
+    def __init__(self, cache_dir: str = "shaili_ai/data/tokenized_cache"):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def cache_key(self, tokenizer_hash: str, dataset_checksum: str, max_length: int) -> str:
+        """Clave de caché de un dataset tokenizado"""
+        key = f"{CACHE_FORMAT_VERSION}:{tokenizer_hash}:{dataset_checksum}:{max_length}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+    def from_jsonl(
+        self,
+        dataset_path: Union[str, Path],
+        tokenizer: Any,
+        max_length: int,
+        text_template: str = DEFAULT_TEXT_TEMPLATE,
+        pack: bool = True,
+    ) -> TokenizedDataset:
+        """Obtener un dataset JSONL tokenizado, tokenizándolo solo si no está en caché"""
+        checksum = hashlib.sha256(
+            f"{file_checksum(dataset_path)}:{text_template}".encode("utf-8")
+        ).hexdigest()
+
+        def texts() -> Iterator[str]:
+            with open(dataset_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield text_template.format(**json.loads(line))
+
+        return self.load_or_build(texts, tokenizer, checksum, max_length, pack)
+
+    def from_records(
+        self,
+        records: List[Dict[str, Any]],
+        tokenizer: Any,
+        max_length: int,
+        text_template: str = DEFAULT_TEXT_TEMPLATE,
+        pack: bool = True,
+    ) -> TokenizedDataset:
+        """Obtener una lista de registros tokenizada (caché por contenido)"""
+        hasher = hashlib.sha256(text_template.encode("utf-8"))
+        for record in records:
+            hasher.update(
+                json.dumps(record, sort_keys=True, ensure_ascii=False).encode("utf-8")
+            )
+
+        def texts() -> Iterator[str]:
+            for record in records:
+                yield text_template.format(**record)
+
+        return self.load_or_build(
+            texts, tokenizer, hasher.hexdigest(), max_length, pack
+        )
+
+    def load_or_build(
+        self,
+        texts: Callable[[], Iterable[str]],
+        tokenizer: Any,
+        dataset_checksum: str,
+        max_length: int,
+        pack: bool = True,
+    ) -> TokenizedDataset:
+        """
+        Cargar un dataset tokenizado de la caché o construirlo
+
+        Args:
+            texts: Función que devuelve los textos a tokenizar (solo se
+                llama si el dataset no está en caché)
+            tokenizer: Tokenizador de transformers
+            dataset_checksum: Checksum del contenido del dataset
+            max_length: Longitud máxima de ejemplo y de bloque empaquetado
+            pack: Empaquetar ejemplos consecutivos en bloques
+        """
+        key = self.cache_key(tokenizer_fingerprint(tokenizer), dataset_checksum, max_length)
+        directory = self.cache_dir / key
+
+        if (directory / "metadata.json").exists():
+            dataset = TokenizedDataset(directory, max_length, pack)
+            dataset.cache_hit = True
+            return dataset
+
+        self._build(directory, texts(), tokenizer, max_length)
+        return TokenizedDataset(directory, max_length, pack)
+
+    def _build(
+        self, directory: Path, texts: Iterable[str], tokenizer: Any, max_length: int
+    ):
+        """Tokenizar por lotes y escribir tokens y offsets de forma atómica"""
+        dtype = np.uint16 if len(tokenizer) <= np.iinfo(np.uint16).max else np.int32
+        eos_token_id = tokenizer.eos_token_id
+        # Hueco para el EOS que separa ejemplos dentro de un bloque
+        example_length = max_length - 1 if eos_token_id is not None else max_length
+
+        build_dir = Path(tempfile.mkdtemp(prefix=".build_", dir=self.cache_dir))
+        offsets = [0]
+
+        try:
+            with open(build_dir / "tokens.bin", "wb") as f:
+                batch: List[str] = []
+
+                def flush():
+                    encoded = tokenizer(
+                        batch, truncation=True, max_length=example_length
+                    )["input_ids"]
+                    for input_ids in encoded:
+                        if eos_token_id is not None and (
+                            not input_ids or input_ids[-1] != eos_token_id
+                        ):
+                            input_ids = list(input_ids) + [eos_token_id]
+                        np.asarray(input_ids, dtype=dtype).tofile(f)
+                        offsets.append(offsets[-1] + len(input_ids))
+                    batch.clear()
+
+                for text in texts:
+                    batch.append(text)
+                    if len(batch) >= TOKENIZE_BATCH_SIZE:
+                        flush()
+                if batch:
+                    flush()
+
+            np.save(build_dir / "offsets.npy", np.asarray(offsets, dtype=np.int64))
+            with open(build_dir / "metadata.json", "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "format_version": CACHE_FORMAT_VERSION,
+                        "dtype": np.dtype(dtype).name,
+                        "num_tokens": offsets[-1],
+                        "num_examples": len(offsets) - 1,
+                        "max_length": max_length,
+                        "tokenizer": getattr(tokenizer, "name_or_path", ""),
+                    },
+                    f,
+                    indent=2,
+                )
+
+            try:
+                os.replace(build_dir, directory)
+            except OSError:
+                # Otro proceso construyó la misma entrada a la vez
+                shutil.rmtree(build_dir, ignore_errors=True)
+
+        except Exception:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            raise
+
+        logger.info(
+            f"🔤 Dataset tokenizado en caché: {len(offsets) - 1} ejemplos, "
+            f"{offsets[-1]} tokens ({directory.name})"
+        )
@@ -1,13 +1,15 @@
+import ast
 import os
 import sys
 import importlib
 import importlib.util
-import inspect
 import json
 import hashlib
 import logging
 import traceback
 import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from typing import Dict, List, Any, Optional, Type, Tuple
 from dataclasses import dataclass, asdict, field
 
@@ -18,6 +20,19 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Importaciones de nivel superior (fallback cuando el archivo no compila)
+IMPORT_PATTERN = re.compile(r"^(?:from\s+(\w+)|import\s+(\w+))", re.MULTILINE)
+
+
+@lru_cache(maxsize=None)
+def _is_dependency_available(module_name: str) -> bool:
+    """Comprobar (una vez por escaneo) si una dependencia se puede importar"""
+    try:
+        importlib.import_module(module_name)
+        return True
+    except ImportError:
+        return False
+
 
 @dataclass
 class ModuleMetadata:
@@ -54,9 +69,15 @@ class ModuleScanner:
         ignore_dirs: Optional[List[str]] = None,
         output_path: str = "shaili_ai/config/module_catalog.json",
         detailed_report_path: str = "shaili_ai/config/module_scan_report.json",
+        max_workers: Optional[int] = None,
+        parallel_threshold: int = 8,
     ):
         """
         Inicializar escáner de módulos
+
+        Args:
+            max_workers: Procesos para analizar módulos (por defecto, núcleos)
+            parallel_threshold: Mínimo de módulos a analizar para usar el pool
         """
         self.base_path = os.path.abspath(base_path)
         self.ignore_dirs = ignore_dirs or [
@@ -67,6 +88,8 @@ class ModuleScanner:
         ]
         self.output_path = output_path
         self.detailed_report_path = detailed_report_path
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.parallel_threshold = parallel_threshold
 
         # Configurar ruta de importación
         if self.base_path not in sys.path:
@@ -88,24 +111,41 @@ class ModuleScanner:
         logger.debug(f"Validando módulo {path}: {is_valid}")
         return is_valid
 
-    def _calculate_file_hash(self, path: str) -> str:
+    def _calculate_file_hash(self, path: str, source: Optional[bytes] = None) -> str:
         """
-        Calcular hash MD5 de un archivo
+        Calcular hash MD5 de un archivo (o de su contenido ya leído)
         """
-        with open(path, "rb") as f:
-            file_hash = hashlib.md5(f.read()).hexdigest()
+        if source is None:
+            with open(path, "rb") as f:
+                source = f.read()
+        file_hash = hashlib.md5(source).hexdigest()
         logger.debug(f"Hash de {path}: {file_hash}")
         return file_hash
 
-    def _check_syntax(self, path: str) -> List[str]:
+    def _parse_module(
+        self, path: str, source: bytes
+    ) -> Tuple[Optional[ast.Module], List[str]]:
+        """
+        Parsear un archivo una sola vez
+
+        Returns:
+            (AST o None si no compila, errores de sintaxis)
+        """
+        try:
+            return ast.parse(source, filename=path), []
+        except (SyntaxError, ValueError):
+            return None, self._check_syntax(path, source)
+
+    def _check_syntax(self, path: str, source: Optional[bytes] = None) -> List[str]:
         """
         Verificar sintaxis de un archivo Python
         """
         syntax_errors = []
         try:
-            with open(path, "r", encoding="utf-8") as f:
-                content = f.read()
-                compile(content, path, "exec")
+            if source is None:
+                with open(path, "rb") as f:
+                    source = f.read()
+            compile(source, path, "exec")
         except SyntaxError as e:
             # Intentar recuperar información del error
             error_line = e.lineno if hasattr(e, "lineno") else "desconocida"
@@ -115,32 +155,51 @@ class ModuleScanner:
             logger.error(error_msg)
         return syntax_errors
 
-    def _check_dependencies(self, module_path: str) -> List[str]:
+    def _top_level_imports(
+        self, tree: Optional[ast.Module], source: Optional[bytes] = None
+    ) -> List[str]:
+        """
+        Paquetes importados en el nivel superior del módulo
+
+        Las importaciones relativas y las que están dentro de funciones o
+        bloques try (dependencias opcionales) no se cuentan.
+        """
+        if tree is None:
+            # Sin AST (error de sintaxis): búsqueda por regex en el texto
+            text = (source or b"").decode("utf-8", errors="replace")
+            imports = IMPORT_PATTERN.findall(text)
+            return [name for group in imports for name in group if name]
+
+        module_names = []
+        for node in tree.body:
+            if isinstance(node, ast.Import):
+                module_names.extend(alias.name.split(".")[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                module_names.append(node.module.split(".")[0])
+        return module_names
+
+    def _check_dependencies(
+        self,
+        module_path: str,
+        tree: Optional[ast.Module] = None,
+        source: Optional[bytes] = None,
+    ) -> List[str]:
         """
         Verificar dependencias de un módulo
         """
         missing_dependencies = []
 
         try:
-            with open(module_path, "r", encoding="utf-8") as f:
-                module_content = f.read()
-
-            # Buscar importaciones usando regex
-            import_pattern = re.compile(
-                r"^(?:from\s+(\w+)|import\s+(\w+))", re.MULTILINE
-            )
-            imports = import_pattern.findall(module_content)
+            if tree is None and source is None:
+                with open(module_path, "rb") as f:
+                    source = f.read()
 
-            # Filtrar nombres de módulos
-            module_names = [name for group in imports for name in group if name]
+            module_names = self._top_level_imports(tree, source)
 
             logger.debug(f"Módulos importados en {module_path}: {module_names}")
 
             for module_name in module_names:
-                try:
-                    # Intentar importar
-                    importlib.import_module(module_name)
-                except ImportError:
+                if not _is_dependency_available(module_name):
                     missing_dependencies.append(module_name)
                     logger.warning(f"Módulo faltante: {module_name}")
 
@@ -149,14 +208,41 @@ class ModuleScanner:
 
         return missing_dependencies
 
+    def _definitions(self, tree: Optional[ast.Module]) -> Tuple[List[str], List[str]]:
+        """Clases y funciones definidas en el nivel superior del AST"""
+        if tree is None:
+            return [], []
+        classes = sorted(
+            node.name for node in tree.body if isinstance(node, ast.ClassDef)
+        )
+        functions = sorted(
+            node.name
+            for node in tree.body
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+        )
+        return classes, functions
+
     def _analyze_module(self, module_path: str) -> ModuleMetadata:
         """
         Analizar un módulo Python y extraer metadatos
+
+        El archivo se lee y se parsea una sola vez: el mismo contenido da el
+        hash, y el mismo AST da la sintaxis, las importaciones y las clases y
+        funciones definidas.
         """
         logger.info(f"Analizando módulo: {module_path}")
 
+        # Ruta de importación también en procesos del pool
+        if self.base_path not in sys.path:
+            sys.path.insert(0, self.base_path)
+
+        file_stats = os.stat(module_path)
+        with open(module_path, "rb") as f:
+            source = f.read()
+        file_hash = self._calculate_file_hash(module_path, source)
+
         # Verificar sintaxis primero
-        syntax_errors = self._check_syntax(module_path)
+        tree, syntax_errors = self._parse_module(module_path, source)
 
         try:
             # Calcular ruta relativa
@@ -166,7 +252,7 @@ class ModuleScanner:
             logger.debug(f"Nombre del módulo: {module_name}")
 
             # Verificar dependencias
-            missing_dependencies = self._check_dependencies(module_path)
+            missing_dependencies = self._check_dependencies(module_path, tree, source)
 
             # Intentar importar el módulo
             try:
@@ -179,6 +265,9 @@ class ModuleScanner:
                     name=module_name,
                     path=rel_path,
                     type="unknown",
+                    size_bytes=file_stats.st_size,
+                    hash=file_hash,
+                    last_modified=file_stats.st_mtime,
                     is_importable=False,
                     import_error=str(e),
                     import_traceback=traceback.format_exc(),
@@ -187,24 +276,11 @@ class ModuleScanner:
                 )
 
             # Extraer clases y funciones
-            classes = [
-                name
-                for name, obj in inspect.getmembers(module, inspect.isclass)
-                if obj.__module__ == module_name
-            ]
-
-            functions = [
-                name
-                for name, obj in inspect.getmembers(module, inspect.isfunction)
-                if obj.__module__ == module_name
-            ]
+            classes, functions = self._definitions(tree)
 
             logger.debug(f"Clases en {module_name}: {classes}")
             logger.debug(f"Funciones en {module_name}: {functions}")
 
-            # Obtener información del archivo
-            file_stats = os.stat(module_path)
-
             # Intentar determinar el tipo de módulo
             module_type = "module"
             if "ai" in module_name.lower():
@@ -225,7 +301,7 @@ class ModuleScanner:
                 classes=classes,
                 functions=functions,
                 size_bytes=file_stats.st_size,
-                hash=self._calculate_file_hash(module_path),
+                hash=file_hash,
                 last_modified=file_stats.st_mtime,
                 is_importable=True,
                 docstring=module.__doc__,
@@ -240,15 +316,90 @@ class ModuleScanner:
                 name=os.path.splitext(os.path.basename(module_path))[0],
                 path=os.path.relpath(module_path, self.base_path),
                 type="unknown",
+                size_bytes=file_stats.st_size,
+                hash=file_hash,
+                last_modified=file_stats.st_mtime,
                 is_importable=False,
                 import_error=str(e),
                 import_traceback=traceback.format_exc(),
                 syntax_errors=syntax_errors,
             )
 
-    def scan_modules(self) -> Dict[str, ModuleMetadata]:
+    def _cached_metadata(
+        self,
+        path: str,
+        previous: Dict[str, ModuleMetadata],
+        file_stats: os.stat_result,
+    ) -> Optional[ModuleMetadata]:
+        """
+        Reutilizar los metadatos del catálogo anterior si el archivo no cambió
+
+        Con el mismo mtime y tamaño no se lee el archivo; si solo cambió el
+        mtime, se compara el hash del contenido. Los módulos que no se
+        pudieron importar o con dependencias faltantes se vuelven a analizar
+        siempre: eso depende de otros archivos y paquetes, no solo del suyo.
+        """
+        cached = previous.get(os.path.relpath(path, self.base_path))
+        if (
+            cached is None
+            or cached.hash is None
+            or cached.size_bytes != file_stats.st_size
+            or cached.import_error
+            or cached.missing_dependencies
+        ):
+            return None
+
+        if cached.last_modified == file_stats.st_mtime:
+            return cached
+
+        if self._calculate_file_hash(path) == cached.hash:
+            cached.last_modified = file_stats.st_mtime
+            return cached
+        return None
+
+    def _analyze_many(self, paths: List[str]) -> Dict[str, ModuleMetadata]:
+        """
+        Analizar varios módulos, en un pool de procesos si son suficientes
+
+        Cada proceso importa los módulos por separado, así que los efectos
+        secundarios de importarlos no se acumulan en el proceso principal.
+        """
+        results: Dict[str, ModuleMetadata] = {}
+        if len(paths) >= self.parallel_threshold and self.max_workers > 1:
+            workers = min(self.max_workers, len(paths))
+            logger.info(f"Analizando {len(paths)} módulos con {workers} procesos")
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    chunksize = max(1, len(paths) // (workers * 4))
+                    for path, metadata in zip(
+                        paths,
+                        executor.map(self._analyze_module, paths, chunksize=chunksize),
+                    ):
+                        results[path] = metadata
+                return results
+            except Exception as e:
+                logger.warning(
+                    f"Pool de procesos no disponible, análisis secuencial: {e}"
+                )
+                results.clear()
+
+        for path in paths:
+            try:
+                results[path] = self._analyze_module(path)
+            except Exception as e:
+                logger.error(f"Error procesando {path}: {e}")
+                logger.error(traceback.format_exc())
+        return results
+
+    def scan_modules(self, use_cache: bool = True) -> Dict[str, ModuleMetadata]:
         """
         Escanear recursivamente todos los módulos
+
+        Args:
+            use_cache: Reutilizar del catálogo guardado los módulos cuyo
+                (mtime, tamaño, hash) no cambió; solo se analizan los
+                archivos nuevos o modificados y los que tenían errores de
+                importación o dependencias faltantes
         """
         module_catalog = {}
         detailed_report = {
@@ -258,14 +409,22 @@ class ModuleScanner:
             "syntax_errors": [],
             "import_errors": [],
             "missing_dependencies": [],
+            "cached_modules": 0,
+            "analyzed_modules": 0,
         }
 
         logger.info("Iniciando escaneo de módulos...")
 
+        # Las dependencias pueden haberse instalado o creado desde el último
+        # escaneo
+        importlib.invalidate_caches()
+        _is_dependency_available.cache_clear()
+
         try:
             # Listar todos los archivos en el directorio base
             logger.debug(f"Directorio base: {self.base_path}")
 
+            module_paths = []
             for root, dirs, files in os.walk(self.base_path):
                 # Ignorar directorios especificados
                 dirs[:] = [d for d in dirs if d not in self.ignore_dirs]
@@ -273,51 +432,82 @@ class ModuleScanner:
 
                 for file in files:
                     full_path = os.path.join(root, file)
-
                     if self._is_valid_module(full_path):
-                        try:
-                            module_metadata = self._analyze_module(full_path)
-                            module_catalog[module_metadata.name] = module_metadata
-
-                            # Actualizar informe detallado
-                            detailed_report["total_modules_scanned"] += 1
-
-                            if module_metadata.is_importable:
-                                detailed_report["importable_modules"] += 1
-                            else:
-                                detailed_report["modules_with_errors"].append(
-                                    {
-                                        "module_name": module_metadata.name,
-                                        "path": module_metadata.path,
-                                        "import_error": module_metadata.import_error,
-                                    }
-                                )
-
-                            # Registrar errores de sintaxis
-                            if module_metadata.syntax_errors:
-                                detailed_report["syntax_errors"].extend(
-                                    module_metadata.syntax_errors
-                                )
-
-                            # Registrar errores de importación
-                            if module_metadata.import_error:
-                                detailed_report["import_errors"].append(
-                                    {
-                                        "module_name": module_metadata.name,
-                                        "path": module_metadata.path,
-                                        "error": module_metadata.import_error,
-                                    }
-                                )
-
-                            # Registrar dependencias faltantes
-                            if module_metadata.missing_dependencies:
-                                detailed_report["missing_dependencies"].extend(
-                                    module_metadata.missing_dependencies
-                                )
-
-                        except Exception as e:
-                            logger.error(f"Error procesando {full_path}: {e}")
-                            logger.error(traceback.format_exc())
+                        module_paths.append(full_path)
+
+            # Separar módulos sin cambios de los que hay que analizar
+            previous = (
+                {
+                    metadata.path: metadata
+                    for metadata in self.load_module_catalog().values()
+                }
+                if use_cache
+                else {}
+            )
+            scanned: Dict[str, ModuleMetadata] = {}
+            to_analyze = []
+            for full_path in module_paths:
+                try:
+                    cached = self._cached_metadata(
+                        full_path, previous, os.stat(full_path)
+                    )
+                except OSError as e:
+                    logger.error(f"Error procesando {full_path}: {e}")
+                    continue
+                if cached is not None:
+                    scanned[full_path] = cached
+                else:
+                    to_analyze.append(full_path)
+
+            detailed_report["cached_modules"] = len(scanned)
+            detailed_report["analyzed_modules"] = len(to_analyze)
+            logger.info(
+                f"Módulos sin cambios: {len(scanned)}, a analizar: {len(to_analyze)}"
+            )
+            scanned.update(self._analyze_many(to_analyze))
+
+            for full_path in module_paths:
+                module_metadata = scanned.get(full_path)
+                if module_metadata is None:
+                    continue
+
+                module_catalog[module_metadata.name] = module_metadata
+
+                # Actualizar informe detallado
+                detailed_report["total_modules_scanned"] += 1
+
+                if module_metadata.is_importable:
+                    detailed_report["importable_modules"] += 1
+                else:
+                    detailed_report["modules_with_errors"].append(
+                        {
+                            "module_name": module_metadata.name,
+                            "path": module_metadata.path,
+                            "import_error": module_metadata.import_error,
+                        }
+                    )
+
+                # Registrar errores de sintaxis
+                if module_metadata.syntax_errors:
+                    detailed_report["syntax_errors"].extend(
+                        module_metadata.syntax_errors
+                    )
+
+                # Registrar errores de importación
+                if module_metadata.import_error:
+                    detailed_report["import_errors"].append(
+                        {
+                            "module_name": module_metadata.name,
+                            "path": module_metadata.path,
+                            "error": module_metadata.import_error,
+                        }
+                    )
+
+                # Registrar dependencias faltantes
+                if module_metadata.missing_dependencies:
+                    detailed_report["missing_dependencies"].extend(
+                        module_metadata.missing_dependencies
+                    )
 
             # Guardar informe detallado
             os.makedirs(os.path.dirname(self.detailed_report_path), exist_ok=True)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Pruebas del escáner de módulos
+
+Comprueban que el escaneo incremental reutiliza los módulos sin cambios y
+vuelve a evaluar los que no se pudieron importar.
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from module_scanner import ModuleScanner
+
+
+def _scanner(base: Path) -> ModuleScanner:
+    # Directorio propio: _is_valid_module descarta rutas con "test_"
+    return ModuleScanner(
+        base_path=str(base / "modules"),
+        output_path=str(base / "config" / "module_catalog.json"),
+        detailed_report_path=str(base / "config" / "module_scan_report.json"),
+        max_workers=1,
+    )
+
+
+def _scan(scanner: ModuleScanner):
+    """Escanear, guardar el catálogo y devolver (catálogo, informe)"""
+    catalog = scanner.scan_modules()
+    scanner.save_module_catalog(catalog)
+    with open(scanner.detailed_report_path, encoding="utf-8") as f:
+        return catalog, json.load(f)
+
+
+def test_unchanged_modules_are_reused():
+    """Solo se analizan los archivos nuevos o modificados"""
+    with tempfile.TemporaryDirectory(prefix="module_scanner_") as tmp:
+        modules = Path(tmp) / "modules"
+        modules.mkdir()
+        (modules / "alpha_mod.py").write_text("def uno():\n    return 1\n")
+        (modules / "beta_mod.py").write_text("class Beta:\n    pass\n")
+        scanner = _scanner(Path(tmp))
+
+        catalog, report = _scan(scanner)
+        assert report["analyzed_modules"] == 2
+        assert catalog["alpha_mod"].functions == ["uno"]
+
+        catalog, report = _scan(scanner)
+        assert (report["cached_modules"], report["analyzed_modules"]) == (2, 0)
+
+        (modules / "alpha_mod.py").write_text(
+            "def uno():\n    return 1\n\n\ndef dos():\n    return 2\n"
+        )
+        catalog, report = _scan(scanner)
+        assert (report["cached_modules"], report["analyzed_modules"]) == (1, 1)
+        assert catalog["alpha_mod"].functions == ["dos", "uno"]
+
+
+def test_failed_import_is_rescanned():
+    """Crear la dependencia que faltaba vuelve importable al módulo"""
+    with tempfile.TemporaryDirectory(prefix="module_scanner_") as tmp:
+        modules = Path(tmp) / "modules"
+        modules.mkdir()
+        (modules / "uses_dep.py").write_text("import zz_dep_mod\n\nVALUE = 1\n")
+        scanner = _scanner(Path(tmp))
+
+        catalog, report = _scan(scanner)
+        assert not catalog["uses_dep"].is_importable
+        assert catalog["uses_dep"].missing_dependencies == ["zz_dep_mod"]
+        assert report["missing_dependencies"] == ["zz_dep_mod"]
+
+        # uses_dep.py no cambia; aparece la dependencia
+        (modules / "zz_dep_mod.py").write_text("NAME = 'dep'\n")
+        catalog, report = _scan(scanner)
+        assert catalog["uses_dep"].is_importable
+        assert catalog["uses_dep"].import_error is None
+        assert catalog["uses_dep"].missing_dependencies == []
+        assert report["missing_dependencies"] == []
+
+        # Ya importable, el siguiente escaneo lo reutiliza
+        catalog, report = _scan(scanner)
+        assert (report["cached_modules"], report["analyzed_modules"]) == (2, 0)
+        assert catalog["uses_dep"].is_importable
+
+
+def main():
+    """Ejecutar las pruebas sin pytest"""
+    tests = [
+        test_unchanged_modules_are_reused,
+        test_failed_import_is_rescanned,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,8 +10,21 @@ from typing import Dict, List, Any, Optional, Tuple
 from collections import Counter
 import re
 
+from modules.utils.keyword_matcher import KeywordMatcher
+
 logger = logging.getLogger(__name__)
 
+# Palabras clave por rama para sugerencias rápidas
+BRANCH_KEYWORDS = {
+    "tech": ["technology", "software", "computer", "programming", "code"],
+    "science": ["science", "research", "experiment", "discovery", "theory"],
+    "health": ["health", "medical", "doctor", "patient", "treatment"],
+    "finance": ["money", "finance", "bank", "investment", "economy"],
+    "education": ["education", "learning", "school", "student", "teacher"],
+}
+
+_BRANCH_MATCHER = KeywordMatcher.from_lexicons(BRANCH_KEYWORDS, word_boundary=False)
+
 
 class VocabBuilder20Branches:
     """Constructor de vocabulario para 20 ramas de especialización"""
@@ -195,27 +208,17 @@ class UnifiedBranchTokenizer:
 
     def suggest_branches(self, text: str) -> List[Tuple[str, float]]:
         """Sugerir ramas basándose en el contenido del texto"""
-        # Análisis simple basado en palabras clave
-        branch_keywords = {
-            "tech": ["technology", "software", "computer", "programming", "code"],
-            "science": ["science", "research", "experiment", "discovery", "theory"],
-            "health": ["health", "medical", "doctor", "patient", "treatment"],
-            "finance": ["money", "finance", "bank", "investment", "economy"],
-            "education": ["education", "learning", "school", "student", "teacher"],
-        }
-
-        text_lower = text.lower()
-        branch_scores = Counter()
-
-        for branch, keywords in branch_keywords.items():
-            for keyword in keywords:
-                if keyword in text_lower:
-                    branch_scores[branch] += 1
-
         total_words = len(text.split())
         if total_words == 0:
             return []
 
+        # Análisis simple basado en palabras clave (una pasada con el autómata)
+        found = _BRANCH_MATCHER.count_keywords(text)
+        branch_scores = Counter()
+        for branch in BRANCH_KEYWORDS:
+            if branch in found:
+                branch_scores[branch] = len(found[branch])
+
         suggestions = []
         for branch, count in branch_scores.most_common():
             score = count / total_words
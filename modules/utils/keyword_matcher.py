@@ -0,0 +1,235 @@
+"""
+Motor de Coincidencia Multi-Patrón para Sheily AI
+
+Este módulo proporciona un autómata Aho-Corasick compartido para buscar
+muchas palabras clave a la vez en un texto.
+
+Características principales:
+- Una sola pasada sobre el texto, O(longitud del texto + coincidencias)
+- Soporte de límites de palabra por léxico
+- Normalización de acentos y mayúsculas conservando las posiciones
+- Etiquetas por palabra clave (categoría, dominio, rama...)
+"""
+
+import unicodedata
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Optional, Set
+
+
+@dataclass(frozen=True)
+class KeywordMatch:
+    """Coincidencia de una palabra clave en el texto original"""
+
+    start: int
+    end: int
+    keyword: str
+    label: str
+
+
+_FOLD_CACHE: Dict[str, str] = {}
+
+
+def _fold_char(char: str, fold_accents: bool) -> str:
+    """Normalizar un carácter a un único carácter en minúsculas"""
+    key = char if fold_accents else "\0" + char
+    folded = _FOLD_CACHE.get(key)
+    if folded is None:
+        folded = char.lower()[:1] or char
+        # La "ñ" es una letra distinta en español, no un acento
+        if fold_accents and folded != "ñ":
+            folded = unicodedata.normalize("NFD", folded)[:1]
+        _FOLD_CACHE[key] = folded
+    return folded
+
+
+def fold_text(text: str, fold_accents: bool = True) -> str:
+    """
+    Normalizar texto carácter a carácter (misma longitud que el original)
+
+    Args:
+        text: Texto a normalizar
+        fold_accents: Eliminar tildes y diéresis
+
+    Returns:
+        Texto normalizado con posiciones equivalentes al original
+    """
+    return "".join(_fold_char(char, fold_accents) for char in text)
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class KeywordMatcher:
+    """Autómata Aho-Corasick para búsqueda de múltiples palabras clave"""
+
+    def __init__(self, fold_accents: bool = True):
+        """
+        Inicializar el autómata vacío
+
+        Args:
+            fold_accents: Normalizar acentos en patrones y texto
+        """
+        self.fold_accents = fold_accents
+
+        # Trie: transiciones, enlaces de fallo y salidas por nodo
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+
+        # Patrones registrados: (palabra original, etiqueta, longitud, límite)
+        self._patterns: List[tuple] = []
+        self._built = False
+
+    @classmethod
+    def from_lexicons(
+        cls,
+        lexicons: Mapping[str, Iterable[str]],
+        word_boundary: bool = True,
+        fold_accents: bool = True,
+    ) -> "KeywordMatcher":
+        """
+        Construir un autómata a partir de un mapeo etiqueta -> palabras
+
+        Args:
+            lexicons: Diccionario de etiquetas a listas de palabras clave
+            word_boundary: Exigir límites de palabra en las coincidencias
+            fold_accents: Normalizar acentos
+
+        Returns:
+            Autómata construido y listo para buscar
+        """
+        matcher = cls(fold_accents=fold_accents)
+        for label, keywords in lexicons.items():
+            matcher.add_keywords(keywords, label, word_boundary=word_boundary)
+        matcher.build()
+        return matcher
+
+    def add_keyword(self, keyword: str, label: str, word_boundary: bool = True):
+        """
+        Añadir una palabra clave al autómata
+
+        Args:
+            keyword: Palabra o frase a buscar
+            label: Etiqueta asociada (categoría, dominio...)
+            word_boundary: Exigir límites de palabra para esta palabra
+        """
+        folded = fold_text(keyword, self.fold_accents)
+        if not folded:
+            return
+
+        node = 0
+        for char in folded:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+
+        self._output[node].append(len(self._patterns))
+        self._patterns.append((keyword, label, len(folded), word_boundary))
+        self._built = False
+
+    def add_keywords(
+        self, keywords: Iterable[str], label: str, word_boundary: bool = True
+    ):
+        """Añadir varias palabras clave con la misma etiqueta"""
+        for keyword in keywords:
+            self.add_keyword(keyword, label, word_boundary=word_boundary)
+
+    def build(self):
+        """Calcular los enlaces de fallo (recorrido en anchura del trie)"""
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            queue.append(child)
+
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._output[child] = (
+                    self._output[child] + self._output[self._fail[child]]
+                )
+
+        self._built = True
+
+    def find_all(self, text: str, labels: Optional[Set[str]] = None) -> List[KeywordMatch]:
+        """
+        Encontrar todas las coincidencias en una sola pasada
+
+        Args:
+            text: Texto donde buscar
+            labels: Limitar los resultados a estas etiquetas
+
+        Returns:
+            Lista de coincidencias ordenadas por posición final
+        """
+        if not self._built:
+            self.build()
+        if not text or not self._patterns:
+            return []
+
+        folded = fold_text(text, self.fold_accents)
+        goto, fail, output, patterns = (
+            self._goto,
+            self._fail,
+            self._output,
+            self._patterns,
+        )
+        text_length = len(folded)
+        matches = []
+        node = 0
+
+        for position, char in enumerate(folded):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+
+            for pattern_index in output[node]:
+                keyword, label, length, word_boundary = patterns[pattern_index]
+                if labels is not None and label not in labels:
+                    continue
+
+                start = position - length + 1
+                end = position + 1
+                if word_boundary and (
+                    (start > 0 and _is_word_char(folded[start - 1]))
+                    or (end < text_length and _is_word_char(folded[end]))
+                ):
+                    continue
+
+                matches.append(KeywordMatch(start, end, keyword, label))
+
+        return matches
+
+    def count_keywords(self, text: str) -> Dict[str, Set[str]]:
+        """
+        Agrupar por etiqueta las palabras clave distintas encontradas
+
+        Args:
+            text: Texto donde buscar
+
+        Returns:
+            Diccionario etiqueta -> conjunto de palabras clave encontradas
+        """
+        found: Dict[str, Set[str]] = {}
+        for match in self.find_all(text):
+            found.setdefault(match.label, set()).add(match.keyword)
+        return found
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+
+__all__ = ["KeywordMatch", "KeywordMatcher", "fold_text"]
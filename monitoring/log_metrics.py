@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Métricas Incrementales de Logs para Shaili AI
+=============================================
+Lee los logs de logs/*.log desde el último offset guardado (tail) y acumula
+peticiones, errores y tiempos de respuesta en contadores por minuto, de modo
+que el coste de cada recopilación depende solo de las líneas nuevas.
+"""
+
+import fnmatch
+import json
+import logging
+import os
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Categorías de logs según el nombre de archivo (mismos patrones que antes)
+LOG_CATEGORIES = {
+    "requests": ["access*.log", "nginx*.log"],
+    "errors": ["error*.log", "*error*.log"],
+    "responses": ["response*.log", "api*.log"],
+}
+
+# Formato de las claves de minuto (hora local, como los logs)
+MINUTE_FORMAT = "%Y-%m-%d %H:%M"
+
+_ISO_TIMESTAMP = re.compile(r"(\d{4}-\d{2}-\d{2})[ T](\d{2}:\d{2})")
+_CLF_TIMESTAMP = re.compile(r"\[(\d{2})/([A-Za-z]{3})/(\d{4}):(\d{2}:\d{2})")
+_DURATION_MS = re.compile(r"(\d+\.?\d*)\s*ms")
+_MONTHS = {
+    name: f"{index:02d}"
+    for index, name in enumerate(
+        ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
+         "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"],
+        start=1,
+    )
+}
+
+
+def minute_key(moment: datetime) -> str:
+    """Clave del minuto que contiene un instante"""
+    return moment.strftime(MINUTE_FORMAT)
+
+
+def parse_minute(line: str) -> Optional[str]:
+    """Extraer el minuto de una línea de log (ISO o formato de nginx)"""
+    match = _ISO_TIMESTAMP.search(line)
+    if match:
+        return f"{match.group(1)} {match.group(2)}"
+
+    match = _CLF_TIMESTAMP.search(line)
+    if match and match.group(2) in _MONTHS:
+        day, month, year, hour_minute = match.groups()
+        return f"{year}-{_MONTHS[month]}-{day} {hour_minute}"
+
+    return None
+
+
+def parse_duration_ms(line: str) -> Optional[float]:
+    """Extraer una duración en milisegundos de una línea de log"""
+    match = _DURATION_MS.search(line)
+    return float(match.group(1)) if match else None
+
+
+class LogTailer:
+    """
+    Lector incremental de archivos de log
+
+    Guarda por archivo el inode y el offset de la última línea completa
+    leída. Si el inode cambia o el archivo encoge (rotación o truncado),
+    vuelve a empezar desde el principio.
+    """
+
+    def __init__(
+        self,
+        initial_backfill_bytes: int = 1024 * 1024,
+        max_read_bytes: int = 16 * 1024 * 1024,
+    ):
+        self.initial_backfill_bytes = initial_backfill_bytes
+        self.max_read_bytes = max_read_bytes
+        self.offsets: Dict[str, Dict[str, int]] = {}
+
+    def read_new_lines(self, path: str) -> List[str]:
+        """Leer las líneas completas añadidas desde la última lectura"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.offsets.pop(path, None)
+            return []
+
+        state = self.offsets.get(path)
+        skip_partial = False
+        if state is None:
+            # Archivo nuevo: solo se leen los últimos bytes
+            offset = max(0, stat.st_size - self.initial_backfill_bytes)
+            skip_partial = offset > 0
+        elif state["inode"] != stat.st_ino or stat.st_size < state["offset"]:
+            offset = 0
+        else:
+            offset = state["offset"]
+
+        if stat.st_size == offset:
+            self.offsets[path] = {"inode": stat.st_ino, "offset": offset}
+            return []
+
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read(self.max_read_bytes)
+
+        end = data.rfind(b"\n")
+        if end >= 0:
+            consumed = end + 1
+        elif len(data) >= self.max_read_bytes:
+            # Línea más larga que el máximo por lectura: se descarta
+            consumed = len(data)
+        else:
+            # Línea a medio escribir: se leerá en la próxima recopilación
+            consumed = 0
+
+        chunk = data[:consumed]
+        if skip_partial:
+            first_newline = chunk.find(b"\n")
+            chunk = chunk[first_newline + 1:] if first_newline >= 0 else b""
+
+        self.offsets[path] = {"inode": stat.st_ino, "offset": offset + consumed}
+        return chunk.decode("utf-8", errors="replace").splitlines()
+
+    def forget_missing(self, paths: List[str]):
+        """Olvidar los offsets de archivos que ya no existen"""
+        for path in set(self.offsets) - set(paths):
+            del self.offsets[path]
+
+
+class RollingLogMetrics:
+    """
+    Contadores por minuto alimentados por LogTailer
+
+    Los offsets y los contadores de la ventana se guardan en un archivo
+    JSON, así que un reinicio del colector continúa donde se quedó.
+    """
+
+    def __init__(
+        self,
+        log_dir: str = "logs",
+        state_path: str = "monitoring/log_offsets.json",
+        window_minutes: int = 60,
+    ):
+        self.log_dir = Path(log_dir)
+        self.state_path = Path(state_path)
+        self.window_minutes = window_minutes
+
+        self.tailer = LogTailer()
+        self.counters: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: defaultdict(float)
+        )
+        self.last_inference_time: Optional[float] = None
+        self.categories_present: set = set()
+
+        self._load_state()
+
+    def _load_state(self):
+        """Cargar offsets y contadores guardados"""
+        if not self.state_path.exists():
+            return
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self.tailer.offsets = state.get("offsets", {})
+            for minute, fields in state.get("counters", {}).items():
+                self.counters[minute].update(fields)
+            self.last_inference_time = state.get("last_inference_time")
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Estado de logs no válido, se reinicia: {e}")
+
+    def save_state(self):
+        """Guardar offsets y contadores de forma atómica"""
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.state_path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "offsets": self.tailer.offsets,
+                    "counters": self.counters,
+                    "last_inference_time": self.last_inference_time,
+                },
+                f,
+            )
+        os.replace(temp_path, self.state_path)
+
+    def update(self, now: Optional[datetime] = None):
+        """Leer las líneas nuevas de todos los logs y actualizar los contadores"""
+        now = now or datetime.now()
+        paths = sorted(str(path) for path in self.log_dir.glob("*.log"))
+        self.categories_present = set()
+
+        for path in paths:
+            name = os.path.basename(path)
+            categories = [
+                category
+                for category, patterns in LOG_CATEGORIES.items()
+                if any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+            ]
+            self.categories_present.update(categories)
+
+            try:
+                lines = self.tailer.read_new_lines(path)
+            except OSError as e:
+                logger.warning(f"⚠️ No se pudo leer {path}: {e}")
+                continue
+
+            for line in lines:
+                self._process_line(line, categories)
+
+        self.tailer.forget_missing(paths)
+        self._prune(now)
+        self.save_state()
+
+    def _process_line(self, line: str, categories: List[str]):
+        if "inference_time" in line or "response_time" in line:
+            duration = parse_duration_ms(line)
+            if duration is not None:
+                self.last_inference_time = duration
+
+        if not categories:
+            return
+
+        minute = parse_minute(line)
+        if minute is None:
+            return
+
+        counters = self.counters[minute]
+        if "requests" in categories:
+            counters["requests"] += 1
+        if "errors" in categories:
+            counters["errors"] += 1
+        if "responses" in categories:
+            duration = parse_duration_ms(line)
+            if duration is not None:
+                counters["response_time_sum"] += duration
+                counters["response_time_count"] += 1
+
+    def _prune(self, now: datetime):
+        """Descartar minutos fuera de la ventana"""
+        oldest = minute_key(now - timedelta(minutes=self.window_minutes))
+        for minute in [m for m in self.counters if m < oldest]:
+            del self.counters[minute]
+
+    def has_category(self, category: str) -> bool:
+        """Indica si hay algún log de la categoría"""
+        return category in self.categories_present
+
+    def minute_value(self, field: str, now: Optional[datetime] = None) -> float:
+        """Valor de un contador en el último minuto completo"""
+        now = now or datetime.now()
+        minute = minute_key(now - timedelta(minutes=1))
+        return self.counters.get(minute, {}).get(field, 0.0)
@@ -18,7 +18,14 @@ import sqlite3
 import os
 import requests
 import subprocess
-import glob
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from monitoring.log_metrics import RollingLogMetrics
+    from monitoring.metrics_store import MetricsStore, utc_now
+except ImportError:
+    from log_metrics import RollingLogMetrics
+    from metrics_store import MetricsStore, utc_now
 
 # Configurar logging con más detalles
 logging.basicConfig(
@@ -61,6 +68,32 @@ class MetricsCollector:
         self.metrics_interval = 15  # segundos
         self.backend_url = "http://127.0.0.1:8000"
         self.frontend_url = "http://127.0.0.1:3000"
+        self.retention_interval = 3600  # segundos entre limpiezas por retención
+        self.last_retention = 0.0
+        self.service_timeout = 3  # segundos por comprobación HTTP
+        self.connections_interval = 60  # segundos entre conteos de conexiones
+
+        # Almacén con agregados 1m/5m/1h
+        self.store = MetricsStore(db_path)
+
+        # Contadores por minuto a partir de los logs (lectura incremental)
+        self.log_metrics = RollingLogMetrics(
+            log_dir="logs",
+            state_path=str(Path(self.db_path).parent / "log_offsets.json"),
+        )
+
+        # Sondeos de E/S (HTTP, docker, nvidia-smi) en paralelo
+        self.executor = None
+        self.collect_executor = None
+        self._create_executors()
+        self.http_session = requests.Session()
+        self.last_cpu_percent = 0.0
+        self.connections_count = 0
+        self.last_connections_check = 0.0
+        self.connections_lock = threading.Lock()
+
+        # La primera llamada sin intervalo solo fija la referencia de CPU
+        psutil.cpu_percent(interval=None)
 
         # Crear directorio si no existe
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
@@ -147,17 +180,55 @@ class MetricsCollector:
                 """
                 )
 
+                # Índices por timestamp y tablas de agregados
+                self.store.initialize(conn)
+
                 conn.commit()
                 logger.info("✅ Base de datos de métricas inicializada")
 
         except Exception as e:
             log_error("❌ Error inicializando base de datos de métricas", e)
 
+    def _create_executors(self):
+        """
+        Crear los pools de hilos
+
+        Las recopilaciones de modelos y ramas van en su propio pool y solo
+        ellas envían sondeos al pool de sondeos, que nunca envía tareas: una
+        tarea no espera a otra de su mismo pool, así que no hay bloqueo mutuo
+        aunque todos los hilos estén ocupados.
+        """
+        self.executor = ThreadPoolExecutor(
+            max_workers=8, thread_name_prefix="metrics-probe"
+        )
+        self.collect_executor = ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="metrics-collect"
+        )
+
+    def _shutdown_executors(self):
+        """Cerrar los pools de hilos (primero el que envía al otro)"""
+        for executor in (self.collect_executor, self.executor):
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+        self.collect_executor = None
+        self.executor = None
+
     def collect_system_metrics(self) -> Dict[str, Any]:
         """Recopilar métricas reales del sistema"""
         try:
-            # CPU
-            cpu_percent = psutil.cpu_percent(interval=1)
+            # Sondeos lentos en paralelo mientras se leen los contadores locales
+            backend_future = self.executor.submit(
+                self._check_service_status, self.backend_url
+            )
+            frontend_future = self.executor.submit(
+                self._check_service_status, self.frontend_url
+            )
+            docker_future = self.executor.submit(self._count_docker_containers)
+            connections_future = self.executor.submit(self._count_connections)
+
+            # CPU desde la llamada anterior (sin bloquear)
+            cpu_percent = psutil.cpu_percent(interval=None)
+            self.last_cpu_percent = cpu_percent
 
             # Memoria
             memory = psutil.virtual_memory()
@@ -169,14 +240,14 @@ class MetricsCollector:
             network = psutil.net_io_counters()
 
             # Conexiones activas
-            connections = len(psutil.net_connections())
+            connections = connections_future.result()
 
             # Estado de servicios
-            backend_status = self._check_service_status(self.backend_url)
-            frontend_status = self._check_service_status(self.frontend_url)
+            backend_status = backend_future.result()
+            frontend_status = frontend_future.result()
 
             # Contenedores Docker
-            docker_containers = self._count_docker_containers()
+            docker_containers = docker_future.result()
 
             metrics = {
                 "cpu_percent": cpu_percent,
@@ -203,7 +274,7 @@ class MetricsCollector:
     def _check_service_status(self, url: str) -> str:
         """Verificar estado de un servicio"""
         try:
-            response = requests.get(url, timeout=5)
+            response = self.http_session.get(url, timeout=self.service_timeout)
             if response.status_code == 200:
                 return "running"
             else:
@@ -227,11 +298,35 @@ class MetricsCollector:
         except (subprocess.TimeoutExpired, FileNotFoundError):
             return 0
 
+    def _count_connections(self) -> int:
+        """Contar conexiones de red, como mucho una vez por intervalo"""
+        with self.connections_lock:
+            if time.time() - self.last_connections_check >= self.connections_interval:
+                self.last_connections_check = time.time()
+                try:
+                    self.connections_count = len(psutil.net_connections())
+                except (psutil.AccessDenied, OSError):
+                    pass
+            return self.connections_count
+
     def collect_model_metrics(self) -> List[Dict[str, Any]]:
         """Recopilar métricas reales del modelo"""
         try:
             metrics = []
 
+            # Líneas nuevas de los logs y GPU: una vez por recopilación
+            gpu_future = self.executor.submit(self._get_real_gpu_usage)
+            try:
+                self.log_metrics.update()
+            except Exception as e:
+                log_error("❌ Error leyendo logs de métricas", e)
+
+            inference_time = self._get_real_inference_time()
+            requests_per_minute = self._get_real_requests_per_minute()
+            error_rate = self._get_real_error_rate()
+            avg_response_time = self._get_real_avg_response_time()
+            gpu_usage = gpu_future.result()
+
             # Verificar modelos reales
             model_paths = [
                 "models/custom/shaili-personal-model",
@@ -244,14 +339,14 @@ class MetricsCollector:
                     # Métricas reales del modelo
                     model_metrics = {
                         "model_name": os.path.basename(model_path),
-                        "inference_time_ms": self._get_real_inference_time(),
+                        "inference_time_ms": inference_time,
                         "memory_usage_bytes": self._get_real_model_memory_usage(
                             model_path
                         ),
-                        "gpu_usage_percent": self._get_real_gpu_usage(),
-                        "requests_per_minute": self._get_real_requests_per_minute(),
-                        "error_rate": self._get_real_error_rate(),
-                        "response_time_avg_ms": self._get_real_avg_response_time(),
+                        "gpu_usage_percent": gpu_usage,
+                        "requests_per_minute": requests_per_minute,
+                        "error_rate": error_rate,
+                        "response_time_avg_ms": avg_response_time,
                         "model_status": self._get_model_status(model_path),
                     }
                     metrics.append(model_metrics)
@@ -265,28 +360,12 @@ class MetricsCollector:
     def _get_real_inference_time(self) -> float:
         """Obtener tiempo de inferencia real"""
         try:
-            # Verificar logs de inferencia reales
-            log_files = glob.glob("logs/*.log")
-            if log_files:
-                # Buscar tiempos de inferencia en logs
-                for log_file in log_files:
-                    try:
-                        with open(log_file, "r") as f:
-                            lines = f.readlines()
-                            for line in lines[-100:]:  # Últimas 100 líneas
-                                if "inference_time" in line or "response_time" in line:
-                                    # Extraer tiempo de la línea
-                                    import re
-
-                                    match = re.search(r"(\d+\.?\d*)\s*ms", line)
-                                    if match:
-                                        return float(match.group(1))
-                    except:
-                        continue
+            # Último tiempo de inferencia visto en los logs
+            if self.log_metrics.last_inference_time is not None:
+                return self.log_metrics.last_inference_time
 
             # Fallback: tiempo basado en carga del sistema
-            cpu_percent = psutil.cpu_percent()
-            return 50.0 + (cpu_percent * 1.5)
+            return 50.0 + (self.last_cpu_percent * 1.5)
         except:
             return 75.0
 
@@ -343,49 +422,22 @@ class MetricsCollector:
     def _get_real_requests_per_minute(self) -> int:
         """Obtener requests reales por minuto"""
         try:
-            # Verificar logs de acceso reales
-            access_logs = glob.glob("logs/access*.log") + glob.glob("logs/nginx*.log")
-            if access_logs:
-                current_time = datetime.now()
-                minute_ago = current_time.replace(second=0, microsecond=0)
-
-                request_count = 0
-                for log_file in access_logs:
-                    try:
-                        with open(log_file, "r") as f:
-                            for line in f:
-                                if minute_ago.strftime("%Y-%m-%d %H:%M") in line:
-                                    request_count += 1
-                    except:
-                        continue
-
-                return request_count
+            # Peticiones del último minuto completo en los logs de acceso
+            if self.log_metrics.has_category("requests"):
+                return int(self.log_metrics.minute_value("requests"))
 
-            # Fallback: verificar conexiones activas
-            return len(psutil.net_connections())
+            # Fallback: conexiones activas (conteo en caché)
+            return self._count_connections()
         except:
             return 0
 
     def _get_real_error_rate(self) -> float:
         """Obtener tasa real de errores"""
         try:
-            # Verificar logs de errores reales
-            error_logs = glob.glob("logs/error*.log") + glob.glob("logs/*error*.log")
-            if error_logs:
-                current_time = datetime.now()
-                minute_ago = current_time.replace(second=0, microsecond=0)
-
-                error_count = 0
-                total_requests = self._get_real_requests_per_minute()
-
-                for log_file in error_logs:
-                    try:
-                        with open(log_file, "r") as f:
-                            for line in f:
-                                if minute_ago.strftime("%Y-%m-%d %H:%M") in line:
-                                    error_count += 1
-                    except:
-                        continue
+            # Errores del último minuto completo respecto a las peticiones
+            if self.log_metrics.has_category("errors"):
+                error_count = self.log_metrics.minute_value("errors")
+                total_requests = self.log_metrics.minute_value("requests")
 
                 if total_requests > 0:
                     return (error_count / total_requests) * 100
@@ -398,32 +450,14 @@ class MetricsCollector:
     def _get_real_avg_response_time(self) -> float:
         """Obtener tiempo de respuesta promedio real"""
         try:
-            # Verificar logs de respuesta reales
-            response_logs = glob.glob("logs/response*.log") + glob.glob("logs/api*.log")
-            if response_logs:
-                response_times = []
-                current_time = datetime.now()
-                minute_ago = current_time.replace(second=0, microsecond=0)
-
-                for log_file in response_logs:
-                    try:
-                        with open(log_file, "r") as f:
-                            for line in f:
-                                if minute_ago.strftime("%Y-%m-%d %H:%M") in line:
-                                    import re
-
-                                    match = re.search(r"(\d+\.?\d*)\s*ms", line)
-                                    if match:
-                                        response_times.append(float(match.group(1)))
-                    except:
-                        continue
-
-                if response_times:
-                    return sum(response_times) / len(response_times)
+            # Media del último minuto completo en los logs de respuesta
+            if self.log_metrics.has_category("responses"):
+                count = self.log_metrics.minute_value("response_time_count")
+                if count:
+                    return self.log_metrics.minute_value("response_time_sum") / count
 
             # Fallback: tiempo basado en carga del sistema
-            cpu_percent = psutil.cpu_percent()
-            return 100.0 + (cpu_percent * 2)
+            return 100.0 + (self.last_cpu_percent * 2)
         except:
             return 150.0
 
@@ -688,73 +722,101 @@ class MetricsCollector:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
 
+                # Misma marca de tiempo UTC para toda la recopilación
+                moment = utc_now()
+
                 # Guardar métricas del sistema
                 if system_metrics:
-                    cursor.execute(
-                        """
-                        INSERT INTO system_metrics 
-                        (cpu_percent, memory_percent, memory_used_bytes, memory_total_bytes,
-                         disk_usage_percent, disk_used_bytes, disk_total_bytes,
-                         network_bytes_sent, network_bytes_recv, active_connections,
-                         backend_status, frontend_status, docker_containers_running)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                        (
-                            system_metrics.get("cpu_percent", 0),
-                            system_metrics.get("memory_percent", 0),
-                            system_metrics.get("memory_used_bytes", 0),
-                            system_metrics.get("memory_total_bytes", 0),
-                            system_metrics.get("disk_usage_percent", 0),
-                            system_metrics.get("disk_used_bytes", 0),
-                            system_metrics.get("disk_total_bytes", 0),
-                            system_metrics.get("network_bytes_sent", 0),
-                            system_metrics.get("network_bytes_recv", 0),
-                            system_metrics.get("active_connections", 0),
-                            system_metrics.get("backend_status", "unknown"),
-                            system_metrics.get("frontend_status", "unknown"),
-                            system_metrics.get("docker_containers_running", 0),
-                        ),
+                    self.store.record(
+                        cursor,
+                        "system_metrics",
+                        {
+                            "cpu_percent": system_metrics.get("cpu_percent", 0),
+                            "memory_percent": system_metrics.get("memory_percent", 0),
+                            "memory_used_bytes": system_metrics.get(
+                                "memory_used_bytes", 0
+                            ),
+                            "memory_total_bytes": system_metrics.get(
+                                "memory_total_bytes", 0
+                            ),
+                            "disk_usage_percent": system_metrics.get(
+                                "disk_usage_percent", 0
+                            ),
+                            "disk_used_bytes": system_metrics.get("disk_used_bytes", 0),
+                            "disk_total_bytes": system_metrics.get(
+                                "disk_total_bytes", 0
+                            ),
+                            "network_bytes_sent": system_metrics.get(
+                                "network_bytes_sent", 0
+                            ),
+                            "network_bytes_recv": system_metrics.get(
+                                "network_bytes_recv", 0
+                            ),
+                            "active_connections": system_metrics.get(
+                                "active_connections", 0
+                            ),
+                            "backend_status": system_metrics.get(
+                                "backend_status", "unknown"
+                            ),
+                            "frontend_status": system_metrics.get(
+                                "frontend_status", "unknown"
+                            ),
+                            "docker_containers_running": system_metrics.get(
+                                "docker_containers_running", 0
+                            ),
+                        },
+                        moment,
                     )
 
                 # Guardar métricas del modelo
                 for model_metric in model_metrics:
-                    cursor.execute(
-                        """
-                        INSERT INTO model_metrics 
-                        (model_name, inference_time_ms, memory_usage_bytes, gpu_usage_percent,
-                         requests_per_minute, error_rate, response_time_avg_ms, model_status)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                        (
-                            model_metric.get("model_name", ""),
-                            model_metric.get("inference_time_ms", 0),
-                            model_metric.get("memory_usage_bytes", 0),
-                            model_metric.get("gpu_usage_percent", 0),
-                            model_metric.get("requests_per_minute", 0),
-                            model_metric.get("error_rate", 0),
-                            model_metric.get("response_time_avg_ms", 0),
-                            model_metric.get("model_status", "unknown"),
-                        ),
+                    self.store.record(
+                        cursor,
+                        "model_metrics",
+                        {
+                            "model_name": model_metric.get("model_name", ""),
+                            "inference_time_ms": model_metric.get(
+                                "inference_time_ms", 0
+                            ),
+                            "memory_usage_bytes": model_metric.get(
+                                "memory_usage_bytes", 0
+                            ),
+                            "gpu_usage_percent": model_metric.get(
+                                "gpu_usage_percent", 0
+                            ),
+                            "requests_per_minute": model_metric.get(
+                                "requests_per_minute", 0
+                            ),
+                            "error_rate": model_metric.get("error_rate", 0),
+                            "response_time_avg_ms": model_metric.get(
+                                "response_time_avg_ms", 0
+                            ),
+                            "model_status": model_metric.get("model_status", "unknown"),
+                        },
+                        moment,
                     )
 
                 # Guardar métricas de ramas
                 for branch_metric in branch_metrics:
-                    cursor.execute(
-                        """
-                        INSERT INTO branch_metrics 
-                        (branch_name, active_adapters, training_progress, accuracy_score,
-                         loss_value, samples_processed, last_training_time)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                    """,
-                        (
-                            branch_metric.get("branch_name", ""),
-                            branch_metric.get("active_adapters", 0),
-                            branch_metric.get("training_progress", 0),
-                            branch_metric.get("accuracy_score", 0),
-                            branch_metric.get("loss_value", 0),
-                            branch_metric.get("samples_processed", 0),
-                            branch_metric.get("last_training_time", ""),
-                        ),
+                    self.store.record(
+                        cursor,
+                        "branch_metrics",
+                        {
+                            "branch_name": branch_metric.get("branch_name", ""),
+                            "active_adapters": branch_metric.get("active_adapters", 0),
+                            "training_progress": branch_metric.get(
+                                "training_progress", 0
+                            ),
+                            "accuracy_score": branch_metric.get("accuracy_score", 0),
+                            "loss_value": branch_metric.get("loss_value", 0),
+                            "samples_processed": branch_metric.get(
+                                "samples_processed", 0
+                            ),
+                            "last_training_time": branch_metric.get(
+                                "last_training_time", ""
+                            ),
+                        },
+                        moment,
                     )
 
                 conn.commit()
@@ -887,10 +949,12 @@ class MetricsCollector:
     def collect_and_save(self):
         """Recopilar y guardar todas las métricas"""
         try:
-            # Recopilar métricas
+            # Recopilar métricas (modelos y ramas en paralelo con el sistema)
+            model_future = self.collect_executor.submit(self.collect_model_metrics)
+            branch_future = self.collect_executor.submit(self.collect_branch_metrics)
             system_metrics = self.collect_system_metrics()
-            model_metrics = self.collect_model_metrics()
-            branch_metrics = self.collect_branch_metrics()
+            model_metrics = model_future.result()
+            branch_metrics = branch_future.result()
 
             # Guardar métricas
             self.save_metrics(system_metrics, model_metrics, branch_metrics)
@@ -917,6 +981,9 @@ class MetricsCollector:
             logger.warning("⚠️ La recopilación ya está en ejecución")
             return
 
+        if self.executor is None:
+            self._create_executors()
+
         self.is_running = True
         self.collection_thread = threading.Thread(target=self._collection_loop)
         self.collection_thread.daemon = True
@@ -931,6 +998,7 @@ class MetricsCollector:
         self.is_running = False
         if self.collection_thread:
             self.collection_thread.join()
+        self._shutdown_executors()
         logger.info("🛑 Recopilación de métricas detenida")
 
     def _collection_loop(self):
@@ -938,11 +1006,26 @@ class MetricsCollector:
         while self.is_running:
             try:
                 self.collect_and_save()
+                self._maybe_enforce_retention()
                 time.sleep(self.metrics_interval)
             except Exception as e:
                 log_error("❌ Error en bucle de recopilación", e)
                 time.sleep(self.metrics_interval)
 
+    def _maybe_enforce_retention(self):
+        """Aplicar la retención por resolución como mucho una vez por intervalo"""
+        if time.time() - self.last_retention < self.retention_interval:
+            return
+
+        self.last_retention = time.time()
+        try:
+            removed = self.store.enforce_retention()
+            total = sum(removed.values())
+            if total:
+                logger.info(f"🧹 Retención aplicada: {total} filas eliminadas")
+        except Exception as e:
+            log_error("❌ Error aplicando retención de métricas", e)
+
     def get_latest_metrics(self) -> Dict[str, Any]:
         """Obtener métricas más recientes"""
         try:
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Almacén de Series Temporales de Métricas para Shaili AI
+=======================================================
+Índices por timestamp, agregados automáticos a 1m/5m/1h y retención por
+resolución sobre las tablas de métricas de monitoring/metrics.db
+"""
+
+import logging
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Formato de CURRENT_TIMESTAMP de SQLite (UTC)
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Resoluciones de agregado (segundos por intervalo)
+RESOLUTIONS = {"1m": 60, "5m": 300, "1h": 3600}
+
+# Retención por resolución
+RETENTION = {
+    "raw": timedelta(days=2),
+    "1m": timedelta(days=7),
+    "5m": timedelta(days=30),
+    "1h": timedelta(days=365),
+}
+
+# Tablas de métricas: columna de serie y columnas numéricas agregadas
+METRIC_TABLES = {
+    "system_metrics": {
+        "series": None,
+        "columns": [
+            "cpu_percent",
+            "memory_percent",
+            "memory_used_bytes",
+            "memory_total_bytes",
+            "disk_usage_percent",
+            "active_connections",
+        ],
+    },
+    "model_metrics": {
+        "series": "model_name",
+        "columns": [
+            "inference_time_ms",
+            "memory_usage_bytes",
+            "gpu_usage_percent",
+            "requests_per_minute",
+            "error_rate",
+            "response_time_avg_ms",
+        ],
+    },
+    "branch_metrics": {
+        "series": "branch_name",
+        "columns": [
+            "active_adapters",
+            "training_progress",
+            "accuracy_score",
+            "loss_value",
+            "samples_processed",
+        ],
+    },
+}
+
+
+def utc_now() -> datetime:
+    """Hora actual en UTC sin zona (como CURRENT_TIMESTAMP)"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def format_timestamp(moment: datetime) -> str:
+    """Formatear un instante UTC como los timestamps de la base de datos"""
+    return moment.strftime(TIMESTAMP_FORMAT)
+
+
+def bucket_start(moment: datetime, seconds: int) -> str:
+    """Inicio del intervalo de agregado que contiene un instante"""
+    epoch = int(moment.replace(tzinfo=timezone.utc).timestamp())
+    start = datetime.fromtimestamp(epoch - epoch % seconds, timezone.utc)
+    return format_timestamp(start)
+
+
+def resolution_for_range(hours: float) -> str:
+    """Resolución de lectura según el rango de tiempo mostrado"""
+    if hours <= 1:
+        return "raw"
+    if hours <= 6:
+        return "1m"
+    if hours <= 48:
+        return "5m"
+    return "1h"
+
+
+class MetricsStore:
+    """
+    Almacén de métricas con agregados por resolución
+
+    Cada inserción en una tabla cruda actualiza en la misma transacción la
+    media móvil de su intervalo en las tablas <tabla>_1m, <tabla>_5m y
+    <tabla>_1h, así que los agregados están siempre al día.
+    """
+
+    def __init__(self, db_path: str = "monitoring/metrics.db"):
+        self.db_path = db_path
+
+    def initialize(self, conn: Optional[sqlite3.Connection] = None):
+        """
+        Crear tablas de agregados e índices por timestamp
+
+        Los agregados solo se actualizan al insertar, así que un agregado
+        vacío con filas crudas (base anterior a los agregados) se rellena
+        aquí desde las filas crudas, antes de que la retención las borre.
+        """
+        if conn is None:
+            with sqlite3.connect(self.db_path) as own_conn:
+                self.initialize(own_conn)
+            return
+
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        existing = {row[0] for row in cursor.fetchall()}
+
+        for table, spec in METRIC_TABLES.items():
+            series = spec["series"]
+
+            if table in existing:
+                cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_{table}_timestamp ON {table} (timestamp)"
+                )
+
+            for resolution in RESOLUTIONS:
+                key_columns = ["timestamp"] + ([series] if series else [])
+                column_defs = (
+                    ["timestamp TEXT NOT NULL"]
+                    + ([f"{series} TEXT NOT NULL"] if series else [])
+                    + ["samples INTEGER NOT NULL"]
+                    + [f"{column} REAL" for column in spec["columns"]]
+                )
+                cursor.execute(
+                    f"""
+                    CREATE TABLE IF NOT EXISTS {table}_{resolution} (
+                        {", ".join(column_defs)},
+                        PRIMARY KEY ({", ".join(key_columns)})
+                    )
+                """
+                )
+                if table in existing:
+                    self._backfill_rollup(cursor, table, resolution)
+
+        if "alerts" in existing:
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_alerts_timestamp ON alerts (timestamp)"
+            )
+
+        conn.commit()
+
+    def _backfill_rollup(self, cursor: sqlite3.Cursor, table: str, resolution: str):
+        """Rellenar un agregado vacío desde las filas crudas (una sola vez)"""
+        rollup = f"{table}_{resolution}"
+        cursor.execute(f"SELECT 1 FROM {rollup} LIMIT 1")
+        if cursor.fetchone() is not None:
+            return
+
+        spec = METRIC_TABLES[table]
+        series = spec["series"]
+        seconds = RESOLUTIONS[resolution]
+        bucket = (
+            f"strftime('%Y-%m-%d %H:%M:%S', "
+            f"(CAST(strftime('%s', timestamp) AS INTEGER) / {seconds}) * {seconds}, "
+            f"'unixepoch')"
+        )
+        key_columns = ["timestamp"] + ([series] if series else [])
+        # Mismo criterio que record(): los valores nulos cuentan como 0
+        selected = (
+            [bucket]
+            + ([f"COALESCE({series}, '')"] if series else [])
+            + ["COUNT(*)"]
+            + [f"AVG(COALESCE({column}, 0))" for column in spec["columns"]]
+        )
+        rollup_columns = key_columns + ["samples"] + spec["columns"]
+        cursor.execute(
+            f"""
+            INSERT INTO {rollup} ({", ".join(rollup_columns)})
+            SELECT {", ".join(selected)}
+            FROM {table}
+            WHERE timestamp IS NOT NULL
+            GROUP BY {", ".join(str(i + 1) for i in range(len(key_columns)))}
+        """
+        )
+        if cursor.rowcount > 0:
+            logger.info(
+                f"📊 {rollup}: {cursor.rowcount} intervalos rellenados desde {table}"
+            )
+
+    def record(
+        self,
+        cursor: sqlite3.Cursor,
+        table: str,
+        values: Dict[str, Any],
+        moment: Optional[datetime] = None,
+    ):
+        """
+        Insertar una fila cruda y actualizar sus agregados
+
+        Args:
+            cursor: Cursor de la transacción en curso
+            table: Tabla de métricas (system_metrics, model_metrics, branch_metrics)
+            values: Columnas de la fila cruda
+            moment: Instante UTC de la muestra (ahora por defecto)
+        """
+        moment = moment or utc_now()
+        spec = METRIC_TABLES[table]
+        series = spec["series"]
+
+        row = dict(values, timestamp=format_timestamp(moment))
+        columns = list(row)
+        cursor.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)})",
+            [row[column] for column in columns],
+        )
+
+        key_columns = ["timestamp"] + ([series] if series else [])
+        rollup_columns = key_columns + ["samples"] + spec["columns"]
+        averages = ", ".join(
+            f"{column} = ({column} * samples + excluded.{column}) / (samples + 1)"
+            for column in spec["columns"]
+        )
+
+        for resolution, seconds in RESOLUTIONS.items():
+            key_values = [bucket_start(moment, seconds)] + (
+                [values.get(series, "")] if series else []
+            )
+            cursor.execute(
+                f"""
+                INSERT INTO {table}_{resolution} ({", ".join(rollup_columns)})
+                VALUES ({", ".join("?" for _ in rollup_columns)})
+                ON CONFLICT({", ".join(key_columns)}) DO UPDATE SET
+                    {averages},
+                    samples = samples + 1
+            """,
+                key_values
+                + [1]
+                + [float(values.get(column) or 0) for column in spec["columns"]],
+            )
+
+    def enforce_retention(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Eliminar filas más antiguas que la retención de cada resolución
+
+        Returns:
+            Filas eliminadas por tabla
+        """
+        now = now or utc_now()
+        removed = {}
+
+        with sqlite3.connect(self.db_path) as conn:
+            # Completar los agregados antes de borrar filas crudas
+            self.initialize(conn)
+            cursor = conn.cursor()
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+            existing = {row[0] for row in cursor.fetchall()}
+
+            for table in METRIC_TABLES:
+                for resolution, retention in RETENTION.items():
+                    target = table if resolution == "raw" else f"{table}_{resolution}"
+                    if target not in existing:
+                        continue
+                    cursor.execute(
+                        f"DELETE FROM {target} WHERE timestamp < ?",
+                        (format_timestamp(now - retention),),
+                    )
+                    removed[target] = cursor.rowcount
+            conn.commit()
+
+        return removed
+
+    def fetch(
+        self,
+        table: str,
+        columns: List[str],
+        resolution: str,
+        since: str,
+    ) -> Tuple[List[str], List[Tuple]]:
+        """
+        Leer filas con timestamp >= since en la resolución indicada
+
+        Returns:
+            (nombres de columna, filas) ordenadas por timestamp
+        """
+        series = METRIC_TABLES[table]["series"]
+        source = table if resolution == "raw" else f"{table}_{resolution}"
+        selected = ["timestamp"] + ([series] if series else []) + columns
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT {', '.join(selected)} FROM {source} "
+                f"WHERE timestamp >= ? ORDER BY timestamp",
+                (since,),
+            )
+            return selected, cursor.fetchall()
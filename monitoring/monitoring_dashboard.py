@@ -17,11 +17,26 @@ import logging
 import traceback
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 import threading
 import time
 import requests  # Añadir esta importación al principio del archivo
 
+try:
+    from monitoring.metrics_store import (
+        MetricsStore,
+        format_timestamp,
+        resolution_for_range,
+        utc_now,
+    )
+except ImportError:
+    from metrics_store import (
+        MetricsStore,
+        format_timestamp,
+        resolution_for_range,
+        utc_now,
+    )
+
 # Configurar logging con más detalles
 logging.basicConfig(
     level=logging.INFO,
@@ -64,24 +79,65 @@ class MonitoringDashboard:
         # Crear directorio si no existe
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
 
-    def get_system_metrics_data(self, hours: int = 24) -> pd.DataFrame:
-        """Obtener datos de métricas del sistema"""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cutoff_time = datetime.now() - timedelta(hours=hours)
+        # Almacén de métricas y series ya leídas por (tabla, resolución, rango)
+        self.store = MetricsStore(db_path)
+        self.store.initialize()
+        self._series_cache: Dict[Tuple[str, str, int], pd.DataFrame] = {}
+        self._cache_lock = threading.Lock()
+
+    def _get_series_data(
+        self, table: str, columns: List[str], hours: int
+    ) -> pd.DataFrame:
+        """
+        Obtener una serie en la resolución adecuada al rango
+
+        Cada refresco solo lee las filas desde el último timestamp en
+        memoria (incluido, porque el último intervalo agregado puede
+        haber cambiado) y descarta las que salen de la ventana.
+        """
+        resolution = resolution_for_range(hours)
+        cutoff = pd.Timestamp(utc_now() - timedelta(hours=hours))
+        key = (table, resolution, hours)
+
+        with self._cache_lock:
+            cached = self._series_cache.get(key)
+
+        if cached is not None and not cached.empty:
+            since = cached["timestamp"].max()
+            cached = cached[cached["timestamp"] < since]
+        else:
+            since = cutoff
+            cached = None
+
+        names, rows = self.store.fetch(
+            table, columns, resolution, format_timestamp(since)
+        )
+        new_rows = pd.DataFrame.from_records(rows, columns=names)
+        new_rows["timestamp"] = pd.to_datetime(new_rows["timestamp"])
 
-                query = """
-                    SELECT timestamp, cpu_percent, memory_percent, disk_usage_percent,
-                           memory_used_bytes, memory_total_bytes, active_connections
-                    FROM system_metrics 
-                    WHERE timestamp > ?
-                    ORDER BY timestamp
-                """
+        df = new_rows if cached is None else pd.concat([cached, new_rows])
+        df = df[df["timestamp"] > cutoff].reset_index(drop=True)
 
-                df = pd.read_sql_query(query, conn, params=(cutoff_time.isoformat(),))
-                df["timestamp"] = pd.to_datetime(df["timestamp"])
+        with self._cache_lock:
+            self._series_cache[key] = df
 
-                return df
+        return df
+
+    def get_system_metrics_data(self, hours: int = 24) -> pd.DataFrame:
+        """Obtener datos de métricas del sistema"""
+        try:
+            return self._get_series_data(
+                "system_metrics",
+                [
+                    "cpu_percent",
+                    "memory_percent",
+                    "disk_usage_percent",
+                    "memory_used_bytes",
+                    "memory_total_bytes",
+                    "active_connections",
+                ],
+                hours,
+            )
 
         except Exception as e:
             log_error("❌ Error obteniendo métricas del sistema", e)
@@ -90,21 +146,18 @@ class MonitoringDashboard:
     def get_model_metrics_data(self, hours: int = 24) -> pd.DataFrame:
         """Obtener datos de métricas del modelo"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cutoff_time = datetime.now() - timedelta(hours=hours)
-
-                query = """
-                    SELECT timestamp, model_name, inference_time_ms, memory_usage_bytes,
-                           gpu_usage_percent, requests_per_minute, error_rate, response_time_avg_ms
-                    FROM model_metrics 
-                    WHERE timestamp > ?
-                    ORDER BY timestamp
-                """
-
-                df = pd.read_sql_query(query, conn, params=(cutoff_time.isoformat(),))
-                df["timestamp"] = pd.to_datetime(df["timestamp"])
-
-                return df
+            return self._get_series_data(
+                "model_metrics",
+                [
+                    "inference_time_ms",
+                    "memory_usage_bytes",
+                    "gpu_usage_percent",
+                    "requests_per_minute",
+                    "error_rate",
+                    "response_time_avg_ms",
+                ],
+                hours,
+            )
 
         except Exception as e:
             log_error("❌ Error obteniendo métricas del modelo", e)
@@ -113,21 +166,17 @@ class MonitoringDashboard:
     def get_branch_metrics_data(self, hours: int = 24) -> pd.DataFrame:
         """Obtener datos de métricas de ramas"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cutoff_time = datetime.now() - timedelta(hours=hours)
-
-                query = """
-                    SELECT timestamp, branch_name, active_adapters, training_progress,
-                           accuracy_score, loss_value, samples_processed
-                    FROM branch_metrics 
-                    WHERE timestamp > ?
-                    ORDER BY timestamp
-                """
-
-                df = pd.read_sql_query(query, conn, params=(cutoff_time.isoformat(),))
-                df["timestamp"] = pd.to_datetime(df["timestamp"])
-
-                return df
+            return self._get_series_data(
+                "branch_metrics",
+                [
+                    "active_adapters",
+                    "training_progress",
+                    "accuracy_score",
+                    "loss_value",
+                    "samples_processed",
+                ],
+                hours,
+            )
 
         except Exception as e:
             log_error("❌ Error obteniendo métricas de ramas", e)
@@ -137,16 +186,19 @@ class MonitoringDashboard:
         """Obtener datos de alertas"""
         try:
             with sqlite3.connect(self.db_path) as conn:
-                cutoff_time = datetime.now() - timedelta(hours=hours)
+                cutoff_time = utc_now() - timedelta(hours=hours)
 
                 query = """
                     SELECT timestamp, alert_type, severity, message, resolved
                     FROM alerts 
                     WHERE timestamp > ?
                     ORDER BY timestamp DESC
+                    LIMIT 10
                 """
 
-                df = pd.read_sql_query(query, conn, params=(cutoff_time.isoformat(),))
+                df = pd.read_sql_query(
+                    query, conn, params=(format_timestamp(cutoff_time),)
+                )
                 df["timestamp"] = pd.to_datetime(df["timestamp"])
 
                 return df
@@ -490,6 +542,7 @@ app.layout = html.Div(
                         {"label": "6 hours", "value": 6},
                         {"label": "12 hours", "value": 12},
                         {"label": "24 hours", "value": 24},
+                        {"label": "7 days", "value": 168},
                     ],
                     value=24,
                     style={"width": 150, "display": "inline-block"},
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Pruebas de las métricas incrementales de logs
+
+Comprueban la lectura por offset (líneas a medio escribir, rotación y
+truncado) y que los contadores por minuto sobreviven a un reinicio.
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from log_metrics import LogTailer, RollingLogMetrics, parse_minute
+
+
+def _append(path: Path, text: str):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_tailer_reads_only_complete_new_lines(tmp_path):
+    """Las líneas incompletas esperan a la siguiente lectura"""
+    log = Path(tmp_path) / "access.log"
+    log.write_text("uno\ndos\ntr", encoding="utf-8")
+
+    tailer = LogTailer()
+    assert tailer.read_new_lines(str(log)) == ["uno", "dos"]
+    assert tailer.read_new_lines(str(log)) == []
+
+    _append(log, "es\ncuatro\n")
+    assert tailer.read_new_lines(str(log)) == ["tres", "cuatro"]
+
+
+def test_tailer_restarts_after_rotation_and_truncation(tmp_path):
+    """Un inode nuevo o un archivo más corto se leen desde el principio"""
+    log = Path(tmp_path) / "error.log"
+    log.write_text("viejo 1\nviejo 2\n", encoding="utf-8")
+    tailer = LogTailer()
+    tailer.read_new_lines(str(log))
+
+    # Rotación: el archivo se renombra y se crea otro con el mismo nombre
+    os.replace(log, Path(tmp_path) / "error.log.1")
+    log.write_text("nuevo\n", encoding="utf-8")
+    assert tailer.read_new_lines(str(log)) == ["nuevo"]
+
+    # Truncado en el sitio
+    log.write_text("", encoding="utf-8")
+    tailer.read_new_lines(str(log))
+    _append(log, "otra\n")
+    assert tailer.read_new_lines(str(log)) == ["otra"]
+
+
+def test_tailer_skips_partial_line_on_backfill(tmp_path):
+    """En la primera lectura de un log grande no se cuenta media línea"""
+    log = Path(tmp_path) / "api.log"
+    log.write_text("a" * 50 + "\nlínea completa\n", encoding="utf-8")
+
+    tailer = LogTailer(initial_backfill_bytes=20)
+    assert tailer.read_new_lines(str(log)) == ["línea completa"]
+
+
+def test_rolling_counters_survive_restart(tmp_path):
+    """Los contadores y offsets se guardan y se retoman sin recontar"""
+    log_dir = Path(tmp_path) / "logs"
+    log_dir.mkdir()
+    state_path = Path(tmp_path) / "log_offsets.json"
+    now = datetime(2024, 1, 15, 10, 31, 5)
+
+    _append(log_dir / "access.log", "2024-01-15 10:30:01 GET /\n" * 3)
+    _append(
+        log_dir / "api.log",
+        "2024-01-15 10:30:02 response_time 120ms\n"
+        "2024-01-15 10:30:09 response_time 80ms\n",
+    )
+
+    metrics = RollingLogMetrics(str(log_dir), str(state_path))
+    metrics.update(now)
+    assert metrics.minute_value("requests", now) == 3
+    assert metrics.minute_value("response_time_sum", now) == 200
+    assert metrics.last_inference_time == 80
+    assert metrics.has_category("responses")
+    assert not metrics.has_category("errors")
+
+    _append(log_dir / "access.log", "2024-01-15 10:30:40 GET /salud\n")
+    restarted = RollingLogMetrics(str(log_dir), str(state_path))
+    restarted.update(now)
+    assert restarted.minute_value("requests", now) == 4
+    assert restarted.minute_value("response_time_count", now) == 2
+
+
+def test_parse_minute_formats():
+    """Minutos de líneas ISO y de nginx"""
+    assert parse_minute("2024-01-15T10:30:59 ok") == "2024-01-15 10:30"
+    assert (
+        parse_minute('1.2.3.4 - - [15/Jan/2024:10:30:59 +0000] "GET /"')
+        == "2024-01-15 10:30"
+    )
+    assert parse_minute("sin fecha") is None
+
+
+def main():
+    """Ejecutar las pruebas sin pytest"""
+    tests = [
+        test_tailer_reads_only_complete_new_lines,
+        test_tailer_restarts_after_rotation_and_truncation,
+        test_tailer_skips_partial_line_on_backfill,
+        test_rolling_counters_survive_restart,
+    ]
+    failed = 0
+    for test in tests + [test_parse_minute_formats]:
+        try:
+            if test in tests:
+                test(tempfile.mkdtemp(prefix="log_metrics_test_"))
+            else:
+                test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Pruebas del almacén de series temporales de métricas
+
+Comprueban que los agregados se rellenan desde las filas crudas ya
+existentes antes de que la retención las borre.
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from metrics_store import MetricsStore, format_timestamp, utc_now
+
+
+def _create_raw_tables(db_path: str):
+    """Tablas crudas como las crea MetricsCollector (sin agregados)"""
+    with sqlite3.connect(db_path) as conn:
+        conn.executescript(
+            """
+            CREATE TABLE system_metrics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                cpu_percent REAL, memory_percent REAL, memory_used_bytes INTEGER,
+                memory_total_bytes INTEGER, disk_usage_percent REAL,
+                active_connections INTEGER
+            );
+            CREATE TABLE model_metrics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                model_name TEXT, inference_time_ms REAL, memory_usage_bytes INTEGER,
+                gpu_usage_percent REAL, requests_per_minute INTEGER,
+                error_rate REAL, response_time_avg_ms REAL
+            );
+            """
+        )
+
+
+def _insert_history(db_path: str, days_ago: float, samples):
+    """Insertar filas crudas antiguas: (segundos, cpu, modelo, inferencia)"""
+    base = utc_now() - timedelta(days=days_ago)
+    base = base.replace(minute=0, second=0, microsecond=0)
+    with sqlite3.connect(db_path) as conn:
+        for offset, cpu, model, inference in samples:
+            moment = format_timestamp(base + timedelta(seconds=offset))
+            conn.execute(
+                "INSERT INTO system_metrics (timestamp, cpu_percent) VALUES (?, ?)",
+                (moment, cpu),
+            )
+            conn.execute(
+                "INSERT INTO model_metrics (timestamp, model_name, inference_time_ms) "
+                "VALUES (?, ?, ?)",
+                (moment, model, inference),
+            )
+    return base
+
+
+def _rows(db_path: str, query: str):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute(query).fetchall()
+
+
+def test_initialize_backfills_existing_history(tmp_path):
+    """Una base anterior a los agregados conserva su historia tras la retención"""
+    db_path = str(Path(tmp_path) / "metrics.db")
+    _create_raw_tables(db_path)
+    base = _insert_history(
+        db_path,
+        days_ago=5,
+        samples=[
+            (0, 10.0, "a", 100.0),
+            (30, 20.0, "b", 300.0),
+            (90, 60.0, "a", 200.0),
+        ],
+    )
+
+    store = MetricsStore(db_path)
+    store.initialize()
+
+    minute = format_timestamp(base)
+    assert _rows(
+        db_path,
+        "SELECT samples, cpu_percent FROM system_metrics_1m "
+        f"WHERE timestamp = '{minute}'",
+    ) == [(2, 15.0)]
+    assert _rows(
+        db_path, "SELECT samples, cpu_percent FROM system_metrics_1h"
+    ) == [(3, 30.0)]
+    assert _rows(
+        db_path,
+        "SELECT model_name, samples, inference_time_ms FROM model_metrics_5m "
+        "ORDER BY model_name",
+    ) == [("a", 2, 150.0), ("b", 1, 300.0)]
+
+    # La retención borra las filas crudas (> 2 días) pero no los agregados
+    removed = store.enforce_retention()
+    assert removed["system_metrics"] == 3
+    assert _rows(db_path, "SELECT COUNT(*) FROM system_metrics") == [(0,)]
+    assert _rows(db_path, "SELECT samples FROM system_metrics_1h") == [(3,)]
+
+
+def test_backfill_runs_once(tmp_path):
+    """Volver a inicializar no duplica ni recalcula agregados ya rellenos"""
+    db_path = str(Path(tmp_path) / "metrics.db")
+    _create_raw_tables(db_path)
+    _insert_history(db_path, days_ago=1, samples=[(0, 40.0, "a", 10.0)])
+
+    store = MetricsStore(db_path)
+    store.initialize()
+    store.initialize()
+    assert _rows(db_path, "SELECT samples FROM system_metrics_1h") == [(1,)]
+
+    # Las inserciones nuevas siguen actualizando los agregados
+    with sqlite3.connect(db_path) as conn:
+        store.record(conn.cursor(), "system_metrics", {"cpu_percent": 80.0})
+    store.initialize()
+    assert _rows(
+        db_path, "SELECT SUM(samples) FROM system_metrics_1h"
+    ) == [(2,)]
+
+
+def test_enforce_retention_backfills_first(tmp_path):
+    """La retención rellena los agregados si nadie llamó antes a initialize"""
+    db_path = str(Path(tmp_path) / "metrics.db")
+    _create_raw_tables(db_path)
+    _insert_history(db_path, days_ago=3, samples=[(0, 50.0, "a", 5.0)])
+
+    MetricsStore(db_path).enforce_retention()
+
+    assert _rows(db_path, "SELECT COUNT(*) FROM system_metrics") == [(0,)]
+    assert _rows(db_path, "SELECT samples, cpu_percent FROM system_metrics_1m") == [
+        (1, 50.0)
+    ]
+
+
+def main():
+    """Ejecutar las pruebas sin pytest"""
+    tests = [
+        test_initialize_backfills_existing_history,
+        test_backfill_runs_once,
+        test_enforce_retention_backfills_first,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test(tempfile.mkdtemp(prefix="metrics_store_test_"))
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
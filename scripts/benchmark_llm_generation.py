@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark de Generación de LocalLLMModel
+Sheily AI - Tokens por segundo con un modelo local pequeño
+
+Compara, para cada forma de carga (fp32, bf16, int8 dinámico en CPU):
+  - secuencial: generate_text prompt a prompt
+  - lotes: generate_batch con relleno a la izquierda
+  - streaming: tiempo hasta el primer fragmento de stream_text
+
+Uso:
+    python scripts/benchmark_llm_generation.py --model-path sshleifer/tiny-gpt2
+"""
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "modules" / "ai"))
+
+from llm_models import LocalLLMModel, ModelConfig
+
+PROMPTS = [
+    "Hola",
+    "Explica qué es un token",
+    "Resume en una frase la historia de la computación personal",
+    "¿Cuál es la capital de Francia?",
+    "Escribe un haiku sobre el otoño",
+    "Enumera tres ventajas de usar lotes al generar texto con un modelo",
+    "Traduce al inglés: buenos días",
+    "Describe brevemente cómo funciona la caché de claves y valores",
+]
+
+VARIANTS = {
+    "fp32": {"torch_dtype": "float32"},
+    "bf16": {"torch_dtype": "bfloat16"},
+    "int8 dinámico": {"torch_dtype": "float32", "quantization": "int8"},
+}
+
+
+def run_variant(model_path: str, options: dict, prompts, max_new_tokens: int):
+    """Tokens/s secuencial y en lotes, y latencia del primer fragmento"""
+    model = LocalLLMModel(
+        ModelConfig(
+            model_name=model_path,
+            model_path=model_path,
+            device="cpu",
+            max_new_tokens=max_new_tokens,
+            max_batch_size=len(prompts),
+            **options,
+        )
+    )
+    if not model.model:
+        return None
+
+    # Calentamiento
+    model.generate_text(prompts[0])
+
+    tokens = 0
+    start = time.perf_counter()
+    for prompt in prompts:
+        model.generate_text(prompt)
+        tokens += model.last_generation_stats["new_tokens"]
+    sequential = tokens / (time.perf_counter() - start)
+
+    model.generate_batch(prompts)
+    batched = model.last_generation_stats["tokens_per_second"]
+
+    start = time.perf_counter()
+    stream = model.stream_text(prompts[0])
+    next(stream)
+    first_chunk_ms = (time.perf_counter() - start) * 1000
+    for _ in stream:
+        pass
+
+    return sequential, batched, first_chunk_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de LocalLLMModel")
+    parser.add_argument("--model-path", default="sshleifer/tiny-gpt2")
+    parser.add_argument("--max-new-tokens", type=int, default=32)
+    parser.add_argument("--prompts", type=int, default=len(PROMPTS))
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    prompts = (PROMPTS * (args.prompts // len(PROMPTS) + 1))[: args.prompts]
+
+    print(
+        f"📊 {args.model_path}: {len(prompts)} prompts, "
+        f"{args.max_new_tokens} tokens nuevos por respuesta"
+    )
+    print(f"  {'carga':<14} {'secuencial':>12} {'lotes':>12} {'1er fragmento':>14}")
+    for name, options in VARIANTS.items():
+        result = run_variant(args.model_path, options, prompts, args.max_new_tokens)
+        if result is None:
+            print(f"  {name:<14} no disponible")
+            continue
+        sequential, batched, first_chunk_ms = result
+        print(
+            f"  {name:<14} {sequential:>8.1f} t/s {batched:>8.1f} t/s "
+            f"{first_chunk_ms:>11.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark del RateLimiter de Blockchain
+Sheily AI - Latencia de check_rate_limit según el historial de peticiones
+
+El estado GCRA es constante por (usuario, regla), así que la latencia de
+cada comprobación no debe crecer con el número de peticiones registradas.
+Se mide con el estado en memoria y con el estado compartido en SQLite.
+
+Uso:
+    python scripts/benchmark_rate_limiter.py --checks 20000
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "modules" / "blockchain"))
+
+from rate_limiter import RateLimitConfig, RateLimiter, RateLimitRule
+
+HISTORY_LENGTHS = [10, 1000, 100000]
+
+
+def build_limiter(tmp: str, shared: bool) -> RateLimiter:
+    """Limiter con una regla lo bastante amplia para no bloquear al medir"""
+    limiter = RateLimiter(
+        config_path=os.path.join(tmp, f"rate_limits_{int(shared)}.json"),
+        shared_state_path=os.path.join(tmp, "rate_limits.db") if shared else None,
+    )
+    limiter.add_rate_limit_rule(
+        RateLimitRule(
+            rule_id="bench",
+            description="Regla de benchmark",
+            config=RateLimitConfig(
+                max_requests=10**9, time_window=3600, burst_limit=10**9
+            ),
+        )
+    )
+    return limiter
+
+
+def measure(limiter: RateLimiter, history: int, checks: int) -> float:
+    """Latencia media (µs) de check_rate_limit tras `history` peticiones"""
+    user_id = f"user_{history}"
+    for _ in range(history):
+        limiter.record_request(user_id, "bench")
+
+    start = time.perf_counter()
+    for _ in range(checks):
+        limiter.check_rate_limit(user_id, "bench")
+    return (time.perf_counter() - start) / checks * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark de RateLimiter")
+    parser.add_argument("--checks", type=int, default=20000)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for shared in (False, True):
+            limiter = build_limiter(tmp, shared)
+            backend = "SQLite compartido" if shared else "memoria"
+            checks = args.checks // 10 if shared else args.checks
+            print(f"📊 Estado en {backend} ({checks} comprobaciones por medida)")
+            for history in HISTORY_LENGTHS:
+                # El historial en SQLite se limita para no alargar la preparación
+                history = min(history, 10000) if shared else history
+                latency = measure(limiter, history, checks)
+                print(f"  historial {history:>7}: {latency:8.2f} µs/check")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Benchmark de Escritura de SPLDataPersistence
+Sheily AI - Operaciones por segundo del ledger SPL
+
+Compara tres formas de registrar transacciones con su actualización de
+balance:
+  - antes: conexión nueva y commit por operación (journal por defecto)
+  - WAL: conexión persistente por hilo, un commit por operación
+  - WAL + batch(): todas las operaciones de un lote en un único commit
+
+Uso:
+    python scripts/benchmark_spl_persistence.py --operations 2000 --batch-size 500
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "modules" / "blockchain"))
+
+from spl_data_persistence import SPLDataPersistence, TransactionRecord
+
+TOKEN_MINT = "BenchMint111111111111111111111111111111111"
+
+
+def make_transaction(index: int) -> TransactionRecord:
+    """Transacción de prueba"""
+    return TransactionRecord(
+        transaction_id=str(uuid.uuid4()),
+        signature=None,
+        from_user="system",
+        to_user=f"user_{index % 100}",
+        amount=10,
+        token_mint=TOKEN_MINT,
+        transaction_type="mint",
+        reason="benchmark",
+        status="confirmed",
+        block_height=None,
+        fee=0.000005,
+        slot=None,
+        confirmation_status=None,
+        created_at=datetime.now(),
+        confirmed_at=None,
+        metadata={"index": index},
+    )
+
+
+def bench_legacy(db_path: str, operations: int) -> float:
+    """Comportamiento anterior: conexión y commit por operación"""
+    SPLDataPersistence(db_path).close()
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("PRAGMA journal_mode=DELETE")
+
+    start = time.perf_counter()
+    for index in range(operations):
+        tx = make_transaction(index)
+        for statements in (
+            [
+                (
+                    "INSERT INTO transactions (transaction_id, from_user, to_user, amount, "
+                    "token_mint, transaction_type, reason, status, fee, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (tx.transaction_id, tx.from_user, tx.to_user, tx.amount,
+                     tx.token_mint, tx.transaction_type, tx.reason, tx.status,
+                     tx.fee, tx.created_at.isoformat()),
+                )
+            ],
+            [
+                (
+                    "UPDATE token_accounts SET balance = ?, last_updated = ? "
+                    "WHERE user_id = ? AND mint_address = ?",
+                    (index, datetime.now().isoformat(), tx.to_user, TOKEN_MINT),
+                ),
+                (
+                    "INSERT OR REPLACE INTO token_balances "
+                    "(user_id, token_mint, balance, last_updated, transaction_count) "
+                    "VALUES (?, ?, ?, ?, COALESCE((SELECT transaction_count FROM "
+                    "token_balances WHERE user_id = ? AND token_mint = ?), 0) + 1)",
+                    (tx.to_user, TOKEN_MINT, index, datetime.now().isoformat(),
+                     tx.to_user, TOKEN_MINT),
+                ),
+            ],
+        ):
+            conn = sqlite3.connect(db_path)
+            try:
+                for query, params in statements:
+                    conn.execute(query, params)
+                conn.commit()
+            finally:
+                conn.close()
+    return time.perf_counter() - start
+
+
+def bench_wal(db_path: str, operations: int, batch_size: int = 0) -> float:
+    """Conexión persistente en WAL, con o sin lotes"""
+    persistence = SPLDataPersistence(db_path)
+
+    def run(indices):
+        for index in indices:
+            tx = make_transaction(index)
+            persistence.save_transaction(tx)
+            persistence.update_token_balance(tx.to_user, index, TOKEN_MINT)
+
+    start = time.perf_counter()
+    if batch_size:
+        for offset in range(0, operations, batch_size):
+            with persistence.batch():
+                run(range(offset, min(offset + batch_size, operations)))
+    else:
+        run(range(operations))
+    elapsed = time.perf_counter() - start
+
+    persistence.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de SPLDataPersistence")
+    parser.add_argument("--operations", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    # Los logs por operación distorsionarían la medida
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {
+            "antes (conexión + commit por operación)": bench_legacy(
+                os.path.join(tmp, "legacy.db"), args.operations
+            ),
+            "WAL, conexión persistente": bench_wal(
+                os.path.join(tmp, "wal.db"), args.operations
+            ),
+            f"WAL + batch({args.batch_size})": bench_wal(
+                os.path.join(tmp, "batch.db"), args.operations, args.batch_size
+            ),
+        }
+
+    # Cada operación del ledger es una transacción más su actualización de balance
+    print(f"📊 {args.operations} operaciones (transacción + balance)")
+    baseline = None
+    for name, elapsed in results.items():
+        ops = args.operations / elapsed
+        baseline = baseline or ops
+        print(f"  {name:<42} {ops:>10.0f} ops/s  (x{ops / baseline:.1f})")
+
+
+if __name__ == "__main__":
+    main()